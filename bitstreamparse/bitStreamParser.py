@@ -46,32 +46,14 @@ class BitStreamParser(object):
 
         pass
 
+    @abstractmethod
     def _parse_pcap_file(self):
+        """
+        Extracts the bit stream of the capture, whose packets are looked up in its packet index (see
+        `util.packetIndex`).
+        """
 
-        self._before_parsing()
-
-        from scapy.all import rdpcap
-        self._packets = rdpcap(self._pcap_file_path)
-
-        self._parse_packets()
-
-        self._after_parsing()
-
-    def _parse_packets(self):
-
-        packet_count = len(self._packets)
-        packet_index = 1
-
-        for packet in self._packets:
-
-            self._dump_packet_index(packet_index, packet_count)
-
-            # noinspection PyBroadException
-            # try:
-            self._parse_packet(packet)
-            # except: pass
-
-            packet_index += 1
+        pass
 
     def get_bit_stream(self):
         """
@@ -81,29 +63,13 @@ class BitStreamParser(object):
 
         return self._bit_stream
 
-    @abstractmethod
-    def _parse_packet(self, packet):
-        """
-        This method can be used to parse a singular packet into the bitstream
-
-        :param packet: the packet to parse
-        :type packet: Packet
-        """
-
-        pass
-
-    @abstractmethod
-    def _before_parsing(self):
-        """
-        Use this method to execute code before all packets are parsed
+    def write_bit_stream(self, file_path):
         """
+        Writes the bit stream extracted from the parsed packets into a file.
 
-        print 'No bounding!'
-
-    @abstractmethod
-    def _after_parsing(self):
-        """
-        Use this method to execute code after all packets were parsed
+        :param file_path: the path of the file to write
+        :type file_path: basestring
         """
 
-        print 'No splitting!'
+        with open(file_path, 'wb') as bit_stream_file:
+            bit_stream_file.write(self.get_bit_stream())
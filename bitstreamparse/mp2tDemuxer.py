@@ -0,0 +1,337 @@
+"""
+Demultiplexes the MPEG transport stream carried by the payloads of a capture, instead of just concatenating them.
+
+The payloads are viewed as one (N, 188) array of TS packets, whose sync bytes are validated and whose header fields
+(PID, payload_unit_start_indicator, adaptation_field_control, continuity_counter) are extracted for all packets at
+once. The continuity counters are checked per PID to detect the lost TS packets, which are written into a loss map
+next to the extracted stream (see `Mp2tDemuxer.write`).
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+from util.packetIndex import TS_PACKET_SIZE, TS_SYNC_BYTE
+
+# the fields of the loss map: one entry per extracted TS packet
+LOSS_MAP_DTYPE = numpy.dtype([
+    # number of the TS packet in the extracted stream (starting at 1)
+    ('packet', '<u8'),
+    ('pid', '<u2'),
+    ('continuity_counter', '<u1'),
+    # number of lost TS packets of the PID right before this packet (modulo 16, as given by the continuity counter)
+    ('lost_before', '<u1'),
+    # 1 if the packet repeats its predecessor of the same PID
+    ('is_duplicate', '<u1'),
+    ('is_unit_start', '<u1')
+])
+
+# suffix of the loss map file of an extracted stream
+LOSS_MAP_FILE_SUFFIX = '_ts_loss.csv'
+
+
+def get_loss_map_file_path(stream_file_path):
+    """
+    Returns the path of the loss map file of an extracted transport stream.
+
+    :param stream_file_path: the path of the extracted transport stream
+    :type stream_file_path: basestring
+
+    :rtype: basestring
+    """
+
+    from os.path import splitext
+
+    assert isinstance(stream_file_path, basestring)
+
+    return splitext(stream_file_path)[0] + LOSS_MAP_FILE_SUFFIX
+
+
+def get_ts_packets(data, payload_starts, payload_ends):
+    """
+    Concatenates the payloads of packets and views them as TS packets. Trailing bytes of a payload, which do not form
+    a complete TS packet, are skipped.
+
+    :param data: the content of the capture
+    :type data: numpy.ndarray
+
+    :param payload_starts: the file offsets of the payloads
+    :type payload_starts: numpy.ndarray
+
+    :param payload_ends: the end (exclusive) file offsets of the payloads
+    :type payload_ends: numpy.ndarray
+
+    :return: the TS packets (N x 188 bytes)
+    :rtype: numpy.ndarray
+    """
+
+    payload_ends = payload_starts + numpy.maximum(payload_ends - payload_starts, 0) // TS_PACKET_SIZE * TS_PACKET_SIZE
+
+    payloads = [data[start:end] for (start, end) in zip(payload_starts.tolist(), payload_ends.tolist()) if start < end]
+    if not payloads:
+        return numpy.zeros((0, TS_PACKET_SIZE), dtype=numpy.uint8)
+
+    return numpy.concatenate(payloads).reshape(-1, TS_PACKET_SIZE)
+
+
+class Mp2tDemuxer(object):
+    """
+    Demultiplexes TS packets (see the module description).
+
+    A TS packet is lost if the continuity counter of the next packet of its PID skips its value; the number of lost
+    packets is only known modulo 16. Packets without payload do not increment the counter, a packet with payload may
+    be sent twice, and the counters of null packets and of packets with the discontinuity_indicator set are not
+    checked.
+
+    Stray PIDs, i.e. PIDs which are neither PSI/SI tables nor announced by the program association table (PAT) and the
+    program map tables (PMT), e.g. null packets, can be dropped from the extracted stream.
+    """
+
+    NULL_PID = 0x1fff
+    PAT_PID = 0x0000
+
+    # the PIDs of the PSI/SI tables (PAT, CAT, NIT, SDT, EIT, ...)
+    PSI_PID_MAX = 0x001f
+
+    PAT_TABLE_ID = 0x00
+    PMT_TABLE_ID = 0x02
+
+    CONTINUITY_COUNTER_MODULUS = 16
+
+    # the size of the CRC_32 at the end of a section
+    SECTION_CRC_SIZE = 4
+
+    def __init__(self, ts_packets, is_stray_pid_dropped=False):
+        """
+        Demultiplexes TS packets.
+
+        :param ts_packets: the TS packets in the order they were sent (N x 188 bytes, see `get_ts_packets`)
+        :type ts_packets: numpy.ndarray
+
+        :param is_stray_pid_dropped: true if the packets of stray PIDs are dropped
+        :type is_stray_pid_dropped: bool
+        """
+
+        assert isinstance(ts_packets, numpy.ndarray)
+        assert ts_packets.ndim == 2 and ts_packets.shape[1] == TS_PACKET_SIZE
+        assert isinstance(is_stray_pid_dropped, bool)
+
+        self._is_stray_pid_dropped = is_stray_pid_dropped
+
+        # packets without sync byte are dropped, since their headers cannot be read
+        is_synced = ts_packets[:, 0] == TS_SYNC_BYTE
+        self._unsynced_packet_count = len(ts_packets) - int(numpy.count_nonzero(is_synced))
+        self._packets = ts_packets[is_synced]
+
+        self._parse_headers()
+        self._detect_losses()
+
+        self._stray_packet_count = 0
+        if is_stray_pid_dropped:
+            self._drop_stray_pids()
+
+    def _parse_headers(self):
+        """
+        Extracts the header fields of all packets.
+        """
+
+        # +--------+---+---+---+-------------+-----+-----+----+
+        # | sync   |TEI|PUS|TP |     PID     | TSC | AFC | CC |
+        # | 8 bits | 1 | 1 | 1 |   13 bits   |  2  |  2  | 4  |
+        # +--------+---+---+---+-------------+-----+-----+----+
+        packets = self._packets
+
+        self._pids = ((packets[:, 1] & 0x1f).astype(numpy.uint16) << 8) | packets[:, 2]
+        self._is_unit_start = packets[:, 1] & 0x40 != 0
+        self._continuity_counters = packets[:, 3] & 0x0f
+
+        adaptation_field_control = (packets[:, 3] >> 4) & 0x03
+        self._has_payload = adaptation_field_control & 0x01 != 0
+        self._has_adaptation_field = adaptation_field_control & 0x02 != 0
+
+        # the discontinuity_indicator is the first flag of the adaptation field, behind its length
+        self._is_discontinuity = self._has_adaptation_field & (packets[:, 4] > 0) & (packets[:, 5] & 0x80 != 0)
+
+    def _detect_losses(self):
+        """
+        Checks the continuity counters of each PID (see the class description).
+        """
+
+        packet_count = len(self._packets)
+
+        # stable sort by PID, so that the packets of each PID are consecutive and in order
+        order = numpy.argsort(self._pids, kind='mergesort')
+        pids = self._pids[order]
+        has_payload = self._has_payload[order]
+
+        is_checked = numpy.zeros(packet_count, dtype=bool)
+        is_checked[1:] = pids[1:] == pids[:-1]
+        is_checked &= (pids != self.NULL_PID) & ~self._is_discontinuity[order]
+
+        counters = self._continuity_counters[order].astype(numpy.int16)
+        steps = numpy.zeros(packet_count, dtype=numpy.int16)
+        steps[1:] = (counters[1:] - counters[:-1]) % self.CONTINUITY_COUNTER_MODULUS
+
+        is_duplicate = is_checked & has_payload & (steps == 0)
+        lost_counts = numpy.where(
+            is_checked & ~is_duplicate, (steps - has_payload) % self.CONTINUITY_COUNTER_MODULUS, 0
+        )
+
+        self._is_duplicate = numpy.empty(packet_count, dtype=bool)
+        self._is_duplicate[order] = is_duplicate
+        self._lost_counts = numpy.empty(packet_count, dtype=numpy.uint8)
+        self._lost_counts[order] = lost_counts
+
+    def _get_section(self, pid, table_id):
+        """
+        Returns the first section of a table, which starts and ends in a single TS packet of a PID.
+
+        :param pid: the PID of the table
+        :type pid: int
+
+        :param table_id: the id of the table
+        :type table_id: int
+
+        :return: the bytes of the section (None -> no such section)
+        :rtype: list|None
+        """
+
+        for index in numpy.flatnonzero((self._pids == pid) & self._is_unit_start & self._has_payload).tolist():
+            packet = self._packets[index].tolist()
+
+            payload_start = 4 + (1 + packet[4] if self._has_adaptation_field[index] else 0)
+            if payload_start >= TS_PACKET_SIZE:
+                continue
+
+            # the pointer_field gives the start of the section
+            section_start = payload_start + 1 + packet[payload_start]
+            if section_start + 3 > TS_PACKET_SIZE or packet[section_start] != table_id:
+                continue
+
+            section_end = section_start + 3 + (((packet[section_start + 1] & 0x0f) << 8) | packet[section_start + 2])
+            if section_end <= TS_PACKET_SIZE:
+                return packet[section_start:section_end]
+
+        return None
+
+    def _get_program_pids(self):
+        """
+        Returns the PIDs announced by the PAT and the PMTs, and the PIDs of the PSI/SI tables.
+
+        :return: the PIDs of the programs (None -> no PAT found)
+        :rtype: set|None
+        """
+
+        pat = self._get_section(self.PAT_PID, self.PAT_TABLE_ID)
+        if pat is None:
+            return None
+
+        program_pids = set(xrange(self.PSI_PID_MAX + 1))
+        pmt_pids = list()
+
+        # the program loop follows the 8 header bytes of the section: program_number (16), reserved (3), PID (13)
+        for offset in xrange(8, len(pat) - self.SECTION_CRC_SIZE - 3, 4):
+            pid = ((pat[offset + 2] & 0x1f) << 8) | pat[offset + 3]
+            program_pids.add(pid)
+
+            # program_number 0 announces the network PID
+            if (pat[offset] << 8) | pat[offset + 1]:
+                pmt_pids.append(pid)
+
+        for pmt_pid in pmt_pids:
+            pmt = self._get_section(pmt_pid, self.PMT_TABLE_ID)
+            if pmt is None or len(pmt) < 12:
+                continue
+
+            # PCR_PID
+            program_pids.add(((pmt[8] & 0x1f) << 8) | pmt[9])
+
+            # the stream loop follows the program info: stream_type (8), reserved (3), elementary_PID (13),
+            #  reserved (4), ES_info_length (12)
+            offset = 12 + (((pmt[10] & 0x0f) << 8) | pmt[11])
+            while offset + 5 <= len(pmt) - self.SECTION_CRC_SIZE:
+                program_pids.add(((pmt[offset + 1] & 0x1f) << 8) | pmt[offset + 2])
+                offset += 5 + (((pmt[offset + 3] & 0x0f) << 8) | pmt[offset + 4])
+
+        # a program without PCR announces the null PID
+        program_pids.discard(self.NULL_PID)
+
+        return program_pids
+
+    def _drop_stray_pids(self):
+        """
+        Drops the packets of the stray PIDs (see the class description).
+        """
+
+        program_pids = self._get_program_pids()
+        if program_pids is None:
+            print '# \033[93mNo PAT found, stray PIDs are kept!\033[0m'
+            return
+
+        is_kept = numpy.in1d(self._pids, sorted(program_pids))
+        self._stray_packet_count = len(is_kept) - int(numpy.count_nonzero(is_kept))
+
+        self._packets = self._packets[is_kept]
+        self._pids = self._pids[is_kept]
+        self._is_unit_start = self._is_unit_start[is_kept]
+        self._continuity_counters = self._continuity_counters[is_kept]
+        self._has_payload = self._has_payload[is_kept]
+        self._has_adaptation_field = self._has_adaptation_field[is_kept]
+        self._is_discontinuity = self._is_discontinuity[is_kept]
+        self._is_duplicate = self._is_duplicate[is_kept]
+        self._lost_counts = self._lost_counts[is_kept]
+
+    def get_loss_map(self):
+        """
+        Returns the loss map of the extracted stream.
+
+        :return: the loss map (see `LOSS_MAP_DTYPE`)
+        :rtype: numpy.ndarray
+        """
+
+        loss_map = numpy.zeros(len(self._packets), dtype=LOSS_MAP_DTYPE)
+        loss_map['packet'] = numpy.arange(1, len(self._packets) + 1)
+        loss_map['pid'] = self._pids
+        loss_map['continuity_counter'] = self._continuity_counters
+        loss_map['lost_before'] = self._lost_counts
+        loss_map['is_duplicate'] = self._is_duplicate
+        loss_map['is_unit_start'] = self._is_unit_start
+
+        return loss_map
+
+    def get_stream(self):
+        """
+        Returns the extracted transport stream.
+
+        :rtype: str
+        """
+
+        return self._packets.tobytes()
+
+    def write(self, file_path):
+        """
+        Writes the extracted transport stream into a file and its loss map next to it (see `get_loss_map_file_path`).
+
+        :param file_path: the path of the file to write
+        :type file_path: basestring
+        """
+
+        assert isinstance(file_path, basestring)
+
+        with open(file_path, 'wb') as stream_file:
+            stream_file.write(numpy.ascontiguousarray(self._packets).data)
+
+        loss_map = self.get_loss_map()
+        numpy.savetxt(
+            get_loss_map_file_path(file_path),
+            numpy.column_stack([loss_map[name] for name in LOSS_MAP_DTYPE.names]).reshape(-1, len(LOSS_MAP_DTYPE)),
+            fmt='%d', delimiter=',', header=','.join(LOSS_MAP_DTYPE.names), comments=''
+        )
+
+        print 'TS packets: %d extracted, %d lost, %d duplicated, %d stray dropped, %d without sync byte' % (
+            len(self._packets),
+            int(self._lost_counts.sum(dtype=numpy.int64)),
+            int(numpy.count_nonzero(self._is_duplicate)),
+            self._stray_packet_count,
+            self._unsynced_packet_count
+        )
@@ -0,0 +1,154 @@
+__author__ = 'Alexander Dethof'
+
+from bitstreamparse.rtp.rawVideo import RawVideo
+
+
+class H264(RawVideo):
+    """
+    Depacketizes H.264 streams as described in RFC 6184 (https://tools.ietf.org/html/rfc6184) for the non-interleaved
+    packetization mode: single NAL unit packets, single-time aggregation packets (STAP-A) and fragmentation units
+    (FU-A). The payload structures of the interleaved mode (STAP-B, MTAP16, MTAP24 and FU-B) are skipped.
+    """
+
+    NAL_UNIT_FIELD_NRI = 'nri'
+
+    # NAL unit types of the RTP payload structures
+    NAL_UNIT_TYPE_STAP_A = 24
+    NAL_UNIT_TYPE_STAP_B = 25
+    NAL_UNIT_TYPE_MTAP16 = 26
+    NAL_UNIT_TYPE_MTAP24 = 27
+    NAL_UNIT_TYPE_FU_A = 28
+    NAL_UNIT_TYPE_FU_B = 29
+
+    INTERLEAVED_NAL_UNIT_TYPES = (
+        NAL_UNIT_TYPE_STAP_B,
+        NAL_UNIT_TYPE_MTAP16,
+        NAL_UNIT_TYPE_MTAP24,
+        NAL_UNIT_TYPE_FU_B
+    )
+
+    PAYLOAD_HEADER_SIZE = 1
+    FU_HEADER_SIZE = 1
+    STAP_NAL_UNIT_SIZE_SIZE = 2
+
+    def _parse_nal_unit(self, nal_unit_header):
+        assert isinstance(nal_unit_header, basestring)
+        assert len(nal_unit_header) == 1
+
+        # NAL Unit structure:
+        #  https://tools.ietf.org/html/rfc6184#section-1.3
+        header_byte = ord(nal_unit_header)
+
+        # +---------------+
+        # |0|1|2|3|4|5|6|7|
+        # +-+-+-+-+-+-+-+-+
+        # |F|NRI|  Type   |
+        # +---------------+
+        nal_unit = dict()
+
+        # F: 1 bit
+        # forbidden_zero_bit.  The H.264 specification declares a value of
+        # 1 as a syntax violation.
+        nal_unit[self.NAL_UNIT_FIELD_FORBIDDEN] = header_byte >> 7
+
+        # NRI: 2 bits
+        # nal_ref_idc.  A value of 00 indicates that the content of the NAL
+        # unit is not used to reconstruct reference pictures for inter
+        # picture prediction.
+        nal_unit[self.NAL_UNIT_FIELD_NRI] = (header_byte >> 5) & 0x03
+
+        # Type: 5 bits
+        # nal_unit_type.  This component specifies the NAL unit payload type
+        # as defined in Table 7-1 of [1], and later within this memo.
+        nal_unit[self.NAL_UNIT_FIELD_TYPE] = header_byte & 0x1f
+
+        return nal_unit
+
+    def _depacketize(self, payload):
+        if len(payload) < self.PAYLOAD_HEADER_SIZE:
+            return
+
+        # The first byte of a packet's payload is the NAL unit header of the payload structure
+        payload_header = payload[:self.PAYLOAD_HEADER_SIZE].tobytes()
+        body = payload[self.PAYLOAD_HEADER_SIZE:]
+
+        nal_unit_type = self._parse_nal_unit(payload_header)[self.NAL_UNIT_FIELD_TYPE]
+
+        if nal_unit_type == self.NAL_UNIT_TYPE_FU_A:
+            self._depacketize_fragmentation_unit(payload_header, body)
+            return
+
+        # any other packet ends a fragmented NAL unit, whose end fragment is lost
+        self._end_fragmented_nal_unit(is_complete=False)
+
+        if nal_unit_type == self.NAL_UNIT_TYPE_STAP_A:
+            self._depacketize_aggregation_packet(body)
+        elif nal_unit_type in self.INTERLEAVED_NAL_UNIT_TYPES or not nal_unit_type:
+            # not used in the non-interleaved mode (type 0 is undefined)
+            pass
+        else:
+            # single NAL unit packet
+            self._write_nal_unit(payload_header, body)
+
+    def _depacketize_aggregation_packet(self, body):
+        """
+        Splits a single-time aggregation packet (STAP-A) into its NAL units (RFC 6184, section 5.7.1).
+
+        :param body: the payload behind the STAP-A NAL unit header
+        :type body: memoryview
+        """
+
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |STAP-A NAL HDR |         NALU 1 Size           | NALU 1 HDR    |
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |                         NALU 1 Data                           |
+        # :                                                               :
+        # +               +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |               | NALU 2 Size                   | NALU 2 HDR    |
+        # ...
+        offset = 0
+        body_size = len(body)
+
+        while offset + self.STAP_NAL_UNIT_SIZE_SIZE <= body_size:
+            nal_unit_size = (ord(body[offset]) << 8) | ord(body[offset + 1])
+            offset += self.STAP_NAL_UNIT_SIZE_SIZE
+
+            if not nal_unit_size or offset + nal_unit_size > body_size:
+                # truncated aggregation packet
+                break
+
+            self._write_nal_unit(body[offset:offset + nal_unit_size])
+            offset += nal_unit_size
+
+    def _depacketize_fragmentation_unit(self, fu_indicator, body):
+        """
+        Reassembles a fragment of a fragmented NAL unit (FU-A, RFC 6184, section 5.8).
+
+        :param fu_indicator: the FU indicator (the NAL unit header of the payload structure)
+        :type fu_indicator: str
+
+        :param body: the payload behind the FU indicator
+        :type body: memoryview
+        """
+
+        if len(body) < self.FU_HEADER_SIZE:
+            return
+
+        # +---------------+
+        # |0|1|2|3|4|5|6|7|
+        # +-+-+-+-+-+-+-+-+
+        # |S|E|R|  Type   |
+        # +---------------+
+        fu_header = ord(body[0])
+        is_start = fu_header & 0x80 != 0
+        is_end = fu_header & 0x40 != 0
+        fragment = body[self.FU_HEADER_SIZE:]
+
+        if is_start:
+            # the NAL unit header consists of the F and NRI bits of the FU indicator and the type of the FU header
+            self._start_fragmented_nal_unit(chr((ord(fu_indicator) & 0xe0) | (fu_header & 0x1f)), fragment)
+        else:
+            self._append_fragment(fragment)
+
+        if is_end:
+            self._end_fragmented_nal_unit()
@@ -1,18 +1,34 @@
 __author__ = 'Alexander Dethof'
 
 from bitstreamparse.rtp.rawVideo import RawVideo
-from util.bitparse import str_to_bits, bits_to_int
 
 
 class Hevc(RawVideo):
+    """
+    Depacketizes HEVC streams as described in RFC 7798 (https://tools.ietf.org/html/rfc7798): single NAL unit
+    packets, aggregation packets (AP), fragmentation units (FU) and PACI packets.
 
-    def _parse_nal_unit(self, nal_unit_str):
-        assert isinstance(nal_unit_str, basestring)
-        assert len(nal_unit_str) == 2
+    The decoding order number fields (DONL/DOND) are only present if the stream was sent with sprop-max-don-diff > 0,
+    which is not signalled in the capture; the packets are expected without them (as sent by e.g. ffmpeg).
+    """
+
+    # NAL unit types of the RTP payload structures
+    NAL_UNIT_TYPE_AP = 48
+    NAL_UNIT_TYPE_FU = 49
+    NAL_UNIT_TYPE_PACI = 50
+
+    PAYLOAD_HEADER_SIZE = 2
+    FU_HEADER_SIZE = 1
+    AP_NAL_UNIT_SIZE_SIZE = 2
+    PACI_HEADER_SIZE = 2
+
+    def _parse_nal_unit(self, nal_unit_header):
+        assert isinstance(nal_unit_header, basestring)
+        assert len(nal_unit_header) == 2
 
         # NAL Unit structure:
         #  https://tools.ietf.org/html/rfc7798#section-1.1.4
-        nal_unit_bits = str_to_bits(nal_unit_str)
+        (first_byte, second_byte) = (ord(nal_unit_header[0]), ord(nal_unit_header[1]))
 
         # +---------------+---------------+
         # |0|1|2|3|4|5|6|7|0|1|2|3|4|5|6|7|
@@ -30,7 +46,7 @@ class Hevc(RawVideo):
         # a NAL unit resulted from aggregating a number of fragmented units
         # of a NAL unit but missing the last fragment, as described in
         # Section 4.4.3.
-        nal_unit[self.NAL_UNIT_FIELD_FORBIDDEN] = nal_unit_bits[0]
+        nal_unit[self.NAL_UNIT_FIELD_FORBIDDEN] = first_byte >> 7
 
         # Type: 6 bits
         # nal_unit_type.  This field specifies the NAL unit type as defined
@@ -40,7 +56,7 @@ class Hevc(RawVideo):
         # is a non-VCL NAL unit.  For a reference of all currently defined
         # NAL unit types and their semantics, please refer to Section 7.4.2
         # in [HEVC].
-        nal_unit[self.NAL_UNIT_FIELD_TYPE] = bits_to_int(nal_unit_bits[1:6])
+        nal_unit[self.NAL_UNIT_FIELD_TYPE] = (first_byte >> 1) & 0x3f
 
         # LayerId: 6 bits
         # nuh_layer_id.  Required to be equal to zero in [HEVC].  It is
@@ -49,7 +65,7 @@ class Hevc(RawVideo):
         # identify additional layers that may be present in the CVS, wherein
         # a layer may be, e.g., a spatial scalable layer, a quality scalable
         # layer, a texture view, or a depth view.
-        nal_unit[self.NAL_UNIT_FIELD_LAYER_ID] = bits_to_int(nal_unit_bits[7:12])
+        nal_unit[self.NAL_UNIT_FIELD_LAYER_ID] = ((first_byte & 0x01) << 5) | (second_byte >> 3)
 
         # TID: 3 bits
         # nuh_temporal_id_plus1.  This field specifies the temporal
@@ -58,29 +74,140 @@ class Hevc(RawVideo):
         # there is at least one bit in the NAL unit header equal to 1, so to
         # enable independent considerations of start code emulations in the
         # NAL unit header and in the NAL unit payload data.
-        nal_unit[self.NAL_UNIT_FIELD_TID] = bits_to_int(nal_unit_bits[13:16])
+        nal_unit[self.NAL_UNIT_FIELD_TID] = second_byte & 0x07
 
         return nal_unit
 
-    def _parse_payload_header(self, payload_header):
-        return self._parse_nal_unit(payload_header)
-
-    def _get_payload_body(self, payload):
-
-        # We parse the payload as described in RFC 7798
-        # https://tools.ietf.org/html/rfc7798
-
-        payload_header_str = payload[0:2]
-        print payload_header_str
-
-        print map(lambda byte: int(byte), bytearray(payload_header_str))
-
-        # The first two bytes of a packet's payload form the RTP payload header
-        payload_header = self._parse_payload_header(payload_header_str)
-
-        print payload_header
-        print '-- DEL --'
-
-        return '\0\0\0\0\0\0\0\1' + payload
-
-
+    def _depacketize(self, payload):
+        if len(payload) < self.PAYLOAD_HEADER_SIZE:
+            return
+
+        # The first two bytes of a packet's payload form the RTP payload header, which has the structure of a NAL
+        #  unit header
+        self._depacketize_structure(payload[:self.PAYLOAD_HEADER_SIZE].tobytes(), payload[self.PAYLOAD_HEADER_SIZE:])
+
+    def _depacketize_structure(self, payload_header, body):
+        """
+        Depacketizes a payload structure, given by its payload header.
+
+        :param payload_header: the payload header
+        :type payload_header: str
+
+        :param body: the payload behind the payload header
+        :type body: memoryview
+        """
+
+        nal_unit_type = self._parse_nal_unit(payload_header)[self.NAL_UNIT_FIELD_TYPE]
+
+        if nal_unit_type == self.NAL_UNIT_TYPE_FU:
+            self._depacketize_fragmentation_unit(payload_header, body)
+            return
+
+        # any other packet ends a fragmented NAL unit, whose end fragment is lost
+        self._end_fragmented_nal_unit(is_complete=False)
+
+        if nal_unit_type == self.NAL_UNIT_TYPE_AP:
+            self._depacketize_aggregation_packet(body)
+        elif nal_unit_type == self.NAL_UNIT_TYPE_PACI:
+            self._depacketize_paci_packet(payload_header, body)
+        else:
+            # single NAL unit packet
+            self._write_nal_unit(payload_header, body)
+
+    def _depacketize_aggregation_packet(self, body):
+        """
+        Splits an aggregation packet into its NAL units (RFC 7798, section 4.4.2).
+
+        :param body: the payload behind the payload header
+        :type body: memoryview
+        """
+
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |          PayloadHdr (Type=48)   |           NALU 1 Size       |
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |          NALU 1 HDR             |                             |
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+         NALU 1 Data         |
+        # |                   . . .                                       |
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |  . . .        | NALU 2 Size                   | NALU 2 HDR    |
+        # ...
+        offset = 0
+        body_size = len(body)
+
+        while offset + self.AP_NAL_UNIT_SIZE_SIZE <= body_size:
+            nal_unit_size = (ord(body[offset]) << 8) | ord(body[offset + 1])
+            offset += self.AP_NAL_UNIT_SIZE_SIZE
+
+            if not nal_unit_size or offset + nal_unit_size > body_size:
+                # truncated aggregation packet
+                break
+
+            self._write_nal_unit(body[offset:offset + nal_unit_size])
+            offset += nal_unit_size
+
+    def _depacketize_fragmentation_unit(self, payload_header, body):
+        """
+        Reassembles a fragment of a fragmented NAL unit (RFC 7798, section 4.4.3).
+
+        :param payload_header: the payload header
+        :type payload_header: str
+
+        :param body: the payload behind the payload header
+        :type body: memoryview
+        """
+
+        if len(body) < self.FU_HEADER_SIZE:
+            return
+
+        # +---------------+
+        # |0|1|2|3|4|5|6|7|
+        # +-+-+-+-+-+-+-+-+
+        # |S|E|  FuType   |
+        # +---------------+
+        fu_header = ord(body[0])
+        is_start = fu_header & 0x80 != 0
+        is_end = fu_header & 0x40 != 0
+        fragment = body[self.FU_HEADER_SIZE:]
+
+        if is_start:
+            # the NAL unit header is the payload header with the type of the fragmented NAL unit
+            nal_unit_header = chr((ord(payload_header[0]) & 0x81) | ((fu_header & 0x3f) << 1)) + payload_header[1]
+            self._start_fragmented_nal_unit(nal_unit_header, fragment)
+        else:
+            self._append_fragment(fragment)
+
+        if is_end:
+            self._end_fragmented_nal_unit()
+
+    def _depacketize_paci_packet(self, payload_header, body):
+        """
+        Depacketizes the payload structure (single NAL unit, AP or FU) carried by a PACI packet (RFC 7798, section
+        4.4.4), whose payload header is restored from the PACI header.
+
+        :param payload_header: the payload header
+        :type payload_header: str
+
+        :param body: the payload behind the payload header
+        :type body: memoryview
+        """
+
+        if len(body) < self.PACI_HEADER_SIZE:
+            return
+
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |    PayloadHdr (Type=50)       |A|   cType   | PHSsize |F0..2|Y|
+        # +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+        # |        Payload Header Extension Structure (PHES)              |
+        # |=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=|
+        # |                  PACI payload: NAL unit                       |
+        (first_byte, second_byte) = (ord(body[0]), ord(body[1]))
+        phes_size = ((first_byte & 0x01) << 4) | (second_byte >> 4)
+
+        payload_start = self.PACI_HEADER_SIZE + phes_size
+        if payload_start > len(body):
+            return
+
+        # A replaces the F bit and cType the type of the payload header
+        restored_header = chr((first_byte & 0xfe) | (ord(payload_header[0]) & 0x01)) + payload_header[1]
+
+        self._depacketize_structure(restored_header, body[payload_start:])
@@ -4,13 +4,71 @@ from bitstreamparse.rtpParser import RtpParser
 
 
 class Mp2t(RtpParser):
+    """
+    Extracts the transport stream of RTP/MP2T captures (RFC 2250): the RTP packets are looked up in the packet index of
+    the capture (see `util.packetIndex`), ordered by their sequence numbers and their payloads are demultiplexed into
+    TS packets (see `bitstreamparse.mp2tDemuxer`), which are written together with their loss map.
+    """
 
     MP2TS_PAYLOAD_TYPE_ID = 33
 
+    def __init__(self, pcap_file_path, is_stray_pid_dropped=False):
+        """
+        Extracts the transport stream of a capture.
+
+        :param pcap_file_path: the path of the packet capture to parse
+        :type pcap_file_path: basestring
+
+        :param is_stray_pid_dropped: true if the TS packets of stray PIDs are dropped
+        :type is_stray_pid_dropped: bool
+        """
+
+        assert isinstance(is_stray_pid_dropped, bool)
+
+        self._is_stray_pid_dropped = is_stray_pid_dropped
+        super(Mp2t, self).__init__(pcap_file_path)
+
+    def _init_class_variables(self):
+        super(Mp2t, self)._init_class_variables()
+        self._demuxer = None
+
     def _is_valid_payload_type(self, payload_type):
         assert isinstance(payload_type, int), 'Invalid payload type given!'
 
         return payload_type == self.MP2TS_PAYLOAD_TYPE_ID
 
-    def _add_to_bit_stream(self, payload):
-        self._bit_stream += payload
\ No newline at end of file
+    def _parse_pcap_file(self):
+        """
+        Demultiplexes the RTP payloads of the capture.
+        """
+
+        import numpy
+        from mmap import mmap, ACCESS_READ
+        from bitstreamparse.mp2tDemuxer import Mp2tDemuxer, get_ts_packets
+        from util.packetIndex import load_packet_index
+
+        (packets, _) = self._get_packets(load_packet_index(self._pcap_file_path))
+
+        with open(self._pcap_file_path, 'rb') as pcap_file:
+            content = mmap(pcap_file.fileno(), 0, access=ACCESS_READ)
+
+        try:
+            data = numpy.frombuffer(content, dtype=numpy.uint8)
+            ts_packets = get_ts_packets(data, *self._get_payload_bounds(data, packets))
+        finally:
+            content.close()
+
+        self._demuxer = Mp2tDemuxer(ts_packets, self._is_stray_pid_dropped)
+
+    def get_bit_stream(self):
+        return self._demuxer.get_stream()
+
+    def write_bit_stream(self, file_path):
+        """
+        Writes the extracted transport stream into a file and its loss map next to it.
+
+        :param file_path: the path of the file to write
+        :type file_path: basestring
+        """
+
+        self._demuxer.write(file_path)
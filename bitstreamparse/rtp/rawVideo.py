@@ -5,6 +5,19 @@ from bitstreamparse.rtpParser import RtpParser
 
 
 class RawVideo(RtpParser):
+    """
+    Base class of the depacketizers of video streams, which are directly packetized into RTP (raw-rtp), to an Annex-B
+    byte stream.
+
+    Instead of dissecting the packets one by one, the RTP packets are looked up in the packet index of the capture
+    (see `util.packetIndex`), ordered by their (extended) sequence numbers, and their payloads are sliced from a memory
+    map of the capture. The NAL units are reassembled from these slices without copying them and are written by a
+    single buffered writer (see `write_bit_stream`).
+
+    A fragmented NAL unit is incomplete if one of its fragments is lost. Incomplete NAL units are dropped, or, if
+    requested, written with the forbidden bit (F) set to indicate the syntax violation, as suggested by RFC 6184 and
+    RFC 7798 for NAL units which are missing their last fragments.
+    """
 
     __metaclass__ = ABCMeta
 
@@ -24,25 +37,200 @@ class RawVideo(RtpParser):
     NAL_UNIT_FIELD_TYPE = 'type'
     NAL_UNIT_FIELD_TID = 'tid'
 
+    # the forbidden bit of the first NAL unit header byte
+    NAL_UNIT_FORBIDDEN_FLAG = 0x80
+
+    START_CODE = '\0\0\0\1'
+
+    # buffer size of the bit stream writer
+    WRITE_BUFFER_SIZE = 1 << 20
+
+    def __init__(self, pcap_file_path, is_incomplete_nal_unit_flagged=False):
+        """
+        Depacketizes the video stream of a capture.
+
+        :param pcap_file_path: the path of the packet capture to parse
+        :type pcap_file_path: basestring
+
+        :param is_incomplete_nal_unit_flagged: true if incomplete fragmented NAL units are written with the forbidden
+            bit set, false if they are dropped
+        :type is_incomplete_nal_unit_flagged: bool
+        """
+
+        assert isinstance(is_incomplete_nal_unit_flagged, bool)
+
+        self._is_incomplete_nal_unit_flagged = is_incomplete_nal_unit_flagged
+        super(RawVideo, self).__init__(pcap_file_path)
+
+    def _init_class_variables(self):
+        super(RawVideo, self)._init_class_variables()
+
+        # the buffers of the bit stream, which are written in order
+        self._chunks = list()
+
+        # the header and the buffers of the fragmented NAL unit in reassembly (None -> no fragmented NAL unit)
+        self._fragment_header = None
+        self._fragments = list()
+
+        self._dropped_nal_unit_count = 0
+        self._flagged_nal_unit_count = 0
+
     def _is_valid_payload_type(self, payload_type):
         assert isinstance(payload_type, int), 'Invalid payload type given!'
 
         return self.DYNAMIC_PAYLOAD_TYPE_ID_MIN <= payload_type <= self.DYNAMIC_PAYLOAD_TYPE_ID_MAX
 
     @abstractmethod
-    def _parse_payload_header(self, payload_header):
-        pass
+    def _parse_nal_unit(self, nal_unit_header):
+        """
+        Parses the header of a NAL unit.
+
+        :param nal_unit_header: the header bytes of the NAL unit
+        :type nal_unit_header: str
+
+        :return: the fields of the header (see the NAL_UNIT_FIELD_* constants)
+        :rtype: dict
+        """
 
-    @abstractmethod
-    def _parse_nal_unit(self, nal_unit):
         pass
 
     @abstractmethod
-    def _get_payload_body(self, payload):
+    def _depacketize(self, payload):
+        """
+        Reassembles the NAL units of a RTP payload into the bit stream (see `_write_nal_unit` and the methods of the
+        fragmented NAL units).
+
+        :param payload: the RTP payload (without padding)
+        :type payload: memoryview
+        """
+
         pass
 
-    def _add_to_bit_stream(self, payload):
+    def _parse_pcap_file(self):
+        """
+        Depacketizes the RTP payloads of the capture (see the class description).
+        """
+
+        import numpy
+        from mmap import mmap, ACCESS_READ
+        from util.packetIndex import load_packet_index
+
+        (packets, is_continuous) = self._get_packets(load_packet_index(self._pcap_file_path))
+        packet_count = len(packets)
+
+        if not packet_count:
+            return
+
+        with open(self._pcap_file_path, 'rb') as pcap_file:
+            self._content = mmap(pcap_file.fileno(), 0, access=ACCESS_READ)
+
+        data = numpy.frombuffer(self._content, dtype=numpy.uint8)
+        content = memoryview(data)
+
+        (payload_starts, payload_ends) = self._get_payload_bounds(data, packets)
+
+        for (packet_index, start, end, is_packet_continuous) in zip(
+                xrange(1, packet_count + 1), payload_starts.tolist(), payload_ends.tolist(), is_continuous.tolist()
+        ):
+            if not is_packet_continuous:
+                # the packets in between are lost
+                self._end_fragmented_nal_unit(is_complete=False)
+
+            if start < end:
+                self._depacketize(content[start:end])
+
+            if packet_index == 1 or packet_index % 1000 == 0 or packet_index == packet_count:
+                self._dump_packet_index(packet_index, packet_count)
+
+        self._end_fragmented_nal_unit(is_complete=False)
+
+        if self._dropped_nal_unit_count or self._flagged_nal_unit_count:
+            print 'Incomplete NAL units: %d dropped, %d flagged' % (
+                self._dropped_nal_unit_count, self._flagged_nal_unit_count
+            )
+
+    def _write_nal_unit(self, *parts):
+        """
+        Appends a NAL unit to the bit stream.
+
+        :param parts: the consecutive buffers of the NAL unit (header and body)
+        :type parts: str|memoryview
+        """
+
+        self._chunks.append(self.START_CODE)
+        self._chunks.extend(parts)
+
+    def _start_fragmented_nal_unit(self, nal_unit_header, fragment):
+        """
+        Starts the reassembly of a fragmented NAL unit; a previously started one is incomplete.
+
+        :param nal_unit_header: the reconstructed header of the NAL unit
+        :type nal_unit_header: str
+
+        :param fragment: the first fragment of the NAL unit's body
+        :type fragment: memoryview
+        """
+
+        self._end_fragmented_nal_unit(is_complete=False)
+
+        self._fragment_header = nal_unit_header
+        self._fragments = [fragment]
+
+    def _append_fragment(self, fragment):
+        """
+        Appends a fragment to the fragmented NAL unit in reassembly. A fragment without a started NAL unit (whose
+        first fragment is lost) is dropped.
+
+        :param fragment: the fragment of the NAL unit's body
+        :type fragment: memoryview
+        """
+
+        if self._fragment_header is not None:
+            self._fragments.append(fragment)
+
+    def _end_fragmented_nal_unit(self, is_complete=True):
+        """
+        Ends the reassembly of the fragmented NAL unit, if any, and writes it.
+
+        :param is_complete: false if the NAL unit is missing fragments
+        :type is_complete: bool
+        """
+
+        if self._fragment_header is None:
+            return
+
+        if is_complete:
+            self._write_nal_unit(self._fragment_header, *self._fragments)
+        elif self._is_incomplete_nal_unit_flagged:
+            self._write_nal_unit(
+                chr(ord(self._fragment_header[0]) | self.NAL_UNIT_FORBIDDEN_FLAG) + self._fragment_header[1:],
+                *self._fragments
+            )
+            self._flagged_nal_unit_count += 1
+        else:
+            self._dropped_nal_unit_count += 1
+
+        self._fragment_header = None
+        self._fragments = list()
+
+    def get_bit_stream(self):
+        """
+        Returns the bit stream extracted from the parsed packets
+        :return bit stream extracted from the parsed packets
+        """
+
+        return ''.join(chunk if isinstance(chunk, str) else chunk.tobytes() for chunk in self._chunks)
+
+    def write_bit_stream(self, file_path):
+        """
+        Writes the bit stream extracted from the parsed packets into a file, buffer by buffer.
+
+        :param file_path: the path of the file to write
+        :type file_path: basestring
+        """
+
+        from io import open as open_file
 
-        # Unfortunately we can not concatenate the payload with the residual bitstream. We need to parse the NAL units
-        #  and repair them before we can continue.
-        self._bit_stream += self._get_payload_body(payload)
+        with open_file(file_path, 'wb', buffering=self.WRITE_BUFFER_SIZE) as bit_stream_file:
+            for chunk in self._chunks:
+                bit_stream_file.write(chunk)
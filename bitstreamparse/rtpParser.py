@@ -2,70 +2,93 @@ __author__ = 'Alexander Dethof'
 
 from abc import ABCMeta, abstractmethod
 from bitstreamparse.bitStreamParser import BitStreamParser
-from scapy.all import Packet
-from scapy.layers.inet import UDP
-from scapy.layers.rtp import RTP, Raw
 
 
 class RtpParser(BitStreamParser):
 
     __metaclass__ = ABCMeta
 
-    @abstractmethod
-    def _is_valid_payload_type(self, payload_type):
-        pass
+    # the RTP padding bit of the first header byte
+    RTP_PADDING_FLAG = 0x20
 
     @abstractmethod
-    def _add_to_bit_stream(self, payload):
+    def _is_valid_payload_type(self, payload_type):
         pass
 
     def _init_class_variables(self):
         self._ssrc_id = None
         self._payload_type = None
 
-    def _parse_packet(self, packet):
+    def _get_packets(self, index):
         """
-        Parses the RTP/* packet into the bitstream
+        Selects the packets of the stream, i.e. the RTP packets with a valid payload type (see
+        `_is_valid_payload_type`) and the payload type and SSRC of the first one, ordered by their sequence numbers
+        (duplicates removed).
 
-        :param packet: the packet to parse
-        :type packet: Packet
+        :param index: the packet index of the capture (see `util.packetIndex.PACKET_INDEX_DTYPE`)
+        :type index: numpy.ndarray
+
+        :return: tuple (packets, is_continuous): the index entries of the packets in order and whether each packet
+            directly follows its predecessor
+        :rtype: tuple
         """
 
-        assert isinstance(packet, Packet), 'The given packet variable is not a valid Scapy packet!'
-        assert packet.haslayer(RTP), 'Packet does not contain any RTP layer!'
-        assert packet.haslayer(Raw), 'Packet does not contain any payload!'
+        import numpy
 
-        # Extract header information
-        payload_type = int(packet[RTP].getfieldval('payload'))
-        ssrc_id = int(packet[RTP].getfieldval('sourcesync'))
+        is_rtp = index['rtp_header_length'] > 0
+        valid_payload_types = [
+            payload_type for payload_type in numpy.unique(index['rtp_payload_type'][is_rtp]).tolist()
+            if self._is_valid_payload_type(payload_type)
+        ]
 
-        # checks if the payload type is valid
-        if self._is_valid_payload_type(payload_type):
+        valid_indexes = numpy.flatnonzero(is_rtp & numpy.in1d(index['rtp_payload_type'], valid_payload_types))
+        if not len(valid_indexes):
+            return index[:0], numpy.zeros(0, dtype=bool)
 
-            if self._payload_type is None:  # no payload type set yet
-                self._payload_type = payload_type
+        # we can only concatenate if we follow the payload type and SSRC of the first packet
+        self._payload_type = int(index['rtp_payload_type'][valid_indexes[0]])
+        self._ssrc_id = int(index['rtp_ssrc'][valid_indexes[0]])
 
-            if self._ssrc_id is None:  # no SSRC ID set yet
-                self._ssrc_id = ssrc_id
+        packets = index[valid_indexes]
+        packets = packets[(packets['rtp_payload_type'] == self._payload_type) & (packets['rtp_ssrc'] == self._ssrc_id)]
 
-            # We can only concatenate if we follow the correct payload number and SSRC ID
-            if payload_type == self._payload_type and ssrc_id == self._ssrc_id:
-                self._add_to_bit_stream(packet[Raw].load)
+        # extend the sequence numbers by their wrap arounds (in capture order)
+        sequence_numbers = packets['rtp_sequence_number'].astype(numpy.int64)
+        steps = numpy.diff(sequence_numbers)
+        wraps = numpy.cumsum((steps < -0x8000).astype(numpy.int64) - (steps > 0x8000))
+        sequence_numbers[1:] += wraps * 0x10000
 
-    # noinspection PyMethodMayBeStatic
-    def _before_parsing(self):
-        """
-        Before all packets are parsed we need to assure that after the UDP layer follows directly the raw payload
-        """
+        order = numpy.argsort(sequence_numbers, kind='mergesort')
+        sequence_numbers = sequence_numbers[order]
+        is_unique = numpy.concatenate(([True], numpy.diff(sequence_numbers) != 0))
 
-        from scapy.all import bind_layers
-        bind_layers(UDP, RTP)
+        packets = packets[order][is_unique]
+        sequence_numbers = sequence_numbers[is_unique]
+        is_continuous = numpy.concatenate(([True], numpy.diff(sequence_numbers) == 1))
 
-    # noinspection PyMethodMayBeStatic
-    def _after_parsing(self):
+        return packets, is_continuous
+
+    def _get_payload_bounds(self, data, packets):
         """
-        After the parsing was done we need to split up the layering again
+        Returns the file offsets of the RTP payloads of packets, without the RTP header and padding.
+
+        :param data: the content of the capture
+        :type data: numpy.ndarray
+
+        :param packets: the index entries of the packets (see `_get_packets`)
+        :type packets: numpy.ndarray
+
+        :return: tuple (starts, ends): the first and the end (exclusive) offsets of the payloads
+        :rtype: tuple
         """
 
-        from scapy.all import split_layers
-        split_layers(UDP, RTP)
\ No newline at end of file
+        import numpy
+
+        payload_offsets = packets['payload_offset']
+        payload_ends = payload_offsets + packets['payload_length']
+
+        # strip the RTP padding, whose length is given by the last byte of the payload
+        has_padding = data[payload_offsets] & self.RTP_PADDING_FLAG != 0
+        payload_ends -= numpy.where(has_padding, data[numpy.maximum(payload_ends - 1, 0)], 0)
+
+        return payload_offsets + packets['rtp_header_length'], payload_ends
@@ -1,43 +1,71 @@
 __author__ = 'Alexander Dethof'
 
 from bitstreamparse.bitStreamParser import BitStreamParser
-from scapy.all import Packet
-from scapy.layers.inet import UDP, Raw
 
 
 class Mp2t(BitStreamParser):
+    """
+    Extracts the transport stream of UDP/MP2T captures: the UDP payloads are looked up in the packet index of the
+    capture (see `util.packetIndex`) and demultiplexed into TS packets (see `bitstreamparse.mp2tDemuxer`), which are
+    written together with their loss map.
+    """
 
-    def _init_class_variables(self):
-        pass
-
-    def _parse_packet(self, packet):
+    def __init__(self, pcap_file_path, is_stray_pid_dropped=False):
         """
-        Parses the UDP/MP2T packet into the bitstream
+        Extracts the transport stream of a capture.
+
+        :param pcap_file_path: the path of the packet capture to parse
+        :type pcap_file_path: basestring
 
-        :param packet: the packet to parse
-        :type packet: Packet
+        :param is_stray_pid_dropped: true if the TS packets of stray PIDs are dropped
+        :type is_stray_pid_dropped: bool
         """
 
-        assert isinstance(packet, Packet), 'The given packet variable is not a valid Scapy packet!'
-        assert packet.haslayer(Raw), 'Packet does not contain any payload!'
+        assert isinstance(is_stray_pid_dropped, bool)
 
-        # UDP/MP2T packets can just be concatenated
-        self._bit_stream += packet[Raw].load
+        self._is_stray_pid_dropped = is_stray_pid_dropped
+        super(Mp2t, self).__init__(pcap_file_path)
 
-    # noinspection PyMethodMayBeStatic
-    def _before_parsing(self):
+    def _init_class_variables(self):
+        self._demuxer = None
+
+    def _parse_pcap_file(self):
         """
-        Before all packets are parsed we need to assure that after the UDP layer follows directly the raw payload
+        Demultiplexes the UDP payloads of the capture.
         """
 
-        from scapy.all import bind_layers
-        bind_layers(UDP, Raw)
+        import numpy
+        from mmap import mmap, ACCESS_READ
+        from bitstreamparse.mp2tDemuxer import Mp2tDemuxer, get_ts_packets
+        from util.packetIndex import load_packet_index
+
+        index = load_packet_index(self._pcap_file_path)
 
-    # noinspection PyMethodMayBeStatic
-    def _after_parsing(self):
+        # the UDP packets, which do not carry RTP
+        packets = index[(index['payload_offset'] >= 0) & (index['rtp_header_length'] == 0)]
+        payload_starts = packets['payload_offset']
+
+        with open(self._pcap_file_path, 'rb') as pcap_file:
+            content = mmap(pcap_file.fileno(), 0, access=ACCESS_READ)
+
+        try:
+            ts_packets = get_ts_packets(
+                numpy.frombuffer(content, dtype=numpy.uint8), payload_starts, payload_starts + packets['payload_length']
+            )
+        finally:
+            content.close()
+
+        self._demuxer = Mp2tDemuxer(ts_packets, self._is_stray_pid_dropped)
+
+    def get_bit_stream(self):
+        return self._demuxer.get_stream()
+
+    def write_bit_stream(self, file_path):
         """
-        After the parsing was done we need to split up the layering again
+        Writes the extracted transport stream into a file and its loss map next to it.
+
+        :param file_path: the path of the file to write
+        :type file_path: basestring
         """
 
-        from scapy.all import split_layers
-        split_layers(UDP, Raw)
\ No newline at end of file
+        self._demuxer.write(file_path)
@@ -0,0 +1,166 @@
+"""
+This application calibrates the parameters of the markov loss models to target statistics (loss rate, mean burst
+length and gap density) and optionally appends them as new rows to the loss model tables of an execution path.
+
+Example:
+    python calibrate.py gemodel -r 2 -b 3 -g 0.5 -n 8000 -p <EXECUTION_PATH>
+"""
+
+__author__ = 'Alexander Dethof'
+
+from argparse import ArgumentParser
+
+from manipulators.offline import modelCalibration
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+
+def __get_table(model):
+    """
+    Returns the resource table of a model.
+
+    :param model: the model (see `modelCalibration.MODELS`)
+    :type model: basestring
+
+    :return: tuple (relative table path, resource class)
+    :rtype: tuple
+    """
+
+    from manipulators.offlineTrafficControlManipulator import OfflineTrafficControlManipulator
+    from manipulators.offlineTelchemyManipulator import OfflineTelchemyManipulator
+    from manipulators.resources.trafficControlManipulatorResource import \
+        TrafficControlManipulatorGeModelResource as TCGeModelRes, \
+        TrafficControlManipulatorStateModeResource as TCStateRes
+    from manipulators.resources.telchemyManipulatorResource import \
+        TelchemyManipulatorMarkovResource as TelchemyMarkovRes, \
+        TelchemyManipulatorMarkov2StateResource as Markov2StateRes, \
+        TelchemyManipulatorMarkov4StateResource as Markov4StateRes
+
+    if model == modelCalibration.MODEL_2STATE:
+        return OfflineTelchemyManipulator.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR \
+            + TelchemyMarkovRes.DB_TABLE_NAME + PATH_SEPARATOR + Markov2StateRes.DB_TABLE_NAME, Markov2StateRes
+
+    if model == modelCalibration.MODEL_MARKOV_4STATE:
+        return OfflineTelchemyManipulator.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR \
+            + TelchemyMarkovRes.DB_TABLE_NAME + PATH_SEPARATOR + Markov4StateRes.DB_TABLE_NAME, Markov4StateRes
+
+    if model == modelCalibration.MODEL_GEMODEL:
+        return OfflineTrafficControlManipulator.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR \
+            + TCGeModelRes.DB_TABLE_NAME, TCGeModelRes
+
+    return OfflineTrafficControlManipulator.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR \
+        + TCStateRes.DB_TABLE_NAME, TCStateRes
+
+
+def __get_row(model, parameters):
+    """
+    Returns the table row (probabilities in %) of calibrated parameters.
+
+    :param model: the model (see `modelCalibration.MODELS`)
+    :type model: basestring
+
+    :param parameters: the calibrated parameters (p, r, gap loss)
+    :type parameters: tuple
+
+    :rtype: dict
+    """
+
+    from manipulators.resources.trafficControlManipulatorResource import \
+        TrafficControlManipulatorGeModelResource as TCGeModelRes, \
+        TrafficControlManipulatorStateModeResource as TCStateRes
+    from manipulators.resources.telchemyManipulatorResource import \
+        TelchemyManipulatorMarkov2StateResource as Markov2StateRes, \
+        TelchemyManipulatorMarkov4StateResource as Markov4StateRes
+
+    (p, r, gap_loss) = ['%.4f' % (parameter * 100) for parameter in parameters]
+
+    if model == modelCalibration.MODEL_2STATE:
+        return {
+            Markov2StateRes.DB_FIELD_NAME_PBC: p,
+            Markov2StateRes.DB_FIELD_NAME_PCB: r,
+            Markov2StateRes.DB_FIELD_NAME_G: gap_loss,
+            Markov2StateRes.DB_FIELD_NAME_B: '100'
+        }
+
+    if model == modelCalibration.MODEL_MARKOV_4STATE:
+        # the states map on the ones of netem's 4-state model (see `modelCalibration`), the burst lossless state is
+        # not entered
+        return {
+            Markov4StateRes.DB_FIELD_NAME_PBA: gap_loss,
+            Markov4StateRes.DB_FIELD_NAME_PBC: p,
+            Markov4StateRes.DB_FIELD_NAME_PCB: r,
+            Markov4StateRes.DB_FIELD_NAME_PCD: '0',
+            Markov4StateRes.DB_FIELD_NAME_PDC: '100',
+            Markov4StateRes.DB_FIELD_NAME_G: '100',
+            Markov4StateRes.DB_FIELD_NAME_B: '100'
+        }
+
+    if model == modelCalibration.MODEL_GEMODEL:
+        # the fields are named after the tc arguments: 1-h is the loss probability of the bad state
+        return {
+            TCGeModelRes.DB_BAD_PROB_FIELD_NAME: p,
+            TCGeModelRes.DB_GOOD_PROB_FIELD_NAME: r,
+            TCGeModelRes.DB_GOOD_LOSS_PROB_FIELD_NAME: '100',
+            TCGeModelRes.DB_BAD_LOSS_PROB_FIELD_NAME: gap_loss
+        }
+
+    return {
+        TCStateRes.DB_P13_FIELD_NAME: p,
+        TCStateRes.DB_P31_FIELD_NAME: r,
+        TCStateRes.DB_P32_FIELD_NAME: '0',
+        TCStateRes.DB_P23_FIELD_NAME: '100',
+        TCStateRes.DB_P14_FIELD_NAME: gap_loss
+    }
+
+
+def __calibrate():
+    """
+    Parses the arguments, calibrates the model and writes the result.
+    """
+
+    arg_parser = ArgumentParser('Calibration of markov loss model parameters to target statistics')
+    arg_parser.add_argument('model', choices=modelCalibration.MODELS,
+                            help='the model to calibrate: 2s (telchemy markov2state), gemodel (tc), '
+                                 'state (tc 4-state), markov4state (telchemy markov4state)')
+    arg_parser.add_argument('-r', '--loss_rate', type=float, required=True, help='the target loss rate in %%')
+    arg_parser.add_argument('-b', '--burst_length', type=float, required=True,
+                            help='the target mean burst length in packets')
+    arg_parser.add_argument('-g', '--gap_density', type=float, default=None,
+                            help='[optional] the target gap density (RFC 3611) in %%')
+    arg_parser.add_argument('-n', '--packet_count', type=int, default=10000,
+                            help='the number of packets of the clips [default: 10000]')
+    arg_parser.add_argument('-p', '--path', default=None,
+                            help='[optional] execution path, whose loss model table the parameters are appended to')
+    arguments = arg_parser.parse_args()
+
+    gap_density = arguments.gap_density / 100 if arguments.gap_density is not None else None
+
+    (parameters, statistics) = modelCalibration.calibrate(
+        arguments.model,
+        arguments.loss_rate / 100,
+        arguments.burst_length,
+        gap_density,
+        arguments.packet_count
+    )
+
+    row = __get_row(arguments.model, parameters)
+
+    print '# \033[1m\033[94mCALIBRATED %s: %s\033[0m' % (
+        arguments.model, ', '.join('%s=%s%%' % (name, value) for (name, value) in sorted(row.items()))
+    )
+    print '# realized: loss rate %.3f%%, mean burst length %.3f, gap density %.3f%%' % (
+        statistics[0] * 100, statistics[1], statistics[2] * 100
+    )
+
+    if arguments.path is not None:
+        (table_path, resource_class) = __get_table(arguments.model)
+        table_file_path = arguments.path.rstrip(PATH_SEPARATOR) + PATH_SEPARATOR + 'config' + PATH_SEPARATOR \
+            + table_path + '.csv'
+
+        # noinspection PyProtectedMember
+        row_id = modelCalibration.add_table_row(table_file_path, resource_class._valid_field_names, row)
+        print '# appended as id %d to %s' % (row_id, table_file_path)
+
+
+if __name__ == '__main__':
+    __calibrate()
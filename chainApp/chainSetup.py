@@ -1,7 +1,7 @@
 __author__ = 'Alexander Dethof'
 
 from tool.encodeTool import ENCODER_SOURCE_DIR, ENCODER_DESTINATION_DIR, TOOL_ID_ENCODE
-from tool.streamTool import STREAM_DESTINATION_DIR, TOOL_ID_STREAM
+from tool.streamTool import STREAM_DESTINATION_DIR, STREAM_REMUX_CACHE_DIR, TOOL_ID_STREAM
 from tool.lossTool import LOSS_DESTINATION_DIR, TOOL_ID_LOSS
 from tool.extractTool import EXTRACT_DESTINATION_DIR, TOOL_ID_EXTRACT
 from tool.decodeTool import DECODER_DESTINATION_DIR, TOOL_ID_DECODE
@@ -17,7 +17,7 @@ class ChainSetup:
 
     REQUIRED_FOLDERS = {
         TOOL_ID_ENCODE: [ENCODER_SOURCE_DIR, ENCODER_DESTINATION_DIR],
-        TOOL_ID_STREAM: [STREAM_DESTINATION_DIR],
+        TOOL_ID_STREAM: [STREAM_DESTINATION_DIR, STREAM_REMUX_CACHE_DIR],
         TOOL_ID_LOSS: [LOSS_DESTINATION_DIR],  # TODO integrate traces dir
         TOOL_ID_EXTRACT: [EXTRACT_DESTINATION_DIR],
         TOOL_ID_DECODE: [DECODER_DESTINATION_DIR]
@@ -68,7 +68,8 @@ class ChainSetup:
                     elif ctsetup == 'b':
                         # TODO force sudo in this step!
 
-                        from shutil import copytree, rmtree
+                        from shutil import rmtree
+                        from util.fileMaterializer import materialize_tree
                         # noinspection PyPep8Naming
                         from os import mkdir, sep as PATH_SEPARATOR
 
@@ -82,7 +83,8 @@ class ChainSetup:
                         dir_name = path_elements[len(path_elements) - 1]
 
                         backup_path = backup_dir + PATH_SEPARATOR + dir_name + '_' + str(time())
-                        copytree(dir_path, backup_path)
+                        # the backup needs own inodes, a hard link would follow any later in-place write
+                        materialize_tree(dir_path, backup_path, allow_link=False)
                         print 'Did backup of `%s` in `%s`' % (dir_path, backup_path)
 
                         rmtree(dir_path)
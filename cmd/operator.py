@@ -101,6 +101,124 @@ class Operator(object):
         pgid = getpgid(int(process.pid))
         killpg(pgid, signal)
 
+    def _start_capture(self, device, pcap_path, port, is_dst_port_only=False, network_namespace=None,
+                       log_file_path=None):
+        """
+        Starts capturing the UDP datagrams of a port on a device into a pcap file. The capture is done in-process with
+        a raw socket, which is ready to receive when this method returns. If raw sockets can not be used (e.g. due to
+        missing privileges), tcpdump is started in background as fallback.
+
+        <strong style="text-decoration:underline;color:#a00">ATTENTION!!</strong> The returned capture has to be
+         stopped with `_stop_capture` afterwards!
+
+        :param device: the name of the device to capture on
+        :type device: basestring
+
+        :param pcap_path: the path of the pcap file to write
+        :type pcap_path: basestring
+
+        :param port: the UDP port to capture
+        :type port: int
+
+        :param is_dst_port_only: true if only datagrams sent to the port should be captured, false if also datagrams
+            sent from the port should be captured
+        :type is_dst_port_only: bool
+
+        :param network_namespace: the network namespace wherein the device is located (None -> the application's one)
+        :type network_namespace: manipulators.networkNamespace.NetworkNamespace|None
+
+        :param log_file_path: the path of the log file of the tcpdump fallback
+        :type log_file_path: basestring|None
+
+        :return: the running capture (None in dry mode)
+        :rtype: util.packetCapture.PacketCapture|Process|None
+        """
+
+        assert isinstance(device, basestring)
+        assert isinstance(pcap_path, basestring)
+        assert isinstance(port, int)
+        assert isinstance(is_dst_port_only, bool)
+
+        port_filter = ('dst port %d' if is_dst_port_only else 'port %d') % port
+
+        if not self._is_dry_run:
+            import socket
+            from util.packetCapture import PacketCapture
+
+            capture = PacketCapture(
+                device,
+                pcap_path,
+                port,
+                is_dst_port_only,
+                network_namespace.get_name() if network_namespace is not None else None
+            )
+
+            try:
+                capture.start()
+                print '# \033[1m\033[94mRUN : capture udp %s on %s -> %s\033[0m' % (port_filter, device, pcap_path)
+                return capture
+            except (socket.error, IOError, OSError) as e:
+                self._log_warning(Warning('Falling back to tcpdump, since the capture can not be done in-process: %s'
+                                          % e))
+
+        """
+        tcpdump: http://www.tcpdump.org/tcpdump_man.html
+
+        -i <INPUT>: specifies input resource
+        -w <OUTPUT>: specifies output resource to write pcap content
+
+        additional filter used here: 'udp [dst] port <PORT>'
+        --> Capture only all packets which are delivered via the udp protocol over port <PORT>
+        """
+
+        program_path = 'tcpdump'
+        if network_namespace is not None:
+            program_path = network_namespace.get_program_path(program_path)
+
+        tcpdump_command = Command(program_path)
+        tcpdump_command.set_as_subprocess() \
+                       .set_as_posix_option('i', device) \
+                       .set_as_posix_option('w', pcap_path) \
+                       .set_as_argument('PROTOCOL', 'udp') \
+                       .set_as_argument('PORT', port_filter)
+
+        if log_file_path:
+            tcpdump_command.set_as_log_file(log_file_path) \
+                           .set_std_err_redirect_to_file()
+
+        process = self._cmd(tcpdump_command)
+
+        # tcpdump does not tell when it is ready -> wait a short time wherein the process is able to initialize itself
+        if not self._is_dry_run:
+            from time import sleep
+            sleep(1)
+
+        return process
+
+    def _stop_capture(self, capture):
+        """
+        Stops a capture started by `_start_capture`. When this method returns, the pcap file is complete. Packets which
+        were dropped by the kernel during the capture are reported as warning.
+
+        :param capture: the capture to stop
+        :type capture: util.packetCapture.PacketCapture|Process|None
+
+        :raises: the error which aborted the capture (see `util.packetCapture.PacketCapture.stop`)
+        """
+
+        from util.packetCapture import PacketCapture
+
+        if isinstance(capture, PacketCapture):
+            capture.stop()
+
+            if capture.dropped_packet_count:
+                self._log_warning(Warning('The capture missed %d packets, which were dropped by the kernel!'
+                                          % capture.dropped_packet_count))
+
+        elif isinstance(capture, Process):
+            self._terminate_process_with_children(capture)
+            capture.join()
+
     @staticmethod
     def __execute_command_in_new_session(command):
         """
@@ -62,6 +62,7 @@ class AbstractCoder(Operator):
         self._destination_path = self.DEFAULT_DESTINATION_PATH
         self._log_file = self.DEFAULT_LOG_FILE_PATH
         self._config_folder_path = config_folder_path
+        self._staging_cache = None
 
         if not isfile(self.APP_PATH) and not self._is_dry_run:
             raise IOError(
@@ -75,10 +76,29 @@ class AbstractCoder(Operator):
                 % self.STREAMER_PATH
             )
 
+    def set_staging_cache(self, staging_cache):
+        """
+        Sets a cache wherein the source files might be staged. If a source is staged, the coder reads the staged copy
+        instead of the original file.
+
+        :param staging_cache: the cache to look up staged sources in, or None to always read the original files
+        :type staging_cache: util.stagingCache.StagingCache|None
+
+        :return: self
+        :rtype: AbstractCoder
+        """
+
+        from util.stagingCache import StagingCache
+        assert staging_cache is None or isinstance(staging_cache, StagingCache)
+
+        self._staging_cache = staging_cache
+        return self
+
     def set_src_path(self, src_path):
         """
         Configures the class's source path. This is the file on which the coder module will interact the next method
-        calls, after this path has been set.
+        calls, after this path has been set. If the source is staged in the coder's staging cache, the path of the
+        staged copy is used instead.
 
         :param src_path: the source which should be used for coder interaction
         :type src_path: basestring
@@ -87,6 +107,9 @@ class AbstractCoder(Operator):
         assert isinstance(src_path, basestring), "The source path given to the code is not a string"
         assert isfile(src_path), "The source path `%s` given to the coder is not a valid file" % src_path
 
+        if self._staging_cache is not None:
+            src_path = self._staging_cache.get_path(src_path)
+
         self._src_path = src_path
         return self
 
@@ -144,7 +167,7 @@ class AbstractCoder(Operator):
         pass
 
     @abstractmethod
-    def send_stream(self, server, port, stream_mode, codec):
+    def send_stream(self, server, port, stream_mode, codec, is_real_time=True):
         """
         Abstract method which has to be implemented in all classes extending this one. Used to perform an interaction
         to send a video
@@ -160,6 +183,10 @@ class AbstractCoder(Operator):
 
         :param codec: the codec used for the encoding of the video (required to set bit stream filters)
         :type codec: AbstractCodec
+
+        :param is_real_time: true if the video should be sent in real time, false if it should be sent as fast as
+            possible
+        :type is_real_time: bool
         """
 
         pass
\ No newline at end of file
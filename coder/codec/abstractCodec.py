@@ -43,7 +43,20 @@ class AbstractCodec(MetaConfigInterface):
 
     @staticmethod
     @abstractmethod
-    def get_bit_stream_parser(src_path):
+    def get_bit_stream_parser(src_path, is_incomplete_nal_unit_flagged=False):
+        """
+        Returns the parser, which depacketizes the codec's bit stream from a raw-rtp packet capture.
+
+        :param src_path: the path of the packet capture to parse
+        :type src_path: basestring
+
+        :param is_incomplete_nal_unit_flagged: true if incomplete fragmented NAL units are written with the forbidden
+            bit set, false if they are dropped
+        :type is_incomplete_nal_unit_flagged: bool
+
+        :rtype: bitstreamparse.bitStreamParser.BitStreamParser
+        """
+
         pass
 
     @staticmethod
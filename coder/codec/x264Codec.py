@@ -84,8 +84,9 @@ for video encoding techniques in the context of the processing chain.""",
         )
 
     @staticmethod
-    def get_bit_stream_parser(src_path):
-        raise Exception('Not implemented yet!')
+    def get_bit_stream_parser(src_path, is_incomplete_nal_unit_flagged=False):
+        from bitstreamparse.rtp.h264 import H264 as RtpH264
+        return RtpH264(src_path, is_incomplete_nal_unit_flagged)
 
     @staticmethod
     def get_library_name():
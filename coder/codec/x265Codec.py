@@ -113,9 +113,9 @@ for video encoding techniques in the context of the processing chain.""",
         )
 
     @staticmethod
-    def get_bit_stream_parser(src_path):
+    def get_bit_stream_parser(src_path, is_incomplete_nal_unit_flagged=False):
         from bitstreamparse.rtp.hevc import Hevc as RtpHevc
-        return RtpHevc(src_path)
+        return RtpHevc(src_path, is_incomplete_nal_unit_flagged)
 
     @staticmethod
     def get_library_name():
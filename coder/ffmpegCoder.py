@@ -431,7 +431,7 @@ class FfmpegCoder(AbstractCoder):
         # execute command
         return self._cmd(command)
 
-    def send_stream(self, server, port, stream_mode, codec, is_debug_mode=_GLOBAL_DEBUG_MODE):
+    def send_stream(self, server, port, stream_mode, codec, is_real_time=True, is_debug_mode=_GLOBAL_DEBUG_MODE):
         """
         Streams the ffmpeg video to a given server:port by a given protocol.
 
@@ -447,6 +447,10 @@ class FfmpegCoder(AbstractCoder):
         :param codec: the codec used for the encoding of the video (required to set bit stream filters)
         :type codec: AbstractCodec
 
+        :param is_real_time: True if the video should be sent in real time, False if it should be sent as fast as
+            possible
+        :type is_real_time: bool
+
         :param is_debug_mode: True is debug logging is allowed, False otherwise
         :type is_debug_mode: bool
         """
@@ -454,6 +458,7 @@ class FfmpegCoder(AbstractCoder):
         assert isinstance(server, basestring)
         assert isinstance(port, int)
         assert isinstance(stream_mode, basestring)
+        assert isinstance(is_real_time, bool)
 
         assert stream_mode in HrcTable.VALID_STREAM_MODES
 
@@ -463,7 +468,8 @@ class FfmpegCoder(AbstractCoder):
         """
         -re: play back in real-time
         """
-        command.set_as_posix_option('re')
+        if is_real_time:
+            command.set_as_posix_option('re')
         command.set_as_posix_option('y')
 
         """
@@ -0,0 +1,44 @@
+"""
+This application converts loss traces between the text format (one line per packet, as written by the loss trace
+parser and read by tpkloss) and the compact binary format (`.ltr`). The direction is derived from the source trace.
+
+Example:
+    python convertTrace.py trace.csv trace.ltr -s 42
+    python convertTrace.py trace.ltr trace.csv
+"""
+
+__author__ = 'Alexander Dethof'
+
+from argparse import ArgumentParser
+
+from manipulators.offline import compactTrace
+
+
+def __convert():
+    """
+    Parses the arguments and converts the trace.
+    """
+
+    arg_parser = ArgumentParser('Conversion of loss traces between the text and the compact binary format')
+    arg_parser.add_argument('src', help='the trace to convert')
+    arg_parser.add_argument('dst', help='the path of the converted trace')
+    arg_parser.add_argument('-s', '--seed', type=int, default=None,
+                            help='[optional] the seed which generated the losses, stored in compact traces')
+    arg_parser.add_argument('-e', '--encoding', choices=sorted(compactTrace.ENCODINGS.keys()), default=None,
+                            help='[optional] the encoding of compact traces [default: the smaller one]')
+    arguments = arg_parser.parse_args()
+
+    from os.path import getsize
+
+    if compactTrace.is_compact_trace(arguments.src):
+        compactTrace.convert_to_text(arguments.src, arguments.dst)
+    else:
+        compactTrace.convert_to_compact(arguments.src, arguments.dst, arguments.seed, arguments.encoding)
+
+    print '# \033[1m\033[94mCONVERTED %s (%d bytes) -> %s (%d bytes)\033[0m' % (
+        arguments.src, getsize(arguments.src), arguments.dst, getsize(arguments.dst)
+    )
+
+
+if __name__ == '__main__':
+    __convert()
@@ -0,0 +1,593 @@
+__author__ = 'Alexander Dethof'
+
+from abc import ABCMeta, abstractmethod
+
+from abstractManipulator import AbstractManipulator
+
+
+class AbstractOfflineManipulator(AbstractManipulator):
+    """
+    Abstract class representing a manipulator, which computes the received packets of a capture in-process (i.e. the
+    loss, delay and order of the packets), instead of replaying or rewriting the capture with an external program.
+
+    Since the capture is only needed in memory, several offline manipulators which read the same capture can be
+    applied in a single pass (see `manipulate_in_single_pass`).
+    """
+
+    __metaclass__ = ABCMeta
+
+    # the store wherein generated loss masks are kept (None -> the masks are generated for each manipulation)
+    _mask_store = None
+
+    # the number of seeded realizations of a loss model, of which the one closest to the target statistics is kept
+    _realization_count = 1
+
+    # suffix of the file, wherein the selected realization is recorded
+    REALIZATION_FILE_SUFFIX = '_realization'
+
+    # the FEC settings, with which the lost packets are repaired (None -> no FEC)
+    _fec_settings = None
+
+    # suffix of the file, wherein the FEC overhead and repairs are recorded
+    FEC_FILE_SUFFIX = '_fec'
+
+    # index of the random stream of the FEC packet losses
+    FEC_RANDOM_STREAM = 3
+
+    # the retransmission settings, with which the lost packets are recovered (None -> no retransmissions)
+    _arq_settings = None
+
+    # suffix of the file, wherein the recovery of the lost packets is recorded
+    ARQ_FILE_SUFFIX = '_arq'
+
+    # index of the random stream of the retransmissions (independent of the loss streams of the same seed)
+    ARQ_RANDOM_STREAM = 2
+
+    # the number of packets of the capture per batch, whose received records are written by all manipulators of a
+    # single pass before the next batch is read from the memory map of the capture
+    WRITE_CHUNK_SIZE = 1 << 16
+
+    def set_mask_store(self, mask_store):
+        """
+        Sets a store, which provides the loss masks already generated for the same model, parameters and seed.
+
+        :param mask_store: the store of the loss masks, or None
+        :type mask_store: manipulators.offline.maskStore.MaskStore|None
+
+        :return: self
+        :rtype: AbstractOfflineManipulator
+        """
+
+        from manipulators.offline.maskStore import MaskStore
+        assert mask_store is None or isinstance(mask_store, MaskStore)
+
+        self._mask_store = mask_store
+        return self
+
+    def set_realization_count(self, realization_count):
+        """
+        Sets the number of seeded realizations which are generated for a loss model, to keep the one closest to the
+        target statistics (see `_get_selected_losses`).
+
+        :param realization_count: the number of realizations (1 -> the seed's realization is kept)
+        :type realization_count: int
+
+        :return: self
+        :rtype: AbstractOfflineManipulator
+        """
+
+        assert isinstance(realization_count, int) and realization_count > 0
+
+        self._realization_count = realization_count
+        return self
+
+    def set_fec_settings(self, fec_settings):
+        """
+        Sets the row/column XOR FEC settings, with which the packets lost by the manipulation are repaired before any
+        retransmissions (see `manipulators.offline.fecSimulator`).
+
+        :param fec_settings: a row of the FEC settings (see
+            `manipulators.resources.fecManipulatorResource.FecManipulatorResource`), or None
+        :type fec_settings: dict|None
+
+        :return: self
+        :rtype: AbstractOfflineManipulator
+        """
+
+        assert fec_settings is None or isinstance(fec_settings, dict)
+
+        self._fec_settings = fec_settings
+        return self
+
+    def set_arq_settings(self, arq_settings):
+        """
+        Sets the retransmission (NACK/ARQ) settings, with which the packets lost by the manipulation are recovered
+        before the destination capture is written (see `manipulators.offline.arqSimulator`).
+
+        :param arq_settings: a row of the retransmission settings (see
+            `manipulators.resources.arqManipulatorResource.ArqManipulatorResource`), or None
+        :type arq_settings: dict|None
+
+        :return: self
+        :rtype: AbstractOfflineManipulator
+        """
+
+        assert arq_settings is None or isinstance(arq_settings, dict)
+
+        self._arq_settings = arq_settings
+        return self
+
+    def _get_seed(self, seed=None):
+        """
+        Returns the seed of the manipulation's random numbers: the configured seed, or a seed derived from the
+        destination file's name (reproducible per PVS).
+
+        :param seed: the configured seed, or None
+        :type seed: int|long|None
+
+        :rtype: int|long
+        """
+
+        if seed is not None:
+            return int(seed)
+
+        from os.path import basename
+        from zlib import crc32
+
+        return crc32(basename(self._dst_file_path)) & 0xffffffff
+
+    def _get_losses(self, model, parameters, seed, packet_count, generate):
+        """
+        Returns the losses of a model from the mask store, or generates them if no store is set.
+
+        :param model: the name of the loss model (see `manipulators.offline.maskStore`)
+        :type model: basestring
+
+        :param parameters: the parameters of the model
+        :type parameters: dict
+
+        :param seed: the seed of the random numbers
+        :type seed: int|long
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :param generate: a function which generates the losses for a given number of packets
+        :type generate: callable
+
+        :return: the loss of each packet
+        :rtype: numpy.ndarray
+        """
+
+        if self._mask_store is None:
+            return generate(packet_count)
+
+        return self._mask_store.get_mask(model, parameters, seed, packet_count, generate)
+
+    def _get_selected_losses(self, model, parameters, seed, packet_count, generate_batch, targets, window=None):
+        """
+        Generates the realizations of the seeds `seed`, `seed + 1`, ... in a batch and returns the one whose loss rate
+        and mean burst length are closest to the targets. The selected seed is recorded next to the destination file,
+        so that the realization can be reproduced by configuring it as seed. With a mask store, all realizations are
+        served from it and only the missing ones are generated.
+
+        :param model: the name of the loss model (see `manipulators.offline.maskStore`)
+        :type model: basestring
+
+        :param parameters: the parameters of the model
+        :type parameters: dict
+
+        :param seed: the first seed of the realizations
+        :type seed: int|long
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :param generate_batch: a function which generates the losses of a list of seeds for a given number of packets
+            (seeds x packets)
+        :type generate_batch: callable
+
+        :param targets: the target statistics (see `manipulators.offline.realizationSelector.select_realization`)
+        :type targets: dict
+
+        :param window: the packets which may be lost, to restrict the statistics to them (None -> all packets)
+        :type window: numpy.ndarray|None
+
+        :return: the loss of each packet
+        :rtype: numpy.ndarray
+        """
+
+        if self._realization_count == 1:
+            return self._get_losses(
+                model, parameters, seed, packet_count, lambda count: generate_batch([seed], count)[0]
+            )
+
+        from manipulators.offline.realizationSelector import get_loss_statistics, select_realization
+
+        seeds = [(seed + i) & 0xffffffff for i in xrange(self._realization_count)]
+
+        if self._mask_store is None:
+            realizations = generate_batch(seeds, packet_count)
+        else:
+            realizations = self._mask_store.get_masks(model, parameters, seeds, packet_count, generate_batch)
+
+        (loss_rates, mean_burst_lengths) = get_loss_statistics(
+            realizations if window is None else realizations[:, window]
+        )
+        (index, is_accepted) = select_realization(loss_rates, mean_burst_lengths, **targets)
+
+        print '# \033[1m\033[94mREALIZATION: seed %d (%d of %d, %s): loss rate %.2f%%, mean burst length %.2f\033[0m' \
+            % (seeds[index], index + 1, len(seeds), 'accepted' if is_accepted else 'NOT WITHIN TOLERANCES',
+               loss_rates[index] * 100, mean_burst_lengths[index])
+
+        # noinspection PyPep8Naming
+        from os.path import splitext, extsep as FILE_EXTENSION_SEPARATOR
+
+        realization_file_path = splitext(self._dst_file_path)[0] \
+            + self.REALIZATION_FILE_SUFFIX \
+            + FILE_EXTENSION_SEPARATOR \
+            + 'csv'
+
+        with open(realization_file_path, 'w') as realization_file:
+            realization_file.write('seed,realizations,loss_rate,mean_burst_length,is_accepted\n')
+            realization_file.write('%d,%d,%f,%f,%d\n' % (
+                seeds[index], len(seeds), loss_rates[index] * 100, mean_burst_lengths[index], is_accepted
+            ))
+
+        return realizations[index]
+
+    def _index_packets(self, records, link_type, shared_results):
+        """
+        Inspects the contents of the packets before the received packets are computed, e.g. to classify them. The
+        manipulators which only depend on the timestamps and sizes of the packets do not need to.
+
+        :param records: the records of the capture (see `util.packetIndex.PacketRecords`)
+        :type records: util.packetIndex.PacketRecords
+
+        :param link_type: the link layer type of the capture
+        :type link_type: int
+
+        :param shared_results: the results of the inspections by key, which are shared by all manipulators of a single
+            pass, so that the same inspection is done only once per capture
+        :type shared_results: dict
+        """
+
+        pass
+
+    @abstractmethod
+    def _get_received_packets(self, timestamps, packet_sizes, units_per_second):
+        """
+        Computes which packets of the capture are received, in which order and at which time.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param packet_sizes: the original lengths of the packets in bytes (as on the wire, including all headers)
+        :type packet_sizes: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps
+        :type units_per_second: int
+
+        :return: tuple (losses, indexes, arrivals): the loss of each packet, the indexes of the received packets in
+            the order of their arrival and their arrival times (integer time units)
+        :rtype: tuple
+        """
+
+        pass
+
+    def _repair_losses(self, timestamps, losses, indexes, arrivals):
+        """
+        Repairs the lost packets by the FEC, and records the FEC overhead and the number of repaired packets next to
+        the destination file.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param losses: the loss of each packet
+        :type losses: numpy.ndarray
+
+        :param indexes: the indexes of the received packets in the order of their arrival
+        :type indexes: numpy.ndarray
+
+        :param arrivals: the arrival times of the received packets (integer time units)
+        :type arrivals: numpy.ndarray
+
+        :return: tuple (losses, indexes, arrivals) after the FEC decoding
+        :rtype: tuple
+        """
+
+        from numpy.random import RandomState
+        from manipulators.offline.fecSimulator import simulate, get_fec_packet_count
+        from manipulators.resources.fecManipulatorResource import FecManipulatorResource as FecRes
+
+        settings = self._fec_settings
+
+        column_count = settings[FecRes.DB_COLUMNS_FIELD_NAME]
+        row_count = settings[FecRes.DB_ROWS_FIELD_NAME]
+        is_row_fec = settings[FecRes.DB_MODE_FIELD_NAME] == FecRes.DB_MODE_ROW_COLUMN_VALUE
+
+        fec_loss_probability = settings[FecRes.DB_FEC_LOSS_FIELD_NAME]
+        if fec_loss_probability is None:
+            fec_loss_probability = float(losses.mean()) if len(losses) else 0.0
+        else:
+            fec_loss_probability /= 100
+
+        (residual_losses, indexes, arrivals) = simulate(
+            timestamps,
+            losses,
+            indexes,
+            arrivals,
+            column_count,
+            row_count,
+            is_row_fec,
+            fec_loss_probability,
+            RandomState([self._get_seed(settings[FecRes.DB_SEED_FIELD_NAME]), self.FEC_RANDOM_STREAM])
+        )
+
+        packet_count = len(losses)
+        fec_packet_count = get_fec_packet_count(packet_count, column_count, row_count, is_row_fec)
+        overhead = fec_packet_count * 100.0 / packet_count if packet_count else 0.0
+        lost_count = int(losses.sum())
+        repaired_count = lost_count - int(residual_losses.sum())
+
+        print '# \033[1m\033[94mFEC: %d of %d lost packets repaired (%dx%d %s), overhead %.2f%%\033[0m' % (
+            repaired_count, lost_count, column_count, row_count, settings[FecRes.DB_MODE_FIELD_NAME], overhead
+        )
+
+        # noinspection PyPep8Naming
+        from os.path import splitext, extsep as FILE_EXTENSION_SEPARATOR
+
+        fec_file_path = splitext(self._dst_file_path)[0] + self.FEC_FILE_SUFFIX + FILE_EXTENSION_SEPARATOR + 'csv'
+
+        with open(fec_file_path, 'w') as fec_file:
+            fec_file.write('columns,rows,mode,packets,fec_packets,overhead,lost,repaired,residual_loss_rate\n')
+            fec_file.write('%d,%d,%s,%d,%d,%f,%d,%d,%f\n' % (
+                column_count, row_count, settings[FecRes.DB_MODE_FIELD_NAME], packet_count, fec_packet_count,
+                overhead, lost_count, repaired_count,
+                residual_losses.sum() * 100.0 / packet_count if packet_count else 0.0
+            ))
+
+        return residual_losses, indexes, arrivals
+
+    def _recover_losses(self, timestamps, losses, indexes, arrivals, units_per_second):
+        """
+        Recovers the lost packets, whose retransmissions arrive in time, and records the recovery of each lost packet
+        next to the destination file.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param losses: the loss of each packet
+        :type losses: numpy.ndarray
+
+        :param indexes: the indexes of the received packets in the order of their arrival
+        :type indexes: numpy.ndarray
+
+        :param arrivals: the arrival times of the received packets (integer time units)
+        :type arrivals: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps
+        :type units_per_second: int
+
+        :return: tuple (losses, indexes, arrivals) after the retransmissions
+        :rtype: tuple
+        """
+
+        import numpy
+        from numpy.random import RandomState
+        from manipulators.offline.arqSimulator import simulate
+        from manipulators.resources.arqManipulatorResource import ArqManipulatorResource as ArqRes
+
+        settings = self._arq_settings
+
+        retransmission_loss_probability = settings[ArqRes.DB_RETRANSMISSION_LOSS_FIELD_NAME]
+        if retransmission_loss_probability is None:
+            retransmission_loss_probability = float(losses.mean()) if len(losses) else 0.0
+        else:
+            retransmission_loss_probability /= 100
+
+        (residual_losses, indexes, arrivals, recovery_times) = simulate(
+            timestamps,
+            losses,
+            indexes,
+            arrivals,
+            units_per_second,
+            settings[ArqRes.DB_RTT_FIELD_NAME],
+            settings[ArqRes.DB_RTT_JITTER_FIELD_NAME],
+            settings[ArqRes.DB_MAX_RETRANSMISSIONS_FIELD_NAME],
+            settings[ArqRes.DB_PLAYOUT_DEADLINE_FIELD_NAME],
+            retransmission_loss_probability,
+            RandomState([self._get_seed(settings[ArqRes.DB_SEED_FIELD_NAME]), self.ARQ_RANDOM_STREAM])
+        )
+
+        lost_indexes = numpy.flatnonzero(losses)
+        is_recovered = recovery_times >= 0
+
+        print '# \033[1m\033[94mARQ: %d of %d lost packets recovered\033[0m' % (
+            int(is_recovered.sum()), len(lost_indexes)
+        )
+
+        # noinspection PyPep8Naming
+        from os.path import splitext, extsep as FILE_EXTENSION_SEPARATOR
+
+        arq_file_path = splitext(self._dst_file_path)[0] + self.ARQ_FILE_SUFFIX + FILE_EXTENSION_SEPARATOR + 'csv'
+
+        # the delay of each recovered packet after its sending in ms, -1 for the packets which are not recovered
+        delays = numpy.where(
+            is_recovered, (recovery_times - timestamps[lost_indexes]) * (1000.0 / units_per_second), -1
+        )
+
+        with open(arq_file_path, 'w') as arq_file:
+            arq_file.write('packet,delay\n')
+            for (index, delay) in zip(lost_indexes.tolist(), delays.tolist()):
+                arq_file.write('%d,%.3f\n' % (index + 1, delay))
+
+        return residual_losses, indexes, arrivals
+
+    @staticmethod
+    def __write_records(writers, content, index, timestamps, received_packets, units_per_second):
+        """
+        Writes the received records of several manipulators in a single loop over the capture: the capture is cut
+        into batches of `WRITE_CHUNK_SIZE` packets and the records, which arrive until the end of a batch, are sliced
+        from the memory map of the capture and written by all writers, before the next batch is read.
+
+        :param writers: the writers of the lossy captures
+        :type writers: list[util.pcapFile.PcapWriter]
+
+        :param content: the memory map of the capture
+        :type content: mmap.mmap
+
+        :param index: the packet index of the capture (see `util.packetIndex.PACKET_INDEX_DTYPE`)
+        :type index: numpy.ndarray
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param received_packets: tuple (indexes, arrivals) per writer: the indexes of the received packets in the order
+            of their arrival and their arrival times (integer time units)
+        :type received_packets: list[tuple]
+
+        :param units_per_second: the number of time units per second of the arrival times
+        :type units_per_second: int
+        """
+
+        import numpy
+
+        chunk_size = AbstractOfflineManipulator.WRITE_CHUNK_SIZE
+        batch_ends = timestamps[chunk_size::chunk_size]
+
+        # the bounds of the batches in the records of each writer
+        bounds = [
+            numpy.maximum.accumulate(
+                numpy.concatenate(([0], numpy.searchsorted(arrivals, batch_ends), [len(arrivals)]))
+            )
+            for (indexes, arrivals) in received_packets
+        ]
+
+        for batch in xrange(len(batch_ends) + 1):
+            for (writer, (indexes, arrivals), batch_bounds) in zip(writers, received_packets, bounds):
+                (start, end) = batch_bounds[batch:batch + 2].tolist()
+                records = index[indexes[start:end]]
+
+                for (offset, captured_length, orig_len, arrival) in zip(
+                        records['offset'].tolist(),
+                        records['captured_length'].tolist(),
+                        records['original_length'].tolist(),
+                        arrivals[start:end].tolist()
+                ):
+                    writer.write(
+                        arrival // units_per_second, arrival % units_per_second, orig_len,
+                        content[offset:offset + captured_length]
+                    )
+
+    @staticmethod
+    def manipulate_in_single_pass(manipulators):
+        """
+        Applies several offline manipulators on the same source capture, which is read only once. The capture is
+        memory-mapped and looked up by its packet index (see `util.packetIndex`): the inspections of the packets are
+        shared by the manipulators (see `_index_packets`), the received packets are computed from the index and the
+        lossy captures are written together in a single loop over the capture (see `__write_records`).
+
+        :param manipulators: the manipulators to apply (all with the same source file, possibly by different paths)
+        :type manipulators: list[AbstractOfflineManipulator]
+
+        :return: the loss of each packet per manipulator (None for manipulators which did not manipulate, e.g. in dry
+            or trace only mode)
+        :rtype: list
+        """
+
+        assert isinstance(manipulators, (list, tuple))
+        assert len(manipulators) > 0
+
+        from os.path import samefile
+
+        src_file_path = manipulators[0]._src_file_path
+        for manipulator in manipulators:
+            assert isinstance(manipulator, AbstractOfflineManipulator)
+            assert manipulator._src_file_path == src_file_path or samefile(manipulator._src_file_path, src_file_path), \
+                "The manipulators have different source files!"
+            assert manipulator._dst_file_path, "No destination file specified!"
+
+        active_manipulators = list()
+        for manipulator in manipulators:
+            if manipulator._is_trace_only:
+                # the loss tool will perform the tracing
+                continue
+
+            print '# \033[1m\033[94mRUN : %s %s -> %s\033[0m' % (
+                manipulator.__class__.__name__, manipulator._src_file_path, manipulator._dst_file_path
+            )
+
+            if not manipulator._is_dry_run:
+                active_manipulators.append(manipulator)
+
+        losses_by_manipulator = dict()
+
+        if active_manipulators:
+            import numpy
+            from mmap import mmap, ACCESS_READ
+            from util.pcapFile import PcapReader, PcapWriter
+            from util.packetIndex import load_packet_index, PacketRecords
+
+            index = load_packet_index(src_file_path)
+
+            # the reader gives the global settings of the capture only
+            with PcapReader(src_file_path) as reader, open(src_file_path, 'rb') as src_file:
+                content = mmap(src_file.fileno(), 0, access=ACCESS_READ)
+
+                try:
+                    units_per_second = 1000000000 if reader.is_nano else 1000000
+                    records = PacketRecords(content, index, reader.is_nano)
+
+                    # the index gives the timestamps in nanoseconds
+                    timestamps = index['timestamp'] // (1000000000 // units_per_second)
+                    packet_sizes = index['original_length'].astype(numpy.int64)
+
+                    shared_results = dict()
+                    received_packets = list()
+
+                    for manipulator in active_manipulators:
+                        manipulator._index_packets(records, reader.link_type, shared_results)
+
+                        (losses, indexes, arrivals) = manipulator._get_received_packets(
+                            timestamps, packet_sizes, units_per_second
+                        )
+
+                        if manipulator._fec_settings is not None:
+                            (losses, indexes, arrivals) = manipulator._repair_losses(
+                                timestamps, losses, indexes, arrivals
+                            )
+
+                        if manipulator._arq_settings is not None:
+                            (losses, indexes, arrivals) = manipulator._recover_losses(
+                                timestamps, losses, indexes, arrivals, units_per_second
+                            )
+
+                        received_packets.append((indexes, arrivals))
+                        losses_by_manipulator[id(manipulator)] = losses
+
+                    writers = list()
+                    try:
+                        for manipulator in active_manipulators:
+                            writers.append(PcapWriter.like(manipulator._dst_file_path, reader))
+
+                        AbstractOfflineManipulator.__write_records(
+                            writers, content, index, timestamps, received_packets, units_per_second
+                        )
+                    finally:
+                        for writer in writers:
+                            writer.close()
+                finally:
+                    content.close()
+
+        return [losses_by_manipulator.get(id(manipulator)) for manipulator in manipulators]
+
+    def manipulate(self):
+        """
+        Performs the offline manipulation.
+        """
+
+        assert self._src_file_path, "No source file specified!"
+        assert self._dst_file_path, "No destination file specified!"
+
+        self.manipulate_in_single_pass([self])
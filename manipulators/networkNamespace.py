@@ -0,0 +1,151 @@
+__author__ = 'Alexander Dethof'
+
+from cmd.operator import Operator
+from cmd.command import Command
+
+
+class NetworkNamespace(Operator):
+    """
+    Represents an isolated linux network namespace with a veth pair, wherein an online manipulation can run without
+    interfering with other manipulations or with the host's loopback device. Packets are replayed on the sender device,
+    where also the traffic control settings are applied, and arrive at the receiver device, where they can be
+    captured. Deleting the namespace removes the veth pair with all its traffic control settings, even if the
+    manipulation was interrupted.
+    """
+
+    # prefix of the namespace names
+    NAME_PREFIX = 'pvs_'
+
+    # devices of the veth pair inside of each namespace
+    SENDER_DEVICE = 'veth_tx'
+    RECEIVER_DEVICE = 'veth_rx'
+
+    def __init__(self, name):
+        """
+        Initializes the namespace with a name. The namespace is not created before `create` is called.
+
+        :param name: the name of the namespace, unique among the concurrently used namespaces
+        :type name: basestring
+        """
+
+        super(NetworkNamespace, self).__init__()
+
+        assert isinstance(name, basestring)
+
+        self.__name = self.NAME_PREFIX + name
+        self.__is_created = False
+
+    def get_name(self):
+        """
+        :return: the name of the namespace
+        :rtype: str
+        """
+
+        return self.__name
+
+    def get_sender_device(self):
+        """
+        :return: the device where to replay the packets and to apply the traffic control settings on
+        :rtype: str
+        """
+
+        return self.SENDER_DEVICE
+
+    def get_receiver_device(self):
+        """
+        :return: the device where to capture the manipulated packets
+        :rtype: str
+        """
+
+        return self.RECEIVER_DEVICE
+
+    def get_program_path(self, program_path):
+        """
+        Returns the program path to use in a command, so that the program is executed inside of the namespace.
+
+        :param program_path: the path of the program to execute
+        :type program_path: basestring
+
+        :return: the program path to use in a command, so that the program is executed inside of the namespace
+        :rtype: str
+        """
+
+        assert isinstance(program_path, basestring)
+
+        return 'ip netns exec %s %s' % (self.__name, program_path)
+
+    def __ip(self, *arguments):
+        """
+        Executes an `ip` command inside of the namespace.
+
+        :param arguments: the arguments of the command
+        :type arguments: basestring*
+        """
+
+        command = Command(self.get_program_path('ip'))
+        for (i, argument) in enumerate(arguments):
+            command.set_as_argument('ARG%d' % i, argument)
+
+        self._cmd(command)
+
+    def create(self):
+        """
+        Creates the namespace with its veth pair. A namespace with the same name which was left over by an interrupted
+        run is deleted before.
+
+        :return: self
+        :rtype: NetworkNamespace
+        """
+
+        """
+        ip: http://man7.org/linux/man-pages/man8/ip-netns.8.html
+
+        netns add <NAME>: creates a new network namespace
+        link add <DEVICE> type veth peer name <PEER_DEVICE>: creates a pair of connected virtual ethernet devices
+        link set <DEVICE> up: activates a device
+        """
+
+        self.destroy(force=True)
+
+        command = Command('ip')
+        command.set_as_argument('NETNS', 'netns add %s' % self.__name)
+        self._cmd(command)
+        self.__is_created = True
+
+        # the devices are created inside of the namespace, so that their names do not collide with other namespaces
+        self.__ip('link add %s type veth peer name %s' % (self.SENDER_DEVICE, self.RECEIVER_DEVICE))
+
+        for device in ('lo', self.SENDER_DEVICE, self.RECEIVER_DEVICE):
+            self.__ip('link set %s up' % device)
+
+        return self
+
+    def destroy(self, force=False):
+        """
+        Deletes the namespace, including its devices and their traffic control settings.
+
+        :param force: true if the namespace should be deleted, even if it was not created by this instance
+        :type force: bool
+        """
+
+        assert isinstance(force, bool)
+
+        if not self.__is_created and not force:
+            return
+
+        """
+        ip: http://man7.org/linux/man-pages/man8/ip-netns.8.html
+
+        netns del <NAME>: deletes a network namespace
+        """
+
+        command = Command('ip')
+        command.set_as_argument('NETNS', 'netns del %s' % self.__name)
+
+        if force:
+            from os import devnull
+            command.set_as_log_file(devnull) \
+                   .set_std_err_redirect_to_file()
+
+        self._cmd(command)
+        self.__is_created = False
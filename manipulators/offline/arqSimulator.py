@@ -0,0 +1,106 @@
+"""
+Simulates the recovery of lost packets by NACK based retransmissions (RTP/AVPF generic NACK, RFC 4585, with
+retransmissions like RFC 4588), based on the losses and arrival times computed by an offline manipulation.
+
+The receiver detects a lost packet as soon as a packet with a higher sequence number arrives, and requests it with a
+NACK. Each retransmission arrives one round trip time (with normally distributed jitter) after its request and may
+be lost again; the receiver repeats its request after each round trip without the packet, up to the retransmission
+budget. A lost packet is recovered, if one of its retransmissions arrives before its playout deadline, i.e. within a
+given time after it was sent.
+
+All lost packets of a capture are simulated at once (lost packets x retransmissions).
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+
+def simulate(timestamps, losses, indexes, arrivals, units_per_second, rtt, rtt_jitter, max_retransmission_count,
+             playout_deadline, retransmission_loss_probability, random_state):
+    """
+    Simulates the retransmission of the lost packets.
+
+    :param timestamps: the send (capture) times of the packets (integer time units)
+    :type timestamps: numpy.ndarray
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param indexes: the indexes of the received packets in the order of their arrival
+    :type indexes: numpy.ndarray
+
+    :param arrivals: the arrival times of the received packets (integer time units)
+    :type arrivals: numpy.ndarray
+
+    :param units_per_second: the number of time units per second of the timestamps
+    :type units_per_second: int
+
+    :param rtt: the mean round trip time in ms
+    :type rtt: float
+
+    :param rtt_jitter: the standard deviation of the round trip time in ms
+    :type rtt_jitter: float
+
+    :param max_retransmission_count: the maximum number of retransmissions per lost packet
+    :type max_retransmission_count: int
+
+    :param playout_deadline: the time in ms after sending, until which a packet has to arrive to be played out
+    :type playout_deadline: float
+
+    :param retransmission_loss_probability: the probability that a retransmission is lost, in [0, 1]
+    :type retransmission_loss_probability: float
+
+    :param random_state: the random numbers of the round trip times and retransmission losses
+    :type random_state: numpy.random.RandomState
+
+    :return: tuple (residual losses, indexes, arrivals, recovery times): the losses after the retransmissions, the
+        indexes and arrival times of the received packets (incl. the recovered ones) in the order of their arrival and
+        the arrival time of each lost packet's retransmission (-1 if the packet is not recovered)
+    :rtype: tuple
+    """
+
+    assert isinstance(max_retransmission_count, int) and max_retransmission_count > 0
+    assert 0 <= retransmission_loss_probability <= 1
+
+    lost_indexes = numpy.flatnonzero(losses)
+    recovery_times = numpy.full(len(lost_indexes), -1, dtype=numpy.int64)
+
+    if not len(lost_indexes) or not len(indexes):
+        return losses, indexes, arrivals, recovery_times
+
+    units_per_ms = units_per_second / 1000.0
+
+    # a loss is detected by the earliest arrival of any packet with a higher sequence number
+    order = numpy.argsort(indexes, kind='mergesort')
+    received_indexes = indexes[order]
+    earliest_later_arrivals = numpy.minimum.accumulate(arrivals[order][::-1])[::-1]
+
+    positions = numpy.searchsorted(received_indexes, lost_indexes, 'right')
+    is_detected = positions < len(received_indexes)
+    detection_times = earliest_later_arrivals[numpy.minimum(positions, len(received_indexes) - 1)]
+
+    # each request is answered (or repeated) after a round trip
+    shape = (len(lost_indexes), max_retransmission_count)
+    round_trip_times = numpy.maximum(rtt + rtt_jitter * random_state.standard_normal(shape), 0) * units_per_ms
+    attempt_times = detection_times[:, None] + numpy.cumsum(round_trip_times, axis=1)
+
+    is_delivered = random_state.random_sample(shape) >= retransmission_loss_probability
+    first_deliveries = numpy.argmax(is_delivered, axis=1)
+    delivery_times = attempt_times[numpy.arange(len(lost_indexes)), first_deliveries]
+
+    is_recovered = is_detected \
+        & is_delivered.any(axis=1) \
+        & (delivery_times <= timestamps[lost_indexes] + playout_deadline * units_per_ms)
+
+    recovery_times[is_recovered] = numpy.round(delivery_times[is_recovered]).astype(numpy.int64)
+
+    residual_losses = losses.copy()
+    residual_losses[lost_indexes[is_recovered]] = False
+
+    # the recovered packets are inserted by their arrival time
+    indexes = numpy.concatenate((indexes, lost_indexes[is_recovered]))
+    arrivals = numpy.concatenate((arrivals, recovery_times[is_recovered]))
+    order = numpy.argsort(arrivals, kind='mergesort')
+
+    return residual_losses, indexes[order], arrivals[order], recovery_times
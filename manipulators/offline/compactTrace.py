@@ -0,0 +1,349 @@
+"""
+Compact binary format for loss traces, which replaces the text traces (one `1` or `0` line per packet) for large
+captures, and converters from and to the text format read by tpkloss (`-r`).
+
+A compact trace starts with a fixed header (magic, version, encoding, flags, packet count, seed and run count) which
+is followed by the losses and, optionally, by the delay of each packet:
+
+* `bits`: the losses as packed bitset (`numpy.packbits`, 1 bit per packet, 1 = lost)
+* `runs`: the lengths of the alternating runs of received and lost packets (uint32), starting with a (possibly empty)
+  run of received packets
+
+The writer chooses the smaller encoding, unless one is requested. Both encodings allow random access by packet index:
+packed bits are read through a memory map, runs are searched by their cumulated lengths.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from struct import Struct
+
+import numpy
+
+# file extension of compact traces
+COMPACT_TRACE_FILE_EXTENSION = 'ltr'
+
+COMPACT_TRACE_MAGIC = 'LTRC'
+COMPACT_TRACE_VERSION = 1
+
+# header: magic, version, encoding, flags, padding, packet count, seed (-1 -> unknown), run count
+COMPACT_TRACE_HEADER = Struct('<4sBBBxQqQ')
+
+ENCODING_BITS = 0
+ENCODING_RUNS = 1
+
+ENCODINGS = {
+    'bits': ENCODING_BITS,
+    'runs': ENCODING_RUNS
+}
+
+# flag set if the trace contains the delay (in ms) of each packet
+FLAG_DELAYS = 1
+
+# characters of a text trace
+TEXT_TRACE_RECEIVED = ord('1')
+TEXT_TRACE_LOST = ord('0')
+TEXT_TRACE_LINE_END = ord('\n')
+
+
+def is_compact_trace(trace_file_path):
+    """
+    Checks if a file is a compact trace.
+
+    :param trace_file_path: the path of the trace file
+    :type trace_file_path: basestring
+
+    :rtype: bool
+    """
+
+    assert isinstance(trace_file_path, basestring)
+
+    with open(trace_file_path, 'rb') as trace_file:
+        return trace_file.read(len(COMPACT_TRACE_MAGIC)) == COMPACT_TRACE_MAGIC
+
+
+def get_runs(losses):
+    """
+    Returns the lengths of the alternating runs of received and lost packets, starting with the received packets.
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :rtype: numpy.ndarray
+    """
+
+    losses = numpy.asarray(losses, dtype=bool)
+
+    # positions where the loss state changes, a change is assumed before the first packet if it is lost
+    changes = numpy.flatnonzero(losses[1:] != losses[:-1]) + 1
+    bounds = numpy.concatenate(([0], changes, [len(losses)]))
+    runs = numpy.diff(bounds)
+
+    if len(losses) and losses[0]:
+        runs = numpy.concatenate(([0], runs))
+
+    return runs
+
+
+def write_compact_trace(trace_file_path, losses, seed=None, delays=None, encoding=None):
+    """
+    Writes a compact trace.
+
+    :param trace_file_path: the path of the trace file
+    :type trace_file_path: basestring
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param seed: the seed which generated the losses (None -> unknown)
+    :type seed: int|None
+
+    :param delays: the delay (in ms) of each packet (None -> no delays are stored)
+    :type delays: numpy.ndarray|None
+
+    :param encoding: the encoding of the losses (`bits` or `runs`, None -> the smaller one)
+    :type encoding: basestring|None
+    """
+
+    assert isinstance(trace_file_path, basestring)
+    assert seed is None or isinstance(seed, (int, long))
+    assert encoding is None or encoding in ENCODINGS
+
+    losses = numpy.asarray(losses, dtype=bool)
+    assert delays is None or len(delays) == len(losses)
+
+    runs = get_runs(losses)
+
+    if encoding is None:
+        encoding = 'runs' if 4 * len(runs) < (len(losses) + 7) / 8 else 'bits'
+
+    if encoding == 'runs':
+        assert not len(runs) or runs.max() < 1 << 32, 'Runs of 2^32 packets or more can not be encoded!'
+        payload = runs.astype('<u4')
+    else:
+        payload = numpy.packbits(losses)
+
+    with open(trace_file_path, 'wb') as trace_file:
+        trace_file.write(COMPACT_TRACE_HEADER.pack(
+            COMPACT_TRACE_MAGIC,
+            COMPACT_TRACE_VERSION,
+            ENCODINGS[encoding],
+            FLAG_DELAYS if delays is not None else 0,
+            len(losses),
+            -1 if seed is None else seed,
+            len(runs) if encoding == 'runs' else 0
+        ))
+        trace_file.write(payload.tobytes())
+
+        if delays is not None:
+            trace_file.write(numpy.asarray(delays, dtype='<f4').tobytes())
+
+
+class CompactTrace(object):
+    """
+    Reads a compact trace, with random access by packet index.
+    """
+
+    def __init__(self, trace_file_path):
+        """
+        Opens a compact trace.
+
+        :param trace_file_path: the path of the trace file
+        :type trace_file_path: basestring
+
+        :raises ValueError: if the file is no compact trace
+        """
+
+        assert isinstance(trace_file_path, basestring)
+
+        with open(trace_file_path, 'rb') as trace_file:
+            header = trace_file.read(COMPACT_TRACE_HEADER.size)
+
+        if len(header) < COMPACT_TRACE_HEADER.size or not header.startswith(COMPACT_TRACE_MAGIC):
+            raise ValueError('The file `%s` is no compact loss trace!' % trace_file_path)
+
+        (magic, version, encoding, flags, packet_count, seed, run_count) = COMPACT_TRACE_HEADER.unpack(header)
+
+        if version != COMPACT_TRACE_VERSION or encoding not in ENCODINGS.values():
+            raise ValueError('The compact loss trace `%s` has an unsupported version or encoding!' % trace_file_path)
+
+        self.packet_count = packet_count
+        self.seed = None if seed < 0 else seed
+
+        self.__encoding = encoding
+        self.__bits = None
+        self.__runs = None
+        self.__run_ends = None
+        self.__delays = None
+
+        offset = COMPACT_TRACE_HEADER.size
+
+        if encoding == ENCODING_RUNS:
+            self.__runs = self.__map(trace_file_path, '<u4', offset, run_count)
+            self.__run_ends = numpy.cumsum(self.__runs, dtype=numpy.int64)
+            offset += 4 * run_count
+        else:
+            self.__bits = self.__map(trace_file_path, numpy.uint8, offset, (packet_count + 7) / 8)
+            offset += (packet_count + 7) / 8
+
+        if flags & FLAG_DELAYS:
+            self.__delays = self.__map(trace_file_path, '<f4', offset, packet_count)
+
+    @staticmethod
+    def __map(trace_file_path, dtype, offset, count):
+        """
+        Maps a section of the trace file into memory.
+
+        :return: the (read only) values of the section
+        :rtype: numpy.ndarray
+        """
+
+        if count == 0:
+            return numpy.zeros(0, dtype=dtype)
+
+        return numpy.memmap(trace_file_path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    def __get_slice(self, start, stop):
+        """
+        :return: the validated bounds of a packet range
+        :rtype: tuple
+        """
+
+        stop = self.packet_count if stop is None else min(stop, self.packet_count)
+        assert isinstance(start, (int, long)) and 0 <= start
+        return min(start, stop), stop
+
+    def has_delays(self):
+        """
+        :return: true if the trace contains the delay of each packet
+        :rtype: bool
+        """
+
+        return self.__delays is not None
+
+    def get_losses(self, start=0, stop=None):
+        """
+        Returns the losses of a range of packets.
+
+        :param start: the index of the first packet
+        :type start: int
+
+        :param stop: the index behind the last packet (None -> up to the trace's end)
+        :type stop: int|None
+
+        :return: the loss of each packet of the range
+        :rtype: numpy.ndarray
+        """
+
+        (start, stop) = self.__get_slice(start, stop)
+
+        if start == stop:
+            return numpy.zeros(0, dtype=bool)
+
+        if self.__encoding == ENCODING_BITS:
+            first_byte = start / 8
+            bits = numpy.unpackbits(self.__bits[first_byte:(stop + 7) / 8])
+            return bits[start - 8 * first_byte:stop - 8 * first_byte].astype(bool)
+
+        # runs overlapping the range, clipped to its bounds; odd runs are losses
+        first_run = int(numpy.searchsorted(self.__run_ends, start, 'right'))
+        last_run = int(numpy.searchsorted(self.__run_ends, stop - 1, 'right'))
+
+        run_ends = numpy.minimum(self.__run_ends[first_run:last_run + 1], stop)
+        run_starts = numpy.maximum(numpy.concatenate(([start], run_ends[:-1])), start)
+        run_values = (numpy.arange(first_run, last_run + 1) % 2).astype(bool)
+
+        return numpy.repeat(run_values, run_ends - run_starts)
+
+    def is_lost(self, index):
+        """
+        :param index: the index of a packet
+        :type index: int
+
+        :return: true if the packet is lost
+        :rtype: bool
+        """
+
+        assert 0 <= index < self.packet_count
+
+        if self.__encoding == ENCODING_BITS:
+            return bool(self.__bits[index / 8] >> (7 - index % 8) & 1)
+
+        return int(numpy.searchsorted(self.__run_ends, index, 'right')) % 2 == 1
+
+    def get_delays(self, start=0, stop=None):
+        """
+        Returns the delays of a range of packets.
+
+        :param start: the index of the first packet
+        :type start: int
+
+        :param stop: the index behind the last packet (None -> up to the trace's end)
+        :type stop: int|None
+
+        :return: the delay (in ms) of each packet of the range, or None if the trace contains no delays
+        :rtype: numpy.ndarray|None
+        """
+
+        if self.__delays is None:
+            return None
+
+        (start, stop) = self.__get_slice(start, stop)
+        return numpy.array(self.__delays[start:stop])
+
+
+def write_text_trace(trace_file_path, losses):
+    """
+    Writes a text trace (one line per packet: `1` if the packet is received, `0` if it is lost), as read by tpkloss.
+
+    :param trace_file_path: the path of the trace file
+    :type trace_file_path: basestring
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+    """
+
+    assert isinstance(trace_file_path, basestring)
+
+    losses = numpy.asarray(losses, dtype=bool)
+
+    characters = numpy.empty(2 * len(losses), dtype=numpy.uint8)
+    characters[0::2] = numpy.where(losses, TEXT_TRACE_LOST, TEXT_TRACE_RECEIVED)
+    characters[1::2] = TEXT_TRACE_LINE_END
+
+    with open(trace_file_path, 'wb') as trace_file:
+        trace_file.write(characters.tobytes())
+
+
+def convert_to_compact(text_trace_file_path, compact_trace_file_path, seed=None, encoding=None):
+    """
+    Converts a text trace into a compact trace.
+
+    :param text_trace_file_path: the path of the text trace
+    :type text_trace_file_path: basestring
+
+    :param compact_trace_file_path: the path of the compact trace to write
+    :type compact_trace_file_path: basestring
+
+    :param seed: the seed which generated the losses (None -> unknown)
+    :type seed: int|None
+
+    :param encoding: the encoding of the losses (`bits` or `runs`, None -> the smaller one)
+    :type encoding: basestring|None
+    """
+
+    from manipulators.offline.traceLibrary import parse_trace
+    write_compact_trace(compact_trace_file_path, parse_trace(text_trace_file_path), seed, encoding=encoding)
+
+
+def convert_to_text(compact_trace_file_path, text_trace_file_path):
+    """
+    Converts a compact trace into a text trace, e.g. to be read by tpkloss.
+
+    :param compact_trace_file_path: the path of the compact trace
+    :type compact_trace_file_path: basestring
+
+    :param text_trace_file_path: the path of the text trace to write
+    :type text_trace_file_path: basestring
+    """
+
+    write_text_trace(text_trace_file_path, CompactTrace(compact_trace_file_path).get_losses())
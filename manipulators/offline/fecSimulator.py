@@ -0,0 +1,154 @@
+"""
+Simulates the recovery of lost packets by a row/column XOR FEC like SMPTE 2022-1 (and the Pro-MPEG COP3), based on
+the losses and arrival times computed by an offline manipulation.
+
+The media packets are arranged in consecutive matrices of L columns and D rows (in the order they were sent). Each
+column is protected by one FEC packet (1D FEC) and, optionally, each row too (2D FEC). A FEC packet repairs its row or
+column, if exactly one of its media packets is lost; since each repair may enable further repairs of the crossing rows
+and columns, the decoding is repeated until no more packets are repaired.
+
+All matrices of a capture are decoded at once (matrices x rows x columns).
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+
+def get_fec_packet_count(packet_count, column_count, row_count, is_row_fec):
+    """
+    Returns the number of FEC packets sent for a number of media packets.
+
+    :param packet_count: the number of media packets
+    :type packet_count: int
+
+    :param column_count: the number of columns (L) of the FEC matrix
+    :type column_count: int
+
+    :param row_count: the number of rows (D) of the FEC matrix
+    :type row_count: int
+
+    :param is_row_fec: whether the rows are protected too (2D FEC)
+    :type is_row_fec: bool
+
+    :rtype: int
+    """
+
+    matrix_count = -(-packet_count // (column_count * row_count))
+    return matrix_count * (column_count + (row_count if is_row_fec else 0))
+
+
+def decode(losses, column_count, row_count, is_row_fec, fec_loss_probability, random_state):
+    """
+    Decodes the FEC matrices of the lost packets.
+
+    :param losses: the loss of each media packet
+    :type losses: numpy.ndarray
+
+    :param column_count: the number of columns (L) of the FEC matrix
+    :type column_count: int
+
+    :param row_count: the number of rows (D) of the FEC matrix
+    :type row_count: int
+
+    :param is_row_fec: whether the rows are protected too (2D FEC)
+    :type is_row_fec: bool
+
+    :param fec_loss_probability: the probability that a FEC packet is lost, in [0, 1]
+    :type fec_loss_probability: float
+
+    :param random_state: the random numbers of the FEC packet losses
+    :type random_state: numpy.random.RandomState
+
+    :return: the losses after the decoding
+    :rtype: numpy.ndarray
+    """
+
+    assert isinstance(column_count, int) and column_count > 0
+    assert isinstance(row_count, int) and row_count > 0
+    assert 0 <= fec_loss_probability <= 1
+
+    packet_count = len(losses)
+    matrix_size = column_count * row_count
+    matrix_count = -(-packet_count // matrix_size)
+
+    # the packets of an incomplete last matrix are treated as received
+    matrices = numpy.zeros(matrix_count * matrix_size, dtype=bool)
+    matrices[:packet_count] = losses
+    matrices = matrices.reshape(matrix_count, row_count, column_count)
+
+    is_column_fec_received = random_state.random_sample((matrix_count, column_count)) >= fec_loss_probability
+    if is_row_fec:
+        is_row_fec_received = random_state.random_sample((matrix_count, row_count)) >= fec_loss_probability
+    else:
+        is_row_fec_received = numpy.zeros((matrix_count, row_count), dtype=bool)
+
+    while True:
+        is_column_repaired = is_column_fec_received & (matrices.sum(axis=1) == 1)
+        matrices &= ~is_column_repaired[:, None, :]
+
+        is_row_repaired = is_row_fec_received & (matrices.sum(axis=2) == 1)
+        matrices &= ~is_row_repaired[:, :, None]
+
+        if not is_column_repaired.any() and not is_row_repaired.any():
+            break
+
+    return matrices.reshape(-1)[:packet_count]
+
+
+def simulate(timestamps, losses, indexes, arrivals, column_count, row_count, is_row_fec, fec_loss_probability,
+             random_state):
+    """
+    Simulates the FEC decoding of the lost packets. A repaired packet is available as soon as the last received
+    packet of its matrix arrived, which approximates the arrival of the matrix's FEC packets.
+
+    :param timestamps: the send (capture) times of the packets (integer time units)
+    :type timestamps: numpy.ndarray
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param indexes: the indexes of the received packets in the order of their arrival
+    :type indexes: numpy.ndarray
+
+    :param arrivals: the arrival times of the received packets (integer time units)
+    :type arrivals: numpy.ndarray
+
+    :param column_count: the number of columns (L) of the FEC matrix
+    :type column_count: int
+
+    :param row_count: the number of rows (D) of the FEC matrix
+    :type row_count: int
+
+    :param is_row_fec: whether the rows are protected too (2D FEC)
+    :type is_row_fec: bool
+
+    :param fec_loss_probability: the probability that a FEC packet is lost, in [0, 1]
+    :type fec_loss_probability: float
+
+    :param random_state: the random numbers of the FEC packet losses
+    :type random_state: numpy.random.RandomState
+
+    :return: tuple (residual losses, indexes, arrivals): the losses after the decoding and the indexes and arrival
+        times of the received packets (incl. the repaired ones) in the order of their arrival
+    :rtype: tuple
+    """
+
+    residual_losses = decode(losses, column_count, row_count, is_row_fec, fec_loss_probability, random_state)
+    repaired_indexes = numpy.flatnonzero(losses & ~residual_losses)
+
+    if not len(repaired_indexes):
+        return residual_losses, indexes, arrivals
+
+    matrix_size = column_count * row_count
+    matrix_count = -(-len(losses) // matrix_size)
+
+    # the arrival of each matrix's last packet, or the send time of its last packet if all of them are lost
+    matrix_arrivals = timestamps[numpy.minimum(numpy.arange(1, matrix_count + 1) * matrix_size, len(losses)) - 1]
+    numpy.maximum.at(matrix_arrivals, indexes // matrix_size, arrivals)
+
+    indexes = numpy.concatenate((indexes, repaired_indexes))
+    arrivals = numpy.concatenate((arrivals, matrix_arrivals[repaired_indexes // matrix_size]))
+    order = numpy.argsort(arrivals, kind='mergesort')
+
+    return residual_losses, indexes[order], arrivals[order]
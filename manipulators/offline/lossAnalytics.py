@@ -0,0 +1,411 @@
+"""
+Analytics of loss traces: the loss rate, the distributions of the burst and gap lengths (runs of lost and received
+packets), the burst and gap densities of RFC 3611 and the parameters of the loss models fitted to the trace, so that
+the realized loss of each PVS can be compared with its condition and reproduced by the (offline) manipulators.
+
+The fitted models are:
+
+* `2s`: the 2-state markov model without losses in the gap and all losses in the burst state (telchemy markov2state,
+  pbc/pcb), i.e. the transition probabilities between the runs of received and lost packets
+* `ge`: the Gilbert model (tc gemodel p, r, 1-h, without losses in the good state), fitted by the method of Gilbert
+  from the probabilities of the patterns `1`, `11` and `101`
+* `state`: the 4-state markov model of netem (tc state p13, p31, p32, p23, p14), fitted by matching the statistics
+  of simulations to the trace's loss rate, mean burst length and RFC 3611 burst density, gap density and mean burst
+  period. The states of the chain are hidden: the RFC 3611 partition of the trace into burst and gap periods only
+  yields the starting point of the search, since it differs from the chain's periods (e.g. a lossless sojourn in
+  state 2 longer than Gmin splits a burst, and consecutive losses of state 4 form a burst)
+
+All rates, densities and probabilities are given in percent, like in the resource tables.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from collections import OrderedDict
+
+import numpy
+
+from manipulators.offline.lossStatistics import RFC3611_GMIN
+
+# upper bounds of the classes of the burst length histogram (the last class is open)
+BURST_LENGTH_HISTOGRAM_BOUNDS = (1, 2, 4, 8, 16)
+
+# resolution of the search for the burst state's persistence of the Gilbert fit
+GILBERT_FIT_GRID_SIZE = 10001
+
+# states of the 4-state model (see `lossModels`)
+STATE_COUNT = 5
+
+# number of grid points per parameter of the 4-state search and its number of zoom steps
+FIT_4STATE_GRID_SIZE = 3
+FIT_4STATE_ITERATION_COUNT = 7
+
+# maximum number of packets of a simulated realization of the 4-state search (the trace is simulated in replicates)
+FIT_4STATE_MAX_PACKET_COUNT = 10000
+
+# smallest scale of the matched statistics (loss rate, mean burst length, burst density, gap density, mean burst
+# period), so that the relative errors remain finite for statistics which are 0
+FIT_4STATE_MIN_SCALES = (1e-3, 1.0, 1e-3, 1e-3, 1.0)
+
+
+def __get_percentile(values, percentile):
+    """
+    Returns a percentile of values, or 0 if there are none.
+
+    :rtype: float
+    """
+
+    return float(numpy.percentile(values, percentile)) if len(values) else 0.0
+
+
+def fit_2state(losses):
+    """
+    Fits the 2-state markov model without gap losses: the probabilities that a run of received packets ends (pbc) and
+    that a run of lost packets ends (pcb).
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :return: tuple (pbc, pcb) in [0, 1]
+    :rtype: tuple
+    """
+
+    previous = losses[:-1]
+    following = losses[1:]
+
+    received_count = int((~previous).sum())
+    lost_count = int(previous.sum())
+
+    pbc = (~previous & following).sum() / float(received_count) if received_count else 0.0
+    pcb = (previous & ~following).sum() / float(lost_count) if lost_count else 1.0
+
+    return pbc, pcb
+
+
+def fit_gilbert(losses):
+    """
+    Fits the Gilbert model (no losses in the good state) with the method of Gilbert: the loss probability a, the
+    probability b of a loss after a loss and the probability c of a loss after the pattern `10` determine the
+    transition probabilities p, r and the loss probability of the bad state. Traces whose losses can not be explained
+    by a lossless good state fall back to the 2-state fit.
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :return: tuple (p, r, bad_loss_rate) in [0, 1]
+    :rtype: tuple
+    """
+
+    (pbc, pcb) = fit_2state(losses)
+
+    if len(losses) < 3 or not losses.any():
+        return pbc, pcb, 1.0
+
+    a = losses.mean()
+
+    after_loss = losses[1:][losses[:-1]]
+    b = after_loss.mean() if len(after_loss) else 0.0
+
+    is_10 = losses[:-2] & ~losses[1:-1]
+    c = losses[2:][is_10].mean() if is_10.any() else 0.0
+
+    if b <= 0:
+        return pbc, pcb, 1.0
+
+    # b = q * d, a = d * p / (p + r) with q = 1 - r (persistence of the bad state) and d the bad state's loss rate
+    q = numpy.linspace(b, 1.0, GILBERT_FIT_GRID_SIZE)
+    d = b / q
+    r = 1 - q
+
+    is_valid = d > a
+    if not is_valid.any():
+        return pbc, pcb, 1.0
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        p = a * r / (d - a)
+        predicted_c = (q * (1 - d) * q * d + r * p * d) / (q * (1 - d) + r)
+
+    is_valid &= (p <= 1) & numpy.isfinite(predicted_c)
+    if not is_valid.any():
+        return pbc, pcb, 1.0
+
+    index = int(numpy.argmin(numpy.where(is_valid, numpy.abs(predicted_c - c), numpy.inf)))
+
+    return float(p[index]), float(r[index]), float(d[index])
+
+
+def __get_4state_statistics(losses, gmin):
+    """
+    Returns the statistics which the 4-state fit matches.
+
+    :param losses: the loss of each packet per realization (realizations x packets)
+    :type losses: numpy.ndarray
+
+    :return: array (realizations x (loss rate, mean burst length, burst density, gap density, mean burst period))
+    :rtype: numpy.ndarray
+    """
+
+    from manipulators.offline.lossStatistics import get_rfc3611_statistics
+    from manipulators.offline.realizationSelector import get_loss_statistics
+
+    (loss_rates, mean_burst_lengths) = get_loss_statistics(losses)
+    rfc3611_statistics = [get_rfc3611_statistics(row, gmin) for row in losses]
+
+    return numpy.column_stack((
+        loss_rates,
+        mean_burst_lengths,
+        [statistics['burst_density'] for statistics in rfc3611_statistics],
+        [statistics['gap_density'] for statistics in rfc3611_statistics],
+        [statistics['mean_burst_period'] for statistics in rfc3611_statistics]
+    ))
+
+
+def __get_4state_labeled_parameters(losses, gmin):
+    """
+    Estimates the parameters of the 4-state model by assigning each packet to a state by the RFC 3611 partition of the
+    trace (1: received in a gap, 2: received in a burst, 3: lost in a burst, 4: isolated loss in a gap) and counting
+    the transitions between these states.
+
+    :rtype: tuple
+    :return: tuple (p13, p31, p32, p23, p14) in [0, 1]
+    """
+
+    from manipulators.offline.lossModels import \
+        TX_IN_GAP_PERIOD, TX_IN_BURST_PERIOD, LOST_IN_BURST_PERIOD, LOST_IN_GAP_PERIOD
+
+    states = numpy.full(len(losses), TX_IN_GAP_PERIOD, dtype=numpy.int64)
+    positions = numpy.flatnonzero(losses)
+
+    if len(positions):
+        cluster_starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(positions) - 1 >= gmin) + 1))
+        cluster_ends = numpy.concatenate((cluster_starts[1:], [len(positions)])) - 1
+        is_burst = cluster_ends > cluster_starts
+
+        # mark the burst periods: +1 at their first, -1 behind their last loss
+        marks = numpy.zeros(len(losses) + 1, dtype=numpy.int64)
+        numpy.add.at(marks, positions[cluster_starts[is_burst]], 1)
+        numpy.add.at(marks, positions[cluster_ends[is_burst]] + 1, -1)
+        in_burst = numpy.cumsum(marks[:-1]) > 0
+
+        states[in_burst] = TX_IN_BURST_PERIOD
+        states[in_burst & losses] = LOST_IN_BURST_PERIOD
+        states[~in_burst & losses] = LOST_IN_GAP_PERIOD
+
+    transitions = numpy.bincount(
+        states[:-1] * STATE_COUNT + states[1:], minlength=STATE_COUNT * STATE_COUNT
+    ).reshape(STATE_COUNT, STATE_COUNT).astype(float)
+
+    departures = transitions.sum(axis=1)
+    departures[departures == 0] = 1
+
+    probabilities = transitions / departures[:, None]
+
+    return (
+        probabilities[TX_IN_GAP_PERIOD, LOST_IN_BURST_PERIOD],
+        probabilities[LOST_IN_BURST_PERIOD, TX_IN_GAP_PERIOD],
+        probabilities[LOST_IN_BURST_PERIOD, TX_IN_BURST_PERIOD],
+        probabilities[TX_IN_BURST_PERIOD, LOST_IN_BURST_PERIOD] if transitions[TX_IN_BURST_PERIOD].any() else 1.0,
+        probabilities[TX_IN_GAP_PERIOD, LOST_IN_GAP_PERIOD]
+    )
+
+
+def fit_4state(losses, gmin=RFC3611_GMIN, seed=0):
+    """
+    Fits the 4-state markov model of netem by matching statistics, like `modelCalibration`: starting from the
+    parameters of the RFC 3611 labeling of the trace (see `__get_4state_labeled_parameters`), a multiplicative grid of
+    parameter sets around the current best one is simulated in a single batch and the search zooms in on the set whose
+    loss rate, mean burst length, burst density, gap density and mean burst period are closest to the trace's ones.
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param gmin: the minimum number of received packets between two bursts
+    :type gmin: int
+
+    :param seed: the seed of the simulations
+    :type seed: int
+
+    :return: tuple (p13, p31, p32, p23, p14) in [0, 1]
+    :rtype: tuple
+    """
+
+    from numpy.random import RandomState
+    from manipulators.offline.lossModels import get_4state_losses, get_losses_batch
+    from manipulators.offline.modelCalibration import MIN_PROBABILITY, MIN_SIMULATED_PACKET_COUNT
+
+    labeled_parameters = __get_4state_labeled_parameters(losses, gmin)
+    if len(losses) < 2 or not losses.any():
+        return labeled_parameters
+
+    targets = __get_4state_statistics(losses[None, :], gmin)[0]
+    scales = numpy.maximum(targets, FIT_4STATE_MIN_SCALES)
+
+    packet_count = min(len(losses), FIT_4STATE_MAX_PACKET_COUNT)
+    replicate_count = max(1, -(-MIN_SIMULATED_PACKET_COUNT // packet_count))
+
+    best = numpy.clip(labeled_parameters, MIN_PROBABILITY, 1.0)
+    offsets = numpy.linspace(-1, 1, FIT_4STATE_GRID_SIZE)
+    spread = numpy.log(2)
+
+    for iteration in xrange(FIT_4STATE_ITERATION_COUNT):
+        factors = numpy.exp(numpy.array(numpy.meshgrid(*([offsets] * len(best)), indexing='ij'))
+                            .reshape(len(best), -1).T * spread)
+        candidates = numpy.clip(best * factors, MIN_PROBABILITY, 1.0)
+
+        # the transition probabilities out of states 1 and 3 have to sum up to at most 1
+        (p13, p31, p32, p23, p14) = candidates.T
+        is_valid = (p13 + p14 <= 1) & (p31 + p32 <= 1)
+        candidates = candidates[is_valid]
+
+        # all candidates use the same random numbers, so that their differences are not blurred by noise
+        random_states = [RandomState([seed, i % replicate_count]) for i in xrange(len(candidates) * replicate_count)]
+        (p13, p31, p32, p23, p14) = numpy.repeat(candidates, replicate_count, axis=0).T
+
+        realized = __get_4state_statistics(
+            get_losses_batch(get_4state_losses, random_states, packet_count, p13=p13, p31=p31, p32=p32, p23=p23,
+                             p14=p14),
+            gmin
+        ).reshape(len(candidates), replicate_count, -1).mean(axis=1)
+
+        errors = (((realized - targets) / scales) ** 2).sum(axis=1)
+        best = candidates[int(numpy.argmin(errors))]
+
+        spread /= 2
+
+    return tuple(float(value) for value in best)
+
+
+def analyze_losses(losses, gmin=RFC3611_GMIN):
+    """
+    Returns the statistics and fitted model parameters of a loss pattern.
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param gmin: the minimum number of received packets between two bursts (RFC 3611)
+    :type gmin: int
+
+    :return: the metrics by name, in the order of the summary's columns
+    :rtype: OrderedDict
+    """
+
+    from manipulators.offline.lossStatistics import get_run_lengths, get_rfc3611_statistics
+
+    losses = numpy.asarray(losses, dtype=bool)
+    (burst_lengths, gap_lengths) = get_run_lengths(losses)
+
+    metrics = OrderedDict()
+    metrics['packet_count'] = len(losses)
+    metrics['loss_count'] = int(losses.sum())
+    metrics['loss_rate'] = 100.0 * metrics['loss_count'] / len(losses) if len(losses) else 0.0
+
+    metrics['burst_count'] = len(burst_lengths)
+    metrics['burst_length_mean'] = float(burst_lengths.mean()) if len(burst_lengths) else 0.0
+    metrics['burst_length_p50'] = __get_percentile(burst_lengths, 50)
+    metrics['burst_length_p95'] = __get_percentile(burst_lengths, 95)
+    metrics['burst_length_max'] = int(burst_lengths.max()) if len(burst_lengths) else 0
+
+    # histogram of the burst lengths: 1, 2, 3-4, 5-8, 9-16, >16
+    lower_bound = 1
+    for upper_bound in BURST_LENGTH_HISTOGRAM_BOUNDS:
+        name = str(upper_bound) if lower_bound == upper_bound else '%d_%d' % (lower_bound, upper_bound)
+        metrics['bursts_' + name] = int(((burst_lengths >= lower_bound) & (burst_lengths <= upper_bound)).sum())
+        lower_bound = upper_bound + 1
+    metrics['bursts_%d_' % lower_bound] = int((burst_lengths >= lower_bound).sum())
+
+    metrics['gap_length_mean'] = float(gap_lengths.mean()) if len(gap_lengths) else 0.0
+    metrics['gap_length_p50'] = __get_percentile(gap_lengths, 50)
+    metrics['gap_length_p95'] = __get_percentile(gap_lengths, 95)
+
+    rfc3611_statistics = get_rfc3611_statistics(losses, gmin)
+    metrics['rfc3611_burst_density'] = 100 * rfc3611_statistics['burst_density']
+    metrics['rfc3611_gap_density'] = 100 * rfc3611_statistics['gap_density']
+    metrics['rfc3611_burst_period_mean'] = rfc3611_statistics['mean_burst_period']
+    metrics['rfc3611_gap_period_mean'] = rfc3611_statistics['mean_gap_period']
+
+    for (name, value) in zip(('2s_pbc', '2s_pcb'), fit_2state(losses)):
+        metrics[name] = 100 * value
+
+    for (name, value) in zip(('ge_p', 'ge_r', 'ge_1-h'), fit_gilbert(losses)):
+        metrics[name] = 100 * value
+
+    for (name, value) in zip(('state_p13', 'state_p31', 'state_p32', 'state_p23', 'state_p14'),
+                             fit_4state(losses, gmin)):
+        metrics[name] = 100 * value
+
+    return metrics
+
+
+def analyze_trace(trace_file_path):
+    """
+    Loads a loss trace and returns its metrics (see `analyze_losses`).
+
+    :param trace_file_path: the path of the trace (see `traceLibrary`)
+    :type trace_file_path: basestring
+
+    :rtype: OrderedDict
+    """
+
+    from manipulators.offline.traceLibrary import parse_trace
+    return analyze_losses(parse_trace(trace_file_path))
+
+
+def analyze_traces(trace_file_paths, worker_count=1):
+    """
+    Analyzes several loss traces, in parallel by several processes.
+
+    :param trace_file_paths: the paths of the traces
+    :type trace_file_paths: list
+
+    :param worker_count: the number of processes
+    :type worker_count: int
+
+    :return: the metrics of each trace (see `analyze_losses`)
+    :rtype: list[OrderedDict]
+    """
+
+    assert isinstance(trace_file_paths, (list, tuple))
+    assert isinstance(worker_count, int) and worker_count > 0
+
+    if worker_count == 1 or len(trace_file_paths) < 2:
+        return [analyze_trace(trace_file_path) for trace_file_path in trace_file_paths]
+
+    from multiprocessing import Pool
+
+    pool = Pool(min(worker_count, len(trace_file_paths)))
+    try:
+        return pool.map(analyze_trace, trace_file_paths, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def write_summary(summary_file_path, names, metrics):
+    """
+    Writes the metrics of several traces into a csv file, one row per trace and one column per metric.
+
+    :param summary_file_path: the path of the summary file
+    :type summary_file_path: basestring
+
+    :param names: the name of each trace (e.g. the name of the PVS), written in the first column
+    :type names: list
+
+    :param metrics: the metrics of each trace (see `analyze_losses`)
+    :type metrics: list[OrderedDict]
+    """
+
+    assert len(names) == len(metrics)
+
+    from database.dbTable import DbTable
+    delimiter = DbTable.DB_TABLE_COLUMN_DELIMITER
+
+    column_names = list(metrics[0].keys()) if metrics else list(analyze_losses(numpy.zeros(0, dtype=bool)).keys())
+
+    with open(summary_file_path, 'w') as summary_file:
+        summary_file.write(delimiter.join(['pvs'] + column_names) + '\n')
+
+        for (name, trace_metrics) in zip(names, metrics):
+            values = [name] + [
+                ('%.4f' % value) if isinstance(value, float) else str(value)
+                for value in (trace_metrics[column_name] for column_name in column_names)
+            ]
+            summary_file.write(delimiter.join(values) + '\n')
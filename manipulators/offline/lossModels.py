@@ -0,0 +1,289 @@
+"""
+Packet loss models with the semantics of the linux netem queueing discipline (see `loss_4state` and `loss_gilb_ell`
+in net/sched/sch_netem.c), so that an offline manipulation loses packets like tc would do with the same settings.
+
+All probabilities are given as values in [0, 1]. Each model returns a boolean numpy array, wherein `True` marks a
+lost packet. The random numbers are drawn packet by packet, so the losses of the first n packets are the same for any
+total number of packets (see `maskStore`).
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+# states of the 4-state markov model (named like in netem)
+TX_IN_GAP_PERIOD = 1
+TX_IN_BURST_PERIOD = 2
+LOST_IN_BURST_PERIOD = 3
+LOST_IN_GAP_PERIOD = 4
+
+# states of the Gilbert-Elliot model
+GOOD_STATE = 1
+BAD_STATE = 2
+
+
+def get_random_losses(random_state, packet_count, loss_rate):
+    """
+    Returns independent (bernoulli) losses, like netem's `loss random <LOSS_RATE>`.
+
+    :param random_state: the random number generator to use
+    :type random_state: numpy.random.RandomState
+
+    :param packet_count: the number of packets
+    :type packet_count: int
+
+    :param loss_rate: the loss probability of each packet
+    :type loss_rate: float
+
+    :return: the loss of each packet
+    :rtype: numpy.ndarray
+    """
+
+    assert 0 <= loss_rate <= 1
+
+    return random_state.random_sample(packet_count) < loss_rate
+
+
+def get_4state_losses(random_state, packet_count, p13, p31=None, p32=0.0, p23=1.0, p14=0.0):
+    """
+    Returns the losses of netem's 4-state markov model, like `loss state <P13> [<P31> [<P32> [<P23> [<P14>]]]]`. The
+    defaults of the optional probabilities are the ones set by tc (p31 defaults to 1 - p13 -> bernoulli model).
+
+    :param random_state: the random number generator to use
+    :type random_state: numpy.random.RandomState
+
+    :param packet_count: the number of packets
+    :type packet_count: int
+
+    :param p13: transition probability from the good reception into the burst loss state
+    :type p13: float
+
+    :param p31: transition probability from the burst loss state into the good reception state
+    :type p31: float|None
+
+    :param p32: transition probability from the burst loss state into the good reception within a burst state
+    :type p32: float
+
+    :param p23: transition probability from the good reception within a burst state into the burst loss state
+    :type p23: float
+
+    :param p14: transition probability from the good reception into the independent loss state
+    :type p14: float
+
+    :return: the loss of each packet
+    :rtype: numpy.ndarray
+    """
+
+    if p31 is None:
+        p31 = 1.0 - p13
+
+    for p in (p13, p31, p32, p23, p14):
+        assert 0 <= p <= 1
+
+    rnd = random_state.random_sample(packet_count)
+    losses = numpy.zeros(packet_count, dtype=bool)
+    state = TX_IN_GAP_PERIOD
+
+    # the chain is evaluated exactly like the kernel does, including its comparison order
+    for i in xrange(packet_count):
+        r = rnd[i]
+
+        if state == TX_IN_GAP_PERIOD:
+            if r < p14:
+                state = LOST_IN_GAP_PERIOD
+                losses[i] = True
+            elif p14 < r < p13 + p14:
+                state = LOST_IN_BURST_PERIOD
+                losses[i] = True
+
+        elif state == TX_IN_BURST_PERIOD:
+            if r < p23:
+                state = LOST_IN_BURST_PERIOD
+                losses[i] = True
+
+        elif state == LOST_IN_BURST_PERIOD:
+            if r < p32:
+                state = TX_IN_BURST_PERIOD
+            elif p32 < r < p31 + p32:
+                state = TX_IN_GAP_PERIOD
+            elif p31 + p32 < r:
+                losses[i] = True
+
+        else:
+            state = TX_IN_GAP_PERIOD
+
+    return losses
+
+
+def get_gilbert_elliott_losses(random_state, packet_count, p, r=None, bad_loss_rate=1.0, good_loss_rate=0.0):
+    """
+    Returns the losses of netem's Gilbert-Elliot model, like `loss gemodel <P> [<R> [<1-H> [<1-K>]]]`. The defaults of
+    the optional probabilities are the ones set by tc (r defaults to 1 - p).
+
+    :param random_state: the random number generator to use
+    :type random_state: numpy.random.RandomState
+
+    :param packet_count: the number of packets
+    :type packet_count: int
+
+    :param p: transition probability from the good into the bad state
+    :type p: float
+
+    :param r: transition probability from the bad into the good state
+    :type r: float|None
+
+    :param bad_loss_rate: loss probability in the bad state (1-h)
+    :type bad_loss_rate: float
+
+    :param good_loss_rate: loss probability in the good state (1-k)
+    :type good_loss_rate: float
+
+    :return: the loss of each packet
+    :rtype: numpy.ndarray
+    """
+
+    if r is None:
+        r = 1.0 - p
+
+    for probability in (p, r, bad_loss_rate, good_loss_rate):
+        assert 0 <= probability <= 1
+
+    # netem draws two random numbers per packet: one for the transition and one for the loss (drawn interleaved, so
+    # that the losses of the first n packets do not depend on the total number of packets)
+    draws = random_state.random_sample((packet_count, 2))
+    transitions = draws[:, 0]
+    loss_rnd = draws[:, 1]
+
+    # the loss of a packet depends on the state before its transition -> evaluate the chain first, then all losses
+    # at once
+    states = numpy.empty(packet_count, dtype=numpy.int8)
+    state = GOOD_STATE
+
+    for i in xrange(packet_count):
+        states[i] = state
+
+        if state == GOOD_STATE:
+            if transitions[i] < p:
+                state = BAD_STATE
+        elif transitions[i] < r:
+            state = GOOD_STATE
+
+    return numpy.where(states == BAD_STATE, loss_rnd < bad_loss_rate, loss_rnd < good_loss_rate)
+
+
+def __get_4state_losses_batch(draws, p13, p31=None, p32=0.0, p23=1.0, p14=0.0):
+    """
+    Evaluates the 4-state markov model on several rows of random numbers at once (see `get_4state_losses`).
+
+    :param draws: the random numbers of each realization (realizations x packets)
+    :type draws: numpy.ndarray
+
+    :return: the loss of each packet per realization
+    :rtype: numpy.ndarray
+    """
+
+    if p31 is None:
+        p31 = 1.0 - p13
+
+    (realization_count, packet_count) = draws.shape
+    draws = numpy.ascontiguousarray(draws.T)
+
+    losses = numpy.zeros((packet_count, realization_count), dtype=bool)
+    states = numpy.full(realization_count, TX_IN_GAP_PERIOD, dtype=numpy.int8)
+
+    for i in xrange(packet_count):
+        r = draws[i]
+
+        in_gap = states == TX_IN_GAP_PERIOD
+        in_burst = states == LOST_IN_BURST_PERIOD
+
+        lost_in_gap = in_gap & (r < p14)
+        lost_in_burst = (in_gap & (p14 < r) & (r < p13 + p14)) | ((states == TX_IN_BURST_PERIOD) & (r < p23))
+        tx_in_burst = in_burst & (r < p32)
+        tx_in_gap = (in_burst & (p32 < r) & (r < p31 + p32)) | (states == LOST_IN_GAP_PERIOD)
+
+        losses[i] = lost_in_gap | lost_in_burst | (in_burst & (p31 + p32 < r))
+
+        states[lost_in_gap] = LOST_IN_GAP_PERIOD
+        states[lost_in_burst] = LOST_IN_BURST_PERIOD
+        states[tx_in_burst] = TX_IN_BURST_PERIOD
+        states[tx_in_gap] = TX_IN_GAP_PERIOD
+
+    return losses.T
+
+
+def __get_gilbert_elliott_losses_batch(draws, p, r=None, bad_loss_rate=1.0, good_loss_rate=0.0):
+    """
+    Evaluates the Gilbert-Elliot model on several rows of random numbers at once (see `get_gilbert_elliott_losses`).
+
+    :param draws: the random numbers of each realization (realizations x packets x 2)
+    :type draws: numpy.ndarray
+
+    :return: the loss of each packet per realization
+    :rtype: numpy.ndarray
+    """
+
+    if r is None:
+        r = 1.0 - p
+
+    (realization_count, packet_count) = draws.shape[:2]
+    transitions = numpy.ascontiguousarray(draws[:, :, 0].T)
+
+    is_bad = numpy.zeros((packet_count, realization_count), dtype=bool)
+    state = numpy.zeros(realization_count, dtype=bool)
+
+    for i in xrange(packet_count):
+        is_bad[i] = state
+        state = numpy.where(state, transitions[i] >= r, transitions[i] < p)
+
+    # per realization loss rates have to be compared row by row
+    bad_loss_rate = numpy.asarray(bad_loss_rate)[..., None]
+    good_loss_rate = numpy.asarray(good_loss_rate)[..., None]
+
+    return numpy.where(is_bad.T, draws[:, :, 1] < bad_loss_rate, draws[:, :, 1] < good_loss_rate)
+
+
+def get_losses_batch(get_losses, random_states, packet_count, **parameters):
+    """
+    Returns the losses of several realizations of a model, one per random number generator. Each realization equals
+    the losses which the model's function returns for the same generator, but the markov chains of all realizations
+    are evaluated together, packet by packet.
+
+    Each parameter is either one value for all realizations or an array with one value per realization, so that a
+    batch can also compare different parameter sets (see `modelCalibration`).
+
+    :param get_losses: the function of the model (`get_random_losses`, `get_4state_losses` or
+        `get_gilbert_elliott_losses`)
+    :type get_losses: callable
+
+    :param random_states: the random number generator of each realization
+    :type random_states: list[numpy.random.RandomState]
+
+    :param packet_count: the number of packets
+    :type packet_count: int
+
+    :param parameters: the parameters of the model (scalars or arrays with one value per realization)
+    :type parameters: dict
+
+    :return: the loss of each packet per realization (realizations x packets)
+    :rtype: numpy.ndarray
+    """
+
+    assert len(random_states) > 0
+
+    for probability in parameters.values():
+        assert probability is None or numpy.all((0 <= numpy.asarray(probability)) & (numpy.asarray(probability) <= 1))
+
+    if get_losses is get_4state_losses:
+        draws = numpy.array([random_state.random_sample(packet_count) for random_state in random_states])
+        return __get_4state_losses_batch(draws, **parameters)
+
+    if get_losses is get_gilbert_elliott_losses:
+        draws = numpy.array([random_state.random_sample((packet_count, 2)) for random_state in random_states])
+        return __get_gilbert_elliott_losses_batch(draws.reshape(len(random_states), packet_count, 2), **parameters)
+
+    if get_losses is get_random_losses:
+        draws = numpy.array([random_state.random_sample(packet_count) for random_state in random_states])
+        return draws < numpy.asarray(parameters['loss_rate'])[..., None]
+
+    return numpy.array([get_losses(random_state, packet_count, **parameters) for random_state in random_states])
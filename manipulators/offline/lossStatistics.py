@@ -0,0 +1,87 @@
+"""
+Statistics of loss patterns: the run lengths of lost and received packets, and the burst and gap densities of RFC 3611
+(section 4.7.2), wherein a burst is a period of losses which are separated by less than `Gmin` received packets, and
+isolated losses count as losses of the gap.
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+# minimum number of received packets which separate two bursts (the value recommended by RFC 3611)
+RFC3611_GMIN = 16
+
+
+def get_run_lengths(losses):
+    """
+    Returns the lengths of the runs of consecutive lost and received packets.
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :return: tuple (burst_lengths, gap_lengths): the lengths of the runs of lost and of received packets
+    :rtype: tuple
+    """
+
+    losses = numpy.asarray(losses, dtype=bool)
+    if not len(losses):
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+
+    boundaries = numpy.flatnonzero(losses[1:] != losses[:-1]) + 1
+    starts = numpy.concatenate(([0], boundaries))
+    lengths = numpy.diff(numpy.concatenate((starts, [len(losses)])))
+    is_lost = losses[starts]
+
+    return lengths[is_lost], lengths[~is_lost]
+
+
+def get_rfc3611_statistics(losses, gmin=RFC3611_GMIN):
+    """
+    Returns the burst and gap metrics of RFC 3611 of a loss pattern.
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param gmin: the minimum number of received packets between two bursts
+    :type gmin: int
+
+    :return: dict with the fields `burst_density`, `gap_density` (fractions of lost packets in the burst and gap
+        periods), `mean_burst_period` and `mean_gap_period` (in packets) and `burst_count`
+    :rtype: dict
+    """
+
+    assert isinstance(gmin, int) and gmin > 0
+
+    losses = numpy.asarray(losses, dtype=bool)
+    packet_count = len(losses)
+    positions = numpy.flatnonzero(losses)
+
+    if not len(positions):
+        return {
+            'burst_density': 0.0,
+            'gap_density': 0.0,
+            'mean_burst_period': 0.0,
+            'mean_gap_period': float(packet_count),
+            'burst_count': 0
+        }
+
+    # clusters of losses with less than gmin received packets in between -> bursts, single losses -> gap losses
+    cluster_starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(positions) - 1 >= gmin) + 1))
+    cluster_ends = numpy.concatenate((cluster_starts[1:], [len(positions)])) - 1
+    cluster_sizes = cluster_ends - cluster_starts + 1
+
+    is_burst = cluster_sizes > 1
+    burst_periods = positions[cluster_ends[is_burst]] - positions[cluster_starts[is_burst]] + 1
+
+    burst_packet_count = int(burst_periods.sum())
+    burst_loss_count = int(cluster_sizes[is_burst].sum())
+    gap_packet_count = packet_count - burst_packet_count
+    burst_count = int(is_burst.sum())
+
+    return {
+        'burst_density': burst_loss_count / float(burst_packet_count) if burst_packet_count else 0.0,
+        'gap_density': (len(positions) - burst_loss_count) / float(gap_packet_count) if gap_packet_count else 0.0,
+        'mean_burst_period': burst_packet_count / float(burst_count) if burst_count else 0.0,
+        'mean_gap_period': gap_packet_count / float(burst_count + 1),
+        'burst_count': burst_count
+    }
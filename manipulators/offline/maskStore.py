@@ -0,0 +1,354 @@
+"""
+Persistent store of generated loss masks, so that the same loss realization is not generated again for each PVS.
+
+A loss mask is identified by the loss model, its parameters and the seed of the random numbers. The number of packets
+is not part of the key: all models generate their masks packet by packet from one random stream, so the first n
+values of a mask for N >= n packets are exactly the mask for n packets. The store therefore keeps only the longest mask
+of each key and serves shorter requests from its prefix.
+
+The masks are saved as packed bitsets (`numpy.packbits`, 1 bit per packet) in one file per key, next to an index file
+which maps the keys to their files and lengths. Stored masks are read through a memory map, i.e. only the pages of the
+requested prefix are read.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from threading import Lock
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+# model names used in the keys (one per model table)
+MODEL_RANDOM = 'random'
+MODEL_STATE = 'state'
+MODEL_GEMODEL = 'gemodel'
+MODEL_MARKOV_2STATE = 'markov2state'
+
+# name of the index file and the extension of the mask files
+INDEX_FILE_NAME = 'index.json'
+MASK_FILE_EXTENSION = 'bits'
+
+# index entry fields
+ENTRY_FIELD_MODEL = 'model'
+ENTRY_FIELD_PARAMETERS = 'parameters'
+ENTRY_FIELD_SEED = 'seed'
+ENTRY_FIELD_PACKET_COUNT = 'packet_count'
+
+
+class MaskStore(object):
+    """
+    Stores loss masks as packed bitsets in a folder and serves them by model, parameters, seed and packet count.
+    """
+
+    def __init__(self, store_dir_path):
+        """
+        Opens the store in a given folder (created if not existing).
+
+        :param store_dir_path: the folder wherein the masks are stored
+        :type store_dir_path: basestring
+        """
+
+        assert isinstance(store_dir_path, basestring)
+
+        from os.path import isdir
+        from os import makedirs
+
+        if not isdir(store_dir_path):
+            makedirs(store_dir_path)
+
+        self.__store_dir_path = store_dir_path.rstrip(PATH_SEPARATOR) + PATH_SEPARATOR
+        self.__lock = Lock()
+
+        # dict(key hash => index entry)
+        self.__index = self.__load_index()
+
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get_dir_path(self):
+        """
+        :return: the folder wherein the masks are stored (with trailing separator)
+        :rtype: str
+        """
+
+        return self.__store_dir_path
+
+    def __load_index(self):
+        """
+        Loads the index of the store.
+
+        :return: the index as dict(key hash => index entry)
+        :rtype: dict
+        """
+
+        from os.path import isfile
+
+        index_file_path = self.__store_dir_path + INDEX_FILE_NAME
+        if not isfile(index_file_path):
+            return dict()
+
+        import json
+
+        try:
+            with open(index_file_path, 'rb') as index_file:
+                return json.load(index_file)
+        except ValueError:
+            # broken index (e.g. interrupted write) -> the masks are regenerated on demand
+            return dict()
+
+    def __save_index(self):
+        """
+        Writes the index of the store, atomically replacing the previous one. Has to be called with the store's lock
+        held.
+        """
+
+        import json
+        from os import rename
+
+        index_file_path = self.__store_dir_path + INDEX_FILE_NAME
+        with open(index_file_path + '.part', 'wb') as index_file:
+            json.dump(self.__index, index_file, sort_keys=True, indent=1)
+
+        rename(index_file_path + '.part', index_file_path)
+
+    @staticmethod
+    def get_key(model, parameters, seed):
+        """
+        Returns the key of a mask.
+
+        :param model: the name of the loss model
+        :type model: basestring
+
+        :param parameters: the parameters of the model
+        :type parameters: dict
+
+        :param seed: the seed of the random numbers
+        :type seed: int|long
+
+        :return: the key (hash) of the mask
+        :rtype: str
+        """
+
+        assert isinstance(model, basestring)
+        assert isinstance(parameters, dict)
+        assert isinstance(seed, (int, long))
+
+        import json
+        from hashlib import md5
+
+        # floats are normalized, so that equal parameters read from differently formatted tables match
+        normalized_parameters = dict((str(name), repr(float(value))) for (name, value) in parameters.items())
+
+        return md5(json.dumps([model, normalized_parameters, seed], sort_keys=True)).hexdigest()
+
+    def __get_mask_file_path(self, key):
+        """
+        :return: the path of the file wherein the mask of a given key is stored
+        :rtype: str
+        """
+
+        from os import extsep
+        return self.__store_dir_path + key + extsep + MASK_FILE_EXTENSION
+
+    def __read_mask(self, key, packet_count):
+        """
+        Reads the prefix of a stored mask.
+
+        :param key: the key of the mask
+        :type key: basestring
+
+        :param packet_count: the length of the prefix to read
+        :type packet_count: int
+
+        :return: the mask, or None if it is not stored
+        :rtype: numpy.ndarray|None
+        """
+
+        import numpy
+
+        if packet_count == 0:
+            return numpy.zeros(0, dtype=bool)
+
+        try:
+            bits = numpy.memmap(
+                self.__get_mask_file_path(key),
+                dtype=numpy.uint8,
+                mode='r',
+                shape=((packet_count + 7) // 8,)
+            )
+        except (IOError, OSError, ValueError):
+            return None
+
+        return numpy.unpackbits(bits)[:packet_count].astype(bool)
+
+    def __write_mask(self, key, mask):
+        """
+        Writes a mask atomically into its file.
+
+        :param key: the key of the mask
+        :type key: basestring
+
+        :param mask: the mask to write
+        :type mask: numpy.ndarray
+        """
+
+        import numpy
+        from os import rename
+
+        mask_file_path = self.__get_mask_file_path(key)
+        numpy.packbits(mask).tofile(mask_file_path + '.part')
+        rename(mask_file_path + '.part', mask_file_path)
+
+    def __lookup_mask(self, key, packet_count):
+        """
+        Reads the prefix of a stored mask and counts the hit or miss.
+
+        :param key: the key of the mask
+        :type key: basestring
+
+        :param packet_count: the length of the prefix to read
+        :type packet_count: int
+
+        :return: the mask, or None if no long enough mask is stored
+        :rtype: numpy.ndarray|None
+        """
+
+        with self.__lock:
+            entry = self.__index.get(key)
+
+        mask = None
+        if entry is not None and entry[ENTRY_FIELD_PACKET_COUNT] >= packet_count:
+            mask = self.__read_mask(key, packet_count)
+
+        with self.__lock:
+            if mask is None:
+                self.miss_count += 1
+            else:
+                self.hit_count += 1
+
+        return mask
+
+    def __store_mask(self, key, model, parameters, seed, mask):
+        """
+        Stores a generated mask, unless another job stored a longer one in the meanwhile.
+
+        :param key: the key of the mask
+        :type key: basestring
+
+        :param model: the name of the loss model
+        :type model: basestring
+
+        :param parameters: the parameters of the model
+        :type parameters: dict
+
+        :param seed: the seed of the random numbers
+        :type seed: int|long
+
+        :param mask: the generated mask
+        :type mask: numpy.ndarray
+        """
+
+        with self.__lock:
+            entry = self.__index.get(key)
+
+            if entry is None or entry[ENTRY_FIELD_PACKET_COUNT] < len(mask):
+                self.__write_mask(key, mask)
+                self.__index[key] = {
+                    ENTRY_FIELD_MODEL: model,
+                    ENTRY_FIELD_PARAMETERS: parameters,
+                    ENTRY_FIELD_SEED: seed,
+                    ENTRY_FIELD_PACKET_COUNT: len(mask)
+                }
+                self.__save_index()
+
+    def get_mask(self, model, parameters, seed, packet_count, generate):
+        """
+        Returns the mask of a model, its parameters and a seed for a given number of packets. If the store does not
+        contain a long enough mask, the mask is generated and stored.
+
+        :param model: the name of the loss model
+        :type model: basestring
+
+        :param parameters: the parameters of the model
+        :type parameters: dict
+
+        :param seed: the seed of the random numbers
+        :type seed: int|long
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :param generate: a function which generates the mask for a given number of packets (prefix consistent)
+        :type generate: callable
+
+        :return: the loss of each packet
+        :rtype: numpy.ndarray
+        """
+
+        assert isinstance(packet_count, int) and packet_count >= 0
+        assert callable(generate)
+
+        key = self.get_key(model, parameters, seed)
+
+        mask = self.__lookup_mask(key, packet_count)
+        if mask is not None:
+            return mask
+
+        mask = generate(packet_count)
+        assert len(mask) == packet_count
+
+        self.__store_mask(key, model, parameters, seed, mask)
+        return mask
+
+    def get_masks(self, model, parameters, seeds, packet_count, generate_batch):
+        """
+        Returns the masks of a model and its parameters for several seeds (e.g. the realizations of a Monte-Carlo
+        selection). The masks which the store does not contain are generated in a single batch and stored.
+
+        :param model: the name of the loss model
+        :type model: basestring
+
+        :param parameters: the parameters of the model
+        :type parameters: dict
+
+        :param seeds: the seeds of the random numbers
+        :type seeds: list
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :param generate_batch: a function which generates the masks of a list of seeds for a given number of packets
+            (seeds x packets, prefix consistent)
+        :type generate_batch: callable
+
+        :return: the loss of each packet per seed (seeds x packets)
+        :rtype: numpy.ndarray
+        """
+
+        assert isinstance(seeds, list) and len(seeds) > 0
+        assert isinstance(packet_count, int) and packet_count >= 0
+        assert callable(generate_batch)
+
+        import numpy
+
+        keys = [self.get_key(model, parameters, seed) for seed in seeds]
+
+        masks = numpy.zeros((len(seeds), packet_count), dtype=bool)
+        missing_indexes = list()
+
+        for (i, key) in enumerate(keys):
+            mask = self.__lookup_mask(key, packet_count)
+            if mask is None:
+                missing_indexes.append(i)
+            else:
+                masks[i] = mask
+
+        if missing_indexes:
+            generated_masks = generate_batch([seeds[i] for i in missing_indexes], packet_count)
+            assert generated_masks.shape == (len(missing_indexes), packet_count)
+
+            for (i, mask) in zip(missing_indexes, generated_masks):
+                masks[i] = mask
+                self.__store_mask(keys[i], model, parameters, seeds[i], mask)
+
+        return masks
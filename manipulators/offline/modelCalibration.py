@@ -0,0 +1,283 @@
+"""
+Calibration of the parameters of the markov loss models to target statistics: a loss rate, a mean burst length
+(consecutive lost packets) and optionally a gap density (RFC 3611, see `lossStatistics`).
+
+Without a gap density the parameters are solved analytically: the bursts are the sojourns in the loss state (mean
+length 1 / r) and the loss rate is its stationary probability. Isolated gap losses merge with the bursts though, so
+with a gap density the analytic solution is only the starting point of a search, which simulates a grid of parameter
+sets around the current best in a single batch (see `lossModels.get_losses_batch`) and zooms in on the best one.
+
+The telchemy 4-state model (markov4state) has the same states as netem's 4-state model: gap lossless (1), burst lossy
+(3), burst lossless (2) and gap lossy (4), with the transitions pbc = p13, pcb = p31, pcd = p32, pdc = p23 and
+pba = p14, if its gap and burst loss probabilities (g, b) are 100%. Both are calibrated as the same chain.
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+# the models which can be calibrated
+MODEL_2STATE = '2s'
+MODEL_GEMODEL = 'gemodel'
+MODEL_4STATE = 'state'
+MODEL_MARKOV_4STATE = 'markov4state'
+
+MODELS = (
+    MODEL_2STATE,
+    MODEL_GEMODEL,
+    MODEL_4STATE,
+    MODEL_MARKOV_4STATE
+)
+
+# the models which are calibrated as netem's 4-state markov chain
+FOUR_STATE_MODELS = (
+    MODEL_4STATE,
+    MODEL_MARKOV_4STATE
+)
+
+# number of grid points per searched parameter
+SEARCH_GRID_SIZE = 5
+
+# minimum number of simulated packets per parameter set (the clip is replicated to reach it)
+MIN_SIMULATED_PACKET_COUNT = 100000
+
+# smallest probability considered by the search
+MIN_PROBABILITY = 1e-6
+
+
+def __get_model_parameters(model, search_parameters):
+    """
+    Maps the searched parameters (p, r, gap loss) on the parameters of the model's loss function.
+
+    :rtype: tuple
+    :return: tuple (get_losses, parameters)
+    """
+
+    from manipulators.offline.lossModels import get_gilbert_elliott_losses, get_4state_losses
+
+    (p, r, gap_loss) = search_parameters
+
+    if model in FOUR_STATE_MODELS:
+        return get_4state_losses, {'p13': p, 'p31': r, 'p32': 0.0, 'p23': 1.0, 'p14': gap_loss}
+
+    return get_gilbert_elliott_losses, {'p': p, 'r': r, 'bad_loss_rate': 1.0, 'good_loss_rate': gap_loss}
+
+
+def get_analytic_parameters(model, loss_rate, burst_length, gap_density=0.0):
+    """
+    Solves the searched parameters analytically, which is exact if no gap losses are requested.
+
+    :param model: the model to calibrate (see `MODELS`)
+    :type model: basestring
+
+    :param loss_rate: the target loss rate in [0, 1)
+    :type loss_rate: float
+
+    :param burst_length: the target mean burst length (>= 1)
+    :type burst_length: float
+
+    :param gap_density: the target gap density in [0, 1)
+    :type gap_density: float
+
+    :return: tuple (p, r, gap_loss): the transition probability into and out of the burst state and the loss
+        probability (2-state, gemodel) or transition probability into the isolated loss state (4-state) in the gap
+    :rtype: tuple
+    """
+
+    assert model in MODELS
+    assert 0 <= loss_rate < 1
+    assert burst_length >= 1
+    assert 0 <= gap_density < 1
+
+    r = 1.0 / burst_length
+
+    if model in FOUR_STATE_MODELS:
+        # stationary loss rate: (p14 + p13 / p31) / (1 + p14 + p13 / p31)
+        gap_loss = gap_density / (1 - gap_density)
+        burst_share = loss_rate / (1 - loss_rate) - gap_loss
+        if burst_share < 0:
+            raise ValueError('The loss rate %.4f is too small for the gap density %.4f!' % (loss_rate, gap_density))
+
+        p = burst_share / burst_length
+    else:
+        # stationary loss rate: pi_bad + (1 - pi_bad) * gap loss, with pi_bad = p / (p + r)
+        gap_loss = gap_density
+        bad_share = (loss_rate - gap_loss) / (1 - gap_loss)
+        if bad_share < 0:
+            raise ValueError('The loss rate %.4f is too small for the gap density %.4f!' % (loss_rate, gap_density))
+
+        p = r * bad_share / (1 - bad_share)
+
+    if p > 1:
+        raise ValueError('The loss rate %.4f can not be reached with bursts of %.2f packets!'
+                         % (loss_rate, burst_length))
+
+    return p, r, gap_loss
+
+
+def get_realized_statistics(model, search_parameters, packet_count, replicate_count, seed=0):
+    """
+    Simulates parameter sets in a single batch and returns their realized statistics, averaged over the replicates.
+    All parameter sets use the same random numbers, so that their differences are not blurred by noise.
+
+    :param model: the model to simulate (see `MODELS`)
+    :type model: basestring
+
+    :param search_parameters: the parameter sets as array (parameter sets x (p, r, gap loss))
+    :type search_parameters: numpy.ndarray
+
+    :param packet_count: the number of packets of each replicate
+    :type packet_count: int
+
+    :param replicate_count: the number of replicates per parameter set
+    :type replicate_count: int
+
+    :param seed: the seed of the random numbers
+    :type seed: int
+
+    :return: tuple (loss_rates, mean_burst_lengths, gap_densities) with one value per parameter set
+    :rtype: tuple
+    """
+
+    from numpy.random import RandomState
+    from manipulators.offline.lossModels import get_losses_batch
+    from manipulators.offline.lossStatistics import get_rfc3611_statistics
+    from manipulators.offline.realizationSelector import get_loss_statistics
+
+    search_parameters = numpy.atleast_2d(search_parameters)
+    set_count = len(search_parameters)
+
+    # rows: parameter set by parameter set, each with all replicates
+    (get_losses, parameters) = __get_model_parameters(
+        model, numpy.repeat(search_parameters, replicate_count, axis=0).T
+    )
+    random_states = [RandomState([seed, i % replicate_count]) for i in xrange(set_count * replicate_count)]
+
+    losses = get_losses_batch(get_losses, random_states, packet_count, **parameters)
+
+    (loss_rates, mean_burst_lengths) = get_loss_statistics(losses)
+    gap_densities = numpy.array([get_rfc3611_statistics(row)['gap_density'] for row in losses])
+
+    return tuple(
+        statistic.reshape(set_count, replicate_count).mean(axis=1)
+        for statistic in (loss_rates, mean_burst_lengths, gap_densities)
+    )
+
+
+def calibrate(model, loss_rate, burst_length, gap_density=None, packet_count=10000, iteration_count=6, seed=0):
+    """
+    Calibrates the parameters of a model to the target statistics.
+
+    :param model: the model to calibrate (see `MODELS`)
+    :type model: basestring
+
+    :param loss_rate: the target loss rate in [0, 1)
+    :type loss_rate: float
+
+    :param burst_length: the target mean burst length (>= 1)
+    :type burst_length: float
+
+    :param gap_density: the target gap density in [0, 1), or None if no gap losses are requested
+    :type gap_density: float|None
+
+    :param packet_count: the number of packets of the clips the model is applied on
+    :type packet_count: int
+
+    :param iteration_count: the number of zoom steps of the search
+    :type iteration_count: int
+
+    :param seed: the seed of the simulations
+    :type seed: int
+
+    :return: tuple (parameters, statistics): the parameters (p, r, gap loss, see `get_analytic_parameters`) and their
+        realized statistics (loss rate, mean burst length, gap density)
+    :rtype: tuple
+    """
+
+    assert isinstance(packet_count, int) and packet_count > 1
+    assert isinstance(iteration_count, int) and iteration_count >= 0
+
+    replicate_count = max(1, -(-MIN_SIMULATED_PACKET_COUNT // packet_count))
+    best = numpy.array(get_analytic_parameters(model, loss_rate, burst_length, gap_density or 0.0))
+
+    if not gap_density:
+        return tuple(best), tuple(
+            s[0] for s in get_realized_statistics(model, best, packet_count, replicate_count, seed)
+        )
+
+    targets = numpy.array([loss_rate, burst_length, gap_density])
+    offsets = numpy.linspace(-1, 1, SEARCH_GRID_SIZE)
+    spread = numpy.log(2)
+
+    statistics = None
+    for iteration in xrange(iteration_count):
+        # multiplicative grid around the current best parameters
+        factors = numpy.exp(numpy.array(numpy.meshgrid(offsets, offsets, offsets, indexing='ij')).reshape(3, -1).T
+                            * spread)
+        candidates = numpy.clip(best * factors, MIN_PROBABILITY, 1.0)
+
+        realized = numpy.array(get_realized_statistics(model, candidates, packet_count, replicate_count, seed)).T
+        errors = (((realized - targets) / targets) ** 2).sum(axis=1)
+
+        index = int(numpy.argmin(errors))
+        (best, statistics) = (candidates[index], realized[index])
+
+        spread /= 2
+
+    return tuple(best), tuple(statistics)
+
+
+def add_table_row(table_file_path, field_names, row):
+    """
+    Appends a row with the next free id to a resource table (a `;` separated csv file), which is created with the
+    given field names as header if it does not exist yet.
+
+    :param table_file_path: the path of the table's csv file
+    :type table_file_path: basestring
+
+    :param field_names: the field names of the table, starting with the id field
+    :type field_names: tuple|list
+
+    :param row: the values of the row by field name (without id)
+    :type row: dict
+
+    :return: the id of the appended row
+    :rtype: int
+    """
+
+    from csv import reader
+    from os.path import isfile
+    from database.dbTable import DbTable
+
+    delimiter = DbTable.DB_TABLE_COLUMN_DELIMITER
+    id_field_name = field_names[0]
+
+    header = None
+    last_id = 0
+
+    if isfile(table_file_path):
+        with open(table_file_path, 'r') as table_file:
+            for values in reader(table_file, delimiter=delimiter):
+                if not values or values[0].startswith('#'):
+                    continue
+
+                if header is None:
+                    header = values
+                    continue
+
+                try:
+                    last_id = max(last_id, int(values[header.index(id_field_name)]))
+                except (ValueError, IndexError):
+                    pass
+
+    with open(table_file_path, 'a') as table_file:
+        if header is None:
+            header = list(field_names)
+            table_file.write(delimiter.join(header) + '\n')
+
+        row = dict(row)
+        row[id_field_name] = last_id + 1
+
+        table_file.write(delimiter.join(str(row.get(field_name, '')) for field_name in header) + '\n')
+
+    return last_id + 1
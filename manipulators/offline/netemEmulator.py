@@ -0,0 +1,209 @@
+"""
+Offline emulation of the delay behaviour of the linux netem queueing discipline on packet timestamps.
+
+netem delays each packet by `tabledist(delay, jitter, correlation, distribution)` (see net/sched/sch_netem.c): a
+(correlated) uniform random number selects a value of the distribution's table (the inverse CDF of the
+distribution, scaled to 1/NETEM_DIST_SCALE), which is multiplied with the jitter and added to the delay. Without a
+table the delay is uniformly distributed within [delay - jitter, delay + jitter). Since netem queues the packets by
+their time to send, packets overtake each other if the jitter exceeds their distance.
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+# distributions, named like the tables of iproute2
+DISTRIBUTION_UNIFORM = 'uniform'
+DISTRIBUTION_NORMAL = 'normal'
+DISTRIBUTION_PARETO = 'pareto'
+DISTRIBUTION_PARETONORMAL = 'paretonormal'
+
+DISTRIBUTIONS = (
+    DISTRIBUTION_UNIFORM,
+    DISTRIBUTION_NORMAL,
+    DISTRIBUTION_PARETO,
+    DISTRIBUTION_PARETONORMAL
+)
+
+# scale of the distribution tables and the range of their (16 bit) values
+NETEM_DIST_SCALE = 8192
+NETEM_DIST_MAX = 32767.0 / NETEM_DIST_SCALE
+
+# shape parameter of the pareto tables of iproute2
+PARETO_A = 3.0
+
+# share of the normal distribution in the paretonormal table of iproute2
+PARETONORMAL_NORMAL_SHARE = 0.25
+
+# resolution of the inverse CDF table of the normal distribution
+NORMAL_TABLE_SIZE = 1 << 16
+
+# lazily built inverse CDF table of the normal distribution: (cdf values, x values)
+__normal_table = None
+
+
+def __get_normal_quantiles(uniforms):
+    """
+    Returns the quantiles of the standard normal distribution for given probabilities.
+
+    :param uniforms: the probabilities in [0, 1)
+    :type uniforms: numpy.ndarray
+
+    :rtype: numpy.ndarray
+    """
+
+    global __normal_table
+
+    if __normal_table is None:
+        from math import erf, sqrt
+
+        x = numpy.linspace(-NETEM_DIST_MAX, NETEM_DIST_MAX, NORMAL_TABLE_SIZE)
+        cdf = 0.5 * (1.0 + numpy.array([erf(v / sqrt(2.0)) for v in x]))
+        __normal_table = (cdf, x)
+
+    (cdf, x) = __normal_table
+    return numpy.interp(uniforms, cdf, x)
+
+
+def __get_pareto_quantiles(uniforms):
+    """
+    Returns the values of the pareto table of iproute2 for given probabilities, i.e. a pareto distribution with
+    a = 3, shifted to a mean of 0 and scaled to a standard deviation of about 1.
+
+    :param uniforms: the probabilities in [0, 1)
+    :type uniforms: numpy.ndarray
+
+    :rtype: numpy.ndarray
+    """
+
+    # the table is mirrored (uniform -> 1 - uniform), so that large uniforms select the long tail
+    return (numpy.power(numpy.maximum(1.0 - uniforms, 1e-12), -1.0 / PARETO_A) - 1.5) * 4.0 / 3.0
+
+
+def get_table_values(uniforms, distribution):
+    """
+    Returns the values of a distribution's table for given (correlated) uniform random numbers.
+
+    :param uniforms: the uniform random numbers in [0, 1)
+    :type uniforms: numpy.ndarray
+
+    :param distribution: the name of the distribution
+    :type distribution: basestring
+
+    :return: the table values in units of the jitter
+    :rtype: numpy.ndarray
+    """
+
+    assert distribution in DISTRIBUTIONS
+
+    if distribution == DISTRIBUTION_UNIFORM:
+        return 2.0 * uniforms - 1.0
+
+    if distribution == DISTRIBUTION_NORMAL:
+        values = __get_normal_quantiles(uniforms)
+
+    elif distribution == DISTRIBUTION_PARETO:
+        values = __get_pareto_quantiles(uniforms)
+
+    else:
+        # the paretonormal table combines the quantiles of both distributions
+        values = PARETONORMAL_NORMAL_SHARE * __get_normal_quantiles(uniforms) \
+            + (1.0 - PARETONORMAL_NORMAL_SHARE) * __get_pareto_quantiles(uniforms)
+
+    return numpy.clip(values, -NETEM_DIST_MAX, NETEM_DIST_MAX)
+
+
+def get_correlated_uniforms(random_state, count, correlation):
+    """
+    Returns uniform random numbers, which are correlated like netem's `get_crandom`: each number is a weighted mean of
+    a new random number and the previous result.
+
+    :param random_state: the random number generator to use
+    :type random_state: numpy.random.RandomState
+
+    :param count: the number of random numbers
+    :type count: int
+
+    :param correlation: the correlation in [0, 1]
+    :type correlation: float
+
+    :rtype: numpy.ndarray
+    """
+
+    assert 0 <= correlation <= 1
+
+    uniforms = random_state.random_sample(count)
+
+    if correlation == 0 or count == 0:
+        return uniforms
+
+    last = 0.0
+    for i in xrange(count):
+        last = (1.0 - correlation) * uniforms[i] + correlation * last
+        uniforms[i] = last
+
+    return uniforms
+
+
+def get_delays(random_state, count, delay, jitter=0.0, distribution=DISTRIBUTION_UNIFORM, correlation=0.0):
+    """
+    Returns the delay of each packet like netem's `delay <DELAY> [<JITTER> [<CORRELATION>]] [distribution <DIST>]`.
+    Negative delays (jitter larger than the delay) are cut to 0.
+
+    :param random_state: the random number generator to use
+    :type random_state: numpy.random.RandomState
+
+    :param count: the number of packets
+    :type count: int
+
+    :param delay: the mean delay (any time unit)
+    :type delay: float
+
+    :param jitter: the jitter (same unit as the delay)
+    :type jitter: float
+
+    :param distribution: the name of the jitter's distribution
+    :type distribution: basestring
+
+    :param correlation: the correlation of the jitter with the previous packet's one in [0, 1]
+    :type correlation: float
+
+    :return: the delays of the packets (unit of the delay)
+    :rtype: numpy.ndarray
+    """
+
+    if not jitter:
+        return numpy.full(count, float(delay))
+
+    uniforms = get_correlated_uniforms(random_state, count, correlation)
+    delays = delay + jitter * get_table_values(uniforms, distribution)
+
+    return numpy.maximum(delays, 0.0)
+
+
+def emulate(timestamps, losses, delays):
+    """
+    Applies the losses and delays on a packet stream like netem's time sorted queue does.
+
+    :param timestamps: the send times of the packets (integer time units)
+    :type timestamps: numpy.ndarray
+
+    :param losses: the loss of each packet
+    :type losses: numpy.ndarray
+
+    :param delays: the delay of each packet (same time units as the timestamps)
+    :type delays: numpy.ndarray
+
+    :return: the indexes of the received packets in the order of their arrival and their arrival times
+    :rtype: tuple
+    """
+
+    assert len(timestamps) == len(losses) == len(delays)
+
+    received = numpy.flatnonzero(~losses)
+    arrivals = timestamps[received] + numpy.rint(delays[received]).astype(numpy.int64)
+
+    # stable sort -> packets with the same arrival time keep their order (netem's tfifo behaves the same)
+    order = numpy.argsort(arrivals, kind='mergesort')
+
+    return received[order], arrivals[order]
@@ -0,0 +1,570 @@
+"""
+Classifies the packets of a captured video stream by the frames and NAL units they carry, so that losses can be
+inserted selectively (e.g. only into packets of I-frames or of non-reference frames).
+
+The capture is indexed in a single pass: the video elementary stream is reassembled from the packets (by
+depacketizing H.264/HEVC RTP payloads or by extracting the payloads of the video PES of MPEG-TS streams), while the
+range of the stream's bytes carried by each packet is recorded. Afterwards, the NAL units are located by their start
+codes and the frames (access units) by the RTP timestamps or PES headers, and each packet is mapped on the frames and
+NAL units which overlap its byte range.
+
+A frame is classified by the types of its slices (a frame is a B-frame, if it carries B slices) and by its reference
+flag (H.264 nal_ref_idc, HEVC sub-layer non-reference NAL unit types).
+"""
+
+__author__ = 'Alexander Dethof'
+
+from binascii import hexlify
+
+import numpy
+
+# codec formats, named like the raw file extensions of the codecs
+CODEC_FORMAT_H264 = 'h264'
+CODEC_FORMAT_HEVC = 'hevc'
+
+CODEC_FORMATS = (
+    CODEC_FORMAT_H264,
+    CODEC_FORMAT_HEVC
+)
+
+# bits of the frame classes
+FRAME_TYPE_I = 0x01
+FRAME_TYPE_P = 0x02
+FRAME_TYPE_B = 0x04
+FRAME_REFERENCE = 0x08
+FRAME_NON_REFERENCE = 0x10
+
+# frame type bits by slice type (H.264 slice_type % 5: P, B, I, SP, SI; HEVC slice_type: B, P, I)
+H264_SLICE_FRAME_TYPES = (FRAME_TYPE_P, FRAME_TYPE_B, FRAME_TYPE_I, FRAME_TYPE_P, FRAME_TYPE_I)
+HEVC_SLICE_FRAME_TYPES = (FRAME_TYPE_B, FRAME_TYPE_P, FRAME_TYPE_I)
+
+# NAL unit types (see ITU-T H.264 and H.265, table 7-1) and RTP payload structures (RFC 6184, RFC 7798)
+H264_NAL_TYPES_SLICE = (1, 2, 5)
+H264_NAL_TYPE_STAP_A = 24
+H264_NAL_TYPE_FU_A = 28
+
+HEVC_NAL_TYPE_VCL_END = 32
+HEVC_NAL_TYPE_IRAP_START = 16
+HEVC_NAL_TYPE_IRAP_END = 23
+HEVC_NAL_TYPE_PPS = 34
+HEVC_NAL_TYPE_AP = 48
+HEVC_NAL_TYPE_FU = 49
+
+# number of payload bytes of a NAL unit which are parsed for the slice type
+NAL_PARSE_LENGTH = 24
+
+# MPEG-TS and RTP constants
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+RTP_HEADER_SIZE = 12
+
+START_CODE = '\x00\x00\x01'
+
+
+class PacketClasses(object):
+    """
+    The frames and NAL units carried by the packets of a capture.
+    """
+
+    def __init__(self, frame_classes, packet_first_frames, packet_last_frames, nal_type_masks):
+        """
+        :param frame_classes: the class bits of each frame (FRAME_* bits)
+        :type frame_classes: numpy.ndarray
+
+        :param packet_first_frames: the index of the first frame each packet carries data of (-1: no video data)
+        :type packet_first_frames: numpy.ndarray
+
+        :param packet_last_frames: the index of the last frame each packet carries data of (-1: no video data)
+        :type packet_last_frames: numpy.ndarray
+
+        :param nal_type_masks: the bit mask of the NAL unit types each packet carries data of (bit n -> type n)
+        :type nal_type_masks: numpy.ndarray
+        """
+
+        self.frame_classes = frame_classes
+        self.packet_first_frames = packet_first_frames
+        self.packet_last_frames = packet_last_frames
+        self.nal_type_masks = nal_type_masks
+
+    def get_frame_count(self):
+        """
+        :return: the number of frames of the stream
+        :rtype: int
+        """
+
+        return len(self.frame_classes)
+
+    def get_packets_carrying(self, is_frame_selected):
+        """
+        Returns the packets which carry data of selected frames.
+
+        :param is_frame_selected: the selection of each frame
+        :type is_frame_selected: numpy.ndarray
+
+        :return: true for each packet which carries data of at least one selected frame
+        :rtype: numpy.ndarray
+        """
+
+        assert len(is_frame_selected) == len(self.frame_classes)
+        return _is_any_in_ranges(is_frame_selected, self.packet_first_frames, self.packet_last_frames)
+
+    def get_frame_types(self):
+        """
+        Returns the type of each frame: B if it has B slices, P if it has P but no B slices and I if it only has I
+        slices (0 for frames without parsed slice headers).
+
+        :rtype: numpy.ndarray
+        """
+
+        frame_types = numpy.zeros(len(self.frame_classes), dtype=numpy.uint8)
+
+        for frame_type in (FRAME_TYPE_I, FRAME_TYPE_P, FRAME_TYPE_B):
+            frame_types[self.frame_classes & frame_type != 0] = frame_type
+
+        return frame_types
+
+
+def _is_any_in_ranges(flags, firsts, lasts):
+    """
+    Checks for each range of indexes [first, last] if any of its flags is set (ranges with last < 0 are empty).
+
+    :rtype: numpy.ndarray
+    """
+
+    counts = numpy.concatenate(([0], numpy.cumsum(flags, dtype=numpy.int64)))
+    is_valid = lasts >= 0
+
+    return is_valid & (counts[numpy.where(is_valid, lasts + 1, 0)] - counts[numpy.maximum(firsts, 0)] > 0)
+
+
+def __read_ue(value, bit_count, position):
+    """
+    Reads an unsigned Exp-Golomb code from a bit string.
+
+    :param value: the bits as integer
+    :type value: int|long
+
+    :param bit_count: the number of bits of the value
+    :type bit_count: int
+
+    :param position: the position of the code's first bit
+    :type position: int
+
+    :return: tuple (the decoded number, the position behind the code)
+    :rtype: tuple
+
+    :raises IndexError: if the code exceeds the bits
+    """
+
+    leading_zero_count = 0
+    while True:
+        if position >= bit_count:
+            raise IndexError('The Exp-Golomb code exceeds the parsed bits!')
+        if (value >> (bit_count - 1 - position)) & 1:
+            break
+        leading_zero_count += 1
+        position += 1
+
+    end = position + 1 + leading_zero_count
+    if end > bit_count:
+        raise IndexError('The Exp-Golomb code exceeds the parsed bits!')
+
+    suffix = (value >> (bit_count - end)) & ((1 << leading_zero_count) - 1)
+    return (1 << leading_zero_count) - 1 + suffix, end
+
+
+def __read_bits(value, bit_count, position, count):
+    """
+    Reads an unsigned number of a given number of bits from a bit string.
+
+    :return: tuple (the number, the position behind it)
+    :rtype: tuple
+    """
+
+    if position + count > bit_count:
+        raise IndexError('The field exceeds the parsed bits!')
+
+    return (value >> (bit_count - position - count)) & ((1 << count) - 1), position + count
+
+
+def __get_rbsp_bits(stream, payload_start, payload_end):
+    """
+    Returns the first bits of a NAL unit's payload, without emulation prevention bytes.
+
+    :return: tuple (the bits as integer, the number of bits)
+    :rtype: tuple
+    """
+
+    rbsp = stream[payload_start:min(payload_end, payload_start + NAL_PARSE_LENGTH)].replace('\x00\x00\x03', '\x00\x00')
+    return int(hexlify(rbsp), 16) if rbsp else 0, 8 * len(rbsp)
+
+
+def __get_rtp_payload_offset(payload):
+    """
+    Returns the offset of the payload of a RTP packet.
+
+    :param payload: the UDP payload which contains the RTP packet
+    :type payload: str
+
+    :return: the offset of the RTP payload, or None if the UDP payload is no RTP packet
+    :rtype: int|None
+    """
+
+    if len(payload) < RTP_HEADER_SIZE or ord(payload[0]) >> 6 != 2:
+        return None
+
+    # fixed header + CSRC identifiers
+    offset = RTP_HEADER_SIZE + (ord(payload[0]) & 0x0f) * 4
+
+    # header extension
+    if ord(payload[0]) & 0x10 and len(payload) >= offset + 4:
+        offset += 4 + ((ord(payload[offset + 2]) << 8) | ord(payload[offset + 3])) * 4
+
+    return offset if offset <= len(payload) else None
+
+
+def __get_udp_payloads(records, link_type):
+    """
+    Returns the UDP payloads of the packets.
+
+    :return: the UDP payload of each packet (None for packets which are no UDP datagrams)
+    :rtype: list
+    """
+
+    from util.pcapFile import get_udp_header_offset, UDP_HEADER_SIZE
+
+    payloads = list()
+    for (ts_sec, ts_frac, orig_len, data) in records:
+        offset = get_udp_header_offset(link_type, data)
+        payloads.append(None if offset is None else data[offset + UDP_HEADER_SIZE:])
+
+    return payloads
+
+
+def __depacketize_rtp(payloads, codec_format):
+    """
+    Reassembles the elementary stream (Annex B) of a raw RTP stream, following the SSRC of the first RTP packet.
+
+    :param payloads: the UDP payload of each packet
+    :type payloads: list
+
+    :param codec_format: the codec of the stream
+    :type codec_format: basestring
+
+    :return: tuple (stream, packet starts, packet ends, frame starts): the elementary stream, the range of its bytes
+        carried by each packet and the offsets wherein the frames start
+    :rtype: tuple
+    """
+
+    is_hevc = codec_format == CODEC_FORMAT_HEVC
+    header_size = 2 if is_hevc else 1
+    aggregation_type = HEVC_NAL_TYPE_AP if is_hevc else H264_NAL_TYPE_STAP_A
+    fragmentation_type = HEVC_NAL_TYPE_FU if is_hevc else H264_NAL_TYPE_FU_A
+
+    chunks = list()
+    position = 0
+    packet_starts = numpy.zeros(len(payloads), dtype=numpy.int64)
+    packet_ends = numpy.zeros(len(payloads), dtype=numpy.int64)
+    frame_starts = list()
+
+    ssrc = None
+    last_rtp_timestamp = None
+
+    for (index, udp_payload) in enumerate(payloads):
+        packet_starts[index] = position
+        packet_ends[index] = position
+
+        offset = None if udp_payload is None else __get_rtp_payload_offset(udp_payload)
+        if offset is None or offset + header_size >= len(udp_payload):
+            continue
+
+        if ssrc is None:
+            ssrc = udp_payload[8:12]
+        elif udp_payload[8:12] != ssrc:
+            continue
+
+        # all packets of a frame share the frame's RTP timestamp
+        if udp_payload[4:8] != last_rtp_timestamp:
+            last_rtp_timestamp = udp_payload[4:8]
+            frame_starts.append(position)
+
+        payload = udp_payload[offset:]
+        nal_type = (ord(payload[0]) >> 1) & 0x3f if is_hevc else ord(payload[0]) & 0x1f
+        packet_chunks = list()
+
+        if nal_type == aggregation_type:
+            nal_offset = header_size
+            while nal_offset + 2 <= len(payload):
+                nal_size = (ord(payload[nal_offset]) << 8) | ord(payload[nal_offset + 1])
+                packet_chunks.append(START_CODE + payload[nal_offset + 2:nal_offset + 2 + nal_size])
+                nal_offset += 2 + nal_size
+
+        elif nal_type == fragmentation_type:
+            fu_header = ord(payload[header_size])
+            fragment = payload[header_size + 1:]
+
+            if fu_header & 0x80:
+                # first fragment -> reconstruct the header of the fragmented NAL unit
+                if is_hevc:
+                    nal_header = chr((ord(payload[0]) & 0x81) | ((fu_header & 0x3f) << 1)) + payload[1]
+                else:
+                    nal_header = chr((ord(payload[0]) & 0xe0) | (fu_header & 0x1f))
+                packet_chunks.append(START_CODE + nal_header + fragment)
+            else:
+                packet_chunks.append(fragment)
+
+        elif nal_type < aggregation_type:
+            packet_chunks.append(START_CODE + payload)
+
+        # further payload structures (e.g. of the interleaved mode) are not classified
+
+        chunks.extend(packet_chunks)
+        position += sum(len(chunk) for chunk in packet_chunks)
+        packet_ends[index] = position
+
+    return ''.join(chunks), packet_starts, packet_ends, numpy.array(frame_starts, dtype=numpy.int64)
+
+
+def __demultiplex_ts(payloads, is_rtp):
+    """
+    Extracts the elementary stream of the first video PES of a MPEG-TS stream.
+
+    :param payloads: the UDP payload of each packet
+    :type payloads: list
+
+    :param is_rtp: true if the TS packets are carried in RTP packets
+    :type is_rtp: bool
+
+    :return: tuple (stream, packet starts, packet ends, frame starts): the elementary stream, the range of its bytes
+        carried by each packet and the offsets wherein the frames (PES packets) start
+    :rtype: tuple
+    """
+
+    packet_count = len(payloads)
+    ts_counts = numpy.zeros(packet_count, dtype=numpy.int64)
+    buffers = list()
+
+    for (index, payload) in enumerate(payloads):
+        if payload is None:
+            continue
+
+        offset = __get_rtp_payload_offset(payload) if is_rtp else 0
+        if offset is None:
+            continue
+
+        ts_count = (len(payload) - offset) / TS_PACKET_SIZE
+        ts_counts[index] = ts_count
+        buffers.append(payload[offset:offset + ts_count * TS_PACKET_SIZE])
+
+    buffer = ''.join(buffers)
+    data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+
+    # the TS packets are contiguous in the buffer -> their headers are inspected at once
+    ts_offsets = numpy.arange(0, len(buffer), TS_PACKET_SIZE, dtype=numpy.int64)
+    ts_ends = ts_offsets + TS_PACKET_SIZE
+
+    def get_bytes(offsets, is_valid):
+        return numpy.where(is_valid, data[numpy.minimum(offsets, max(len(data) - 1, 0))], 0).astype(numpy.int64)
+
+    is_synced = data[ts_offsets] == TS_SYNC_BYTE if len(buffer) else numpy.zeros(0, dtype=bool)
+    pids = ((data[ts_offsets + 1].astype(numpy.int64) & 0x1f) << 8) | data[ts_offsets + 2]
+    is_unit_start = data[ts_offsets + 1] & 0x40 != 0
+    adaptation_field_control = (data[ts_offsets + 3] >> 4) & 0x03
+
+    pes_offsets = ts_offsets + 4 + numpy.where(
+        adaptation_field_control & 0x02 != 0, 1 + data[numpy.minimum(ts_offsets + 4, len(data) - 1)], 0
+    )
+    has_payload = is_synced & (adaptation_field_control & 0x01 != 0) & (pes_offsets < ts_ends)
+
+    # PES start code prefix followed by a video stream id (0xE0 - 0xEF)
+    is_header_in_packet = has_payload & is_unit_start & (pes_offsets + 9 <= ts_ends)
+    is_video_pes_start = is_header_in_packet \
+        & (get_bytes(pes_offsets, is_header_in_packet) == 0) \
+        & (get_bytes(pes_offsets + 1, is_header_in_packet) == 0) \
+        & (get_bytes(pes_offsets + 2, is_header_in_packet) == 1) \
+        & (get_bytes(pes_offsets + 3, is_header_in_packet) & 0xf0 == 0xe0)
+
+    if not is_video_pes_start.any():
+        empty = numpy.zeros(packet_count, dtype=numpy.int64)
+        return '', empty, empty, numpy.zeros(0, dtype=numpy.int64)
+
+    video_pid = pids[numpy.flatnonzero(is_video_pes_start)[0]]
+    is_video = has_payload & (pids == video_pid)
+    is_video_pes_start &= is_video
+
+    es_starts = numpy.minimum(
+        pes_offsets + numpy.where(is_video_pes_start, 9 + get_bytes(pes_offsets + 8, is_video_pes_start), 0), ts_ends
+    )
+    es_lengths = numpy.where(is_video, ts_ends - es_starts, 0)
+
+    stream = ''.join(
+        buffer[start:start + length] for (start, length) in zip(es_starts.tolist(), es_lengths.tolist()) if length
+    )
+
+    # offsets of the TS packets' data in the elementary stream
+    es_bounds = numpy.concatenate(([0], numpy.cumsum(es_lengths)))
+    ts_bounds = numpy.concatenate(([0], numpy.cumsum(ts_counts)))
+
+    return stream, es_bounds[ts_bounds[:-1]], es_bounds[ts_bounds[1:]], es_bounds[:-1][is_video_pes_start]
+
+
+def __parse_nal_units(stream, nal_starts, codec_format):
+    """
+    Parses the headers of the NAL units of an elementary stream.
+
+    :param stream: the elementary stream
+    :type stream: str
+
+    :param nal_starts: the offsets of the NAL unit headers (behind the start codes)
+    :type nal_starts: numpy.ndarray
+
+    :param codec_format: the codec of the stream
+    :type codec_format: basestring
+
+    :return: tuple (types, classes): the type and the class bits (slice type and reference flag, 0 for non-VCL NAL
+        units) of each NAL unit
+    :rtype: tuple
+    """
+
+    is_hevc = codec_format == CODEC_FORMAT_HEVC
+
+    nal_types = numpy.zeros(len(nal_starts), dtype=numpy.int64)
+    nal_classes = numpy.zeros(len(nal_starts), dtype=numpy.uint8)
+
+    # number of extra slice header bits per HEVC picture parameter set
+    extra_slice_header_bits = dict()
+
+    nal_ends = numpy.concatenate((nal_starts[1:] - len(START_CODE), [len(stream)]))
+
+    for (index, (start, end)) in enumerate(zip(nal_starts.tolist(), nal_ends.tolist())):
+        if start >= len(stream):
+            continue
+
+        header = ord(stream[start])
+
+        try:
+            if is_hevc:
+                nal_type = (header >> 1) & 0x3f
+                nal_types[index] = nal_type
+
+                if nal_type == HEVC_NAL_TYPE_PPS:
+                    (bits, bit_count) = __get_rbsp_bits(stream, start + 2, end)
+                    (pps_id, position) = __read_ue(bits, bit_count, 0)
+                    (sps_id, position) = __read_ue(bits, bit_count, position)
+                    (extra_bits, position) = __read_bits(bits, bit_count, position + 2, 3)
+                    extra_slice_header_bits[pps_id] = extra_bits
+                    continue
+
+                if nal_type >= HEVC_NAL_TYPE_VCL_END:
+                    continue
+
+                # sub-layer non-reference pictures have even types below the IRAP types
+                is_reference = nal_type >= HEVC_NAL_TYPE_IRAP_START or nal_type % 2 == 1
+                nal_classes[index] = FRAME_REFERENCE if is_reference else FRAME_NON_REFERENCE
+
+                # the slice type is only parsed from the first slice segment of a picture, since the address of
+                # further segments depends on the sequence parameter set
+                (bits, bit_count) = __get_rbsp_bits(stream, start + 2, end)
+                (is_first_slice_segment, position) = __read_bits(bits, bit_count, 0, 1)
+                if not is_first_slice_segment:
+                    continue
+
+                if HEVC_NAL_TYPE_IRAP_START <= nal_type <= HEVC_NAL_TYPE_IRAP_END:
+                    position += 1  # no_output_of_prior_pics_flag
+
+                (pps_id, position) = __read_ue(bits, bit_count, position)
+                (slice_type, position) = __read_ue(bits, bit_count, position + extra_slice_header_bits.get(pps_id, 0))
+
+                if slice_type < len(HEVC_SLICE_FRAME_TYPES):
+                    nal_classes[index] |= HEVC_SLICE_FRAME_TYPES[slice_type]
+
+            else:
+                nal_type = header & 0x1f
+                nal_types[index] = nal_type
+
+                if nal_type not in H264_NAL_TYPES_SLICE:
+                    continue
+
+                nal_classes[index] = FRAME_REFERENCE if header & 0x60 else FRAME_NON_REFERENCE
+
+                (bits, bit_count) = __get_rbsp_bits(stream, start + 1, end)
+                (first_mb_in_slice, position) = __read_ue(bits, bit_count, 0)
+                (slice_type, position) = __read_ue(bits, bit_count, position)
+
+                nal_classes[index] |= H264_SLICE_FRAME_TYPES[slice_type % 5]
+
+        except IndexError:
+            # truncated or corrupted header -> the NAL unit is classified by its type only
+            continue
+
+    return nal_types, nal_classes
+
+
+def classify_packets(records, link_type, stream_mode, codec_format):
+    """
+    Classifies the packets of a captured video stream by the frames and NAL units they carry.
+
+    :param records: the records of the capture (see `util.packetIndex.PacketRecords`)
+    :type records: util.packetIndex.PacketRecords
+
+    :param link_type: the link layer type of the capture
+    :type link_type: int
+
+    :param stream_mode: the mode the video was streamed with (see `pvs.hrcTable.HrcTable.VALID_STREAM_MODES`)
+    :type stream_mode: basestring
+
+    :param codec_format: the codec of the video (see `CODEC_FORMATS`)
+    :type codec_format: basestring
+
+    :rtype: PacketClasses
+    """
+
+    from pvs.hrcTable import HrcTable
+
+    assert stream_mode in HrcTable.VALID_STREAM_MODES
+    assert codec_format in CODEC_FORMATS
+
+    payloads = __get_udp_payloads(records, link_type)
+
+    if stream_mode == HrcTable.DB_STREAM_MODE_FIELD_VALUE_RAW_RTP:
+        (stream, packet_starts, packet_ends, frame_starts) = __depacketize_rtp(payloads, codec_format)
+    else:
+        (stream, packet_starts, packet_ends, frame_starts) = __demultiplex_ts(
+            payloads, stream_mode == HrcTable.DB_STREAM_MODE_FIELD_VALUE_MPEGTS_RTP
+        )
+
+    # NAL units start behind the start codes; the start code itself is assigned to the NAL unit
+    data = numpy.frombuffer(stream, dtype=numpy.uint8)
+    nal_starts = numpy.flatnonzero((data[:-2] == 0) & (data[1:-1] == 0) & (data[2:] == 1)) + len(START_CODE)
+
+    (nal_types, nal_classes) = __parse_nal_units(stream, nal_starts, codec_format)
+    nal_bounds = nal_starts - len(START_CODE)
+
+    # the class of a frame consists of the classes of all its slices
+    frame_indexes = numpy.searchsorted(frame_starts, nal_bounds, 'right') - 1
+    frame_classes = numpy.zeros(len(frame_starts), dtype=numpy.uint8)
+
+    is_in_frame = frame_indexes >= 0
+    numpy.bitwise_or.at(frame_classes, frame_indexes[is_in_frame], nal_classes[is_in_frame])
+
+    # packets carrying data of a reference slice are never non-reference
+    frame_classes[frame_classes & FRAME_REFERENCE != 0] &= ~numpy.uint8(FRAME_NON_REFERENCE)
+
+    # map the packets' byte ranges on the frames and NAL units
+    is_carrying_data = packet_ends > packet_starts
+    last_bytes = numpy.maximum(packet_ends - 1, 0)
+
+    packet_first_frames = numpy.searchsorted(frame_starts, packet_starts, 'right') - 1
+    packet_last_frames = numpy.where(
+        is_carrying_data, numpy.searchsorted(frame_starts, last_bytes, 'right') - 1, -1
+    )
+
+    packet_first_nals = numpy.searchsorted(nal_bounds, packet_starts, 'right') - 1
+    packet_last_nals = numpy.where(is_carrying_data, numpy.searchsorted(nal_bounds, last_bytes, 'right') - 1, -1)
+
+    nal_type_masks = numpy.zeros(len(records), dtype=numpy.uint64)
+    for nal_type in numpy.unique(nal_types).tolist():
+        is_carrying_type = _is_any_in_ranges(nal_types == nal_type, packet_first_nals, packet_last_nals)
+        nal_type_masks[is_carrying_type] |= numpy.uint64(1) << numpy.uint64(nal_type)
+
+    return PacketClasses(frame_classes, packet_first_frames, packet_last_frames, nal_type_masks)
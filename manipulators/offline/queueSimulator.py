@@ -0,0 +1,234 @@
+"""
+Offline simulation of a bottleneck link: the packets of a capture pass a FIFO queue with a finite buffer in front of a
+link with a constant or time varying rate.
+
+Each packet arrives at its capture time. It is dropped if the queue discipline rejects it (tail drop: the packet does
+not fit into the buffer; RED: random early detection based on the average queue size, see Floyd & Jacobson, 1993), or
+it is enqueued and leaves the link after all packets in front of it and its own transmission are done. The queue is
+simulated packet by packet (the departure of a packet depends on the departure of the previous one), but all times are
+computed directly, so that no clock is simulated.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from bisect import bisect_right
+from collections import deque
+
+import numpy
+
+# weight of the current queue size in RED's exponentially weighted average (as proposed by Floyd & Jacobson)
+RED_QUEUE_WEIGHT = 0.002
+
+
+class RateSchedule(object):
+    """
+    Represents the rate of a link over the time, as piecewise constant function.
+    """
+
+    def __init__(self, change_times, rates):
+        """
+        Initializes the schedule.
+
+        :param change_times: the times (in s, ascending, starting with 0) from which the rates apply
+        :type change_times: list
+
+        :param rates: the rates (in bit/s) which apply from the change times on (the last rate applies forever)
+        :type rates: list
+        """
+
+        assert len(change_times) == len(rates) > 0
+        assert change_times[0] == 0
+        assert all(rate >= 0 for rate in rates)
+        assert rates[-1] > 0, "The last rate of a link has to be positive!"
+
+        self.__change_times = list(change_times)
+        self.__rates = list(rates)
+
+    @classmethod
+    def constant(cls, rate):
+        """
+        Returns the schedule of a link with a constant rate.
+
+        :param rate: the rate in bit/s
+        :type rate: float
+
+        :rtype: RateSchedule
+        """
+
+        return cls([0.0], [float(rate)])
+
+    @classmethod
+    def from_trace(cls, trace_file_path):
+        """
+        Returns the schedule of a rate trace, wherein each line consists of `<TIME_MS>,<RATE_KBIT_S>`.
+
+        :param trace_file_path: the path of the rate trace
+        :type trace_file_path: basestring
+
+        :rtype: RateSchedule
+        """
+
+        change_times = list()
+        rates = list()
+
+        with open(trace_file_path, 'rb') as trace_file:
+            for line in trace_file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+
+                try:
+                    (time, rate) = line.split(',')[:2]
+                    change_times.append(float(time) / 1000)
+                    rates.append(float(rate) * 1000)
+                except ValueError:
+                    raise ValueError('Invalid line `%s` in the rate trace `%s`!' % (line, trace_file_path))
+
+        assert change_times, "The rate trace `%s` is empty!" % trace_file_path
+
+        # the rate before the first entry is the rate of the first entry
+        change_times[0] = 0.0
+
+        return cls(change_times, rates)
+
+    def get_finish_time(self, start_time, bits):
+        """
+        Returns the time when a transmission is completed.
+
+        :param start_time: the time (in s) when the transmission starts
+        :type start_time: float
+
+        :param bits: the number of bits to transmit
+        :type bits: float
+
+        :return: the time (in s) when the transmission is completed
+        :rtype: float
+        """
+
+        segment = bisect_right(self.__change_times, start_time) - 1
+        last_segment = len(self.__rates) - 1
+        time = start_time
+
+        while segment < last_segment:
+            capacity = self.__rates[segment] * (self.__change_times[segment + 1] - time)
+            if capacity >= bits:
+                break
+
+            bits -= capacity
+            segment += 1
+            time = self.__change_times[segment]
+
+        return time + bits / self.__rates[segment]
+
+
+def simulate(arrival_times, packet_sizes, rate_schedule, buffer_size, is_buffer_in_bytes=True, red_settings=None,
+             random_state=None):
+    """
+    Simulates the bottleneck link.
+
+    :param arrival_times: the arrival times of the packets (in s, relative to the first packet, ascending)
+    :type arrival_times: numpy.ndarray
+
+    :param packet_sizes: the sizes of the packets in bytes
+    :type packet_sizes: numpy.ndarray
+
+    :param rate_schedule: the rate of the link
+    :type rate_schedule: RateSchedule
+
+    :param buffer_size: the size of the buffer (in bytes or packets)
+    :type buffer_size: int
+
+    :param is_buffer_in_bytes: true if the buffer size (and the RED thresholds) are given in bytes, false if in packets
+    :type is_buffer_in_bytes: bool
+
+    :param red_settings: tuple (min_threshold, max_threshold, max_probability) for a RED queue, None for a tail drop
+        queue
+    :type red_settings: tuple|None
+
+    :param random_state: the random number generator for the early drops (required for RED)
+    :type random_state: numpy.random.RandomState|None
+
+    :return: tuple (losses, departure_times): the loss of each packet and the departure time of each packet (in s,
+        NaN for lost packets)
+    :rtype: tuple
+    """
+
+    assert len(arrival_times) == len(packet_sizes)
+    assert isinstance(rate_schedule, RateSchedule)
+    assert buffer_size > 0
+    assert red_settings is None or (len(red_settings) == 3 and random_state is not None)
+
+    packet_count = len(arrival_times)
+    losses = numpy.zeros(packet_count, dtype=bool)
+    departure_times = numpy.full(packet_count, numpy.nan)
+
+    arrival_list = arrival_times.tolist()
+    size_list = packet_sizes.tolist()
+
+    if red_settings is not None:
+        (red_min, red_max, red_max_probability) = red_settings
+        drop_rnd = random_state.random_sample(packet_count).tolist()
+    else:
+        (red_min, red_max, red_max_probability) = (None, None, None)
+        drop_rnd = None
+
+    # the packets in the system (queued or in transmission) as tuples (departure time, size in buffer units)
+    in_system = deque()
+    occupancy = 0
+    last_departure = 0.0
+
+    average = 0.0
+    idle_since = None
+    count = -1
+
+    for i in xrange(packet_count):
+        arrival = arrival_list[i]
+        size = size_list[i] if is_buffer_in_bytes else 1
+
+        # release the packets which left the link until now
+        while in_system and in_system[0][0] <= arrival:
+            occupancy -= in_system.popleft()[1]
+
+        if red_settings is not None:
+            # update the average queue size; after an idle period it decays as if small packets had been sent
+            if occupancy == 0 and idle_since is not None:
+                average *= (1 - RED_QUEUE_WEIGHT) ** max(0.0, (arrival - idle_since) * 1000)
+            else:
+                average = (1 - RED_QUEUE_WEIGHT) * average + RED_QUEUE_WEIGHT * occupancy
+
+            is_dropped = False
+            if red_min <= average < red_max:
+                count += 1
+                probability = red_max_probability * (average - red_min) / (red_max - red_min)
+                if count * probability < 1:
+                    probability /= 1 - count * probability
+                else:
+                    probability = 1.0
+
+                if drop_rnd[i] < probability:
+                    is_dropped = True
+                    count = 0
+            elif average >= red_max:
+                is_dropped = True
+                count = 0
+            else:
+                count = -1
+
+            if is_dropped:
+                losses[i] = True
+                continue
+
+        # tail drop: the packet does not fit into the buffer anymore
+        if occupancy + size > buffer_size:
+            losses[i] = True
+            continue
+
+        last_departure = rate_schedule.get_finish_time(max(arrival, last_departure), size_list[i] * 8.0)
+        departure_times[i] = last_departure
+
+        in_system.append((last_departure, size))
+        occupancy += size
+
+        idle_since = last_departure
+
+    return losses, departure_times
@@ -0,0 +1,88 @@
+"""
+Selection of loss realizations by their statistics. On short clips the loss rate and the burst lengths which a loss
+model realizes vary widely from seed to seed, so several seeded realizations are generated and the one closest to the
+target statistics is kept. This makes the conditions of different sources comparable.
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+
+def get_loss_statistics(losses):
+    """
+    Returns the realized loss rate and mean burst length (consecutive lost packets) of each realization.
+
+    :param losses: the loss of each packet per realization (realizations x packets)
+    :type losses: numpy.ndarray
+
+    :return: tuple (loss_rates, mean_burst_lengths), 0 as mean burst length of realizations without loss
+    :rtype: tuple
+    """
+
+    assert losses.ndim == 2
+
+    lost_counts = losses.sum(axis=1)
+    burst_counts = (losses[:, 1:] & ~losses[:, :-1]).sum(axis=1) + losses[:, :1].sum(axis=1)
+
+    loss_rates = lost_counts / float(max(losses.shape[1], 1))
+    mean_burst_lengths = numpy.where(burst_counts > 0, lost_counts / numpy.maximum(burst_counts, 1.0), 0.0)
+
+    return loss_rates, mean_burst_lengths
+
+
+def select_realization(loss_rates, mean_burst_lengths, target_loss_rate=None, target_burst_length=None,
+                       loss_rate_tolerance=None, burst_length_tolerance=None):
+    """
+    Returns the realization which is closest to the target statistics. The distance is the sum of the relative
+    deviations from the targets. Realizations within the tolerances are preferred; if none of them is within the
+    tolerances, the closest realization is returned anyway.
+
+    :param loss_rates: the loss rate of each realization
+    :type loss_rates: numpy.ndarray
+
+    :param mean_burst_lengths: the mean burst length of each realization
+    :type mean_burst_lengths: numpy.ndarray
+
+    :param target_loss_rate: the target loss rate (None -> the mean of all realizations)
+    :type target_loss_rate: float|None
+
+    :param target_burst_length: the target mean burst length (None -> the mean of all realizations)
+    :type target_burst_length: float|None
+
+    :param loss_rate_tolerance: the maximum absolute deviation from the target loss rate (None -> unlimited)
+    :type loss_rate_tolerance: float|None
+
+    :param burst_length_tolerance: the maximum absolute deviation from the target burst length (None -> unlimited)
+    :type burst_length_tolerance: float|None
+
+    :return: tuple (index, is_accepted): the index of the selected realization and whether it is within the tolerances
+    :rtype: tuple
+    """
+
+    assert len(loss_rates) == len(mean_burst_lengths) > 0
+
+    if target_loss_rate is None:
+        target_loss_rate = float(numpy.mean(loss_rates))
+
+    if target_burst_length is None:
+        target_burst_length = float(numpy.mean(mean_burst_lengths))
+
+    loss_rate_deviations = numpy.abs(loss_rates - target_loss_rate)
+    burst_length_deviations = numpy.abs(mean_burst_lengths - target_burst_length)
+
+    distances = loss_rate_deviations / max(target_loss_rate, 1e-9) \
+        + burst_length_deviations / max(target_burst_length, 1e-9)
+
+    is_accepted = numpy.ones(len(loss_rates), dtype=bool)
+    if loss_rate_tolerance is not None:
+        is_accepted &= loss_rate_deviations <= loss_rate_tolerance
+    if burst_length_tolerance is not None:
+        is_accepted &= burst_length_deviations <= burst_length_tolerance
+
+    if is_accepted.any():
+        distances = numpy.where(is_accepted, distances, numpy.inf)
+
+    index = int(numpy.argmin(distances))
+
+    return index, bool(is_accepted[index])
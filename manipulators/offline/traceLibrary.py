@@ -0,0 +1,166 @@
+"""
+Loads loss traces of the `traces` folder (as used by the telchemy `read_trace` manipulations) and applies them on
+captures in-process.
+
+A trace contains one line per packet; the first value of a line is `1` if the packet is received and `0` if it is
+lost (the format written by the loss trace parser). Compact traces (see `compactTrace`) are read as well. Each trace
+is parsed once per process into a boolean loss array. If a cache folder is given, the parsed trace is also saved there
+as `.npy` file and is memory-mapped by all further loads, so that a large trace library is parsed only once at all.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from threading import Lock
+
+import numpy
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+# characters of a trace
+TRACE_VALUE_RECEIVED = ord('1')
+TRACE_VALUE_LOST = ord('0')
+
+# dict((trace file path, mtime, size) => losses) of the traces loaded by this process
+__traces = dict()
+__traces_lock = Lock()
+
+
+def parse_trace(trace_file_path):
+    """
+    Parses a trace file.
+
+    :param trace_file_path: the path of the trace file
+    :type trace_file_path: basestring
+
+    :return: the loss of each packet of the trace
+    :rtype: numpy.ndarray
+
+    :raises ValueError: if the trace contains invalid values
+    """
+
+    assert isinstance(trace_file_path, basestring)
+
+    from manipulators.offline.compactTrace import is_compact_trace, CompactTrace
+
+    if is_compact_trace(trace_file_path):
+        return CompactTrace(trace_file_path).get_losses()
+
+    with open(trace_file_path, 'rb') as trace_file:
+        content = trace_file.read()
+
+    # fast path: traces which only consist of single digits and white spaces are parsed at once
+    characters = numpy.frombuffer(content, dtype=numpy.uint8)
+    is_value = (characters == TRACE_VALUE_RECEIVED) | (characters == TRACE_VALUE_LOST)
+
+    if numpy.all(is_value | numpy.isin(characters, numpy.frombuffer(' \t\r\n', dtype=numpy.uint8))):
+        return characters[is_value] == TRACE_VALUE_LOST
+
+    # otherwise take the first value of each line (e.g. traces with further columns)
+    values = list()
+    for line in content.splitlines():
+        value = line.split(',')[0].strip()
+        if not value:
+            continue
+        if value not in ('0', '1'):
+            raise ValueError('Invalid value `%s` in the trace `%s`!' % (value, trace_file_path))
+        values.append(value == '0')
+
+    return numpy.array(values, dtype=bool)
+
+
+def load_trace(trace_file_path, cache_dir_path=None):
+    """
+    Returns the losses of a trace file, which is parsed only if it is not loaded or cached yet.
+
+    :param trace_file_path: the path of the trace file
+    :type trace_file_path: basestring
+
+    :param cache_dir_path: the folder wherein parsed traces are cached (None -> cached in memory only)
+    :type cache_dir_path: basestring|None
+
+    :return: the loss of each packet of the trace (read only)
+    :rtype: numpy.ndarray
+    """
+
+    assert isinstance(trace_file_path, basestring)
+    assert cache_dir_path is None or isinstance(cache_dir_path, basestring)
+
+    from os import stat
+    from os.path import abspath
+
+    trace_stat = stat(trace_file_path)
+    key = (abspath(trace_file_path), trace_stat.st_mtime, trace_stat.st_size)
+
+    with __traces_lock:
+        if key in __traces:
+            return __traces[key]
+
+    losses = None
+    cache_file_path = None
+
+    if cache_dir_path is not None:
+        from hashlib import md5
+
+        cache_file_path = cache_dir_path.rstrip(PATH_SEPARATOR) + PATH_SEPARATOR \
+            + 'trace_' + md5(repr(key)).hexdigest() + '.npy'
+
+        try:
+            losses = numpy.load(cache_file_path, mmap_mode='r')
+        except (IOError, OSError, ValueError):
+            losses = None
+
+    if losses is None:
+        losses = parse_trace(trace_file_path)
+
+        if cache_file_path is not None:
+            from os import rename
+
+            with open(cache_file_path + '.part', 'wb') as cache_file:
+                numpy.save(cache_file, losses)
+            rename(cache_file_path + '.part', cache_file_path)
+
+        losses.setflags(write=False)
+
+    with __traces_lock:
+        __traces[key] = losses
+
+    return losses
+
+
+def get_trace_losses(trace_losses, packet_count, offset=0, is_looped=False):
+    """
+    Maps the losses of a trace on the packets of a capture.
+
+    :param trace_losses: the loss of each packet of the trace
+    :type trace_losses: numpy.ndarray
+
+    :param packet_count: the number of packets of the capture
+    :type packet_count: int
+
+    :param offset: the index of the trace's packet which is mapped on the first packet of the capture
+    :type offset: int
+
+    :param is_looped: true if the trace is repeated, if it is shorter than the capture, false if the packets after the
+        trace's end are received
+    :type is_looped: bool
+
+    :return: the loss of each packet of the capture
+    :rtype: numpy.ndarray
+    """
+
+    assert isinstance(packet_count, int) and packet_count >= 0
+    assert isinstance(offset, int) and offset >= 0
+    assert isinstance(is_looped, bool)
+
+    trace_length = len(trace_losses)
+
+    if is_looped and trace_length > 0:
+        return trace_losses[(offset + numpy.arange(packet_count)) % trace_length]
+
+    losses = numpy.zeros(packet_count, dtype=bool)
+
+    window = trace_losses[offset:offset + packet_count]
+    losses[:len(window)] = window
+
+    return losses
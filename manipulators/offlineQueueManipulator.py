@@ -0,0 +1,146 @@
+__author__ = 'Alexander Dethof'
+
+from abstractOfflineManipulator import AbstractOfflineManipulator
+from manipulators.resources.queueManipulatorResource import QueueManipulatorResource as QueueRes
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+
+class OfflineQueueManipulator(AbstractOfflineManipulator):
+    """
+    Class to represent an offline manipulation, which lets the packets of a capture pass a simulated bottleneck link:
+    a tail drop or RED queue with a finite buffer in front of a link with a constant or trace-driven rate. The losses
+    and delays are hence caused by the sizes and timestamps of the stream itself (see
+    `manipulators.offline.queueSimulator`).
+
+    Besides the manipulated capture, the queueing delay of each packet (the time it waits in the buffer until its
+    transmission starts, without the transmission time itself) is dumped next to the destination file.
+    """
+
+    # path of the manipulator resource table
+    MANIPULATOR_RESOURCE_PATH = 'hrc' + PATH_SEPARATOR + 'packet_loss' + PATH_SEPARATOR + QueueRes.DB_TABLE_NAME
+
+    # folder (in the PATH folder) wherein the rate traces are located
+    TRACES_FOLDER_NAME = 'traces'
+
+    # suffix of the file, wherein the queueing delays are dumped
+    QUEUEING_DELAY_TRACE_SUFFIX = '_queueing_delay'
+
+    def _get_resource_handler(self):
+        """
+        Returns the queue manipulator resource handler
+
+        :return: The queue manipulator resource handler
+        """
+
+        return QueueRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH)
+
+    def __get_rate_schedule(self):
+        """
+        Returns the rate of the simulated link.
+
+        :rtype: manipulators.offline.queueSimulator.RateSchedule
+        """
+
+        from manipulators.offline.queueSimulator import RateSchedule
+
+        trace_file_name = self._settings.get(QueueRes.DB_RATE_TRACE_FILE_NAME_FIELD_NAME)
+        if not trace_file_name:
+            return RateSchedule.constant(self._settings[QueueRes.DB_RATE_FIELD_NAME] * 1000)
+
+        trace_file_path = self._path + self.TRACES_FOLDER_NAME + PATH_SEPARATOR + trace_file_name
+
+        from os.path import isfile
+        assert isfile(trace_file_path), \
+            "The specified rate trace file: `%s` is not a valid existing file!" % trace_file_path
+
+        return RateSchedule.from_trace(trace_file_path)
+
+    def __get_queueing_delay_trace_file_path(self):
+        """
+        Returns the path where the queueing delays are dumped in.
+
+        :rtype: str
+        """
+
+        # noinspection PyPep8Naming
+        from os.path import splitext, extsep as FILE_EXTENSION_SEPARATOR
+
+        return splitext(self._dst_file_path)[0] + self.QUEUEING_DELAY_TRACE_SUFFIX + FILE_EXTENSION_SEPARATOR + 'csv'
+
+    def __write_queueing_delay_trace(self, queueing_delays):
+        """
+        Dumps the queueing delay of each packet (in ms, -1 for dropped packets), one per line.
+
+        :param queueing_delays: the queueing delays in s (NaN for dropped packets)
+        :type queueing_delays: numpy.ndarray
+        """
+
+        import numpy
+
+        trace = numpy.where(numpy.isnan(queueing_delays), -1, queueing_delays * 1000)
+        numpy.savetxt(self.__get_queueing_delay_trace_file_path(), trace, fmt='%.3f')
+
+    def _get_received_packets(self, timestamps, packet_sizes, units_per_second):
+        """
+        Simulates the bottleneck link on the packets of the capture.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param packet_sizes: the original lengths of the packets in bytes (as on the wire, including all headers)
+        :type packet_sizes: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps
+        :type units_per_second: int
+
+        :return: tuple (losses, indexes, arrivals), see `AbstractOfflineManipulator._get_received_packets`
+        :rtype: tuple
+        """
+
+        import numpy
+        from manipulators.offline.queueSimulator import simulate
+
+        if len(timestamps):
+            arrival_times = (timestamps - timestamps[0]) / float(units_per_second)
+        else:
+            arrival_times = numpy.zeros(0)
+
+        red_settings = None
+        random_state = None
+
+        if self._settings[QueueRes.DB_DISCIPLINE_FIELD_NAME] == QueueRes.DB_DISCIPLINE_RED_VALUE:
+            from numpy.random import RandomState
+
+            red_settings = (
+                self._settings[QueueRes.DB_RED_MIN_THRESHOLD_FIELD_NAME],
+                self._settings[QueueRes.DB_RED_MAX_THRESHOLD_FIELD_NAME],
+                self._settings[QueueRes.DB_RED_MAX_PROBABILITY_FIELD_NAME] / 100
+            )
+            random_state = RandomState(self._get_seed(self._settings.get(QueueRes.DB_SEED_FIELD_NAME)))
+
+        (losses, departure_times) = simulate(
+            arrival_times,
+            packet_sizes,
+            self.__get_rate_schedule(),
+            self._settings[QueueRes.DB_BUFFER_SIZE_FIELD_NAME],
+            self._settings[QueueRes.DB_BUFFER_UNIT_FIELD_NAME] == QueueRes.DB_BUFFER_UNIT_BYTES_VALUE,
+            red_settings,
+            random_state
+        )
+
+        # the link is a FIFO, so the packets keep their order
+        indexes = numpy.flatnonzero(~losses)
+
+        # the transmission of a packet starts, when it arrived and the previous packet departed
+        previous_departures = numpy.concatenate(([0.0], departure_times[indexes]))[:-1]
+        queueing_delays = numpy.full(len(arrival_times), numpy.nan)
+        queueing_delays[indexes] = numpy.maximum(arrival_times[indexes], previous_departures) - arrival_times[indexes]
+
+        self.__write_queueing_delay_trace(queueing_delays)
+
+        arrivals = timestamps[indexes] \
+            + numpy.round((departure_times[indexes] - arrival_times[indexes]) * units_per_second).astype(numpy.int64)
+
+        return losses, indexes, arrivals
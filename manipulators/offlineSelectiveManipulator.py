@@ -0,0 +1,196 @@
+__author__ = 'Alexander Dethof'
+
+from abstractOfflineManipulator import AbstractOfflineManipulator
+from manipulators.resources.selectiveManipulatorResource import SelectiveManipulatorResource as SelectiveRes
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+
+class OfflineSelectiveManipulator(AbstractOfflineManipulator):
+    """
+    Class to represent an offline manipulation, which drops packets by their content instead of a random or markov
+    model: the packets of the capture are classified by the frames and NAL units they carry (see
+    `manipulators.offline.packetClassifier`), and the packets of the frames selected by the configured rule (frame
+    type, reference flag, NAL unit types) are lost, either packet by packet or frame by frame.
+
+    The classification requires the stream mode and the codec of the stream (see `set_stream_settings`).
+    """
+
+    # path of the manipulator resource table
+    MANIPULATOR_RESOURCE_PATH = 'hrc' + PATH_SEPARATOR + 'packet_loss' + PATH_SEPARATOR + SelectiveRes.DB_TABLE_NAME
+
+    def __init__(self, parent, manipulator_settings_id, config_path):
+        """
+        Creates the manipulator for the given settings.
+
+        :param parent: The parent which invoked the creation
+        :type parent: tool.abstractTool.AbstractTool
+
+        :param manipulator_settings_id: the id of the settings to manipulate for
+        :type manipulator_settings_id: int
+
+        :param config_path: the path where the config is located
+        :type config_path: basestring
+        """
+
+        super(OfflineSelectiveManipulator, self).__init__(parent, manipulator_settings_id, config_path)
+
+        self.__stream_mode = None
+        self.__codec_format = None
+        self.__packet_classes = None
+
+    def _get_resource_handler(self):
+        """
+        Returns the selective manipulator resource handler
+
+        :return: The selective manipulator resource handler
+        """
+
+        return SelectiveRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH)
+
+    def set_stream_settings(self, stream_mode, codec_format):
+        """
+        Sets how the video of the capture was encoded and streamed.
+
+        :param stream_mode: the mode the video was streamed with (see `pvs.hrcTable.HrcTable.VALID_STREAM_MODES`)
+        :type stream_mode: basestring
+
+        :param codec_format: the codec of the video (see `manipulators.offline.packetClassifier.CODEC_FORMATS`)
+        :type codec_format: basestring
+
+        :return: self
+        :rtype: OfflineSelectiveManipulator
+        """
+
+        from pvs.hrcTable import HrcTable
+        from manipulators.offline.packetClassifier import CODEC_FORMATS
+
+        assert stream_mode in HrcTable.VALID_STREAM_MODES
+        assert codec_format in CODEC_FORMATS, "Selective losses are not supported for the codec `%s`!" % codec_format
+
+        self.__stream_mode = stream_mode
+        self.__codec_format = codec_format
+        return self
+
+    def _index_packets(self, records, link_type, shared_results):
+        """
+        Classifies the packets of the capture by the frames and NAL units they carry. The classification is shared by
+        all selective manipulators of a single pass with the same stream settings.
+
+        :param records: the records of the capture (see `util.packetIndex.PacketRecords`)
+        :type records: util.packetIndex.PacketRecords
+
+        :param link_type: the link layer type of the capture
+        :type link_type: int
+
+        :param shared_results: the results of the inspections of a single pass by key
+        :type shared_results: dict
+        """
+
+        from manipulators.offline.packetClassifier import classify_packets
+
+        assert self.__stream_mode and self.__codec_format, "No stream settings specified!"
+        assert isinstance(shared_results, dict)
+
+        key = (classify_packets, self.__stream_mode, self.__codec_format)
+        if key not in shared_results:
+            shared_results[key] = classify_packets(records, link_type, self.__stream_mode, self.__codec_format)
+
+        self.__packet_classes = shared_results[key]
+
+    def __get_selected_frames(self):
+        """
+        Returns the frames which match the frame type and reference flag of the rule.
+
+        :rtype: numpy.ndarray
+        """
+
+        from manipulators.offline.packetClassifier import \
+            FRAME_TYPE_I, FRAME_TYPE_P, FRAME_TYPE_B, FRAME_REFERENCE, FRAME_NON_REFERENCE
+
+        frame_types = self.__packet_classes.get_frame_types()
+        frame_classes = self.__packet_classes.frame_classes
+
+        frame_type = self._settings[SelectiveRes.DB_FRAME_TYPE_FIELD_NAME]
+        if frame_type == SelectiveRes.DB_FRAME_TYPE_ANY_VALUE:
+            is_selected = frame_types != 0
+        else:
+            is_selected = frame_types == {
+                SelectiveRes.DB_FRAME_TYPE_I_VALUE: FRAME_TYPE_I,
+                SelectiveRes.DB_FRAME_TYPE_P_VALUE: FRAME_TYPE_P,
+                SelectiveRes.DB_FRAME_TYPE_B_VALUE: FRAME_TYPE_B
+            }[frame_type]
+
+        reference = self._settings[SelectiveRes.DB_REFERENCE_FIELD_NAME]
+        if reference == SelectiveRes.DB_REFERENCE_REFERENCE_VALUE:
+            is_selected &= frame_classes & FRAME_REFERENCE != 0
+        elif reference == SelectiveRes.DB_REFERENCE_NON_REFERENCE_VALUE:
+            is_selected &= frame_classes & FRAME_NON_REFERENCE != 0
+
+        return is_selected
+
+    def __get_nal_type_selection(self, packet_count):
+        """
+        Returns the packets which carry data of the NAL unit types of the rule.
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :rtype: numpy.ndarray
+        """
+
+        import numpy
+
+        nal_types = self._settings[SelectiveRes.DB_NAL_TYPES_FIELD_NAME]
+        if not nal_types:
+            return numpy.ones(packet_count, dtype=bool)
+
+        mask = numpy.uint64(0)
+        for nal_type in nal_types:
+            mask |= numpy.uint64(1) << numpy.uint64(nal_type)
+
+        return self.__packet_classes.nal_type_masks & mask != 0
+
+    def _get_received_packets(self, timestamps, packet_sizes, units_per_second):
+        """
+        Drops the packets selected by the rule.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param packet_sizes: the original lengths of the packets in bytes (unused)
+        :type packet_sizes: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps (unused)
+        :type units_per_second: int
+
+        :return: tuple (losses, indexes, arrivals), see `AbstractOfflineManipulator._get_received_packets`
+        :rtype: tuple
+        """
+
+        import numpy
+        from numpy.random import RandomState
+
+        assert self.__packet_classes is not None, "The packets were not classified!"
+
+        packet_count = len(timestamps)
+        loss_probability = self._settings[SelectiveRes.DB_LOSS_RATE_FIELD_NAME] / 100
+        random_state = RandomState(self._get_seed(self._settings[SelectiveRes.DB_SEED_FIELD_NAME]))
+
+        is_frame_selected = self.__get_selected_frames()
+        is_nal_type_selected = self.__get_nal_type_selection(packet_count)
+
+        if self._settings[SelectiveRes.DB_UNIT_FIELD_NAME] == SelectiveRes.DB_UNIT_FRAME_VALUE:
+            is_frame_lost = is_frame_selected & (random_state.random_sample(len(is_frame_selected)) < loss_probability)
+            losses = self.__packet_classes.get_packets_carrying(is_frame_lost) & is_nal_type_selected
+        else:
+            is_packet_selected = self.__packet_classes.get_packets_carrying(is_frame_selected) & is_nal_type_selected
+            losses = is_packet_selected & (random_state.random_sample(packet_count) < loss_probability)
+
+        print '# \033[1m\033[94mSELECTIVE: %d of %d frames selected, %d of %d packets lost\033[0m' % (
+            int(is_frame_selected.sum()), len(is_frame_selected), int(losses.sum()), packet_count
+        )
+
+        indexes = numpy.flatnonzero(~losses)
+        return losses, indexes, timestamps[indexes]
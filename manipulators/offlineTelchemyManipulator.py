@@ -0,0 +1,207 @@
+__author__ = 'Alexander Dethof'
+
+from abstractOfflineManipulator import AbstractOfflineManipulator
+from manipulators.resources.telchemyManipulatorResource import \
+    TelchemyManipulatorResource as TelchemyRes, \
+    TelchemyManipulatorMarkovResource as TelchemyMarkovRes, \
+    TelchemyManipulatorMarkov2StateResource as Markov2StateRes, \
+    TelchemyManipulatorReadTraceResource as TelchemyReadTraceRes
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+
+class OfflineTelchemyManipulator(AbstractOfflineManipulator):
+    """
+    Class to represent an in-process manipulation with the settings of the telchemy manipulator, instead of rewriting
+    the capture with tpkloss.
+
+    Of the markov models only the 2-state model is supported: it is the Gilbert-Elliot model with the transition
+    probabilities pbc (gap -> burst) and pcb (burst -> gap) and the loss probabilities g (gap) and b (burst). Like
+    tpkloss, the loss is only inserted between `start_after` ms after the first and `end_before` ms before the last
+    packet.
+
+    Traces of read trace manipulations are parsed once and applied from memory (see
+    `manipulators.offline.traceLibrary`).
+    """
+
+    # path of the manipulator resource table (the settings are shared with the telchemy manipulator)
+    MANIPULATOR_RESOURCE_PATH = 'hrc' + PATH_SEPARATOR + 'packet_loss' + PATH_SEPARATOR + TelchemyRes.DB_TABLE_NAME
+
+    def _get_resource_handler(self):
+        """
+        Returns the telchemy manipulator resource handler
+
+        :return: The telchemy manipulator resource handler
+        """
+
+        return TelchemyRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH)
+
+    def __get_markov_settings(self):
+        """
+        Returns the settings of the markov manipulation.
+
+        :rtype: dict
+        """
+
+        markov_res = TelchemyMarkovRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR + 'markov')
+        return markov_res.get_row_with_id(int(self._settings[TelchemyRes.DB_FIELD_MANIPULATION_ID]))
+
+    def __get_model_parameters(self, markov_settings):
+        """
+        Returns the parameters of the 2-state markov model.
+
+        :param markov_settings: the settings of the markov manipulation
+        :type markov_settings: dict
+
+        :return: the transition and loss probabilities in [0, 1]
+        :rtype: dict
+        """
+
+        markov_type = markov_settings[TelchemyMarkovRes.DB_FIELD_MARKOV_TYPE]
+        if markov_type != TelchemyMarkovRes.DB_FIELD_VALUE_MARKOV_TYPE_2STATE_VALUE:
+            raise KeyError('The `%s`-model can not be applied offline, use the `telchemy` manipulator!' % markov_type)
+
+        markov_2_state_res = Markov2StateRes(
+            self._config_path + self.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR + 'markov' + PATH_SEPARATOR
+            + Markov2StateRes.DB_TABLE_NAME
+        )
+        model_settings = markov_2_state_res.get_row_with_id(int(markov_settings[TelchemyMarkovRes.DB_FIELD_MARKOV_ID]))
+
+        return {
+            'pbc': float(model_settings[Markov2StateRes.DB_FIELD_NAME_PBC]) / 100,
+            'pcb': float(model_settings[Markov2StateRes.DB_FIELD_NAME_PCB]) / 100,
+            'g': float(model_settings[Markov2StateRes.DB_FIELD_NAME_G]) / 100,
+            'b': float(model_settings[Markov2StateRes.DB_FIELD_NAME_B]) / 100
+        }
+
+    def __get_markov_losses(self, timestamps, units_per_second):
+        """
+        Applies the 2-state markov model on the packets of the capture.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps
+        :type units_per_second: int
+
+        :return: the loss of each packet
+        :rtype: numpy.ndarray
+        """
+
+        from numpy.random import RandomState
+        from manipulators.offline.lossModels import get_gilbert_elliott_losses, get_losses_batch
+        from manipulators.offline.maskStore import MODEL_MARKOV_2STATE
+
+        markov_settings = self.__get_markov_settings()
+        parameters = self.__get_model_parameters(markov_settings)
+        seed = self._get_seed(markov_settings.get(TelchemyMarkovRes.DB_FIELD_SEED))
+
+        def generate_batch(seeds, count):
+            return get_losses_batch(
+                get_gilbert_elliott_losses,
+                [RandomState(realization_seed) for realization_seed in seeds],
+                count,
+                p=parameters['pbc'],
+                r=parameters['pcb'],
+                bad_loss_rate=parameters['b'],
+                good_loss_rate=parameters['g']
+            )
+
+        # restrict the loss to the configured window of the transmission
+        window = None
+        if len(timestamps):
+            units_per_ms = units_per_second / 1000
+            window_start = timestamps[0] + int(markov_settings[TelchemyMarkovRes.DB_FIELD_START_AFTER]) * units_per_ms
+            window_end = timestamps[-1] - int(markov_settings[TelchemyMarkovRes.DB_FIELD_END_BEFORE]) * units_per_ms
+            window = (timestamps >= window_start) & (timestamps <= window_end)
+
+        targets = dict()
+        for (target_name, field_name, scale) in (
+            ('target_loss_rate', TelchemyMarkovRes.DB_FIELD_TARGET_LOSS_RATE, 0.01),
+            ('loss_rate_tolerance', TelchemyMarkovRes.DB_FIELD_LOSS_RATE_TOLERANCE, 0.01),
+            ('target_burst_length', TelchemyMarkovRes.DB_FIELD_TARGET_BURST_LENGTH, 1),
+            ('burst_length_tolerance', TelchemyMarkovRes.DB_FIELD_BURST_LENGTH_TOLERANCE, 1)
+        ):
+            if field_name in markov_settings:
+                targets[target_name] = float(markov_settings[field_name]) * scale
+
+        losses = self._get_selected_losses(
+            MODEL_MARKOV_2STATE, parameters, seed, len(timestamps), generate_batch, targets, window
+        )
+
+        if window is not None:
+            losses = losses & window
+
+        return losses
+
+    def __get_read_trace_losses(self, packet_count):
+        """
+        Maps the losses of the configured trace on the packets of the capture.
+
+        :param packet_count: the number of packets of the capture
+        :type packet_count: int
+
+        :return: the loss of each packet
+        :rtype: numpy.ndarray
+        """
+
+        from manipulators.offline.traceLibrary import load_trace, get_trace_losses
+        from manipulators.telchemyManipulators.telchemyReadTraceManipulator import TRACES_FOLDER_NAME
+
+        read_trace_res = TelchemyReadTraceRes(
+            self._config_path + self.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR + TelchemyReadTraceRes.DB_TABLE_NAME
+        )
+        read_trace_settings = read_trace_res.get_row_with_id(int(self._settings[TelchemyRes.DB_FIELD_MANIPULATION_ID]))
+
+        trace_file_path = self._path \
+            + TRACES_FOLDER_NAME \
+            + PATH_SEPARATOR \
+            + read_trace_settings[TelchemyReadTraceRes.DB_FIELD_NAME_TRACE_FILE_NAME]
+
+        from os.path import isfile
+        assert isfile(trace_file_path), \
+            "The specified trace file: `%s` is not a valid existing file!" % trace_file_path
+
+        cache_dir_path = self._mask_store.get_dir_path() if self._mask_store is not None else None
+
+        return get_trace_losses(
+            load_trace(trace_file_path, cache_dir_path),
+            packet_count,
+            int(read_trace_settings.get(TelchemyReadTraceRes.DB_FIELD_NAME_OFFSET, 0)),
+            bool(int(read_trace_settings.get(TelchemyReadTraceRes.DB_FIELD_NAME_LOOP, 0)))
+        )
+
+    def _get_received_packets(self, timestamps, packet_sizes, units_per_second):
+        """
+        Applies the telchemy manipulation on the packets of the capture.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param packet_sizes: the original lengths of the packets in bytes (unused)
+        :type packet_sizes: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps
+        :type units_per_second: int
+
+        :return: tuple (losses, indexes, arrivals), see `AbstractOfflineManipulator._get_received_packets`
+        :rtype: tuple
+        """
+
+        import numpy
+
+        manipulation_type = self._settings[TelchemyRes.DB_FIELD_MANIPULATION_TYPE]
+
+        if manipulation_type == TelchemyRes.MANIPULATION_TYPE_MARKOV:
+            losses = self.__get_markov_losses(timestamps, units_per_second)
+
+        elif manipulation_type == TelchemyRes.MANIPULATION_TYPE_READ_TRACE:
+            losses = self.__get_read_trace_losses(len(timestamps))
+
+        else:
+            raise KeyError("Unknown manipulator type: `%s`" % manipulation_type)
+
+        indexes = numpy.flatnonzero(~losses)
+
+        return losses, indexes, timestamps[indexes]
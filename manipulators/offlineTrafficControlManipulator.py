@@ -0,0 +1,225 @@
+__author__ = 'Alexander Dethof'
+
+from abstractOfflineManipulator import AbstractOfflineManipulator
+from manipulators.resources.trafficControlManipulatorResource import TrafficControlManipulatorResource as TCRes
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+
+class OfflineTrafficControlManipulator(AbstractOfflineManipulator):
+    """
+    Class to represent an offline manipulation, which applies the settings of the traffic control manipulator (delay,
+    jitter, loss models) directly on the timestamps and the order of the packets of a pcap file, instead of replaying
+    the file through a netem qdisc. No root privileges, no tc and no real-time replay are required.
+
+    The random numbers are seeded by the configured seed or by the name of the destination file, so that a
+    manipulation is reproducible.
+    """
+
+    # path of the manipulator resource table (the settings are shared with the online manipulator)
+    MANIPULATOR_RESOURCE_PATH = 'hrc' + PATH_SEPARATOR + 'packet_loss' + PATH_SEPARATOR + TCRes.DB_TABLE_NAME
+
+    # index of the random stream of the losses (the delays use the seed's main stream)
+    LOSS_RANDOM_STREAM = 1
+
+    def _get_resource_handler(self):
+        """
+        Returns the resource handler for the offline manipulation.
+
+        :return: The resource handler for the offline manipulation
+        """
+
+        return TCRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH)
+
+    def __get_loss_mode_settings(self, resource_class, table_name):
+        """
+        Returns the settings of the configured loss mode.
+
+        :param resource_class: the class of the loss mode's resource table
+        :type resource_class: type
+
+        :param table_name: the name of the loss mode's resource table
+        :type table_name: basestring
+
+        :rtype: dict
+        """
+
+        loss_mode_id = int(self._settings[TCRes.DB_LOSS_MODE_ID_FIELD_NAME])
+        tc_loss_res = resource_class(self._config_path + self.MANIPULATOR_RESOURCE_PATH + PATH_SEPARATOR + table_name)
+
+        return tc_loss_res.get_row_with_id(loss_mode_id)
+
+    def __get_loss_model(self):
+        """
+        Returns the configured loss model with its parameters.
+
+        :return: tuple (model, parameters, get_losses): the name of the model, its parameters (probabilities in [0, 1])
+            and the function of `manipulators.offline.lossModels` which generates its losses
+        :rtype: tuple
+        """
+
+        from manipulators.offline import lossModels, maskStore
+
+        loss_mode = self._settings[TCRes.DB_LOSS_MODE_FIELD_NAME]
+
+        if loss_mode == TCRes.DB_LOSS_MODE_RANDOM_VALUE:
+            from manipulators.resources.trafficControlManipulatorResource \
+                import TrafficControlManipulatorRandomModeResource \
+                as TCLossRes
+
+            settings = self.__get_loss_mode_settings(TCLossRes, 'random')
+            parameters = {'loss_rate': float(settings[TCLossRes.DB_LOSS_RATE_FIELD_NAME]) / 100}
+
+            return maskStore.MODEL_RANDOM, parameters, lossModels.get_random_losses
+
+        if loss_mode == TCRes.DB_LOSS_MODE_STATE_VALUE:
+            from manipulators.resources.trafficControlManipulatorResource \
+                import TrafficControlManipulatorStateModeResource \
+                as TCLossRes
+
+            settings = self.__get_loss_mode_settings(TCLossRes, 'state')
+            parameters = {'p13': float(settings[TCLossRes.DB_P13_FIELD_NAME]) / 100}
+
+            # the optional probabilities are positional, like the arguments of tc
+            for (parameter_name, field_name) in (
+                ('p31', TCLossRes.DB_P31_FIELD_NAME),
+                ('p32', TCLossRes.DB_P32_FIELD_NAME),
+                ('p23', TCLossRes.DB_P23_FIELD_NAME),
+                ('p14', TCLossRes.DB_P14_FIELD_NAME)
+            ):
+                if field_name not in settings:
+                    break
+                parameters[parameter_name] = float(settings[field_name]) / 100
+
+            return maskStore.MODEL_STATE, parameters, lossModels.get_4state_losses
+
+        if loss_mode == TCRes.DB_LOSS_MODE_GE_VALUE:
+            from manipulators.resources.trafficControlManipulatorResource \
+                import TrafficControlManipulatorGeModelResource \
+                as TCLossRes
+
+            settings = self.__get_loss_mode_settings(TCLossRes, 'gemodel')
+            parameters = {'p': float(settings[TCLossRes.DB_BAD_PROB_FIELD_NAME]) / 100}
+
+            # the optional probabilities are positional, like the arguments the online manipulator passes to tc
+            for (parameter_name, field_name) in (
+                ('r', TCLossRes.DB_GOOD_PROB_FIELD_NAME),
+                ('bad_loss_rate', TCLossRes.DB_GOOD_LOSS_PROB_FIELD_NAME),
+                ('good_loss_rate', TCLossRes.DB_BAD_LOSS_PROB_FIELD_NAME)
+            ):
+                if field_name not in settings:
+                    break
+                parameters[parameter_name] = float(settings[field_name]) / 100
+
+            return maskStore.MODEL_GEMODEL, parameters, lossModels.get_gilbert_elliott_losses
+
+        raise KeyError('Unknown loss mode `%s` given.' % loss_mode)
+
+    def __get_realization_targets(self):
+        """
+        Returns the target statistics of the realization to select (see `_get_selected_losses`).
+
+        :rtype: dict
+        """
+
+        targets = dict()
+        for (target_name, field_name, scale) in (
+            ('target_loss_rate', TCRes.DB_TARGET_LOSS_RATE_FIELD_NAME, 0.01),
+            ('loss_rate_tolerance', TCRes.DB_LOSS_RATE_TOLERANCE_FIELD_NAME, 0.01),
+            ('target_burst_length', TCRes.DB_TARGET_BURST_LENGTH_FIELD_NAME, 1),
+            ('burst_length_tolerance', TCRes.DB_BURST_LENGTH_TOLERANCE_FIELD_NAME, 1)
+        ):
+            if field_name in self._settings:
+                targets[target_name] = float(self._settings[field_name]) * scale
+
+        return targets
+
+    def __get_losses(self, seed, packet_count):
+        """
+        Returns the losses of the configured loss model.
+
+        :param seed: the seed of the manipulation's random numbers
+        :type seed: int|long
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :return: the loss of each packet
+        :rtype: numpy.ndarray
+        """
+
+        from numpy.random import RandomState
+        from manipulators.offline.lossModels import get_losses_batch
+
+        (model, parameters, get_losses) = self.__get_loss_model()
+
+        def generate_batch(seeds, count):
+            # the losses use an own random stream, so that they do not depend on the delays
+            random_states = [RandomState([realization_seed, self.LOSS_RANDOM_STREAM]) for realization_seed in seeds]
+            return get_losses_batch(get_losses, random_states, count, **parameters)
+
+        return self._get_selected_losses(
+            model, parameters, seed, packet_count, generate_batch, self.__get_realization_targets()
+        )
+
+    def __get_delays(self, random_state, packet_count):
+        """
+        Returns the delay (in ms) of each packet.
+
+        :param random_state: the random number generator to use
+        :type random_state: numpy.random.RandomState
+
+        :param packet_count: the number of packets
+        :type packet_count: int
+
+        :rtype: numpy.ndarray
+        """
+
+        from manipulators.offline.netemEmulator import get_delays
+
+        delay = float(self._settings[TCRes.DB_DELAY_FIELD_NAME])
+        distribution = self._settings[TCRes.DB_JITTER_DISTRIBUTION_FIELD_NAME]
+
+        if distribution == TCRes.DB_JITTER_DISTRIBUTION_VALUE_NONE:
+            return get_delays(random_state, packet_count, delay)
+
+        return get_delays(
+            random_state,
+            packet_count,
+            delay,
+            float(self._settings[TCRes.DB_JITTER_FIELD_NAME]),
+            distribution,
+            float(self._settings.get(TCRes.DB_CORRELATION_FIELD_NAME, 0)) / 100
+        )
+
+    def _get_received_packets(self, timestamps, packet_sizes, units_per_second):
+        """
+        Emulates netem on the packets of the capture.
+
+        :param timestamps: the capture times of the packets (integer time units)
+        :type timestamps: numpy.ndarray
+
+        :param packet_sizes: the original lengths of the packets in bytes (unused)
+        :type packet_sizes: numpy.ndarray
+
+        :param units_per_second: the number of time units per second of the timestamps
+        :type units_per_second: int
+
+        :return: tuple (losses, indexes, arrivals), see `AbstractOfflineManipulator._get_received_packets`
+        :rtype: tuple
+        """
+
+        from manipulators.offline.netemEmulator import emulate
+
+        from numpy.random import RandomState
+
+        packet_count = len(timestamps)
+        seed = self._get_seed(self._settings.get(TCRes.DB_SEED_FIELD_NAME))
+
+        delays = self.__get_delays(RandomState(seed), packet_count) * (units_per_second / 1000)
+        losses = self.__get_losses(seed, packet_count)
+
+        (indexes, arrivals) = emulate(timestamps, losses, delays)
+
+        return losses, indexes, arrivals
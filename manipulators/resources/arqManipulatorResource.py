@@ -0,0 +1,125 @@
+__author__ = 'Alexander Dethof'
+
+from database.dbHandler import DbHandler
+from metaConfig.metaConfigInterface import MetaConfigInterface
+
+
+class ArqManipulatorResource(DbHandler, MetaConfigInterface):
+    """
+    Represents the table of the retransmission (NACK/ARQ) settings, i.e. the round trip time, the retransmission budget
+    and the playout deadline, with which the packets lost by an offline manipulation are recovered.
+    """
+
+    DB_TABLE_NAME = 'arq'
+
+    DB_ID_FIELD_NAME = 'id'
+    DB_RTT_FIELD_NAME = 'rtt'
+    DB_RTT_JITTER_FIELD_NAME = 'rtt_jitter'
+    DB_MAX_RETRANSMISSIONS_FIELD_NAME = 'max_retransmissions'
+    DB_PLAYOUT_DEADLINE_FIELD_NAME = 'playout_deadline'
+    DB_RETRANSMISSION_LOSS_FIELD_NAME = 'retransmission_loss'
+    DB_SEED_FIELD_NAME = 'seed'
+
+    _valid_field_names = (
+        DB_ID_FIELD_NAME,
+        DB_RTT_FIELD_NAME,
+        DB_RTT_JITTER_FIELD_NAME,
+        DB_MAX_RETRANSMISSIONS_FIELD_NAME,
+        DB_PLAYOUT_DEADLINE_FIELD_NAME,
+        DB_RETRANSMISSION_LOSS_FIELD_NAME,
+        DB_SEED_FIELD_NAME
+    )
+
+    @staticmethod
+    def get_meta_description():
+        from metaConfig.metaTable import MetaTable
+        from metaConfig.metaTableField import MetaTableField
+
+        return MetaTable(
+            ArqManipulatorResource.DB_TABLE_NAME,
+            header_doc="""In this csv file you are able to configure NACK based retransmissions (ARQ), which are
+simulated offline after the losses of an offline manipulator: a lost packet is requested again as soon as a later packet
+arrives, and is recovered if a retransmission arrives before its playout deadline. The settings are referenced by the
+column `arq_id` of the packet loss table.""",
+            fields=[
+                MetaTableField(
+                    ArqManipulatorResource.DB_ID_FIELD_NAME,
+                    int,
+                    'unique id to identify each data set individually'
+                ),
+                MetaTableField(
+                    ArqManipulatorResource.DB_RTT_FIELD_NAME,
+                    float,
+                    'mean round trip time in ms between the request and the arrival of a retransmission'
+                ),
+                MetaTableField(
+                    ArqManipulatorResource.DB_RTT_JITTER_FIELD_NAME,
+                    float,
+                    '[optional] standard deviation of the round trip time in ms [default: 0]'
+                ),
+                MetaTableField(
+                    ArqManipulatorResource.DB_MAX_RETRANSMISSIONS_FIELD_NAME,
+                    int,
+                    'maximum number of retransmissions of a lost packet'
+                ),
+                MetaTableField(
+                    ArqManipulatorResource.DB_PLAYOUT_DEADLINE_FIELD_NAME,
+                    float,
+                    'time in ms after the sending of a packet, until which a retransmission has to arrive'
+                ),
+                MetaTableField(
+                    ArqManipulatorResource.DB_RETRANSMISSION_LOSS_FIELD_NAME,
+                    float,
+                    '[optional] loss rate in percent (%) of the retransmissions [default: the loss rate of the '
+                    'manipulation]'
+                ),
+                MetaTableField(
+                    ArqManipulatorResource.DB_SEED_FIELD_NAME,
+                    int,
+                    '[optional] seed of the random round trip times and retransmission losses [default: derived from '
+                    'the PVS name]'
+                )
+            ]
+        )
+
+    def validate(self, row):
+        """
+        Validates a given row if it is valid for the table configuration or not
+
+        :param row: the row to validate
+        :raise AssertionError: if an assertion failed during the validation
+        """
+
+        #
+        # Check obligatory fields
+        #
+
+        self._assert_fields(row, self.DB_ID_FIELD_NAME, (
+            self.DB_RTT_FIELD_NAME,
+            self.DB_MAX_RETRANSMISSIONS_FIELD_NAME,
+            self.DB_PLAYOUT_DEADLINE_FIELD_NAME
+        ))
+
+        #
+        # check and set values
+        #
+
+        self._map_int(row, self.DB_ID_FIELD_NAME)
+        self._map_float(row, self.DB_RTT_FIELD_NAME, 0)
+        self._map_int(row, self.DB_MAX_RETRANSMISSIONS_FIELD_NAME, 1)
+        self._map_float(row, self.DB_PLAYOUT_DEADLINE_FIELD_NAME, 0)
+
+        if row.get(self.DB_RTT_JITTER_FIELD_NAME):
+            self._map_float(row, self.DB_RTT_JITTER_FIELD_NAME, 0)
+        else:
+            row[self.DB_RTT_JITTER_FIELD_NAME] = 0.0
+
+        if row.get(self.DB_RETRANSMISSION_LOSS_FIELD_NAME):
+            self._map_float(row, self.DB_RETRANSMISSION_LOSS_FIELD_NAME, 0, 100)
+        else:
+            row[self.DB_RETRANSMISSION_LOSS_FIELD_NAME] = None
+
+        if row.get(self.DB_SEED_FIELD_NAME):
+            self._map_int(row, self.DB_SEED_FIELD_NAME)
+        else:
+            row[self.DB_SEED_FIELD_NAME] = None
@@ -0,0 +1,130 @@
+__author__ = 'Alexander Dethof'
+
+from database.dbHandler import DbHandler
+from metaConfig.metaConfigInterface import MetaConfigInterface
+
+
+class FecManipulatorResource(DbHandler, MetaConfigInterface):
+    """
+    Represents the table of the FEC settings, i.e. the size and the dimensions of the row/column XOR FEC matrix (like
+    SMPTE 2022-1), with which the packets lost by an offline manipulation are repaired.
+    """
+
+    DB_TABLE_NAME = 'fec'
+
+    DB_ID_FIELD_NAME = 'id'
+    DB_COLUMNS_FIELD_NAME = 'columns'
+    DB_ROWS_FIELD_NAME = 'rows'
+    DB_MODE_FIELD_NAME = 'mode'
+    DB_FEC_LOSS_FIELD_NAME = 'fec_loss'
+    DB_SEED_FIELD_NAME = 'seed'
+
+    # configure FEC modes
+    DB_MODE_COLUMN_VALUE = 'column'
+    DB_MODE_ROW_COLUMN_VALUE = 'row_column'
+
+    DB_MODE_VALID_VALUES = (
+        DB_MODE_COLUMN_VALUE,
+        DB_MODE_ROW_COLUMN_VALUE
+    )
+
+    _valid_field_names = (
+        DB_ID_FIELD_NAME,
+        DB_COLUMNS_FIELD_NAME,
+        DB_ROWS_FIELD_NAME,
+        DB_MODE_FIELD_NAME,
+        DB_FEC_LOSS_FIELD_NAME,
+        DB_SEED_FIELD_NAME
+    )
+
+    @staticmethod
+    def get_meta_description():
+        from metaConfig.metaTable import MetaTable
+        from metaConfig.metaTableField import MetaTableField
+
+        return MetaTable(
+            FecManipulatorResource.DB_TABLE_NAME,
+            header_doc="""In this csv file you are able to configure a row/column XOR FEC (like SMPTE 2022-1), which is
+simulated offline after the losses of an offline manipulator: the media packets are arranged in matrices of L columns
+and D rows, and a lost packet is repaired if it is the only lost packet of a protected row or column. The settings are
+referenced by the column `fec_id` of the packet loss table.""",
+            fields=[
+                MetaTableField(
+                    FecManipulatorResource.DB_ID_FIELD_NAME,
+                    int,
+                    'unique id to identify each data set individually'
+                ),
+                MetaTableField(
+                    FecManipulatorResource.DB_COLUMNS_FIELD_NAME,
+                    int,
+                    'number of columns (L) of the FEC matrix, i.e. the distance of the packets protected by a column'
+                ),
+                MetaTableField(
+                    FecManipulatorResource.DB_ROWS_FIELD_NAME,
+                    int,
+                    'number of rows (D) of the FEC matrix'
+                ),
+                MetaTableField(
+                    FecManipulatorResource.DB_MODE_FIELD_NAME,
+                    str,
+                    '[optional] the protected dimensions of the FEC matrix [default: row_column]',
+                    {
+                        FecManipulatorResource.DB_MODE_COLUMN_VALUE:
+                            'only the columns are protected (1D FEC, overhead 1/D)',
+                        FecManipulatorResource.DB_MODE_ROW_COLUMN_VALUE:
+                            'the rows and columns are protected (2D FEC, overhead 1/D + 1/L)'
+                    }
+                ),
+                MetaTableField(
+                    FecManipulatorResource.DB_FEC_LOSS_FIELD_NAME,
+                    float,
+                    '[optional] loss rate in percent (%) of the FEC packets [default: the loss rate of the '
+                    'manipulation]'
+                ),
+                MetaTableField(
+                    FecManipulatorResource.DB_SEED_FIELD_NAME,
+                    int,
+                    '[optional] seed of the FEC packet losses [default: derived from the PVS name]'
+                )
+            ]
+        )
+
+    def validate(self, row):
+        """
+        Validates a given row if it is valid for the table configuration or not
+
+        :param row: the row to validate
+        :raise AssertionError: if an assertion failed during the validation
+        """
+
+        #
+        # Check obligatory fields
+        #
+
+        self._assert_fields(row, self.DB_ID_FIELD_NAME, (
+            self.DB_COLUMNS_FIELD_NAME,
+            self.DB_ROWS_FIELD_NAME
+        ))
+
+        #
+        # check and set values
+        #
+
+        self._map_int(row, self.DB_ID_FIELD_NAME)
+        self._map_int(row, self.DB_COLUMNS_FIELD_NAME, 1)
+        self._map_int(row, self.DB_ROWS_FIELD_NAME, 1)
+
+        if row.get(self.DB_MODE_FIELD_NAME):
+            self._map_val_range(row, self.DB_MODE_FIELD_NAME, self.DB_MODE_VALID_VALUES)
+        else:
+            row[self.DB_MODE_FIELD_NAME] = self.DB_MODE_ROW_COLUMN_VALUE
+
+        if row.get(self.DB_FEC_LOSS_FIELD_NAME):
+            self._map_float(row, self.DB_FEC_LOSS_FIELD_NAME, 0, 100)
+        else:
+            row[self.DB_FEC_LOSS_FIELD_NAME] = None
+
+        if row.get(self.DB_SEED_FIELD_NAME):
+            self._map_int(row, self.DB_SEED_FIELD_NAME)
+        else:
+            row[self.DB_SEED_FIELD_NAME] = None
@@ -0,0 +1,183 @@
+__author__ = 'Alexander Dethof'
+
+from database.dbHandler import DbHandler
+from metaConfig.metaConfigInterface import MetaConfigInterface
+
+
+class QueueManipulatorResource(DbHandler, MetaConfigInterface):
+    """
+    Represents the table of the offline bottleneck queue manipulations, i.e. the link rate, the buffer and the queue
+    discipline of a simulated bottleneck link.
+    """
+
+    DB_TABLE_NAME = 'queue'
+
+    DB_ID_FIELD_NAME = 'id'
+    DB_RATE_FIELD_NAME = 'rate'
+    DB_RATE_TRACE_FILE_NAME_FIELD_NAME = 'rate_trace_file_name'
+    DB_BUFFER_SIZE_FIELD_NAME = 'buffer_size'
+    DB_BUFFER_UNIT_FIELD_NAME = 'buffer_unit'
+    DB_DISCIPLINE_FIELD_NAME = 'discipline'
+    DB_RED_MIN_THRESHOLD_FIELD_NAME = 'red_min'
+    DB_RED_MAX_THRESHOLD_FIELD_NAME = 'red_max'
+    DB_RED_MAX_PROBABILITY_FIELD_NAME = 'red_max_p'
+    DB_SEED_FIELD_NAME = 'seed'
+
+    # configure buffer units
+    DB_BUFFER_UNIT_BYTES_VALUE = 'bytes'
+    DB_BUFFER_UNIT_PACKETS_VALUE = 'packets'
+
+    DB_BUFFER_UNIT_VALID_VALUES = (
+        DB_BUFFER_UNIT_BYTES_VALUE,
+        DB_BUFFER_UNIT_PACKETS_VALUE
+    )
+
+    # configure queue disciplines
+    DB_DISCIPLINE_TAIL_DROP_VALUE = 'tail_drop'
+    DB_DISCIPLINE_RED_VALUE = 'red'
+
+    DB_DISCIPLINE_VALID_VALUES = (
+        DB_DISCIPLINE_TAIL_DROP_VALUE,
+        DB_DISCIPLINE_RED_VALUE
+    )
+
+    _valid_field_names = (
+        DB_ID_FIELD_NAME,
+        DB_RATE_FIELD_NAME,
+        DB_RATE_TRACE_FILE_NAME_FIELD_NAME,
+        DB_BUFFER_SIZE_FIELD_NAME,
+        DB_BUFFER_UNIT_FIELD_NAME,
+        DB_DISCIPLINE_FIELD_NAME,
+        DB_RED_MIN_THRESHOLD_FIELD_NAME,
+        DB_RED_MAX_THRESHOLD_FIELD_NAME,
+        DB_RED_MAX_PROBABILITY_FIELD_NAME,
+        DB_SEED_FIELD_NAME
+    )
+
+    @staticmethod
+    def get_meta_description():
+        from metaConfig.metaTable import MetaTable
+        from metaConfig.metaTableField import MetaTableField
+
+        return MetaTable(
+            QueueManipulatorResource.DB_TABLE_NAME,
+            header_doc="""In this csv file you are able to configure bottleneck links, which are simulated offline on
+the captured packet streams: each packet has to pass a rate limited link with a finite buffer in front of it.""",
+            fields=[
+                MetaTableField(
+                    QueueManipulatorResource.DB_ID_FIELD_NAME,
+                    int,
+                    'unique id to identify each data set individually'
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_RATE_FIELD_NAME,
+                    float,
+                    'constant rate of the link in kbit/s (not required if a rate trace is given)'
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_RATE_TRACE_FILE_NAME_FIELD_NAME,
+                    str,
+                    """[optional] a relative file path to a rate trace, which is looked up in the folder PATH/traces;
+each line consists of `<TIME_MS>,<RATE_KBIT_S>`, i.e. the rate of the link from the given time (relative to the first
+packet) on"""
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_BUFFER_SIZE_FIELD_NAME,
+                    int,
+                    'size of the buffer in front of the link (in the buffer unit)'
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_BUFFER_UNIT_FIELD_NAME,
+                    str,
+                    'unit of the buffer size and the RED thresholds',
+                    QueueManipulatorResource.DB_BUFFER_UNIT_VALID_VALUES
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_DISCIPLINE_FIELD_NAME,
+                    str,
+                    'the discipline of the queue',
+                    {
+                        QueueManipulatorResource.DB_DISCIPLINE_TAIL_DROP_VALUE:
+                            'packets are dropped if they do not fit into the buffer',
+                        QueueManipulatorResource.DB_DISCIPLINE_RED_VALUE:
+                            'packets are dropped early (random early detection) based on the average queue size'
+                    }
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_RED_MIN_THRESHOLD_FIELD_NAME,
+                    float,
+                    '[red only] average queue size (in the buffer unit) from which packets are dropped early'
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_RED_MAX_THRESHOLD_FIELD_NAME,
+                    float,
+                    '[red only] average queue size (in the buffer unit) from which all packets are dropped'
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_RED_MAX_PROBABILITY_FIELD_NAME,
+                    float,
+                    '[red only] drop probability in percent (%) at the maximum threshold'
+                ),
+                MetaTableField(
+                    QueueManipulatorResource.DB_SEED_FIELD_NAME,
+                    int,
+                    '[optional] seed of the random early drops [default: derived from the PVS name]'
+                )
+            ]
+        )
+
+    def validate(self, row):
+        """
+        Validates a given row if it is valid for the table configuration or not
+
+        :param row: the row to validate
+        :raise AssertionError: if an assertion failed during the validation
+        """
+
+        #
+        # Check obligatory fields
+        #
+
+        self._assert_fields(row, self.DB_ID_FIELD_NAME, (
+            self.DB_BUFFER_SIZE_FIELD_NAME,
+            self.DB_BUFFER_UNIT_FIELD_NAME,
+            self.DB_DISCIPLINE_FIELD_NAME
+        ))
+
+        assert self.DB_RATE_FIELD_NAME in row or self.DB_RATE_TRACE_FILE_NAME_FIELD_NAME in row, \
+            "The given row with id %s does neither contain a `%s` nor a `%s` field!" % (
+                row[self.DB_ID_FIELD_NAME], self.DB_RATE_FIELD_NAME, self.DB_RATE_TRACE_FILE_NAME_FIELD_NAME
+            )
+
+        #
+        # check and set values
+        #
+
+        self._map_int(row, self.DB_ID_FIELD_NAME)
+        self._map_int(row, self.DB_BUFFER_SIZE_FIELD_NAME, 1)
+
+        if self.DB_RATE_FIELD_NAME in row:
+            self._map_float(row, self.DB_RATE_FIELD_NAME)
+            assert row[self.DB_RATE_FIELD_NAME] > 0, "The rate of the row with id %d must be positive!" \
+                % row[self.DB_ID_FIELD_NAME]
+
+        self._map_val_range(row, self.DB_BUFFER_UNIT_FIELD_NAME, self.DB_BUFFER_UNIT_VALID_VALUES)
+        self._map_val_range(row, self.DB_DISCIPLINE_FIELD_NAME, self.DB_DISCIPLINE_VALID_VALUES)
+
+        if row[self.DB_DISCIPLINE_FIELD_NAME] == self.DB_DISCIPLINE_RED_VALUE:
+            self._assert_fields(row, self.DB_ID_FIELD_NAME, (
+                self.DB_RED_MIN_THRESHOLD_FIELD_NAME,
+                self.DB_RED_MAX_THRESHOLD_FIELD_NAME,
+                self.DB_RED_MAX_PROBABILITY_FIELD_NAME
+            ))
+
+            self._map_float(row, self.DB_RED_MIN_THRESHOLD_FIELD_NAME, 0)
+            self._map_float(row, self.DB_RED_MAX_THRESHOLD_FIELD_NAME, 0)
+            self._map_float(row, self.DB_RED_MAX_PROBABILITY_FIELD_NAME, 0, 100)
+
+            assert row[self.DB_RED_MIN_THRESHOLD_FIELD_NAME] < row[self.DB_RED_MAX_THRESHOLD_FIELD_NAME], \
+                "The RED minimum threshold of the row with id %d must be smaller than its maximum threshold!" \
+                % row[self.DB_ID_FIELD_NAME]
+
+        if self.DB_SEED_FIELD_NAME in row:
+            self._map_int(row, self.DB_SEED_FIELD_NAME)
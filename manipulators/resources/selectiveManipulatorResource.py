@@ -0,0 +1,178 @@
+__author__ = 'Alexander Dethof'
+
+from database.dbHandler import DbHandler
+from metaConfig.metaConfigInterface import MetaConfigInterface
+
+
+class SelectiveManipulatorResource(DbHandler, MetaConfigInterface):
+    """
+    Represents the table of the offline selective loss manipulations, i.e. rules which drop the packets of frames with
+    a given type, reference flag or NAL unit types.
+    """
+
+    DB_TABLE_NAME = 'selective'
+
+    DB_ID_FIELD_NAME = 'id'
+    DB_FRAME_TYPE_FIELD_NAME = 'frame_type'
+    DB_REFERENCE_FIELD_NAME = 'reference'
+    DB_NAL_TYPES_FIELD_NAME = 'nal_types'
+    DB_UNIT_FIELD_NAME = 'unit'
+    DB_LOSS_RATE_FIELD_NAME = 'loss_rate'
+    DB_SEED_FIELD_NAME = 'seed'
+
+    # configure frame types
+    DB_FRAME_TYPE_ANY_VALUE = 'any'
+    DB_FRAME_TYPE_I_VALUE = 'I'
+    DB_FRAME_TYPE_P_VALUE = 'P'
+    DB_FRAME_TYPE_B_VALUE = 'B'
+
+    DB_FRAME_TYPE_VALID_VALUES = (
+        DB_FRAME_TYPE_ANY_VALUE,
+        DB_FRAME_TYPE_I_VALUE,
+        DB_FRAME_TYPE_P_VALUE,
+        DB_FRAME_TYPE_B_VALUE
+    )
+
+    # configure reference flags
+    DB_REFERENCE_ANY_VALUE = 'any'
+    DB_REFERENCE_REFERENCE_VALUE = 'reference'
+    DB_REFERENCE_NON_REFERENCE_VALUE = 'non_reference'
+
+    DB_REFERENCE_VALID_VALUES = (
+        DB_REFERENCE_ANY_VALUE,
+        DB_REFERENCE_REFERENCE_VALUE,
+        DB_REFERENCE_NON_REFERENCE_VALUE
+    )
+
+    # configure loss units
+    DB_UNIT_PACKET_VALUE = 'packet'
+    DB_UNIT_FRAME_VALUE = 'frame'
+
+    DB_UNIT_VALID_VALUES = (
+        DB_UNIT_PACKET_VALUE,
+        DB_UNIT_FRAME_VALUE
+    )
+
+    # separator of the NAL unit types
+    NAL_TYPES_SEPARATOR = ','
+
+    _valid_field_names = (
+        DB_ID_FIELD_NAME,
+        DB_FRAME_TYPE_FIELD_NAME,
+        DB_REFERENCE_FIELD_NAME,
+        DB_NAL_TYPES_FIELD_NAME,
+        DB_UNIT_FIELD_NAME,
+        DB_LOSS_RATE_FIELD_NAME,
+        DB_SEED_FIELD_NAME
+    )
+
+    @staticmethod
+    def get_meta_description():
+        from metaConfig.metaTable import MetaTable
+        from metaConfig.metaTableField import MetaTableField
+
+        return MetaTable(
+            SelectiveManipulatorResource.DB_TABLE_NAME,
+            header_doc="""In this csv file you are able to configure selective losses, which are inserted offline
+into the packets of frames with a given type, reference flag or NAL unit types (e.g. lose all I-frames).""",
+            fields=[
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_ID_FIELD_NAME,
+                    int,
+                    'unique id to identify each data set individually'
+                ),
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_FRAME_TYPE_FIELD_NAME,
+                    str,
+                    'type of the frames to lose; a frame is a B-frame if it has B slices, a P-frame if it has P '
+                    'slices but no B slices and an I-frame otherwise',
+                    SelectiveManipulatorResource.DB_FRAME_TYPE_VALID_VALUES
+                ),
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_REFERENCE_FIELD_NAME,
+                    str,
+                    '[optional] reference flag of the frames to lose [default: any]',
+                    SelectiveManipulatorResource.DB_REFERENCE_VALID_VALUES
+                ),
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_NAL_TYPES_FIELD_NAME,
+                    str,
+                    """[optional] comma separated NAL unit types (of H.264 or HEVC); if given, only the packets of
+the selected frames which carry data of one of these NAL units are lost"""
+                ),
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_UNIT_FIELD_NAME,
+                    str,
+                    'unit of the losses',
+                    {
+                        SelectiveManipulatorResource.DB_UNIT_PACKET_VALUE:
+                            'each packet of the selected frames is lost with the loss rate',
+                        SelectiveManipulatorResource.DB_UNIT_FRAME_VALUE:
+                            'each selected frame is lost with the loss rate, i.e. all packets carrying its data'
+                    }
+                ),
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_LOSS_RATE_FIELD_NAME,
+                    float,
+                    'loss rate in percent (%) of the selected packets or frames (100 -> all are lost)'
+                ),
+                MetaTableField(
+                    SelectiveManipulatorResource.DB_SEED_FIELD_NAME,
+                    int,
+                    '[optional] seed of the random losses [default: derived from the PVS name]'
+                )
+            ]
+        )
+
+    def validate(self, row):
+        """
+        Validates a given row if it is valid for the table configuration or not
+
+        :param row: the row to validate
+        :raise AssertionError: if an assertion failed during the validation
+        """
+
+        #
+        # Check obligatory fields
+        #
+
+        self._assert_fields(row, self.DB_ID_FIELD_NAME, (
+            self.DB_FRAME_TYPE_FIELD_NAME,
+            self.DB_UNIT_FIELD_NAME,
+            self.DB_LOSS_RATE_FIELD_NAME
+        ))
+
+        #
+        # check and set values
+        #
+
+        self._map_int(row, self.DB_ID_FIELD_NAME)
+        self._map_val_range(row, self.DB_FRAME_TYPE_FIELD_NAME, self.DB_FRAME_TYPE_VALID_VALUES)
+        self._map_val_range(row, self.DB_UNIT_FIELD_NAME, self.DB_UNIT_VALID_VALUES)
+        self._map_float(row, self.DB_LOSS_RATE_FIELD_NAME, 0, 100)
+
+        if row.get(self.DB_REFERENCE_FIELD_NAME):
+            self._map_val_range(row, self.DB_REFERENCE_FIELD_NAME, self.DB_REFERENCE_VALID_VALUES)
+        else:
+            row[self.DB_REFERENCE_FIELD_NAME] = self.DB_REFERENCE_ANY_VALUE
+
+        if row.get(self.DB_NAL_TYPES_FIELD_NAME):
+            try:
+                nal_types = [int(nal_type) for nal_type in row[self.DB_NAL_TYPES_FIELD_NAME].split(
+                    self.NAL_TYPES_SEPARATOR
+                )]
+            except ValueError:
+                raise AssertionError("The NAL unit types of the row with id %d are no comma separated integers!"
+                                     % row[self.DB_ID_FIELD_NAME])
+
+            assert all(0 <= nal_type < 64 for nal_type in nal_types), \
+                "The NAL unit types of the row with id %d must be within [0, 63]!" % row[self.DB_ID_FIELD_NAME]
+
+            row[self.DB_NAL_TYPES_FIELD_NAME] = nal_types
+        else:
+            row[self.DB_NAL_TYPES_FIELD_NAME] = list()
+
+        if row.get(self.DB_SEED_FIELD_NAME):
+            self._map_int(row, self.DB_SEED_FIELD_NAME)
+        else:
+            row[self.DB_SEED_FIELD_NAME] = None
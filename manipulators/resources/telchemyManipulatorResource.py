@@ -113,10 +113,14 @@ class TelchemyManipulatorReadTraceResource(DbHandler, MetaConfigInterface):
 
     DB_FIELD_NAME_ID = 'id'
     DB_FIELD_NAME_TRACE_FILE_NAME = 'trace_file_name'
+    DB_FIELD_NAME_OFFSET = 'offset'
+    DB_FIELD_NAME_LOOP = 'loop'
 
     _valid_field_names = (
         DB_FIELD_NAME_ID,
-        DB_FIELD_NAME_TRACE_FILE_NAME
+        DB_FIELD_NAME_TRACE_FILE_NAME,
+        DB_FIELD_NAME_OFFSET,
+        DB_FIELD_NAME_LOOP
     )
 
     @staticmethod
@@ -139,6 +143,17 @@ be used to manipulate .pcap files with the telchemy tpkloss tool, but only for t
                     str,
                     """a relative file path to a loss trace, which is looked up in the folder PATH/traces (with PATH as
 the path defined at the chain's execution time with the "p"/"path" argument)"""
+                ),
+                MetaTableField(
+                    TelchemyManipulatorReadTraceResource.DB_FIELD_NAME_OFFSET,
+                    int,
+                    '[optional] trace entry applied on the first packet (telchemy_offline only) [default: 0]'
+                ),
+                MetaTableField(
+                    TelchemyManipulatorReadTraceResource.DB_FIELD_NAME_LOOP,
+                    int,
+                    """[optional] 1 if the trace is repeated when it is shorter than the capture, 0 if the remaining
+packets are received (telchemy_offline only) [default: 0]"""
                 )
             ]
         )
@@ -161,6 +176,12 @@ the path defined at the chain's execution time with the "p"/"path" argument)"""
 
         self._map_int(row, self.DB_FIELD_NAME_ID)
 
+        if self.DB_FIELD_NAME_OFFSET in row:
+            self._map_int(row, self.DB_FIELD_NAME_OFFSET, 0)
+
+        if self.DB_FIELD_NAME_LOOP in row:
+            self._map_int(row, self.DB_FIELD_NAME_LOOP, 0, 1)
+
 
 class TelchemyManipulatorMarkovResource(DbHandler, MetaConfigInterface):
 
@@ -171,6 +192,11 @@ class TelchemyManipulatorMarkovResource(DbHandler, MetaConfigInterface):
     DB_FIELD_MARKOV_ID = 'markov_id'
     DB_FIELD_START_AFTER = 'start_after'
     DB_FIELD_END_BEFORE = 'end_before'
+    DB_FIELD_SEED = 'seed'
+    DB_FIELD_TARGET_LOSS_RATE = 'target_loss_rate'
+    DB_FIELD_LOSS_RATE_TOLERANCE = 'loss_rate_tolerance'
+    DB_FIELD_TARGET_BURST_LENGTH = 'target_burst_length'
+    DB_FIELD_BURST_LENGTH_TOLERANCE = 'burst_length_tolerance'
 
     DB_FIELD_VALUE_MARKOV_TYPE_2STATE_VALUE = '2s'
     DB_FIELD_VALUE_MARKOV_TYPE_4STATE_VALUE = '4s'
@@ -187,7 +213,12 @@ class TelchemyManipulatorMarkovResource(DbHandler, MetaConfigInterface):
         DB_FIELD_MARKOV_TYPE,
         DB_FIELD_MARKOV_ID,
         DB_FIELD_START_AFTER,
-        DB_FIELD_END_BEFORE
+        DB_FIELD_END_BEFORE,
+        DB_FIELD_SEED,
+        DB_FIELD_TARGET_LOSS_RATE,
+        DB_FIELD_LOSS_RATE_TOLERANCE,
+        DB_FIELD_TARGET_BURST_LENGTH,
+        DB_FIELD_BURST_LENGTH_TOLERANCE
     )
 
     @staticmethod
@@ -242,6 +273,34 @@ be used to manipulate .pcap files with the telchemy tpkloss tool, but only for m
                     int,
                     'time in ms before the transmission\'s end, when the manipulation should stop'
                 ),
+                MetaTableField(
+                    TelchemyManipulatorMarkovResource.DB_FIELD_SEED,
+                    int,
+                    """[optional] seed of the random numbers of the offline manipulation (telchemy_offline), so that
+all sources get the same loss pattern [default: derived from the PVS name]"""
+                ),
+                MetaTableField(
+                    TelchemyManipulatorMarkovResource.DB_FIELD_TARGET_LOSS_RATE,
+                    float,
+                    """[optional] loss rate in percent (%) which the selected realization should have, if several
+realizations are generated (-to:los realizations=<N>) [default: the mean of all realizations]"""
+                ),
+                MetaTableField(
+                    TelchemyManipulatorMarkovResource.DB_FIELD_LOSS_RATE_TOLERANCE,
+                    float,
+                    '[optional] maximum deviation in percentage points from the target loss rate'
+                ),
+                MetaTableField(
+                    TelchemyManipulatorMarkovResource.DB_FIELD_TARGET_BURST_LENGTH,
+                    float,
+                    """[optional] mean burst length in packets which the selected realization should have
+[default: the mean of all realizations]"""
+                ),
+                MetaTableField(
+                    TelchemyManipulatorMarkovResource.DB_FIELD_BURST_LENGTH_TOLERANCE,
+                    float,
+                    '[optional] maximum deviation in packets from the target burst length'
+                ),
             ]
         )
 
@@ -283,6 +342,17 @@ be used to manipulate .pcap files with the telchemy tpkloss tool, but only for m
             self.DB_FIELD_END_BEFORE
         ))
 
+        if self.DB_FIELD_SEED in row:
+            self._map_int(row, self.DB_FIELD_SEED)
+
+        for field_name in (self.DB_FIELD_TARGET_LOSS_RATE, self.DB_FIELD_LOSS_RATE_TOLERANCE):
+            if field_name in row:
+                self._map_float(row, field_name, 0, 100)
+
+        for field_name in (self.DB_FIELD_TARGET_BURST_LENGTH, self.DB_FIELD_BURST_LENGTH_TOLERANCE):
+            if field_name in row:
+                self._map_float(row, field_name, 0)
+
         # check validity of markov id
         assert row[self.DB_FIELD_MARKOV_TYPE] in self.VALID_MARKOV_TYPES, \
             "Unknown value for field `%s` given: `%s`, expected on of these: [%s]" \
@@ -15,6 +15,12 @@ class TrafficControlManipulatorResource(DbHandler, MetaConfigInterface):
     DB_DELAY_FIELD_NAME = 'delay'
     DB_JITTER_FIELD_NAME = 'jitter'
     DB_JITTER_DISTRIBUTION_FIELD_NAME = 'distribution'
+    DB_CORRELATION_FIELD_NAME = 'correlation'
+    DB_SEED_FIELD_NAME = 'seed'
+    DB_TARGET_LOSS_RATE_FIELD_NAME = 'target_loss_rate'
+    DB_LOSS_RATE_TOLERANCE_FIELD_NAME = 'loss_rate_tolerance'
+    DB_TARGET_BURST_LENGTH_FIELD_NAME = 'target_burst_length'
+    DB_BURST_LENGTH_TOLERANCE_FIELD_NAME = 'burst_length_tolerance'
     DB_LOSS_MODE_FIELD_NAME = 'loss_mode'
     DB_LOSS_MODE_ID_FIELD_NAME = 'loss_mode_id'
 
@@ -52,8 +58,14 @@ class TrafficControlManipulatorResource(DbHandler, MetaConfigInterface):
         DB_DELAY_FIELD_NAME,
         DB_JITTER_FIELD_NAME,
         DB_JITTER_DISTRIBUTION_FIELD_NAME,
+        DB_CORRELATION_FIELD_NAME,
         DB_LOSS_MODE_FIELD_NAME,
-        DB_LOSS_MODE_ID_FIELD_NAME
+        DB_LOSS_MODE_ID_FIELD_NAME,
+        DB_SEED_FIELD_NAME,
+        DB_TARGET_LOSS_RATE_FIELD_NAME,
+        DB_LOSS_RATE_TOLERANCE_FIELD_NAME,
+        DB_TARGET_BURST_LENGTH_FIELD_NAME,
+        DB_BURST_LENGTH_TOLERANCE_FIELD_NAME
     )
 
     @staticmethod
@@ -87,6 +99,11 @@ online manipulation.""",
                     'specification of the jitter distribution',
                     TrafficControlManipulatorResource.DB_JITTER_DISTRIBUTION_VALID_VALUES
                 ),
+                MetaTableField(
+                    TrafficControlManipulatorResource.DB_CORRELATION_FIELD_NAME,
+                    float,
+                    '[optional] correlation in percent (%) of the jitter with the jitter of the previous packet'
+                ),
                 MetaTableField(
                     TrafficControlManipulatorResource.DB_LOSS_MODE_FIELD_NAME,
                     str,
@@ -107,6 +124,34 @@ i.e. which model should be applied on""",
                     """an arbitrary, but unique, id referencing to a configuration set of the appropriate loss_mode,
 the referenced configuration can be set in the tc configuration folders (look up the file according to the mode's
 name!)"""
+                ),
+                MetaTableField(
+                    TrafficControlManipulatorResource.DB_SEED_FIELD_NAME,
+                    int,
+                    """[optional] seed of the random numbers of the offline manipulation (tc_offline), so that all
+sources get the same loss pattern [default: derived from the PVS name]"""
+                ),
+                MetaTableField(
+                    TrafficControlManipulatorResource.DB_TARGET_LOSS_RATE_FIELD_NAME,
+                    float,
+                    """[optional] loss rate in percent (%) which the selected realization should have, if several
+realizations are generated (-to:los realizations=<N>) [default: the mean of all realizations]"""
+                ),
+                MetaTableField(
+                    TrafficControlManipulatorResource.DB_LOSS_RATE_TOLERANCE_FIELD_NAME,
+                    float,
+                    '[optional] maximum deviation in percentage points from the target loss rate'
+                ),
+                MetaTableField(
+                    TrafficControlManipulatorResource.DB_TARGET_BURST_LENGTH_FIELD_NAME,
+                    float,
+                    """[optional] mean burst length in packets which the selected realization should have
+[default: the mean of all realizations]"""
+                ),
+                MetaTableField(
+                    TrafficControlManipulatorResource.DB_BURST_LENGTH_TOLERANCE_FIELD_NAME,
+                    float,
+                    '[optional] maximum deviation in packets from the target burst length'
                 )
             ]
         )
@@ -147,12 +192,26 @@ name!)"""
             assert self.DB_JITTER_FIELD_NAME in row
             self._map_float(row, self.DB_JITTER_FIELD_NAME)
 
+            if self.DB_CORRELATION_FIELD_NAME in row:
+                self._map_float(row, self.DB_CORRELATION_FIELD_NAME, 0, 100)
+
         self._map_val_range(row, self.DB_JITTER_DISTRIBUTION_FIELD_NAME, self.DB_JITTER_DISTRIBUTION_VALID_VALUES)
 
         self._map_val_range(row, self.DB_LOSS_MODE_FIELD_NAME, self.DB_LOSS_MODE_VALID_VALUES)
 
         self._map_int(row, self.DB_LOSS_MODE_ID_FIELD_NAME)
 
+        if self.DB_SEED_FIELD_NAME in row:
+            self._map_int(row, self.DB_SEED_FIELD_NAME)
+
+        for field_name in (self.DB_TARGET_LOSS_RATE_FIELD_NAME, self.DB_LOSS_RATE_TOLERANCE_FIELD_NAME):
+            if field_name in row:
+                self._map_float(row, field_name, 0, 100)
+
+        for field_name in (self.DB_TARGET_BURST_LENGTH_FIELD_NAME, self.DB_BURST_LENGTH_TOLERANCE_FIELD_NAME):
+            if field_name in row:
+                self._map_float(row, field_name, 0)
+
 
 class TrafficControlManipulatorRandomModeResource(DbHandler, MetaConfigInterface):
     """
@@ -138,7 +138,7 @@ class TelchemyMarkovManipulator(AbstractTelchemyManipulator):
         assert isinstance(self.__model_settings, dict)
 
         telchemy_command.set_as_posix_option('pba', float(self.__model_settings[Markov4StateRes.DB_FIELD_NAME_PBA]) / 100) \
-                        .set_as_posix_option('pbc', float(self.__model_settings[Markov4StateRes.DB_FIELD_NAME_PBA]) / 100)
+                        .set_as_posix_option('pbc', float(self.__model_settings[Markov4StateRes.DB_FIELD_NAME_PBC]) / 100)
 
         if Markov4StateRes.DB_FIELD_NAME_PDC in self.__model_settings:
             telchemy_command.set_as_posix_option('pdc', float(self.__model_settings[Markov4StateRes.DB_FIELD_NAME_PDC]) / 100)
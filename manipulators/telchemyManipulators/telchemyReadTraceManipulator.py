@@ -43,6 +43,28 @@ class TelchemyReadTraceManipulator(AbstractTelchemyManipulator):
 
         return TelchemyReadTraceRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH)
 
+    @staticmethod
+    def __get_text_trace_file_path(compact_trace_file_path):
+        """
+        Returns the path of the text version of a compact trace, which is converted if it is missing or outdated.
+
+        :param compact_trace_file_path: the path of the compact trace
+        :type compact_trace_file_path: basestring
+
+        :return: the path of the text trace
+        :rtype: str
+        """
+
+        from os.path import getmtime
+        from manipulators.offline.compactTrace import convert_to_text
+
+        text_trace_file_path = compact_trace_file_path + '.csv'
+
+        if not exists(text_trace_file_path) or getmtime(text_trace_file_path) < getmtime(compact_trace_file_path):
+            convert_to_text(compact_trace_file_path, text_trace_file_path)
+
+        return text_trace_file_path
+
     def manipulate(self):
         """
         Performs the manipulation based on existing traces.
@@ -57,6 +79,11 @@ class TelchemyReadTraceManipulator(AbstractTelchemyManipulator):
         assert isfile(trace_file_path) and exists(trace_file_path), \
             "The specified trace file: `%s` is not a valid existing file!" % trace_file_path
 
+        # tpkloss only reads text traces -> compact traces are converted next to their origin once
+        from manipulators.offline.compactTrace import is_compact_trace
+        if is_compact_trace(trace_file_path):
+            trace_file_path = self.__get_text_trace_file_path(trace_file_path)
+
         self._set_telchemy_command_file_input_output_options(telchemy_command)
         telchemy_command.set_as_posix_option('r', trace_file_path)
 
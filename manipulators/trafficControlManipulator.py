@@ -1,15 +1,24 @@
 __author__ = 'Alexander Dethof'
 
-from multiprocessing import Process
-
 from abstractManipulator import AbstractManipulator
 from cmd.command import Command
-from tool.streamTool import STREAM_NETWORK_INTERFACE, STREAM_PROTOCOL_UDP, STREAM_PORT
+from tool.streamTool import STREAM_NETWORK_INTERFACE, STREAM_PORT
 from manipulators.resources.trafficControlManipulatorResource import TrafficControlManipulatorResource as TCRes
 
 # noinspection PyPep8Naming
 from os import sep as PATH_SEPARATOR
 
+# default effective resolution (in ms) of the timers which release the packets in tcpreplay and netem, if it is not
+# configured for the host (see `set_time_compression`); in a time compressed replay each timing error is scaled up by
+# the compression factor
+REPLAY_TIMER_RESOLUTION = 0.05
+
+# maximum error of a time compressed replay relative to the smallest timing of the manipulation (delay, jitter, mean
+# packet gap), above which the replay would distort the distributions; hence the largest factor is this error times
+# the smallest timing divided by the timer resolution, e.g. 2 for streams with packet gaps of 1 ms and the default
+# resolution
+TIME_COMPRESSION_MAX_RELATIVE_ERROR = 0.1
+
 
 class TrafficControlManipulator(AbstractManipulator):
     """
@@ -20,6 +29,107 @@ class TrafficControlManipulator(AbstractManipulator):
     # path of the manipulator resource table
     MANIPULATOR_RESOURCE_PATH = 'hrc' + PATH_SEPARATOR + 'packet_loss' + PATH_SEPARATOR + TCRes.DB_TABLE_NAME
 
+    # the namespace wherein the manipulation runs (None -> on the loopback device of the host)
+    _network_namespace = None
+
+    # the factor by which the replay is accelerated (1 -> real time)
+    _time_compression = 1.0
+
+    # the effective resolution (in ms) of the replay's timers
+    _timer_resolution = REPLAY_TIMER_RESOLUTION
+
+    def set_network_namespace(self, network_namespace):
+        """
+        Sets an isolated network namespace wherein the manipulation should run, instead of the host's loopback device.
+
+        :param network_namespace: the (created) namespace wherein the manipulation should run, or None
+        :type network_namespace: manipulators.networkNamespace.NetworkNamespace|None
+
+        :return: self
+        :rtype: TrafficControlManipulator
+        """
+
+        from manipulators.networkNamespace import NetworkNamespace
+        assert network_namespace is None or isinstance(network_namespace, NetworkNamespace)
+
+        self._network_namespace = network_namespace
+        return self
+
+    def set_time_compression(self, factor, timer_resolution=REPLAY_TIMER_RESOLUTION):
+        """
+        Sets the factor by which the stream is replayed faster than real time. The netem delays are scaled down by the
+        same factor and the timestamps of the capture are scaled up afterwards, so that a manipulation takes only a
+        fraction of the stream's duration.
+
+        :param factor: the compression factor (1 -> real time)
+        :type factor: float
+
+        :param timer_resolution: the effective resolution (in ms) of the timers of tcpreplay and netem on the host,
+            which limits the compression factor (see `TIME_COMPRESSION_MAX_RELATIVE_ERROR`)
+        :type timer_resolution: float
+
+        :return: self
+        :rtype: TrafficControlManipulator
+        """
+
+        assert isinstance(factor, float)
+        assert factor >= 1, "The time compression factor has to be at least 1!"
+        assert isinstance(timer_resolution, float) and timer_resolution > 0, "The timer resolution has to be positive!"
+
+        self._time_compression = factor
+        self._timer_resolution = timer_resolution
+        return self
+
+    def __get_jitter(self):
+        """
+        Returns the jitter of the manipulation in ms, which is 0 without a jitter distribution.
+
+        :rtype: float
+        """
+
+        if self._settings[TCRes.DB_JITTER_DISTRIBUTION_FIELD_NAME] == TCRes.DB_JITTER_DISTRIBUTION_VALUE_NONE:
+            return 0.0
+
+        return float(self._settings.get(TCRes.DB_JITTER_FIELD_NAME, 0))
+
+    def __get_program_path(self, program_path):
+        """
+        Returns the program path to use in a command, which considers the network namespace.
+
+        :param program_path: the path of the program to execute
+        :type program_path: basestring
+
+        :return: the program path to use in a command, which considers the network namespace
+        :rtype: str
+        """
+
+        if self._network_namespace is None:
+            return program_path
+
+        return self._network_namespace.get_program_path(program_path)
+
+    def __get_sender_device(self):
+        """
+        :return: the device where the packets are replayed and the traffic control settings are applied on
+        :rtype: str
+        """
+
+        if self._network_namespace is None:
+            return STREAM_NETWORK_INTERFACE
+
+        return self._network_namespace.get_sender_device()
+
+    def __get_receiver_device(self):
+        """
+        :return: the device where the manipulated packets are captured
+        :rtype: str
+        """
+
+        if self._network_namespace is None:
+            return STREAM_NETWORK_INTERFACE
+
+        return self._network_namespace.get_receiver_device()
+
     def _get_resource_handler(self):
         """
         Returns the resource handler for the online manipulation.
@@ -29,8 +139,7 @@ class TrafficControlManipulator(AbstractManipulator):
 
         return TCRes(self._config_path + self.MANIPULATOR_RESOURCE_PATH)
 
-    @staticmethod
-    def __get_new_tc_add_command():
+    def __get_new_tc_add_command(self):
         """
         Generates and returns a command for the TC tool, which adds a qdisc-operation.
 
@@ -46,9 +155,9 @@ class TrafficControlManipulator(AbstractManipulator):
         <NODE=root|parent>: node of the device to operate in
         """
 
-        tc_command = Command('tc')
+        tc_command = Command(self.__get_program_path('tc'))
         tc_command.set_as_argument('QDISC-OPERATION', 'qdisc add') \
-                  .set_as_argument('DEVICE', 'dev %s root' % STREAM_NETWORK_INTERFACE)
+                  .set_as_argument('DEVICE', 'dev %s root' % self.__get_sender_device())
 
         return tc_command
 
@@ -59,26 +168,30 @@ class TrafficControlManipulator(AbstractManipulator):
 
         distribution = self._settings[TCRes.DB_JITTER_DISTRIBUTION_FIELD_NAME]
 
-        delay = float(self._settings[TCRes.DB_DELAY_FIELD_NAME]) # in ms
+        delay = float(self._settings[TCRes.DB_DELAY_FIELD_NAME]) / self._time_compression # in ms
         if distribution == TCRes.DB_JITTER_DISTRIBUTION_VALUE_NONE and delay == TCRes.DB_DELAY_VALUE_NONE:
             return
 
         """
         netem: http://www.linuxfoundation.org/collaborate/workgroups/networking/netem
 
-        delay <DELAY_IN_MS>ms [<JITTER_IN_MS>ms [<DISTRIBUTION>%|distribution <DISTRIBUTION_TYPE>]]:
+        delay <DELAY_IN_MS>ms [<JITTER_IN_MS>ms [<CORRELATION>%] [distribution <DISTRIBUTION_TYPE>]]:
           sets a delay of <DELAY_IN_MS> ms and optionally a jitter of <JITTER_IN_MS>ms can be defined. Further more
           a distribution can be set for the jitter.
         """
 
+        delay_argument = 'delay %.3fms' % delay
+
+        # a delay without jitter distribution has no jitter
+        if distribution != TCRes.DB_JITTER_DISTRIBUTION_VALUE_NONE:
+            delay_argument += ' %.3fms' % (self.__get_jitter() / self._time_compression)
+            if TCRes.DB_CORRELATION_FIELD_NAME in self._settings:
+                delay_argument += ' %.2f%%' % float(self._settings[TCRes.DB_CORRELATION_FIELD_NAME])
+            delay_argument += ' distribution %s' % distribution
+
         tc_command = self.__get_new_tc_add_command()
         tc_command.set_as_argument('NETEM', 'netem') \
-                  .set_as_argument('DELAY', 'delay %.2fms %.2fms distribution %s' % (
-                      delay,
-                      float(self._settings[TCRes.DB_JITTER_FIELD_NAME]),
-                      distribution
-                  )
-        )
+                  .set_as_argument('DELAY', delay_argument)
 
         self._cmd(tc_command)
 
@@ -218,44 +331,24 @@ class TrafficControlManipulator(AbstractManipulator):
 
     def __handle_tcpdump_on_destination(self):
         """
-        Starts a "tcpdump" process, which captures packets transmitted over the network and collects them in a
+        Starts a capture, which records the packets transmitted over the network and collects them in the
         pre-specified destination file.
 
-        :return: The tcpdump process which is used to dump the transmitted packets into the destination file
-        :rtype: Process
+        :return: The running capture which dumps the transmitted packets into the destination file
+        :rtype: util.packetCapture.PacketCapture|Process|None
         """
 
-        """
-        tcpdump: http://www.tcpdump.org/tcpdump_man.html
-
-        -i <INPUT>: specifies input resource
-        -w <OUTPUT>: specifies output resource to write pcap content
-
-        additional filter used here: '<PROTOCOL> port <PORT>'
-        --> Capture only all packets which are delivered via the <PROTOCOL> protocol over port <PORT>
-        """
-
-        tcpdump_command = Command('tcpdump')
-        tcpdump_command.set_as_subprocess() \
-                       .set_as_posix_option('i', STREAM_NETWORK_INTERFACE) \
-                       .set_as_posix_option('w', self._dst_file_path) \
-                       .set_as_argument('PROTOCOL', STREAM_PROTOCOL_UDP) \
-                       .set_as_argument('PORT', 'port %d' % STREAM_PORT)
-
-        # set loggings
+        tcpdump_log_file_path = None
         if self._log_folder and self._log_suffix:
             tcpdump_log_file_path = self._get_log_file_path('tcpdump')
-            tcpdump_command.set_as_log_file(tcpdump_log_file_path) \
-                           .set_std_err_redirect_to_file()
 
-        process = self._cmd(tcpdump_command)
-
-        # wait a short time wherein the process is able to initialize itself
-        if not self._is_dry_run:
-            from time import sleep
-            sleep(1)
-
-        return process
+        return self._start_capture(
+            self.__get_receiver_device(),
+            self._dst_file_path,
+            STREAM_PORT,
+            network_namespace=self._network_namespace,
+            log_file_path=tcpdump_log_file_path
+        )
 
     def __replay_stream(self):
         """
@@ -270,9 +363,14 @@ class TrafficControlManipulator(AbstractManipulator):
         <INPUT>: input resource to replay the packets from
         """
 
-        tcpreplay_command = Command('tcpreplay')
-        tcpreplay_command.set_as_posix_option('i', STREAM_NETWORK_INTERFACE) \
-                         .set_as_argument('INPUT', self._src_file_path)
+        tcpreplay_command = Command(self.__get_program_path('tcpreplay'))
+        tcpreplay_command.set_as_posix_option('i', self.__get_sender_device())
+
+        if self._time_compression != 1:
+            # --multiplier <FACTOR>: replay the packets <FACTOR> times faster than captured
+            tcpreplay_command.set_as_gnu_option('multiplier', '%g' % self._time_compression)
+
+        tcpreplay_command.set_as_argument('INPUT', self._src_file_path)
 
         if self._log_folder:
             from os import devnull
@@ -287,12 +385,81 @@ class TrafficControlManipulator(AbstractManipulator):
         Replays the packet stream and dumps it to the pre-specified destination file.
         """
 
-        tcpdump_process = self.__handle_tcpdump_on_destination()
+        capture = self.__handle_tcpdump_on_destination()
 
         self.__replay_stream()
 
-        if isinstance(tcpdump_process, Process):
-            self._terminate_process_with_children(tcpdump_process)
+        self._stop_capture(capture)
+
+        if self._time_compression != 1 and not self._is_dry_run:
+            self.__expand_capture_timestamps()
+
+    def __check_time_compression(self):
+        """
+        Reports the accuracy envelope of a time compressed replay, i.e. the timing error which the timer resolution
+        causes after the timestamps are scaled back, and refuses compression factors which would distort the delay
+        and jitter distributions or the packet gaps of the stream. Timings which are 0 (e.g. no jitter) are not checked.
+
+        :raises Warning: if the compression factor is too large for the manipulation
+        """
+
+        envelope = self._timer_resolution * self._time_compression
+
+        timings = {
+            'delay': float(self._settings[TCRes.DB_DELAY_FIELD_NAME]),
+            'jitter': self.__get_jitter()
+        }
+
+        if not self._is_dry_run:
+            from util.pcapFile import PcapReader
+
+            with PcapReader(self._src_file_path) as reader:
+                units_per_ms = 1000000.0 if reader.is_nano else 1000.0
+                timestamps = [ts_sec * units_per_ms * 1000 + ts_frac for (ts_sec, ts_frac, orig_len, data) in reader]
+
+            if len(timestamps) > 1:
+                timings['mean packet gap'] = (timestamps[-1] - timestamps[0]) / units_per_ms / (len(timestamps) - 1)
+
+        print '# \033[1m\033[94mTIME COMPRESSION x%g: accuracy envelope +/-%.3f ms (timer resolution %.3f ms)' \
+              '\033[0m' % (self._time_compression, envelope, self._timer_resolution)
+
+        for (name, timing) in sorted(timings.items()):
+            if timing > 0 and envelope > TIME_COMPRESSION_MAX_RELATIVE_ERROR * timing:
+                raise Warning('The time compression factor %g is too large for the %s of %.3f ms (accuracy envelope: '
+                              '+/-%.3f ms, at most %d%% allowed, i.e. a factor of at most %g with the timer resolution '
+                              'of %.3f ms)!' % (
+                                  self._time_compression, name, timing, envelope,
+                                  TIME_COMPRESSION_MAX_RELATIVE_ERROR * 100,
+                                  TIME_COMPRESSION_MAX_RELATIVE_ERROR * timing / self._timer_resolution,
+                                  self._timer_resolution
+                              ))
+
+    def __expand_capture_timestamps(self):
+        """
+        Scales the timestamps of a capture of a time compressed replay back to real time, relative to the first
+        captured packet.
+        """
+
+        from os import rename
+        from util.pcapFile import PcapReader, PcapWriter
+
+        tmp_file_path = self._dst_file_path + '.part'
+
+        with PcapReader(self._dst_file_path) as reader:
+            units_per_second = 1000000000 if reader.is_nano else 1000000
+
+            with PcapWriter.like(tmp_file_path, reader) as writer:
+                first_timestamp = None
+
+                for (ts_sec, ts_frac, orig_len, data) in reader:
+                    timestamp = ts_sec * units_per_second + ts_frac
+                    if first_timestamp is None:
+                        first_timestamp = timestamp
+
+                    timestamp = first_timestamp + int(round((timestamp - first_timestamp) * self._time_compression))
+                    writer.write(timestamp // units_per_second, timestamp % units_per_second, orig_len, data)
+
+        rename(tmp_file_path, self._dst_file_path)
 
 
     def manipulate(self):
@@ -307,6 +474,9 @@ class TrafficControlManipulator(AbstractManipulator):
             # the loss tool will perform the tracing
             return
 
+        if self._time_compression != 1:
+            self.__check_time_compression()
+
         self.__manipulate_time_behaviour()
         self.__manipulate_space_behaviour()
 
@@ -328,8 +498,8 @@ class TrafficControlManipulator(AbstractManipulator):
         """
 
         # delete tc settings -> reset to default
-        tc_cleanup_command = Command('tc')
+        tc_cleanup_command = Command(self.__get_program_path('tc'))
         tc_cleanup_command.set_as_argument('QDISC-OPERATION', 'qdisc del') \
-                          .set_as_argument('DEVICE', 'dev %s root' % STREAM_NETWORK_INTERFACE)
+                          .set_as_argument('DEVICE', 'dev %s root' % self.__get_sender_device())
 
         self._cmd(tc_cleanup_command)
\ No newline at end of file
@@ -19,22 +19,34 @@ class PacketLossTable(DbHandler, MetaConfigInterface):
     # specific loss setting fields
     DB_TABLE_FIELD_NAME_MANIPULATOR_TOOL = 'manipulator_tool'
     DB_TABLE_FIELD_NAME_MANIPULATOR_TOOL_ID = 'manipulator_tool_id'
+    DB_TABLE_FIELD_NAME_FEC_ID = 'fec_id'
+    DB_TABLE_FIELD_NAME_ARQ_ID = 'arq_id'
 
     DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__NONE = 'none'
     DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TC = 'tc'
     DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TELCHEMY = 'telchemy'
+    DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TC_OFFLINE = 'tc_offline'
+    DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TELCHEMY_OFFLINE = 'telchemy_offline'
+    DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__QUEUE_OFFLINE = 'queue_offline'
+    DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__SELECTIVE_OFFLINE = 'selective_offline'
 
     VALID_FIELD_VALUES__MANIPULATOR_TOOL = (
         DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__NONE,
         DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TC,
-        DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TELCHEMY
+        DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TELCHEMY,
+        DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TC_OFFLINE,
+        DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TELCHEMY_OFFLINE,
+        DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__QUEUE_OFFLINE,
+        DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__SELECTIVE_OFFLINE
     )
 
     # valid field names used in the table
     _valid_field_names = (
         DB_TABLE_FIELD_NAME_PACKET_LOSS_ID,
         DB_TABLE_FIELD_NAME_MANIPULATOR_TOOL,
-        DB_TABLE_FIELD_NAME_MANIPULATOR_TOOL_ID
+        DB_TABLE_FIELD_NAME_MANIPULATOR_TOOL_ID,
+        DB_TABLE_FIELD_NAME_FEC_ID,
+        DB_TABLE_FIELD_NAME_ARQ_ID
     )
 
     @staticmethod
@@ -62,16 +74,36 @@ applied on different streamed sources.""",
                     PacketLossTable.DB_TABLE_FIELD_NAME_MANIPULATOR_TOOL_ID,
                     int,
                     'unique id which refers to the manipulator\'s specific settings'
+                ),
+                MetaTableField(
+                    PacketLossTable.DB_TABLE_FIELD_NAME_FEC_ID,
+                    int,
+                    '[optional] unique id which refers to the FEC settings, with which the losses of an offline '
+                    'manipulator are repaired (before any retransmissions)'
+                ),
+                MetaTableField(
+                    PacketLossTable.DB_TABLE_FIELD_NAME_ARQ_ID,
+                    int,
+                    '[optional] unique id which refers to the retransmission settings, with which the losses of an '
+                    'offline manipulator are recovered'
                 )
             ]
         )
 
         from manipulators.resources.trafficControlManipulatorResource import TrafficControlManipulatorResource as TCRes
         from manipulators.resources.telchemyManipulatorResource import TelchemyManipulatorResource as TelchemyRes
+        from manipulators.resources.queueManipulatorResource import QueueManipulatorResource as QueueRes
+        from manipulators.resources.selectiveManipulatorResource import SelectiveManipulatorResource as SelectiveRes
+        from manipulators.resources.fecManipulatorResource import FecManipulatorResource as FecRes
+        from manipulators.resources.arqManipulatorResource import ArqManipulatorResource as ArqRes
 
         config.add_children([
             TCRes.get_meta_description(),
-            TelchemyRes.get_meta_description()
+            TelchemyRes.get_meta_description(),
+            QueueRes.get_meta_description(),
+            SelectiveRes.get_meta_description(),
+            FecRes.get_meta_description(),
+            ArqRes.get_meta_description()
         ])
 
         return config
@@ -112,4 +144,10 @@ applied on different streamed sources.""",
             self.DB_TABLE_FIELD_NAME_PACKET_LOSS_ID
         ])
 
+        for field_name in (self.DB_TABLE_FIELD_NAME_FEC_ID, self.DB_TABLE_FIELD_NAME_ARQ_ID):
+            if row.get(field_name):
+                self._map_int(row, field_name)
+            else:
+                row[field_name] = None
+
         # TODO add validity for manipulator tool id
\ No newline at end of file
@@ -1,6 +1,5 @@
 __author__ = 'Alexander Dethof'
 
-from scapy.all import PcapReader, Packet
 from os.path import exists, isfile, basename
 from subtools.abstractSubTool import AbstractSubTool
 
@@ -9,6 +8,9 @@ class LossTraceParser(AbstractSubTool):
     """
     Loads two different pcaps and compares them. The first loaded pcap file is defined as the reference file, whereas
     the second file is defined as the loss file. Other usages may lead to undetermined results!
+
+    The packets are compared by their (UDP) payloads, using the packet indexes of the captures (see
+    `util.packetIndex`), which are built once per capture.
     """
 
     def __init__(self, parent):
@@ -25,28 +27,25 @@ class LossTraceParser(AbstractSubTool):
         self.__loss_file_path = ''
         self.__trace_file_path = ''
 
-        self.__trace_file = None
-        self.__loss_pcap_reader = None
-        self.__complete_pcap_reader = None
-
-    def __dump_depacketization_state(self, packet_index, packet_count):
+    @staticmethod
+    def __get_packet_keys(pcap_file_path):
         """
-        Dumps the depacketization state, i.e. the amount of parsed packets to the total amount of packets to parse.
+        Returns a key of each packet of a capture, which identifies the packet by the checksum and the length of its
+        payload.
 
-        :param packet_index: the index of the packet which is in process
-        :type packet_index: int
+        :param pcap_file_path: the path of the capture
+        :type pcap_file_path: basestring
 
-        :param packet_count: the total amount of packet to process
-        :type packet_count: int
+        :rtype: list
         """
 
-        assert isinstance(packet_index, int)
-        assert isinstance(packet_count, int)
+        import numpy
+        from util.packetIndex import load_packet_index
 
-        if packet_index > 1:
-            self.remove_last_output()
+        index = load_packet_index(pcap_file_path)
+        lengths = numpy.where(index['payload_offset'] >= 0, index['payload_length'], index['captured_length'])
 
-        print '[%s] Process packet: %d/%d' % (basename(self.__trace_file_path), packet_index, packet_count)
+        return ((index['payload_checksum'].astype(numpy.int64) << 32) | lengths).tolist()
 
     def set_complete_file_path(self, complete_file_path):
         """
@@ -63,7 +62,6 @@ class LossTraceParser(AbstractSubTool):
         assert isfile(complete_file_path) and exists(complete_file_path)
 
         self.__complete_file_path = complete_file_path
-        self.__complete_pcap_reader = PcapReader(complete_file_path)
         return self
 
     def set_loss_file_path(self, loss_file_path):
@@ -81,7 +79,6 @@ class LossTraceParser(AbstractSubTool):
         assert isfile(loss_file_path) and exists(loss_file_path)
 
         self.__loss_file_path = loss_file_path
-        self.__loss_pcap_reader = PcapReader(loss_file_path)
         return self
 
     def set_trace_file_path(self, trace_file_path):
@@ -104,48 +101,39 @@ class LossTraceParser(AbstractSubTool):
         """
         Generates a trace file at the given path in Telchemy-CSV-Style, i.e. each row represents a packet in the
          complete pcap stream. The value written in (1 or 0) delivers information if the packet is part of the loss
-          stream or not.
+          stream or not. If the trace file has the extension of compact traces, the trace is written in the compact
+           binary format instead (see `manipulators.offline.compactTrace`).
         """
 
-        assert isinstance(self.__complete_pcap_reader, PcapReader)
-        assert isinstance(self.__loss_pcap_reader, PcapReader)
+        assert self.__complete_file_path
+        assert self.__loss_file_path
         assert self.__trace_file_path
 
-        # open trace file and make it clear after that add pcap states for each individual packet
-        self.__trace_file = open(self.__trace_file_path, 'a')
-        self.__trace_file.flush()
-
-        # go through the pcaps and compare them
-        last_incomplete_packet = None
-        packet_count = 0  # TODO len(self.__complete_pcap_reader)
-        packet_index = 1
-        for complete_packet in self.__complete_pcap_reader:
-            assert isinstance(complete_packet, Packet)
-
-            if last_incomplete_packet is None:
-                try:
-                    loss_packet = self.__loss_pcap_reader.next()
-                except StopIteration:
-                    loss_packet = None
-            else:
-                loss_packet = last_incomplete_packet
-
-            if isinstance(loss_packet, Packet) and loss_packet.payload == complete_packet.payload:
-                is_packet_complete = True
-                last_incomplete_packet = None
+        complete_packet_keys = self.__get_packet_keys(self.__complete_file_path)
+        loss_packet_keys = self.__get_packet_keys(self.__loss_file_path)
+
+        # go through the pcaps and compare them: a packet is received, if it is the next packet of the loss pcap
+        loss_packet_count = len(loss_packet_keys)
+        loss_packet_index = 0
+        losses = list()
+        for complete_packet_key in complete_packet_keys:
+            if loss_packet_index < loss_packet_count and loss_packet_keys[loss_packet_index] == complete_packet_key:
+                loss_packet_index += 1
+                losses.append(False)
             else:
-                is_packet_complete = False
-                last_incomplete_packet = loss_packet
+                losses.append(True)
 
-            self.__trace_file.write(str(int(is_packet_complete)) + "\n")
-            self.__dump_depacketization_state(packet_index, packet_count)
-            packet_index += 1
+        print '[%s] Processed packets: %d, lost: %d' % (
+            basename(self.__trace_file_path), len(losses), len(losses) - loss_packet_index
+        )
 
-    def cleanup(self):
-        """
-        Cleans up the tool.
-        """
+        # the trace is written at once, replacing the trace of a previous run
+        from os import extsep
+        from manipulators.offline.compactTrace import \
+            COMPACT_TRACE_FILE_EXTENSION, write_compact_trace, write_text_trace
 
-        if isinstance(self.__trace_file, file):
-            self.__trace_file.close()
+        if self.__trace_file_path.endswith(extsep + COMPACT_TRACE_FILE_EXTENSION):
+            write_compact_trace(self.__trace_file_path, losses)
+        else:
+            write_text_trace(self.__trace_file_path, losses)
 
@@ -0,0 +1,214 @@
+__author__ = 'Alexander Dethof'
+
+from os.path import exists, isfile
+from subtools.abstractSubTool import AbstractSubTool
+from pvs.hrcTable import HrcTable
+
+
+class TimestampSynthesizer(AbstractSubTool):
+    """
+    Rewrites the timestamps of a packet capture of a video stream, which was not sent in real time, to the nominal
+    send schedule of a real time stream. A real time sender (like ffmpeg with `-re`) sends all packets of a frame as
+    soon as the frame is due, i.e. frame n (in sending order) at n / fps. Hence the frames are counted in the capture,
+    by the RTP timestamps of raw RTP streams or by the video PES headers of MPEG-TS streams, and each packet is moved
+    to the due time of the latest frame it carries data of, relative to the first captured packet.
+    """
+
+    # size of MPEG-TS packets and the sync byte starting each of them
+    TS_PACKET_SIZE = 188
+    TS_SYNC_BYTE = 0x47
+
+    # minimum size of a RTP header
+    RTP_HEADER_SIZE = 12
+
+    def __init__(self, parent):
+        """
+        Main initialization of this sub tool.
+
+        :param parent: A reference to the sub tool's parent tool.
+        :type parent: tool.abstractTool.AbstractTool
+        """
+
+        super(TimestampSynthesizer, self).__init__(parent)
+
+        self.__pcap_file_path = ''
+        self.__stream_mode = ''
+        self.__fps = 0.0
+
+    def set_pcap_file_path(self, pcap_file_path):
+        """
+        Sets the path of the packet capture to rewrite.
+
+        :param pcap_file_path: the path of the packet capture to rewrite
+        :type pcap_file_path: basestring
+
+        :return: self
+        :rtype: TimestampSynthesizer
+        """
+
+        assert isinstance(pcap_file_path, basestring)
+        assert isfile(pcap_file_path) and exists(pcap_file_path)
+
+        self.__pcap_file_path = pcap_file_path
+        return self
+
+    def set_stream_mode(self, stream_mode):
+        """
+        Sets the mode the video was streamed with.
+
+        :param stream_mode: the mode the video was streamed with
+        :type stream_mode: basestring
+
+        :return: self
+        :rtype: TimestampSynthesizer
+        """
+
+        assert stream_mode in HrcTable.VALID_STREAM_MODES
+
+        self.__stream_mode = stream_mode
+        return self
+
+    def set_fps(self, fps):
+        """
+        Sets the frame rate of the streamed video.
+
+        :param fps: the frame rate of the streamed video (frames/second)
+        :type fps: int|float
+
+        :return: self
+        :rtype: TimestampSynthesizer
+        """
+
+        assert isinstance(fps, (int, float)) and fps > 0
+
+        self.__fps = float(fps)
+        return self
+
+    def __get_rtp_payload_offset(self, payload):
+        """
+        Returns the offset of the payload of a RTP packet.
+
+        :param payload: the UDP payload which contains the RTP packet
+        :type payload: str
+
+        :return: the offset of the RTP payload, or None if the UDP payload is no RTP packet
+        :rtype: int|None
+        """
+
+        if len(payload) < self.RTP_HEADER_SIZE or ord(payload[0]) >> 6 != 2:
+            return None
+
+        # fixed header + CSRC identifiers
+        offset = self.RTP_HEADER_SIZE + (ord(payload[0]) & 0x0f) * 4
+
+        # header extension
+        if ord(payload[0]) & 0x10 and len(payload) >= offset + 4:
+            offset += 4 + ((ord(payload[offset + 2]) << 8) | ord(payload[offset + 3])) * 4
+
+        return offset if offset <= len(payload) else None
+
+    def __count_video_frame_starts(self, payload, offset):
+        """
+        Counts the video PES headers, i.e. the starts of frames, in the MPEG-TS packets of a payload.
+
+        :param payload: the payload which contains the MPEG-TS packets
+        :type payload: str
+
+        :param offset: the offset of the first MPEG-TS packet
+        :type offset: int
+
+        :return: the number of frames which start in the payload
+        :rtype: int
+        """
+
+        frame_start_count = 0
+
+        for ts_offset in xrange(offset, len(payload) - self.TS_PACKET_SIZE + 1, self.TS_PACKET_SIZE):
+            header = payload[ts_offset:ts_offset + 4]
+
+            # skip packets which are out of sync or do not start a PES (payload unit start indicator)
+            if ord(header[0]) != self.TS_SYNC_BYTE or not ord(header[1]) & 0x40:
+                continue
+
+            adaptation_field_control = (ord(header[3]) >> 4) & 0x03
+            if not adaptation_field_control & 0x01:
+                continue
+
+            pes_offset = ts_offset + 4
+            if adaptation_field_control & 0x02:
+                pes_offset += 1 + ord(payload[pes_offset])
+
+            # PES start code prefix followed by a video stream id (0xE0 - 0xEF)
+            if payload[pes_offset:pes_offset + 3] == '\x00\x00\x01' \
+                    and pes_offset + 3 < ts_offset + self.TS_PACKET_SIZE \
+                    and ord(payload[pes_offset + 3]) & 0xf0 == 0xe0:
+                frame_start_count += 1
+
+        return frame_start_count
+
+    def synthesize(self):
+        """
+        Rewrites the timestamps of the packet capture.
+
+        :return: the number of frames found in the capture
+        :rtype: int
+        """
+
+        assert self.__pcap_file_path, "No packet capture specified!"
+        assert self.__stream_mode, "No stream mode specified!"
+        assert self.__fps > 0, "No frame rate specified!"
+
+        from os import rename
+        from util.pcapFile import PcapReader, PcapWriter, get_udp_header_offset, UDP_HEADER_SIZE
+
+        print "# \033[1m\033[94mRUN : re-synthesize timestamps of %s (%.3f fps)\033[0m" % (
+            self.__pcap_file_path, self.__fps
+        )
+
+        if self._is_dry_run:
+            return 0
+
+        is_raw_rtp = self.__stream_mode == HrcTable.DB_STREAM_MODE_FIELD_VALUE_RAW_RTP
+        is_rtp = self.__stream_mode in (
+            HrcTable.DB_STREAM_MODE_FIELD_VALUE_RAW_RTP,
+            HrcTable.DB_STREAM_MODE_FIELD_VALUE_MPEGTS_RTP
+        )
+
+        tmp_file_path = self.__pcap_file_path + '.tmp'
+
+        frame_index = -1
+        last_rtp_timestamp = None
+        start_time = None
+
+        with PcapReader(self.__pcap_file_path) as reader:
+            with PcapWriter.like(tmp_file_path, reader) as writer:
+                resolution = 1000000000 if reader.is_nano else 1000000
+
+                for (ts_sec, ts_frac, orig_len, data) in reader:
+                    if start_time is None:
+                        start_time = ts_sec * resolution + ts_frac
+
+                    udp_offset = get_udp_header_offset(reader.link_type, data)
+                    if udp_offset is not None:
+                        payload = data[udp_offset + UDP_HEADER_SIZE:]
+                        payload_offset = self.__get_rtp_payload_offset(payload) if is_rtp else 0
+
+                        if payload_offset is None:
+                            pass
+
+                        elif is_raw_rtp:
+                            # all packets of a frame share the frame's RTP timestamp
+                            rtp_timestamp = payload[4:8]
+                            if rtp_timestamp != last_rtp_timestamp:
+                                frame_index += 1
+                                last_rtp_timestamp = rtp_timestamp
+
+                        else:
+                            frame_index += self.__count_video_frame_starts(payload, payload_offset)
+
+                    time = start_time + int(round(max(frame_index, 0) * resolution / self.__fps))
+                    writer.write(time // resolution, time % resolution, orig_len, data)
+
+        rename(tmp_file_path, self.__pcap_file_path)
+
+        return frame_index + 1
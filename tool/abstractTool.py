@@ -84,6 +84,7 @@ class AbstractTool(Operator):
         self._warnings = list()
         self._exceptions = list()
         self._registered_sub_tools = list()
+        self._prefetcher = None
 
         # set tool specific options
         tool_options = self._config.get_tool_options()
@@ -96,6 +97,75 @@ class AbstractTool(Operator):
         Function which should be overwritten in each tool, to execute the tool's functionality.
         """
 
+    def _get_jobs(self):
+        """
+        Returns all jobs of the tool, i.e. all combinations of sources and their HRCs, in the order in which they are
+        processed.
+
+        :return: all jobs of the tool as list of tuples (src_id, hrc_set)
+        :rtype: list[tuple]
+        """
+
+        jobs = list()
+        for src_set in self._src_sets:
+            src_id = int(src_set[self._src_table.DB_TABLE_FIELD_NAME_SRC_ID])
+
+            try:
+                hrc_sets = self._pvs_matrix.get_hrc_sets_of_src_id(src_id)
+            except KeyError:
+                # sources without HRCs are reported by the tool itself, when it comes to them
+                continue
+
+            for hrc_set in hrc_sets:
+                jobs.append((src_id, hrc_set))
+
+        return jobs
+
+    def _start_prefetcher(self, option_key, get_input_path):
+        """
+        Starts reading ahead the inputs of upcoming jobs, if the given option is set. The option requires the
+        arguments <DEPTH>,<BUDGET_MB>, i.e. the number of upcoming jobs to read ahead and the maximum number of MB
+        which may be read ahead at the same time.
+
+        :param option_key: the key of the tool's option which enables the read ahead
+        :type option_key: basestring
+
+        :param get_input_path: a function which returns the input path of a job for a given source id and HRC set
+        :type get_input_path: callable
+        """
+
+        assert isinstance(option_key, basestring)
+        assert callable(get_input_path)
+
+        if option_key not in self._options or self._is_dry_run:
+            return
+
+        (depth, budget) = self._options[option_key]
+
+        try:
+            depth = int(depth)
+            byte_budget = int(float(budget) * 1024 * 1024)
+        except ValueError:
+            raise SyntaxError('The option `%s` requires the arguments <DEPTH>,<BUDGET_MB>, but `%s,%s` was given!' % (
+                option_key, depth, budget
+            ))
+
+        from util.prefetcher import Prefetcher
+        input_paths = [get_input_path(src_id, hrc_set) for (src_id, hrc_set) in self._get_jobs()]
+        self._prefetcher = Prefetcher(input_paths, depth, byte_budget)
+
+    def _prefetch_next(self, input_path):
+        """
+        Notifies the prefetcher (if started) that the job with the given input is processed now, so that the inputs of
+        the next jobs are read ahead in the meanwhile.
+
+        :param input_path: the input path of the job which is processed now
+        :type input_path: basestring
+        """
+
+        if self._prefetcher is not None:
+            self._prefetcher.advance(input_path)
+
     def _get_codec_by_hrc_set(self, hrc_set):
         """
         Returns the codec associated with a given HRC set, linked in its appropriate encoding settings!
@@ -347,6 +417,10 @@ class AbstractTool(Operator):
 
         self._cleanup_sub_tools()
 
+        if self._prefetcher is not None:
+            self._prefetcher.cleanup()
+            self._prefetcher = None
+
     def request_sub_tool(self, tool_id):
         """
         Requests the tool to load a sub tool and to register it in it's sub tool queue.
@@ -12,7 +12,7 @@ TOOL_ID_ENCODE = 'encode_videos'
 from abstractTool import AbstractTool
 # noinspection PyPep8Naming
 from os import sep as PATH_SEPARATOR, remove
-from os.path import exists
+from os.path import exists, isfile
 from pvs.hrc.encodingTable import EncodingTable
 from coder.coderList import get_validated_coder
 
@@ -23,6 +23,15 @@ class EncodeTool(AbstractTool):
     encoder's output dir.
     """
 
+    # define the available tool options
+    OPTION_STAGE_SOURCES = 'stage_sources'
+
+    _options_parser = {
+        # if option stage_sources=<DIR>,<BUDGET_MB> is set -> the raw sources are staged into the folder <DIR> (e.g. a
+        # tmpfs like /dev/shm or a local SSD) before they are encoded, using at most <BUDGET_MB> MB at the same time
+        OPTION_STAGE_SOURCES: 2
+    }
+
     def __init__(self, pvs_matrix, config):
         """
         Initialization of the tool. Loads the given pvs matrix into the tool and connects it to the encoding table,
@@ -39,6 +48,77 @@ class EncodeTool(AbstractTool):
         self.__encoding_table = pvs_matrix.get_hrc_table().get_encoding_table()
         self.__src_enc_references = dict()
 
+        self.__staging_cache = None
+        if self.OPTION_STAGE_SOURCES in self._options and not self._is_dry_run:
+            (staging_dir_path, budget) = self._options[self.OPTION_STAGE_SOURCES]
+
+            try:
+                byte_budget = int(float(budget) * 1024 * 1024)
+            except ValueError:
+                raise SyntaxError('The budget of the option `%s` has to be given in MB, but `%s` was given!' % (
+                    self.OPTION_STAGE_SOURCES, budget
+                ))
+
+            from util.stagingCache import StagingCache
+            self.__staging_cache = StagingCache(staging_dir_path, byte_budget)
+
+    def __get_src_path(self, src_name):
+        """
+        Returns the path of a raw video source.
+
+        :param src_name: the name of the source
+        :type src_name: basestring
+
+        :return: the path of the raw video source
+        :rtype: str
+        """
+
+        assert isinstance(src_name, basestring)
+
+        return self._path + ENCODER_SOURCE_DIR + PATH_SEPARATOR + src_name
+
+    def __get_destination_path(self, src_id, hrc_set):
+        """
+        Returns the path of the encoded video for a given source and HRC.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the set defining the HRC
+        :type hrc_set: dict
+
+        :return: the path of the encoded video for a given source and HRC
+        :rtype: str
+        """
+
+        codec = self._get_codec_by_hrc_set(hrc_set)
+
+        return self._path \
+            + ENCODER_DESTINATION_DIR \
+            + PATH_SEPARATOR \
+            + self._get_output_file_name(src_id, hrc_set, codec.get_raw_file_extension())
+
+    def __is_encoding_required(self, src_id):
+        """
+        Returns true if at least one HRC of the given source still has to be encoded, i.e. its source is going to be
+        read.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :return: true if at least one HRC of the given source still has to be encoded, false otherwise
+        :rtype: bool
+        """
+
+        if self._is_override_mode:
+            return True
+
+        for hrc_set in self._pvs_matrix.get_hrc_sets_of_src_id(src_id):
+            if not exists(self.__get_destination_path(src_id, hrc_set)):
+                return True
+
+        return False
+
     def __encode_source_by_hrc(self, src_id, src_name, src_set, hrc_set):
         """
         Encodes a given video source according to a specific HRC definition.
@@ -76,14 +156,7 @@ class EncodeTool(AbstractTool):
         coder = get_validated_coder(coding_id, self._config.get_config_folder_path())
         codec = self._get_codec_by_hrc_set(hrc_set)
 
-        destination_path = self._path \
-                           + ENCODER_DESTINATION_DIR \
-                           + PATH_SEPARATOR \
-                           + self._get_output_file_name(
-                                src_id,
-                                hrc_set,
-                                codec.get_raw_file_extension()
-                            )
+        destination_path = self.__get_destination_path(src_id, hrc_set)
 
         if self._IS_INFO_MODE:
             print 'HRC: %d (ENC: %d)' % (hrc_id, encoding_id)
@@ -104,7 +177,8 @@ class EncodeTool(AbstractTool):
                       % (src_id, int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID]))
                 return  # !!
 
-        # check if the encoding has been done onetime, if so just copy the file from previous HRC
+        # check if the encoding has been done onetime, if so just materialize the file of the previous HRC (hard link or
+        # copy-on-write clone if possible, byte copy otherwise)
         if encoding_id in self.__src_enc_references[src_id]:
             ref_hrc_id = self.__src_enc_references[src_id][encoding_id]
             ref_hrc_set = self._hrc_table.get_row_with_id(ref_hrc_id)
@@ -121,11 +195,12 @@ class EncodeTool(AbstractTool):
                   % (src_id, int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID]), ref_hrc_id)
 
             if not self._is_dry_run:
-                from shutil import copyfile
-                copyfile(ref_file_path, destination_path)
+                from util.fileMaterializer import materialize_file
+                materialize_file(ref_file_path, destination_path)
             return  # !!
 
-        coder.set_src_path(self._path + ENCODER_SOURCE_DIR + PATH_SEPARATOR + src_name) \
+        coder.set_staging_cache(self.__staging_cache) \
+             .set_src_path(self.__get_src_path(src_name)) \
              .set_destination_path(destination_path)
 
         # get encoding set
@@ -202,6 +277,40 @@ class EncodeTool(AbstractTool):
         # encode video with the settings
         self.__encode_source_by_hrcs(src_id, src_name, src_set, hrc_sets)
 
+    def __prefetch_source(self, src_index):
+        """
+        Stages the source at the given position of the source table in background, if it is going to be encoded.
+
+        :param src_index: the position of the source in the source table
+        :type src_index: int
+        """
+
+        assert isinstance(src_index, int)
+
+        if src_index >= len(self._src_sets):
+            return
+
+        src_set = self._src_sets[src_index]
+        src_id = int(src_set[self._src_table.DB_TABLE_FIELD_NAME_SRC_ID])
+        src_path = self.__get_src_path(src_set[self._src_table.DB_TABLE_FIELD_NAME_SRC_NAME])
+
+        try:
+            if isfile(src_path) and self.__is_encoding_required(src_id):
+                self.__staging_cache.prefetch([src_path])
+        except KeyError:
+            # the source has no HRC -> will be reported when it is processed
+            pass
+
+    def cleanup(self):
+        """
+        Cleans up the tool, i.e. removes all staged sources.
+        """
+
+        super(EncodeTool, self).cleanup()
+
+        if self.__staging_cache is not None:
+            self.__staging_cache.cleanup()
+
     def execute(self):
         """
         Executes the tool and encodes all videos which are set in the PVS matrix's SRC table and stored in the tool's
@@ -210,7 +319,7 @@ class EncodeTool(AbstractTool):
 
         super(self.__class__, self).execute()
 
-        for src_set in self._src_sets:
+        for (src_index, src_set) in enumerate(self._src_sets):
 
             assert isinstance(src_set, dict)
             assert self._src_table.DB_TABLE_FIELD_NAME_SRC_ID in src_set
@@ -223,7 +332,16 @@ class EncodeTool(AbstractTool):
             if self._IS_INFO_MODE:
                 print '--> ENCODE source -- id: %d | name: %s' % (src_id, src_name)
 
+            src_path = self.__get_src_path(src_name)
+            is_staged = False
+
             try:
+                # stage the source (pinned while its HRCs are encoded) and the source of the next job in background
+                if self.__staging_cache is not None and isfile(src_path) and self.__is_encoding_required(src_id):
+                    self.__staging_cache.stage(src_path, pin=True)
+                    is_staged = True
+                    self.__prefetch_source(src_index + 1)
+
                 # encode video
                 self.__encode_source(src_id, src_name, src_set)
             except (KeyError, Warning) as e:
@@ -231,6 +349,9 @@ class EncodeTool(AbstractTool):
                 # They will only lead to the circumstance that not all videos could be converted with the given
                 # settings. The tool should be able to tolerate this, but will still log the problems.
                 self._append_exception(e)
+            finally:
+                if is_staged:
+                    self.__staging_cache.unpin(src_path)
 
         # show summary of all errors and warnings collected
         self._show_we_summary()
\ No newline at end of file
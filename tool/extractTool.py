@@ -22,6 +22,25 @@ class ExtractTool(AbstractTool):
     This tool is used to extract the payload of the transmitted .pcap files.
     """
 
+    # define the available tool options
+    OPTION_PREFETCH = 'prefetch'
+    OPTION_FLAG_INCOMPLETE_NAL_UNITS = 'flag_incomplete_nal_units'
+    OPTION_DROP_STRAY_PIDS = 'drop_stray_pids'
+
+    _options_parser = {
+        # if option prefetch=<DEPTH>,<BUDGET_MB> is set -> the captures of the next <DEPTH> jobs are read ahead in
+        # background, using at most <BUDGET_MB> MB of the page cache
+        OPTION_PREFETCH: 2,
+
+        # if option flag_incomplete_nal_units is set -> fragmented NAL units of raw-rtp streams, which are missing
+        # fragments, are written with the forbidden bit set instead of being dropped
+        OPTION_FLAG_INCOMPLETE_NAL_UNITS: 0,
+
+        # if option drop_stray_pids is set -> TS packets of mpegts streams, whose PIDs are not announced by the PAT and
+        # PMTs (e.g. null packets), are dropped
+        OPTION_DROP_STRAY_PIDS: 0
+    }
+
     def _get_parser(self, src_path, stream_mode, codec):
         """
         Returns an adequate bit stream parser concerning the currently used streaming settings.
@@ -45,18 +64,36 @@ class ExtractTool(AbstractTool):
 
         if stream_mode == self._hrc_table.DB_STREAM_MODE_FIELD_VALUE_MPEGTS_UDP:
             from bitstreamparse.udp.mp2t import Mp2t as UdpMp2t
-            return UdpMp2t(src_path)
+            return UdpMp2t(src_path, self.OPTION_DROP_STRAY_PIDS in self._options)
 
         elif stream_mode == self._hrc_table.DB_STREAM_MODE_FIELD_VALUE_MPEGTS_RTP:
             from bitstreamparse.rtp.mp2t import Mp2t as RtpMp2t
-            return RtpMp2t(src_path)
+            return RtpMp2t(src_path, self.OPTION_DROP_STRAY_PIDS in self._options)
 
         elif stream_mode == self._hrc_table.DB_STREAM_MODE_FIELD_VALUE_RAW_RTP:
-            return codec.get_bit_stream_parser(src_path)
+            return codec.get_bit_stream_parser(src_path, self.OPTION_FLAG_INCOMPLETE_NAL_UNITS in self._options)
 
         else:
             raise Exception('Not implemented yet!')
 
+    def __get_src_path(self, src_id, hrc_set):
+        """
+        Returns the path of the packet capture to extract the payload of, for a given source and HRC.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the settings of the source
+        :type hrc_set: dict
+
+        :return: the path of the packet capture to extract the payload of, for a given source and HRC
+        :rtype: str
+        """
+
+        return self._path + EXTRACT_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
+            src_id, hrc_set, LOSS_OUTPUT_FILE_TYPE_EXTENSION
+        )
+
     def __extract_source(self, src_id, hrc_set):
         """
         Extracts the payload from a streamed pcap source, given by its id, and the additional hrc configuration
@@ -74,9 +111,8 @@ class ExtractTool(AbstractTool):
         assert self._hrc_table.DB_TABLE_FIELD_NAME_STREAM_MODE in hrc_set
 
         stream_mode = hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_STREAM_MODE]
-        src_path = self._path + EXTRACT_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
-            src_id, hrc_set, LOSS_OUTPUT_FILE_TYPE_EXTENSION
-        )
+        src_path = self.__get_src_path(src_id, hrc_set)
+        self._prefetch_next(src_path)
 
         # Recover the file extensions depending on the protocol packaging:
         # ----------------------------------------------------------------
@@ -125,13 +161,7 @@ class ExtractTool(AbstractTool):
         parser = self._get_parser(src_path, stream_mode, codec)
 
         # write bitstream into file
-        payload_file = open(destination_path, 'w')
-        payload_file.flush()
-
-        bit_stream = parser.get_bit_stream()
-        payload_file.write(bit_stream)
-
-        payload_file.close()
+        parser.write_bit_stream(destination_path)
 
     def __extract_source_with_hrc(self, source):
         """
@@ -160,6 +190,8 @@ class ExtractTool(AbstractTool):
 
         super(self.__class__, self).execute()
 
+        self._start_prefetcher(self.OPTION_PREFETCH, self.__get_src_path)
+
         for src_set in self._src_sets:
             try:
                 self.__extract_source_with_hrc(src_set)
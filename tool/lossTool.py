@@ -14,6 +14,7 @@ from pvs.hrc.packetLossTable import PacketLossTable
 from os import sep as PATH_SEPARATOR, remove
 from os.path import isfile, exists
 from manipulators.abstractManipulator import AbstractManipulator
+from manipulators.abstractOfflineManipulator import AbstractOfflineManipulator
 from subtools.abstractSubTool import AbstractSubTool
 from subtools.lossTraceParser import LossTraceParser
 
@@ -27,13 +28,63 @@ class LossTool(AbstractTool):
     # define the available tool options
     OPTION_STORE_LOSS_TRACES = 'store_loss_traces'
     OPTION_TRACE_ONLY = 'trace_only'
+    OPTION_PREFETCH = 'prefetch'
+    OPTION_PARALLEL_WORKERS = 'parallel_workers'
+    OPTION_SINGLE_PASS = 'single_pass'
+    OPTION_MASK_STORE = 'mask_store'
+    OPTION_TIME_COMPRESSION = 'time_compression'
+    OPTION_TIMER_RESOLUTION = 'timer_resolution'
+    OPTION_REALIZATIONS = 'realizations'
+    OPTION_LOSS_ANALYTICS = 'loss_analytics'
+    OPTION_COMPACT_TRACES = 'compact_traces'
 
     _options_parser = {
         # if option store_loss_traces is set -> the loss traces will be stored; if not set -> no trace will be stored!
         OPTION_STORE_LOSS_TRACES: 0,
 
         # if option trace_only is set -> only the loss traces will be done
-        OPTION_TRACE_ONLY: 0
+        OPTION_TRACE_ONLY: 0,
+
+        # if option prefetch=<DEPTH>,<BUDGET_MB> is set -> the captures of the next <DEPTH> jobs are read ahead in
+        # background, using at most <BUDGET_MB> MB of the page cache
+        OPTION_PREFETCH: 2,
+
+        # if option parallel_workers=<N> is set -> up to <N> PVSs are manipulated at the same time; each worker runs
+        # its online manipulations (tc) in an own network namespace
+        OPTION_PARALLEL_WORKERS: 1,
+
+        # if option single_pass is set -> the offline manipulations of the HRCs, whose captures are the same file
+        # (hard links, see the stream tool's option shared_captures), are applied in a single pass over it; the loss
+        # traces are written directly from the computed losses
+        OPTION_SINGLE_PASS: 0,
+
+        # if option mask_store=<DIR> is set -> the loss masks of the offline manipulations are kept in <DIR> as packed
+        # bitsets and are reused by all manipulations with the same model, parameters and seed
+        OPTION_MASK_STORE: 1,
+
+        # if option time_compression=<FACTOR> is set -> the online manipulations (tc) replay the captures <FACTOR>
+        # times faster, with netem delays scaled down and the captured timestamps scaled up by the same factor;
+        # factors which the timer resolution would distort are refused, i.e. factors above 10% of the smallest delay,
+        # jitter or mean packet gap divided by the timer resolution (e.g. above 2 for packet gaps of 1 ms by default)
+        OPTION_TIME_COMPRESSION: 1,
+
+        # if option timer_resolution=<MS> is set -> the time compression assumes the given effective resolution of
+        # the timers of tcpreplay and netem on the host instead of the default of 0.05 ms
+        OPTION_TIMER_RESOLUTION: 1,
+
+        # if option realizations=<N> is set -> the offline manipulations generate <N> seeded realizations of their
+        # loss model in a batch and keep the one closest to the configured target loss rate and burst length; the
+        # selected seed is recorded next to the lossy capture
+        OPTION_REALIZATIONS: 1,
+
+        # if option loss_analytics=<FILE> is set -> the loss traces of all PVSs are analyzed in parallel (loss rate,
+        # burst and gap lengths, RFC 3611 densities and fitted markov model parameters) and summarized in the csv
+        # file <FILE>, one row per PVS
+        OPTION_LOSS_ANALYTICS: 1,
+
+        # if option compact_traces is set -> the loss traces are stored in the compact binary format (`.ltr`, packed
+        # bits or run lengths) instead of one csv line per packet
+        OPTION_COMPACT_TRACES: 0
     }
 
     # configure available sub tools
@@ -56,6 +107,8 @@ class LossTool(AbstractTool):
         assert isinstance(self.__packet_loss_table, PacketLossTable)
 
         self.__manipulator = None
+        self.__network_namespaces = list()
+        self.__mask_store = None
 
     def _import_sub_tool(self, tool_id):
         """
@@ -119,6 +172,26 @@ class LossTool(AbstractTool):
             from manipulators.telchemyManipulator import TelchemyManipulator
             return TelchemyManipulator(self, manipulator_settings_id, self._config.get_config_folder_path())
 
+        if manipulator_id == PacketLossTable.DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TC_OFFLINE:
+            from manipulators.offlineTrafficControlManipulator import OfflineTrafficControlManipulator
+            return OfflineTrafficControlManipulator(
+                self,
+                manipulator_settings_id,
+                self._config.get_config_folder_path()
+            )
+
+        if manipulator_id == PacketLossTable.DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__TELCHEMY_OFFLINE:
+            from manipulators.offlineTelchemyManipulator import OfflineTelchemyManipulator
+            return OfflineTelchemyManipulator(self, manipulator_settings_id, self._config.get_config_folder_path())
+
+        if manipulator_id == PacketLossTable.DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__QUEUE_OFFLINE:
+            from manipulators.offlineQueueManipulator import OfflineQueueManipulator
+            return OfflineQueueManipulator(self, manipulator_settings_id, self._config.get_config_folder_path())
+
+        if manipulator_id == PacketLossTable.DB_TABLE_FIELD_VALUE_MANIPULATOR_TOOL__SELECTIVE_OFFLINE:
+            from manipulators.offlineSelectiveManipulator import OfflineSelectiveManipulator
+            return OfflineSelectiveManipulator(self, manipulator_settings_id, self._config.get_config_folder_path())
+
         """
         Further manipulators can be added here in the following scheme:
 
@@ -129,34 +202,58 @@ class LossTool(AbstractTool):
 
         raise KeyError('Could not find a packet manipulator with name `%s`' % manipulator_id)
 
-    def __insert_loss_in_source_by_hrc(self, src_id, hrc_set):
+    def __get_src_path(self, src_id, hrc_set):
         """
-        Re-streams a source according to the given network settings.
+        Returns the path of the complete packet capture of a given source and HRC.
 
-        :param src_id: the id of the source to manipulate
+        :param src_id: the id of the source
         :type src_id: int
 
-        :param hrc_set: the settings which direct the manipulation
+        :param hrc_set: the settings of the source
         :type hrc_set: dict
+
+        :return: the path of the complete packet capture of a given source and HRC
+        :rtype: str
         """
 
-        src_path = self._path + LOSS_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
+        return self._path + LOSS_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
             src_id, hrc_set, STREAM_OUTPUT_FILE_TYPE_EXTENSION
         )
 
-        if not isfile(src_path):
-            raise Warning(
-                'No loss can be inserted in source %s, since there could not be found an appropriate file for.'
-                % src_path
-            )
+    def __get_destination_path(self, src_id, hrc_set):
+        """
+        Returns the path of the lossy packet capture of a given source and HRC.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the settings of the source
+        :type hrc_set: dict
+
+        :return: the path of the lossy packet capture of a given source and HRC
+        :rtype: str
+        """
 
-        destination_path = self._path + LOSS_DESTINATION_DIR + PATH_SEPARATOR + self._get_output_file_name(
+        return self._path + LOSS_DESTINATION_DIR + PATH_SEPARATOR + self._get_output_file_name(
             src_id, hrc_set, LOSS_OUTPUT_FILE_TYPE_EXTENSION
         )
 
-        # check if the destination path already exists -> check override mode to skip or to override
-        assert self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID in hrc_set
-        hrc_id = int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID])
+    def __is_manipulation_required(self, src_id, hrc_id, destination_path):
+        """
+        Checks if the destination path already exists and considers the override mode to skip or to override it.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_id: the id of the HRC
+        :type hrc_id: int
+
+        :param destination_path: the path of the lossy packet capture
+        :type destination_path: basestring
+
+        :return: true if the manipulation is required, false if it should be skipped
+        :rtype: bool
+        """
 
         if exists(destination_path):
             if self.OPTION_TRACE_ONLY in self._options:
@@ -171,7 +268,40 @@ class LossTool(AbstractTool):
                 else:
                     print "# \033[95m\033[1mSKIP src %d : hrc %d\033[0m"\
                           % (src_id, hrc_id)
-                    return
+                    return False
+
+        return True
+
+    def __insert_loss_in_source_by_hrc(self, src_id, hrc_set, network_namespace=None):
+        """
+        Re-streams a source according to the given network settings.
+
+        :param src_id: the id of the source to manipulate
+        :type src_id: int
+
+        :param hrc_set: the settings which direct the manipulation
+        :type hrc_set: dict
+
+        :param network_namespace: the namespace wherein online manipulations should run (None -> host's loopback)
+        :type network_namespace: manipulators.networkNamespace.NetworkNamespace|None
+        """
+
+        src_path = self.__get_src_path(src_id, hrc_set)
+        self._prefetch_next(src_path)
+
+        if not isfile(src_path):
+            raise Warning(
+                'No loss can be inserted in source %s, since there could not be found an appropriate file for.'
+                % src_path
+            )
+
+        destination_path = self.__get_destination_path(src_id, hrc_set)
+
+        assert self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID in hrc_set
+        hrc_id = int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID])
+
+        if not self.__is_manipulation_required(src_id, hrc_id, destination_path):
+            return
 
         packet_loss_id = int(hrc_set[PacketLossTable.DB_TABLE_FIELD_NAME_PACKET_LOSS_ID])
         packet_loss_settings = self.__packet_loss_table.get_row_with_id(packet_loss_id)
@@ -183,17 +313,163 @@ class LossTool(AbstractTool):
             self.__trace_loss(src_path, destination_path)
             return
 
-        self.__manipulator = self.__get_manipulator(packet_loss_settings)
+        manipulator = self.__get_manipulator(packet_loss_settings)
+
+        if network_namespace is None:
+            # keep the manipulator to revert its settings, if the tool is interrupted (namespaces are just deleted)
+            self.__manipulator = manipulator
 
-        if self.__manipulator is None:
-            # if no loss is specified -> just copy!
+        if manipulator is None:
+            # if no loss is specified -> just materialize the capture (hard link or copy-on-write clone if possible)
             print '# [SRC_ID: %d|HRC_ID: %d] \033[95m\033[1mNO LOSS CASE: Just Copy!\033[0m' % (src_id, hrc_id)
             if not self._is_dry_run:
-                from shutil import copyfile
-                copyfile(src_path, destination_path)
+                from util.fileMaterializer import materialize_file
+                materialize_file(src_path, destination_path)
             return
 
-        self.__manipulator.set_src_file(src_path) \
+        from manipulators.trafficControlManipulator import TrafficControlManipulator
+        if isinstance(manipulator, TrafficControlManipulator):
+            manipulator.set_network_namespace(network_namespace)
+
+            if self.OPTION_TIME_COMPRESSION in self._options:
+                manipulator.set_time_compression(self.__get_time_compression(), self.__get_timer_resolution())
+
+        self.__set_up_manipulator(manipulator, src_id, hrc_set, src_path, destination_path).manipulate()
+
+        if is_loss_trace_mode:
+            self.__trace_loss(src_path, destination_path)
+
+    def __get_time_compression(self):
+        """
+        Returns the factor of the time compressed replay of the online manipulations.
+
+        :rtype: float
+        """
+
+        try:
+            factor = float(self._options[self.OPTION_TIME_COMPRESSION][0])
+        except ValueError:
+            raise SyntaxError('The option `%s` requires the compression factor as argument!'
+                              % self.OPTION_TIME_COMPRESSION)
+
+        if factor < 1:
+            raise SyntaxError('The compression factor of the option `%s` has to be at least 1!'
+                              % self.OPTION_TIME_COMPRESSION)
+
+        return factor
+
+    def __get_timer_resolution(self):
+        """
+        Returns the effective resolution (in ms) of the replay's timers, which limits the time compression.
+
+        :rtype: float
+        """
+
+        from manipulators.trafficControlManipulator import REPLAY_TIMER_RESOLUTION
+
+        if self.OPTION_TIMER_RESOLUTION not in self._options:
+            return REPLAY_TIMER_RESOLUTION
+
+        try:
+            timer_resolution = float(self._options[self.OPTION_TIMER_RESOLUTION][0])
+        except ValueError:
+            raise SyntaxError('The option `%s` requires the timer resolution in ms as argument!'
+                              % self.OPTION_TIMER_RESOLUTION)
+
+        if timer_resolution <= 0:
+            raise SyntaxError('The timer resolution of the option `%s` has to be positive!'
+                              % self.OPTION_TIMER_RESOLUTION)
+
+        return timer_resolution
+
+    def __get_recovery_settings(self, hrc_set, field_name, resource_class):
+        """
+        Returns the settings of a loss recovery (FEC or retransmissions) referenced by the packet loss settings of a
+        HRC.
+
+        :param hrc_set: the settings of the HRC
+        :type hrc_set: dict
+
+        :param field_name: the name of the packet loss table's field which references the settings
+        :type field_name: basestring
+
+        :param resource_class: the class of the settings' table (see `manipulators.resources`)
+        :type resource_class: type
+
+        :return: the recovery settings, or None if the losses are not recovered
+        :rtype: dict|None
+        """
+
+        packet_loss_id = int(hrc_set[PacketLossTable.DB_TABLE_FIELD_NAME_PACKET_LOSS_ID])
+        packet_loss_settings = self.__packet_loss_table.get_row_with_id(packet_loss_id)
+
+        settings_id = packet_loss_settings.get(field_name)
+        if settings_id is None:
+            return None
+
+        resource_table = resource_class(
+            self._config.get_config_folder_path()
+            + 'hrc' + PATH_SEPARATOR + 'packet_loss' + PATH_SEPARATOR + resource_class.DB_TABLE_NAME
+        )
+
+        return resource_table.get_row_with_id(settings_id)
+
+    def __set_up_manipulator(self, manipulator, src_id, hrc_set, src_path, destination_path):
+        """
+        Configures a manipulator to manipulate the capture of a source and HRC.
+
+        :param manipulator: the manipulator to configure
+        :type manipulator: AbstractManipulator
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the settings of the source
+        :type hrc_set: dict
+
+        :param src_path: the path of the complete packet capture
+        :type src_path: basestring
+
+        :param destination_path: the path of the lossy packet capture
+        :type destination_path: basestring
+
+        :return: the configured manipulator
+        :rtype: AbstractManipulator
+        """
+
+        if isinstance(manipulator, AbstractOfflineManipulator):
+            manipulator.set_mask_store(self.__mask_store)
+
+            if self.OPTION_REALIZATIONS in self._options:
+                try:
+                    manipulator.set_realization_count(int(self._options[self.OPTION_REALIZATIONS][0]))
+                except (ValueError, AssertionError):
+                    raise SyntaxError('The option `%s` requires a positive number of realizations as argument!'
+                                      % self.OPTION_REALIZATIONS)
+
+        from manipulators.resources.fecManipulatorResource import FecManipulatorResource as FecRes
+        from manipulators.resources.arqManipulatorResource import ArqManipulatorResource as ArqRes
+
+        fec_settings = self.__get_recovery_settings(hrc_set, PacketLossTable.DB_TABLE_FIELD_NAME_FEC_ID, FecRes)
+        if fec_settings is not None:
+            assert isinstance(manipulator, AbstractOfflineManipulator), \
+                "FEC can only be simulated for offline manipulators!"
+            manipulator.set_fec_settings(fec_settings)
+
+        arq_settings = self.__get_recovery_settings(hrc_set, PacketLossTable.DB_TABLE_FIELD_NAME_ARQ_ID, ArqRes)
+        if arq_settings is not None:
+            assert isinstance(manipulator, AbstractOfflineManipulator), \
+                "Retransmissions can only be simulated for offline manipulators!"
+            manipulator.set_arq_settings(arq_settings)
+
+        from manipulators.offlineSelectiveManipulator import OfflineSelectiveManipulator
+        if isinstance(manipulator, OfflineSelectiveManipulator):
+            manipulator.set_stream_settings(
+                hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_STREAM_MODE],
+                self._get_codec_by_hrc_set(hrc_set).get_raw_file_extension()
+            )
+
+        return manipulator.set_src_file(src_path) \
             .set_dst_file(destination_path) \
             .set_path(self._path) \
             .set_override_mode(self._is_override_mode) \
@@ -204,11 +480,7 @@ class LossTool(AbstractTool):
             .set_log_settings(
                 self._log_folder,
                 self._get_output_file_name(src_id, hrc_set, 'log')
-            ) \
-            .manipulate()
-
-        if is_loss_trace_mode:
-            self.__trace_loss(src_path, destination_path)
+            )
 
     def __trace_loss(self, complete_pcap_file_path, lossy_pcap_file_path):
         """
@@ -228,7 +500,7 @@ class LossTool(AbstractTool):
             print "# \033[95m\033[1m[TRACE] not traceable due to dry mode!\033[0m"
             return
 
-        trace_file_path = self._switch_file_extension(complete_pcap_file_path, 'csv')
+        trace_file_path = self._switch_file_extension(complete_pcap_file_path, self.__get_trace_file_extension())
 
         if exists(trace_file_path) and not self._is_override_mode:
             from os.path import basename
@@ -243,6 +515,133 @@ class LossTool(AbstractTool):
               .set_trace_file_path(trace_file_path) \
               .trace()
 
+    def __get_trace_file_extension(self):
+        """
+        Returns the file extension of the loss traces to write.
+
+        :return: the extension of compact traces, if the option compact_traces is set, csv otherwise
+        :rtype: str
+        """
+
+        if self.OPTION_COMPACT_TRACES in self._options:
+            from manipulators.offline.compactTrace import COMPACT_TRACE_FILE_EXTENSION
+            return COMPACT_TRACE_FILE_EXTENSION
+
+        return 'csv'
+
+    def __write_loss_trace(self, complete_pcap_file_path, losses):
+        """
+        Stores the loss trace of a complete pcap file in a separate CSV file, based on the already known loss of each
+        packet (same format as written by the trace parser).
+
+        :param complete_pcap_file_path: the file which consists of all packets
+        :type complete_pcap_file_path: basestring
+
+        :param losses: the loss of each packet of the complete file (None -> not computed, e.g. in dry mode)
+        :type losses: numpy.ndarray|None
+        """
+
+        assert isinstance(complete_pcap_file_path, basestring)
+
+        if losses is None:
+            print "# \033[95m\033[1m[TRACE] not traceable due to dry mode!\033[0m"
+            return
+
+        trace_file_path = self._switch_file_extension(complete_pcap_file_path, self.__get_trace_file_extension())
+
+        if exists(trace_file_path) and not self._is_override_mode:
+            from os.path import basename
+            print "# \033[95m\033[1m[TRACE] SKIP %s\033[0m" % basename(trace_file_path)
+            return
+
+        from manipulators.offline.compactTrace import write_compact_trace, write_text_trace
+
+        if self.OPTION_COMPACT_TRACES in self._options:
+            write_compact_trace(trace_file_path, losses)
+        else:
+            write_text_trace(trace_file_path, losses)
+
+    def __get_single_pass_groups(self, jobs):
+        """
+        Groups the jobs, whose manipulations can be applied in a single pass over the same capture, i.e. the offline
+        manipulations of the HRCs whose captures are the same file. The stream tool links the capture of the HRCs,
+        which share the encoding, coder and stream mode, if its option shared_captures is set; separate stream runs
+        differ (e.g. in SSRC, sequence numbers and packet count) and can not be grouped.
+
+        :param jobs: the jobs to group as list of tuples (src_id, hrc_set)
+        :type jobs: list
+
+        :return: tuple (groups, remaining_jobs): the groups as lists of jobs and the jobs which have to be processed
+            individually
+        :rtype: tuple
+        """
+
+        assert isinstance(jobs, list)
+
+        if self.OPTION_TRACE_ONLY in self._options:
+            return list(), jobs
+
+        from collections import OrderedDict
+        from os import stat
+
+        groups = OrderedDict()
+        remaining_jobs = list()
+
+        for (src_id, hrc_set) in jobs:
+            packet_loss_id = int(hrc_set[PacketLossTable.DB_TABLE_FIELD_NAME_PACKET_LOSS_ID])
+            manipulator = self.__get_manipulator(self.__packet_loss_table.get_row_with_id(packet_loss_id))
+
+            src_path = self.__get_src_path(src_id, hrc_set)
+
+            # missing captures are reported by the individual processing
+            if not isinstance(manipulator, AbstractOfflineManipulator) or not isfile(src_path):
+                remaining_jobs.append((src_id, hrc_set))
+                continue
+
+            # the device and inode identify the file behind all of its paths
+            src_stat = stat(src_path)
+            groups.setdefault((src_stat.st_dev, src_stat.st_ino), list()).append((src_id, hrc_set, manipulator))
+
+        return list(groups.values()), remaining_jobs
+
+    def __insert_loss_in_single_pass(self, group):
+        """
+        Inserts the loss of a group of HRCs in a single pass over their capture (see `__get_single_pass_groups`).
+
+        :param group: the jobs of the group as list of tuples (src_id, hrc_set, manipulator)
+        :type group: list
+        """
+
+        assert isinstance(group, list) and len(group) > 0
+
+        # all paths of the group lead to the same file
+        src_path = self.__get_src_path(group[0][0], group[0][1])
+        self._prefetch_next(src_path)
+
+        jobs = list()
+        for (src_id, hrc_set, manipulator) in group:
+            hrc_id = int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID])
+            destination_path = self.__get_destination_path(src_id, hrc_set)
+
+            if self.__is_manipulation_required(src_id, hrc_id, destination_path):
+                self.__set_up_manipulator(
+                    manipulator, src_id, hrc_set, self.__get_src_path(src_id, hrc_set), destination_path
+                )
+                jobs.append((src_id, hrc_set, manipulator))
+
+        if not jobs:
+            return
+
+        print '# [SRC_ID: %d] \033[1m\033[94mSINGLE PASS: %d HRCs over %s\033[0m' % (
+            jobs[0][0], len(jobs), src_path
+        )
+
+        losses = AbstractOfflineManipulator.manipulate_in_single_pass([job[2] for job in jobs])
+
+        if self.OPTION_STORE_LOSS_TRACES in self._options:
+            for ((src_id, hrc_set, manipulator), manipulator_losses) in zip(jobs, losses):
+                self.__write_loss_trace(self.__get_src_path(src_id, hrc_set), manipulator_losses)
+
     def __insert_loss_in_source(self, src_id):
         """
         Inserts loss for a single given source according to all applicable HRC variation linked to this source
@@ -273,6 +672,129 @@ class LossTool(AbstractTool):
         if isinstance(self.__manipulator, AbstractManipulator):
             self.__manipulator.cleanup()
 
+        for network_namespace in self.__network_namespaces:
+            network_namespace.destroy()
+
+        self.__network_namespaces = list()
+
+    def __insert_loss_in_parallel(self, worker_count, jobs):
+        """
+        Inserts loss for the given jobs, with up to the given number of workers at the same time. Each worker gets an
+        own network namespace, so that the traffic control settings of the workers do not interfere.
+
+        :param worker_count: the number of workers
+        :type worker_count: int
+
+        :param jobs: the jobs to process as list of tuples (src_id, hrc_set)
+        :type jobs: list
+        """
+
+        assert isinstance(worker_count, int) and worker_count > 0
+        assert isinstance(jobs, list)
+
+        from threading import Thread
+        from Queue import Queue, Empty
+        from manipulators.networkNamespace import NetworkNamespace
+
+        job_queue = Queue()
+        for job in jobs:
+            job_queue.put(job)
+
+        def insert_loss(network_namespace):
+            while True:
+                try:
+                    (src_id, hrc_set) = job_queue.get_nowait()
+                except Empty:
+                    return
+
+                try:
+                    self.__insert_loss_in_source_by_hrc(src_id, hrc_set, network_namespace)
+                except (KeyError, AssertionError, Warning) as e:
+                    self._append_exception(e)
+
+        threads = list()
+        for i in range(worker_count):
+            network_namespace = NetworkNamespace('loss_%d' % i)
+            network_namespace.set_dry_mode(self._is_dry_run) \
+                             .create()
+            self.__network_namespaces.append(network_namespace)
+
+            threads.append(Thread(target=insert_loss, args=(network_namespace,)))
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        for network_namespace in self.__network_namespaces:
+            network_namespace.destroy()
+
+        self.__network_namespaces = list()
+
+    def __get_trace_file_path(self, src_id, hrc_set):
+        """
+        Returns the path of the loss trace of a given source and HRC, i.e. the trace of the complete capture or the
+        trace which was written next to the lossy capture (e.g. by the telchemy manipulator).
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the settings of the source
+        :type hrc_set: dict
+
+        :return: the path of the loss trace, or None if no trace exists
+        :rtype: str|None
+        """
+
+        from manipulators.offline.compactTrace import COMPACT_TRACE_FILE_EXTENSION
+
+        for pcap_file_path in (self.__get_src_path(src_id, hrc_set), self.__get_destination_path(src_id, hrc_set)):
+            for extension in (self.__get_trace_file_extension(), 'csv', COMPACT_TRACE_FILE_EXTENSION):
+                trace_file_path = self._switch_file_extension(pcap_file_path, extension)
+                if exists(trace_file_path):
+                    return trace_file_path
+
+        return None
+
+    def __analyze_loss_traces(self, summary_file_path):
+        """
+        Analyzes the loss traces of all PVSs in parallel and writes their metrics into a summary file.
+
+        :param summary_file_path: the path of the summary file
+        :type summary_file_path: basestring
+        """
+
+        assert isinstance(summary_file_path, basestring)
+
+        from os.path import basename
+        from manipulators.offline.lossAnalytics import analyze_traces, write_summary
+
+        names = list()
+        trace_file_paths = list()
+
+        for (src_id, hrc_set) in self._get_jobs():
+            trace_file_path = self.__get_trace_file_path(src_id, hrc_set)
+            if trace_file_path is None:
+                print "# \033[95m\033[1m[ANALYTICS] no loss trace of %s\033[0m" % \
+                      self._get_output_file_name(src_id, hrc_set)
+                continue
+
+            names.append(self._get_output_file_name(src_id, hrc_set))
+            trace_file_paths.append(trace_file_path)
+
+        if self.OPTION_PARALLEL_WORKERS in self._options:
+            worker_count = int(self._options[self.OPTION_PARALLEL_WORKERS][0])
+        else:
+            from multiprocessing import cpu_count
+            worker_count = cpu_count()
+
+        print '# \033[1m\033[94mRUN : analyze %d loss traces -> %s\033[0m' % (
+            len(trace_file_paths), basename(summary_file_path)
+        )
+
+        write_summary(summary_file_path, names, analyze_traces(trace_file_paths, max(1, worker_count)))
+
     def execute(self):
         """
         Goes through all stored pcap files in the source dir and manipulates the network traffic according to the
@@ -282,8 +804,42 @@ class LossTool(AbstractTool):
 
         super(self.__class__, self).execute()
 
-        for src_set in self._src_sets:
-            src_id = int(src_set[self._src_table.DB_TABLE_FIELD_NAME_SRC_ID])
-            self.__insert_loss_in_source(src_id)
+        self._start_prefetcher(self.OPTION_PREFETCH, self.__get_src_path)
+
+        if self.OPTION_MASK_STORE in self._options and not self._is_dry_run:
+            from manipulators.offline.maskStore import MaskStore
+            self.__mask_store = MaskStore(self._options[self.OPTION_MASK_STORE][0])
+
+        # jobs which remain after the single pass groups are processed (None -> all jobs)
+        jobs = None
+
+        if self.OPTION_SINGLE_PASS in self._options:
+            (groups, jobs) = self.__get_single_pass_groups(self._get_jobs())
+            for group in groups:
+                self.__insert_loss_in_single_pass(group)
+
+        if self.OPTION_PARALLEL_WORKERS in self._options:
+            try:
+                worker_count = int(self._options[self.OPTION_PARALLEL_WORKERS][0])
+            except ValueError:
+                raise SyntaxError('The option `%s` requires the number of workers as argument!'
+                                  % self.OPTION_PARALLEL_WORKERS)
+
+            self.__insert_loss_in_parallel(worker_count, self._get_jobs() if jobs is None else jobs)
+        elif jobs is not None:
+            for (src_id, hrc_set) in jobs:
+                self.__insert_loss_in_source_by_hrc(src_id, hrc_set)
+        else:
+            for src_set in self._src_sets:
+                src_id = int(src_set[self._src_table.DB_TABLE_FIELD_NAME_SRC_ID])
+                self.__insert_loss_in_source(src_id)
+
+        if self.__mask_store is not None:
+            print '# \033[1m\033[94mMASK STORE: %d hits, %d misses\033[0m' % (
+                self.__mask_store.hit_count, self.__mask_store.miss_count
+            )
+
+        if self.OPTION_LOSS_ANALYTICS in self._options and not self._is_dry_run:
+            self.__analyze_loss_traces(self._options[self.OPTION_LOSS_ANALYTICS][0])
 
         self._show_we_summary()
@@ -6,9 +6,20 @@ STREAM_PROTOCOL_UDP = 'udp'
 STREAM_PROTOCOL_RTP = 'rtp'
 STREAM_NETWORK_INTERFACE = 'lo'
 
+# port range used if several streams are captured at the same time (below the ephemeral port range of linux, so that
+# the source ports of the senders do not collide with it)
+STREAM_PORT_POOL_FIRST_PORT = 20000
+STREAM_PORT_POOL_SIZE = 256
+
 from encodeTool import ENCODER_DESTINATION_DIR
 STREAM_SOURCE_DIR = ENCODER_DESTINATION_DIR
 STREAM_DESTINATION_DIR = 'outputPcap'
+
+# folder of the MPEG-TS remuxes, which are shared by all HRCs streaming the same encoded file
+STREAM_REMUX_CACHE_DIR = 'outputTs'
+
+# file (in the remux folder) wherein the fingerprints of the encoded files are kept across runs
+STREAM_FINGERPRINT_INDEX_FILE_NAME = 'fingerprints.json'
 STREAM_OUTPUT_FILE_TYPE_EXTENSION = 'pcap'
 
 TOOL_ID_STREAM = 'stream_videos'
@@ -20,6 +31,7 @@ from os.path import isfile, exists
 from cmd.command import Command
 from coder.coderList import get_validated_coder
 from multiprocessing.process import Process
+from subtools.abstractSubTool import AbstractSubTool
 
 
 class StreamTool(AbstractTool):
@@ -28,108 +40,432 @@ class StreamTool(AbstractTool):
      appropriate coders. To each stream tcpdump will listen and dump each packet into a separate PCAP-file.
     """
 
-    def __convert_to_mpeg2ts(self, input_path, codec_name):
+    # define the available tool options
+    OPTION_PARALLEL_STREAMS = 'parallel_streams'
+    OPTION_ACCELERATED = 'accelerated'
+    OPTION_REMUX_AHEAD = 'remux_ahead'
+    OPTION_SHARED_CAPTURES = 'shared_captures'
+
+    _options_parser = {
+        # if option parallel_streams=<N> is set -> up to <N> videos are streamed (in real time) at the same time, each
+        # one to an own port; the captures are rewritten afterwards as if they were streamed to STREAM_PORT
+        OPTION_PARALLEL_STREAMS: 1,
+
+        # if option accelerated is set -> the videos are streamed as fast as possible (not in real time); the
+        # timestamps of the captures are re-synthesized afterwards from the frame rate given in the source table
+        OPTION_ACCELERATED: 0,
+
+        # if option remux_ahead=<N> is set -> all MPEG-TS remuxes required by the streams are done before streaming,
+        # with <N> ffmpeg processes at the same time
+        OPTION_REMUX_AHEAD: 1,
+
+        # if option shared_captures is set -> the HRCs of a source, which share the encoding, coder and stream mode,
+        # are streamed only once; the capture is hard linked for the other HRCs, so that the loss tool can apply their
+        # offline manipulations in a single pass over it (see the loss tool's option single_pass)
+        OPTION_SHARED_CAPTURES: 0
+    }
+
+    def __init__(self, pvs_matrix, config):
+        """
+        Initializes the stream tool.
+
+        :param pvs_matrix: the pvs matrix, describing the streaming settings
+        :param config: the config used for the tool's execution
+        """
+
+        super(self.__class__, self).__init__(pvs_matrix, config)
+
+        from threading import Lock
+
+        # dict('device:inode:size:mtime' => md5) of the already fingerprinted encoded files (None -> not loaded yet)
+        self.__fingerprints = None
+
+        # dict(remux path => lock), to remux each file only once, even if it is streamed concurrently
+        self.__remux_locks = dict()
+        self.__lock = Lock()
+
+    # configure available sub tools
+    SUB_TOOL_TIMESTAMP_SYNTHESIZER = 'timestamp_synthesizer'
+
+    _available_sub_tools = (
+        SUB_TOOL_TIMESTAMP_SYNTHESIZER
+    )
+
+    def _import_sub_tool(self, tool_id):
+        """
+        Imports a sub tool registered with the given tool id.
+
+        :param tool_id: the id of the sub tool to load
+        :type tool_id: basestring
+
+        :return: the requested sub tool
+        :rtype: AbstractSubTool
+        """
+
+        assert isinstance(tool_id, basestring)
+
+        sub_tool = None
+        if tool_id == self.SUB_TOOL_TIMESTAMP_SYNTHESIZER:
+            from subtools.timestampSynthesizer import TimestampSynthesizer
+            sub_tool = TimestampSynthesizer(self)
+
+        # further sub tools can be added here with "elif"-commands!
+
+        if isinstance(sub_tool, AbstractSubTool):
+            self._register_sub_tool(sub_tool)
+            return sub_tool
+
+        raise KeyError('There exists no equivalent sub-tool representation for the sub-tool id `%s`' % tool_id)
+
+    def __get_fingerprint_index_path(self):
+        """
+        :return: the path of the file wherein the fingerprints are kept across runs
+        :rtype: str
+        """
+
+        return self._path + STREAM_REMUX_CACHE_DIR + PATH_SEPARATOR + STREAM_FINGERPRINT_INDEX_FILE_NAME
+
+    def __load_fingerprints(self):
+        """
+        Loads the fingerprints of the previous runs. Has to be called with the tool's lock held.
+
+        :return: the fingerprints as dict('device:inode:size:mtime' => md5)
+        :rtype: dict
+        """
+
+        import json
+
+        index_path = self.__get_fingerprint_index_path()
+        if not isfile(index_path):
+            return dict()
+
+        try:
+            with open(index_path, 'rb') as index_file:
+                return json.load(index_file)
+        except ValueError:
+            # broken index (e.g. interrupted write) -> the files are fingerprinted again
+            return dict()
+
+    def __save_fingerprints(self):
+        """
+        Writes the fingerprints, atomically replacing the previous ones. Has to be called with the tool's lock held.
+        """
+
+        import json
+        from os import rename, makedirs
+        from os.path import isdir, dirname
+
+        index_path = self.__get_fingerprint_index_path()
+        if not isdir(dirname(index_path)):
+            makedirs(dirname(index_path))
+
+        with open(index_path + '.part', 'wb') as index_file:
+            json.dump(self.__fingerprints, index_file, sort_keys=True, indent=1)
+
+        rename(index_path + '.part', index_path)
+
+    def __get_fingerprint(self, file_path):
+        """
+        Returns a fingerprint of a file's content. The md5 hash of the content is only computed, if the file's device,
+        inode, size and modification time are unknown, i.e. files sharing the same inode (e.g. hard linked duplicates
+        of an encode) and files which did not change since a previous run are not hashed again.
+
+        :param file_path: the path of the file to fingerprint
+        :type file_path: basestring
+
+        :return: the md5 hash of the file's content
+        :rtype: str
         """
-        Converts an input file to a specific output format with MP4Box to MPEG2-TS
+
+        assert isinstance(file_path, basestring)
+
+        from os import stat
+        file_stat = stat(file_path)
+        key = '%d:%d:%d:%r' % (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime)
+
+        with self.__lock:
+            if self.__fingerprints is None:
+                self.__fingerprints = self.__load_fingerprints()
+
+            if key in self.__fingerprints:
+                return self.__fingerprints[key]
+
+        from hashlib import md5
+        file_hash = md5()
+
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), ''):
+                file_hash.update(chunk)
+
+        with self.__lock:
+            self.__fingerprints[key] = file_hash.hexdigest()
+
+            if not self._is_dry_run:
+                self.__save_fingerprints()
+
+            return self.__fingerprints[key]
+
+    def __get_remux_path(self, input_path, codec):
+        """
+        Returns the path of the MPEG-TS remux of an encoded file. The path only depends on the file's content, the
+        codec and its bit stream filter, so that all HRCs streaming the same encode share the remux.
+
+        :param input_path: the path of the encoded file
+        :type input_path: basestring
+
+        :param codec: the codec of the encoded file
+        :type codec: coder.codec.abstractCodec.AbstractCodec
+
+        :return: the path of the MPEG-TS remux of an encoded file
+        :rtype: str
+        """
+
+        bit_stream_filter = codec.get_bit_stream_filter()
+
+        return self._path \
+            + STREAM_REMUX_CACHE_DIR \
+            + PATH_SEPARATOR \
+            + self.__get_fingerprint(input_path) \
+            + '_' \
+            + codec.get_library_name() \
+            + ('_' + bit_stream_filter if bit_stream_filter else '') \
+            + '.ts'
+
+    def __convert_to_mpeg2ts(self, input_path, codec):
+        """
+        Converts an input file to a specific output format with ffmpeg to MPEG2-TS. The result is cached, i.e. each
+        encoded file is converted only once, even if several HRCs stream it or if the tool is run in override mode.
 
         :param input_path: the path to the file to convert
         :type input_path: basestring
 
-        :param codec_name: the name of the codec to use for the conversion
-        :type codec_name: basestring
+        :param codec: the codec of the file, whose library and bit stream filter are used for the conversion
+        :type codec: coder.codec.abstractCodec.AbstractCodec
 
         :return: the path where the converted file can be found after the operation succeeded
         :rtype: basestring
         """
 
         assert isinstance(input_path, basestring)
-        assert isinstance(codec_name, basestring)
         assert isfile(input_path)
         assert exists(input_path)
 
-        """
-        ffmpeg: http://ffmpeg.org/
-        """
-        from coder.ffmpegCoder import APP_PATH as FFMPEG_PATH
-        ffmpeg_command = Command(FFMPEG_PATH)
+        output_path = self.__get_remux_path(input_path, codec)
+
+        with self.__lock:
+            if output_path not in self.__remux_locks:
+                from threading import Lock
+                self.__remux_locks[output_path] = Lock()
+
+            remux_lock = self.__remux_locks[output_path]
+
+        with remux_lock:
+            if exists(output_path):
+                print "# \033[95m\033[1mREUSE remux %s for %s\033[0m" % (output_path, input_path)
+                return output_path
+
+            from os.path import isdir, dirname
+            from os import makedirs
+
+            if not self._is_dry_run and not isdir(dirname(output_path)):
+                makedirs(dirname(output_path))
+
+            # the remux is written to a temporary file first, so that no incomplete remux is ever reused
+            partial_output_path = self._switch_file_extension(output_path, 'part.ts')
+
+            """
+            ffmpeg: http://ffmpeg.org/
+            """
+            from coder.ffmpegCoder import APP_PATH as FFMPEG_PATH
+            ffmpeg_command = Command(FFMPEG_PATH)
+
+            """
+            y: override output file
+            """
+            ffmpeg_command.set_as_posix_option('y')
+
+            """
+            i: input file
+            """
+            ffmpeg_command.set_as_posix_option('i', input_path)
+
+            """
+            c: codec used
+            """
+            ffmpeg_command.set_as_posix_option('c:v', codec.get_library_name())
+
+            """
+            bsf:v: bit stream filter of the codec (as used when streaming MPEG2-TS, see `coder.ffmpegCoder`)
+            """
+            bit_stream_filter = codec.get_bit_stream_filter()
+            if bit_stream_filter:
+                ffmpeg_command.set_as_posix_option('bsf:v', bit_stream_filter)
+
+            """
+            set output file
+            """
+            ffmpeg_command.set_as_argument('OUTPUT', partial_output_path)
+
+            """
+            set log output
+            """
+            if self._log_folder:
+                from os.path import splitext, basename, extsep
+                mp42ts_log_file_path = self._log_folder \
+                                     + PATH_SEPARATOR \
+                                     + 'mp42ts_' \
+                                     + splitext(basename(input_path))[0] \
+                                     + extsep \
+                                     + 'log'
+
+                ffmpeg_command.set_as_log_file(mp42ts_log_file_path) \
+                              .set_std_err_redirect_to_file()
+
+            ffmpeg_process = self._cmd(ffmpeg_command)
+
+            if isinstance(ffmpeg_process, Process):
+                ffmpeg_process.join()
+
+            if not self._is_dry_run:
+                if not isfile(partial_output_path):
+                    raise Warning('The file %s could not be converted to MPEG2-TS!' % input_path)
+
+                from os import rename
+                rename(partial_output_path, output_path)
 
-        """
-        i: input file
-        """
-        ffmpeg_command.set_as_posix_option('i', input_path)
+        return output_path
 
+    def __get_encoded_file_path(self, src_id, hrc_set, codec):
         """
-        c: codec used
+        Returns the path of the encoded file of a given source and HRC.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the settings of the source
+        :type hrc_set: dict
+
+        :param codec: the codec of the HRC
+        :type codec: coder.codec.abstractCodec.AbstractCodec
+
+        :return: the path of the encoded file of a given source and HRC
+        :rtype: str
         """
-        ffmpeg_command.set_as_posix_option('c:v', codec_name)
 
+        return self._path + STREAM_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
+            src_id, hrc_set, codec.get_raw_file_extension()
+        )
+
+    def __get_pcap_path(self, src_id, hrc_set):
         """
-        set output file
+        Returns the path of the capture of a given source and HRC.
+
+        :param src_id: the id of the source
+        :type src_id: int
+
+        :param hrc_set: the settings of the source
+        :type hrc_set: dict
+
+        :return: the path of the capture of a given source and HRC
+        :rtype: str
         """
-        output_path = self._switch_file_extension(input_path, 'ts')
-        ffmpeg_command.set_as_argument('OUTPUT', output_path)
 
+        return self._path + STREAM_DESTINATION_DIR + PATH_SEPARATOR + self._get_output_file_name(
+            src_id, hrc_set, STREAM_OUTPUT_FILE_TYPE_EXTENSION
+        )
+
+    def __remux_ahead(self, worker_count):
         """
-        set log output
+        Converts all encoded files, which are going to be streamed as MPEG2-TS, before the streaming starts. Each
+        encoded file is converted once, with up to the given number of conversions at the same time.
+
+        :param worker_count: the maximum number of conversions at the same time
+        :type worker_count: int
         """
-        if self._log_folder:
-            from os.path import splitext, basename, extsep
-            mp42ts_log_file_path = self._log_folder \
-                                 + PATH_SEPARATOR \
-                                 + 'mp42ts_' \
-                                 + splitext(basename(input_path))[0] \
-                                 + extsep \
-                                 + 'log'
 
-            ffmpeg_command.set_as_log_file(mp42ts_log_file_path) \
-                          .set_std_err_redirect_to_file()
+        assert isinstance(worker_count, int) and worker_count > 0
 
-        ffmpeg_process = self._cmd(ffmpeg_command)
+        from threading import Thread
+        from Queue import Queue, Empty
 
-        if isinstance(ffmpeg_process, Process):
-            ffmpeg_process.join()
+        remuxes = Queue()
+        remux_paths = set()
 
-        return output_path
+        for (src_id, hrc_set) in self._get_jobs():
+            if hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_STREAM_MODE] \
+                    != self._hrc_table.DB_STREAM_MODE_FIELD_VALUE_MPEGTS_UDP:
+                continue
+
+            if exists(self.__get_pcap_path(src_id, hrc_set)) and not self._is_override_mode:
+                continue
+
+            try:
+                codec = self._get_codec_by_hrc_set(hrc_set)
+            except (KeyError, AssertionError) as e:
+                self._append_exception(e)
+                continue
+
+            file_path = self.__get_encoded_file_path(src_id, hrc_set, codec)
+
+            if not isfile(file_path):
+                # will be reported when the source is streamed
+                continue
+
+            remux_path = self.__get_remux_path(file_path, codec)
+            if remux_path not in remux_paths:
+                remux_paths.add(remux_path)
+                remuxes.put((file_path, codec))
+
+        def remux():
+            while True:
+                try:
+                    (input_path, codec) = remuxes.get_nowait()
+                except Empty:
+                    return
 
-    def __stream_source_by_hrc_set(self, src_id, hrc_set):
+                try:
+                    self.__convert_to_mpeg2ts(input_path, codec)
+                except (KeyError, AssertionError, Warning) as e:
+                    self._append_exception(e)
+
+        threads = [Thread(target=remux) for i in range(worker_count)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    def __stream_source_by_hrc_set(self, src_id, hrc_set, port=STREAM_PORT):
         """
         Streams a source by the given settings of the HRC table
         :param src_id: the id of the source to send the stream
         :param hrc_set: the set which contains all information
+        :param port: the port to stream to (the capture is rewritten to STREAM_PORT afterwards, if it differs)
         """
 
         assert isinstance(src_id, int)
         assert isinstance(hrc_set, dict)
+        assert isinstance(port, int)
 
         codec = self._get_codec_by_hrc_set(hrc_set)
-        file_path = self._path + STREAM_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
-            src_id, hrc_set, codec.get_raw_file_extension()
-        )
+        file_path = self.__get_encoded_file_path(src_id, hrc_set, codec)
 
         if not isfile(file_path):
             raise Warning(
                 'Source %d could not be streamed, because no appropriate file has been found' % src_id
             )
 
-        pcap_path = self._path + STREAM_DESTINATION_DIR + PATH_SEPARATOR + self._get_output_file_name(
-            src_id, hrc_set, STREAM_OUTPUT_FILE_TYPE_EXTENSION
-        )
+        pcap_path = self.__get_pcap_path(src_id, hrc_set)
 
         # check if the destination path already exists -> check override mode to skip or to override
         assert self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID in hrc_set
         if exists(pcap_path):
             if self._is_override_mode:
                 if not self._is_dry_run:
+                    # the MPEG2-TS conversion is kept, since it is cached by the encoded file's content
                     remove(pcap_path)
 
-                    ts_path = self._path + STREAM_SOURCE_DIR + PATH_SEPARATOR + self._get_output_file_name(
-                        src_id, hrc_set, 'ts'
-                    )
-
-                    # remove also old ts conversion, if one exists!
-                    if exists(ts_path):
-                        remove(ts_path)
-
                 print "# \033[95m\033[1mREMOVE src %d : hrc %d\033[0m"\
                       % (src_id, int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID]))
             else:
@@ -146,7 +482,7 @@ class StreamTool(AbstractTool):
         stream_mode = hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_STREAM_MODE]
 
         if stream_mode == self._hrc_table.DB_STREAM_MODE_FIELD_VALUE_MPEGTS_UDP:
-            file_path = self.__convert_to_mpeg2ts(file_path, codec.get_library_name())
+            file_path = self.__convert_to_mpeg2ts(file_path, codec)
 
         coder.set_src_path(file_path)
 
@@ -159,58 +495,252 @@ class StreamTool(AbstractTool):
             coder.set_log_file(coder_log_file_path)
 
         #
-        # Activate tcp dump to record the streamed packets
+        # Capture the streamed packets
         #
 
-        """
-        tcpdump: http://www.tcpdump.org/tcpdump_man.html
-
-        -i <INPUT>: specifies input resource
-        -w <OUTPUT>: specifies output resource to write pcap content
-
-        additional filter used here: '<PROTOCOL> port <PORT>'
-        --> Capture only all packets which are delivered via the <PROTOCOL> protocol over port <PORT>
-        """
-        tcpdump_command = Command('tcpdump')
-        tcpdump_command.set_as_subprocess() \
-            .set_as_posix_option('i', STREAM_NETWORK_INTERFACE) \
-            .set_as_posix_option('w', pcap_path) \
-            .set_as_argument('PROTOCOL', STREAM_PROTOCOL_UDP) \
-            .set_as_argument('PORT', 'port %d' % STREAM_PORT)
-
-        # set tcpdump log
+        # If the stream is sent to a port of the pool, only the destination port is filtered, since the pool's ports
+        # may be used as source ports of other streams.
+        tcpdump_log_file_path = None
         if self._log_folder:
             tcpdump_log_file_path = self._log_folder \
                                     + PATH_SEPARATOR \
                                     + 'tcpdump_' \
                                     + self._get_output_file_name(src_id, hrc_set, 'log')
-            tcpdump_command.set_as_log_file(tcpdump_log_file_path) \
-                .set_std_err_redirect_to_file()
-
-        tcpdump_process = self._cmd(tcpdump_command)
 
-        if not self._is_dry_run:
-            from time import sleep
-            sleep(1)
+        capture = self._start_capture(
+            STREAM_NETWORK_INTERFACE,
+            pcap_path,
+            port,
+            is_dst_port_only=port != STREAM_PORT,
+            log_file_path=tcpdump_log_file_path
+        )
 
         #
         # Stream video
         #
 
+        is_accelerated = self.OPTION_ACCELERATED in self._options
+
         coder.set_dry_mode(self._is_dry_run) \
              .send_stream(
                 STREAM_SERVER,
-                STREAM_PORT,
+                port,
                 stream_mode,
-                codec
+                codec,
+                is_real_time=not is_accelerated
              )
 
         #
-        # Stop tcpdump
+        # Stop the capture
         #
 
-        if isinstance(tcpdump_process, Process):
-            self._terminate_process_with_children(tcpdump_process)
+        self._stop_capture(capture)
+
+        #
+        # Move the capture to the default port, which is expected by the following tools
+        #
+
+        if port != STREAM_PORT:
+            print "# \033[1m\033[94mRUN : [SRC:%d|HRC%d] rewrite destination port %d -> %d in %s\033[0m" % (
+                src_id, int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID]), port, STREAM_PORT, pcap_path
+            )
+
+            if not self._is_dry_run:
+                from util.pcapFile import rewrite_udp_destination_port
+                rewrite_udp_destination_port(pcap_path, STREAM_PORT)
+
+                if stream_mode == self._hrc_table.DB_STREAM_MODE_FIELD_VALUE_RAW_RTP:
+                    self.__rewrite_sdp_port(file_path, port)
+
+        #
+        # Reconstruct the real time send schedule of an accelerated stream
+        #
+
+        if is_accelerated:
+            self.__synthesize_timestamps(src_id, pcap_path, stream_mode)
+
+    def __synthesize_timestamps(self, src_id, pcap_path, stream_mode):
+        """
+        Rewrites the timestamps of the capture of an accelerated stream to the send schedule of a real time stream.
+
+        :param src_id: the id of the streamed source
+        :type src_id: int
+
+        :param pcap_path: the path of the capture
+        :type pcap_path: basestring
+
+        :param stream_mode: the mode the source was streamed with
+        :type stream_mode: basestring
+        """
+
+        src_set = self._src_table.get_row_with_id(src_id)
+
+        assert self._src_table.DB_TABLE_FIELD_NAME_FPS in src_set
+        fps = src_set[self._src_table.DB_TABLE_FIELD_NAME_FPS]
+
+        if not fps:
+            raise Warning('The timestamps of the capture %s can not be re-synthesized, since no frame rate is given for '
+                          'the source %d!' % (pcap_path, src_id))
+
+        synthesizer = self.request_sub_tool(self.SUB_TOOL_TIMESTAMP_SYNTHESIZER)
+        synthesizer.set_dry_mode(self._is_dry_run)
+
+        if not self._is_dry_run:
+            synthesizer.set_pcap_file_path(pcap_path)
+
+        synthesizer.set_stream_mode(stream_mode) \
+                   .set_fps(float(fps)) \
+                   .synthesize()
+
+        self._unregister_sub_tool(synthesizer)
+
+    def __rewrite_sdp_port(self, file_path, port):
+        """
+        Rewrites the port of the session description, which was dumped next to a streamed file, to STREAM_PORT.
+
+        :param file_path: the path of the streamed file
+        :type file_path: basestring
+
+        :param port: the port the file was streamed to
+        :type port: int
+        """
+
+        assert isinstance(file_path, basestring)
+        assert isinstance(port, int)
+
+        sdp_path = self._switch_file_extension(file_path, 'sdp')
+        if not isfile(sdp_path):
+            return
+
+        with open(sdp_path, 'r') as sdp_file:
+            sdp_lines = sdp_file.readlines()
+
+        with open(sdp_path, 'w') as sdp_file:
+            for line in sdp_lines:
+                # media description: m=<media> <port> <proto> <fmt> ...
+                if line.startswith('m=') and ' %d ' % port in line:
+                    line = line.replace(' %d ' % port, ' %d ' % STREAM_PORT, 1)
+                sdp_file.write(line)
+
+    def __stream_sources_in_parallel(self, stream_count, jobs):
+        """
+        Streams the given jobs, with up to the given number of streams at the same time. Each stream is sent to an own
+        port of a port pool and captured by an own tcpdump process.
+
+        :param stream_count: the maximum number of streams at the same time
+        :type stream_count: int
+
+        :param jobs: the jobs to stream as list of tuples (src_id, hrc_set)
+        :type jobs: list
+        """
+
+        assert isinstance(stream_count, int) and stream_count > 0
+        assert isinstance(jobs, list)
+
+        from threading import Thread
+        from Queue import Queue, Empty
+        from util.portPool import PortPool
+
+        port_pool = PortPool(STREAM_SERVER, STREAM_PORT_POOL_FIRST_PORT, STREAM_PORT_POOL_SIZE)
+
+        job_queue = Queue()
+        for job in jobs:
+            job_queue.put(job)
+
+        def stream_jobs():
+            while True:
+                try:
+                    (src_id, hrc_set) = job_queue.get_nowait()
+                except Empty:
+                    return
+
+                try:
+                    port = port_pool.acquire()
+                    try:
+                        self.__stream_source_by_hrc_set(src_id, hrc_set, port)
+                    finally:
+                        port_pool.release(port)
+                except (KeyError, AssertionError, Warning) as e:
+                    # see `__stream_source`
+                    self._append_exception(e)
+
+        threads = [Thread(target=stream_jobs) for i in range(stream_count)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    def __get_shared_capture_groups(self, jobs):
+        """
+        Groups the jobs of the HRCs, which share the source, encoding, coder and stream mode, so that each group is
+        streamed only once (see `__share_captures`).
+
+        :param jobs: the jobs to group as list of tuples (src_id, hrc_set)
+        :type jobs: list
+
+        :return: the groups as lists of jobs, the first job of each group is the one to stream
+        :rtype: list
+        """
+
+        assert isinstance(jobs, list)
+
+        from collections import OrderedDict
+        from pvs.hrc.encodingTable import EncodingTable
+
+        groups = OrderedDict()
+
+        for (src_id, hrc_set) in jobs:
+            key = (
+                src_id,
+                int(hrc_set[EncodingTable.DB_TABLE_FIELD_NAME_ENCODING_ID]),
+                hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_CODER_ID],
+                hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_STREAM_MODE]
+            )
+            groups.setdefault(key, list()).append((src_id, hrc_set))
+
+        return list(groups.values())
+
+    def __share_captures(self, groups):
+        """
+        Materializes the capture of the first job of each group for the other jobs of the group (as hard link if
+        possible, see `util.fileMaterializer`).
+
+        :param groups: the groups as lists of jobs (see `__get_shared_capture_groups`)
+        :type groups: list
+        """
+
+        assert isinstance(groups, list)
+
+        from util.fileMaterializer import materialize_file
+
+        for group in groups:
+            pcap_path = self.__get_pcap_path(*group[0])
+
+            for (src_id, hrc_set) in group[1:]:
+                hrc_id = int(hrc_set[self._hrc_table.DB_TABLE_FIELD_NAME_HRC_ID])
+                shared_pcap_path = self.__get_pcap_path(src_id, hrc_set)
+
+                if exists(shared_pcap_path) and not self._is_override_mode:
+                    print "# \033[95m\033[1mSKIP src %d : hrc %d\033[0m" % (src_id, hrc_id)
+                    continue
+
+                print "# \033[1m\033[94mRUN : [SRC:%d|HRC%d] share capture %s\033[0m" % (
+                    src_id, hrc_id, pcap_path
+                )
+
+                if self._is_dry_run:
+                    continue
+
+                if not isfile(pcap_path):
+                    self._append_exception(Warning(
+                        'The capture of source %d could not be shared with HRC %d, because the capture %s is missing'
+                        % (src_id, hrc_id, pcap_path)
+                    ))
+                    continue
+
+                materialize_file(pcap_path, shared_pcap_path)
 
     def __stream_source(self, source):
         """
@@ -240,8 +770,44 @@ class StreamTool(AbstractTool):
 
         super(self.__class__, self).execute()
 
-        for src_set in self._src_sets:
-            self.__stream_source(src_set)
+        if self.OPTION_REMUX_AHEAD in self._options:
+            try:
+                worker_count = int(self._options[self.OPTION_REMUX_AHEAD][0])
+            except ValueError:
+                raise SyntaxError('The option `%s` requires the number of conversions as argument!'
+                                  % self.OPTION_REMUX_AHEAD)
+
+            self.__remux_ahead(worker_count)
+
+        # the groups of jobs which share their capture (None -> each job is streamed)
+        groups = None
+        jobs = self._get_jobs()
+
+        if self.OPTION_SHARED_CAPTURES in self._options:
+            groups = self.__get_shared_capture_groups(jobs)
+            jobs = [group[0] for group in groups]
+
+        if self.OPTION_PARALLEL_STREAMS in self._options:
+            try:
+                stream_count = int(self._options[self.OPTION_PARALLEL_STREAMS][0])
+            except ValueError:
+                raise SyntaxError('The option `%s` requires the number of streams as argument!'
+                                  % self.OPTION_PARALLEL_STREAMS)
+
+            self.__stream_sources_in_parallel(stream_count, jobs)
+        elif groups is not None:
+            for (src_id, hrc_set) in jobs:
+                try:
+                    self.__stream_source_by_hrc_set(src_id, hrc_set)
+                except (KeyError, AssertionError, Warning) as e:
+                    # see `__stream_source`
+                    self._append_exception(e)
+        else:
+            for src_set in self._src_sets:
+                self.__stream_source(src_set)
+
+        if groups is not None:
+            self.__share_captures(groups)
 
         # show summary of all logged exceptions
         self._show_we_summary()
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Shared helpers to materialize (i.e. duplicate) large artifacts like encoded videos or packet captures without copying
+them byte-for-byte whenever the file system allows it.
+
+The strategies are tried in the following order:
+
+1. `link`: a hard link to the same inode (no data is touched at all)
+2. `reflink`: a copy-on-write clone of the data blocks (FICLONE ioctl, e.g. btrfs, xfs)
+3. `copy_file_range`: an in-kernel copy, which may also be accelerated by the file system or NFS server side copies
+4. `sendfile`: an in-kernel copy without passing the data through user space
+5. `copy`: the user space copy of shutil, as last resort
+
+Since hard links share the inode with their origin, a materialized file must never be written in place. All tools of
+the chain remove their outputs before they re-create them, which is safe. If an output is going to be modified in
+place, call `detach_file` first to give it a private copy.
+"""
+
+__author__ = 'Alexander Dethof'
+
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+# strategy names, in the order in which they are tried
+STRATEGY_LINK = 'link'
+STRATEGY_REFLINK = 'reflink'
+STRATEGY_COPY_FILE_RANGE = 'copy_file_range'
+STRATEGY_SENDFILE = 'sendfile'
+STRATEGY_COPY = 'copy'
+
+STRATEGIES = (
+    STRATEGY_LINK,
+    STRATEGY_REFLINK,
+    STRATEGY_COPY_FILE_RANGE,
+    STRATEGY_SENDFILE,
+    STRATEGY_COPY
+)
+
+# ioctl request to clone a file's data blocks: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# maximum number of bytes to transfer with a single in-kernel copy call
+KERNEL_COPY_CHUNK_SIZE = 1 << 30
+
+
+def __try_link(src_path, dst_path):
+    """
+    Tries to create a hard link of the source at the destination path.
+
+    :return: true if the link could be created, false otherwise
+    :rtype: bool
+    """
+
+    from os import link
+
+    try:
+        link(src_path, dst_path)
+    except (OSError, AttributeError):
+        return False
+
+    return True
+
+
+def __try_reflink(src_file, dst_file):
+    """
+    Tries to clone the data blocks of the source file into the destination file (copy-on-write).
+
+    :return: true if the data could be cloned, false otherwise
+    :rtype: bool
+    """
+
+    try:
+        from fcntl import ioctl
+        ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except (ImportError, IOError, OSError):
+        return False
+
+    return True
+
+
+def __try_kernel_copy(src_file, dst_file, size, strategy):
+    """
+    Tries to copy the source file's data into the destination file without passing it through user space.
+
+    :param src_file: the opened source file
+    :type src_file: file
+
+    :param dst_file: the opened (empty) destination file
+    :type dst_file: file
+
+    :param size: the number of bytes to copy
+    :type size: int
+
+    :param strategy: the kernel function to use (`copy_file_range` or `sendfile`)
+    :type strategy: basestring
+
+    :return: true if all data could be copied, false otherwise
+    :rtype: bool
+    """
+
+    assert strategy in (STRATEGY_COPY_FILE_RANGE, STRATEGY_SENDFILE)
+
+    from util.libc import get_libc
+    libc = get_libc()
+    if libc is None or not hasattr(libc, strategy):
+        return False
+
+    import ctypes
+
+    function = getattr(libc, strategy)
+    function.restype = ctypes.c_ssize_t
+
+    src_fd = src_file.fileno()
+    dst_fd = dst_file.fileno()
+
+    copied = 0
+    while copied < size:
+        chunk_size = ctypes.c_size_t(min(KERNEL_COPY_CHUNK_SIZE, size - copied))
+
+        if strategy == STRATEGY_COPY_FILE_RANGE:
+            result = function(src_fd, None, dst_fd, None, chunk_size, ctypes.c_uint(0))
+        else:
+            result = function(dst_fd, src_fd, None, chunk_size)
+
+        if result <= 0:
+            if copied:
+                # the copy was interrupted in between -> restart it from the beginning with another strategy
+                src_file.seek(0)
+                dst_file.seek(0)
+                dst_file.truncate()
+            return False
+
+        copied += result
+
+    return True
+
+
+def materialize_file(src_path, dst_path, allow_link=True):
+    """
+    Materializes the file of the source path at the destination path, using the cheapest strategy available. An
+    existing destination file is removed (not overwritten), so that files sharing its inode stay untouched.
+
+    :param src_path: the path of the file to materialize
+    :type src_path: basestring
+
+    :param dst_path: the path where to materialize the file
+    :type dst_path: basestring
+
+    :param allow_link: true if the destination may share the inode with the source (hard link), false if it needs an
+        own inode
+    :type allow_link: bool
+
+    :return: the name of the strategy which materialized the file
+    :rtype: str
+    """
+
+    assert isinstance(src_path, basestring)
+    assert isinstance(dst_path, basestring)
+    assert isinstance(allow_link, bool)
+
+    from os import remove, fstat
+    from os.path import isfile, lexists
+
+    assert isfile(src_path), "The file `%s` can not be materialized, since it does not exist!" % src_path
+
+    if lexists(dst_path):
+        remove(dst_path)
+
+    if allow_link and __try_link(src_path, dst_path):
+        return STRATEGY_LINK
+
+    with open(src_path, 'rb') as src_file:
+        with open(dst_path, 'wb') as dst_file:
+
+            if __try_reflink(src_file, dst_file):
+                return STRATEGY_REFLINK
+
+            size = fstat(src_file.fileno()).st_size
+            for strategy in (STRATEGY_COPY_FILE_RANGE, STRATEGY_SENDFILE):
+                if __try_kernel_copy(src_file, dst_file, size, strategy):
+                    return strategy
+
+            from shutil import copyfileobj
+            copyfileobj(src_file, dst_file)
+
+    return STRATEGY_COPY
+
+
+def materialize_tree(src_dir_path, dst_dir_path, allow_link=True):
+    """
+    Materializes a complete folder structure file by file. The destination folder must not exist yet. Like
+    shutil.copytree, the permission bits and times of the files and folders are copied too.
+
+    :param src_dir_path: the folder to materialize
+    :type src_dir_path: basestring
+
+    :param dst_dir_path: the folder where to materialize the structure in
+    :type dst_dir_path: basestring
+
+    :param allow_link: true if the files may share their inodes with the source files (hard links), false otherwise,
+        e.g. for backups, which must not change if the source files are written in place
+    :type allow_link: bool
+    """
+
+    assert isinstance(src_dir_path, basestring)
+    assert isinstance(dst_dir_path, basestring)
+    assert isinstance(allow_link, bool)
+
+    from os import walk, mkdir, symlink, readlink
+    from shutil import copystat
+    from os.path import isdir, islink, relpath, exists
+
+    assert isdir(src_dir_path)
+    assert not exists(dst_dir_path), "The folder `%s` does already exist!" % dst_dir_path
+
+    src_dir_path = src_dir_path.rstrip(PATH_SEPARATOR)
+    dst_dir_path = dst_dir_path.rstrip(PATH_SEPARATOR)
+
+    mkdir(dst_dir_path)
+
+    # the folders get their times after their content was materialized, which would modify them otherwise
+    dir_paths = [(src_dir_path, dst_dir_path)]
+
+    for (dir_path, dir_names, file_names) in walk(src_dir_path):
+        relative_path = relpath(dir_path, src_dir_path)
+        target_dir_path = dst_dir_path if relative_path == '.' else dst_dir_path + PATH_SEPARATOR + relative_path
+
+        for dir_name in dir_names:
+            src_path = dir_path + PATH_SEPARATOR + dir_name
+            dst_path = target_dir_path + PATH_SEPARATOR + dir_name
+
+            # symbolic links are re-created, but never followed (same behaviour as shutil.copytree)
+            if islink(src_path):
+                symlink(readlink(src_path), dst_path)
+            else:
+                mkdir(dst_path)
+                dir_paths.append((src_path, dst_path))
+
+        for file_name in file_names:
+            src_path = dir_path + PATH_SEPARATOR + file_name
+            dst_path = target_dir_path + PATH_SEPARATOR + file_name
+
+            if islink(src_path):
+                symlink(readlink(src_path), dst_path)
+            elif materialize_file(src_path, dst_path, allow_link) != STRATEGY_LINK:
+                copystat(src_path, dst_path)
+
+    for (src_path, dst_path) in reversed(dir_paths):
+        copystat(src_path, dst_path)
+
+
+def detach_file(file_path):
+    """
+    Ensures that a file does not share its inode with any other file, e.g. before it is going to be modified in
+    place. If the file is hard linked, it is replaced by a private copy (cloned copy-on-write if possible).
+
+    :param file_path: the path of the file to detach
+    :type file_path: basestring
+
+    :return: true if the file had to be detached, false if it already owned its inode
+    :rtype: bool
+    """
+
+    assert isinstance(file_path, basestring)
+
+    from os import stat, rename, remove
+    from os.path import isfile
+
+    if not isfile(file_path) or stat(file_path).st_nlink <= 1:
+        return False
+
+    detached_file_path = file_path + '.detached'
+    materialize_file(file_path, detached_file_path, allow_link=False)
+
+    try:
+        rename(detached_file_path, file_path)
+    except OSError:
+        remove(detached_file_path)
+        raise
+
+    return True
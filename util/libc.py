@@ -0,0 +1,30 @@
+"""
+Lazy access to the C library, for system calls which are not exposed by python 2 itself (e.g. `copy_file_range`,
+`sendfile` or `posix_fadvise`).
+"""
+
+__author__ = 'Alexander Dethof'
+
+# lazily loaded handle of the C library (False if not available)
+__libc = None
+
+
+def get_libc():
+    """
+    Returns a handle of the C library.
+
+    :return: a handle of the C library, or None if it can not be loaded
+    :rtype: ctypes.CDLL|None
+    """
+
+    global __libc
+
+    if __libc is None:
+        try:
+            import ctypes
+            import ctypes.util
+            __libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        except (ImportError, OSError):
+            __libc = False
+
+    return __libc or None
@@ -0,0 +1,383 @@
+"""
+In-process packet capture engine for linux, which replaces a tcpdump subprocess for the capture of a single UDP port.
+
+The capture opens a raw `AF_PACKET` socket on a device and attaches a classic BPF program, so that the kernel only
+passes the UDP datagrams of the requested port. The packets are received through a `PACKET_MMAP` ring buffer
+(TPACKET_V2) and are written directly into a pcap file. In contrast to a tcpdump process, the capture signals
+explicitly when it is ready to receive, and on stop it drains all packets which are still buffered by the kernel
+instead of being killed. Packets which the kernel dropped, since the ring was full, are counted on stop (see
+`PacketCapture.dropped_packet_count`), and errors of the capture (e.g. while writing the file) are raised by `stop`.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from struct import Struct
+from threading import Thread, Event
+
+# socket options (see <linux/if_packet.h>, <asm-generic/socket.h>)
+SOL_SOCKET = 1
+SO_ATTACH_FILTER = 26
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V2 = 1
+
+ETH_P_ALL = 0x0003
+
+# frame status flags of the ring
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+TP_STATUS_LOSING = 4
+
+# packet types and hardware types of the link layer address
+PACKET_OUTGOING = 4
+ARPHRD_LOOPBACK = 772
+
+# the namespace type to switch with setns (see <sched.h>)
+CLONE_NEWNET = 0x40000000
+
+# layout of the ring buffer: 8 blocks of 4 MB, each divided into frames of 16 KB -> 2048 frames
+RING_BLOCK_SIZE = 1 << 22
+RING_BLOCK_COUNT = 8
+RING_FRAME_SIZE = 1 << 14
+
+# time (in ms) the ring is polled on stop, to receive the packets which are still in flight
+DRAIN_TIMEOUT = 200
+
+# time (in ms) to wait for packets, before the stop flag is checked again
+POLL_TIMEOUT = 100
+
+# struct tpacket2_hdr and struct sockaddr_ll (which follows the header aligned to 16 bytes)
+TPACKET2_HEADER = Struct('=IIIHHII')
+TPACKET2_HEADER_SIZE = 32
+SOCKADDR_LL = Struct('=HHiHBB')
+SOCKADDR_LL_SIZE = 20
+
+# offset of the (ethernet) link layer header within a frame of the ring: the kernel places the network header at the
+# 16 bytes aligned end of the frame header, the sockaddr_ll and at least 16 bytes of link layer header space
+RING_FRAME_MAC_OFFSET = ((TPACKET2_HEADER_SIZE + SOCKADDR_LL_SIZE + 16 + 15) & ~15) - 14
+
+# maximum number of bytes captured per packet, i.e. what fits into a frame of the ring (the kernel truncates longer
+# packets to it, thus it is also the snap length declared in the capture)
+SNAP_LEN = RING_FRAME_SIZE - RING_FRAME_MAC_OFFSET
+
+# struct sock_filter, struct tpacket_req and struct tpacket_stats
+SOCK_FILTER = Struct('=HBBI')
+TPACKET_REQ = Struct('=IIII')
+TPACKET_STATS = Struct('=II')
+
+# classic BPF instructions (see <linux/filter.h>)
+BPF_LD_H_ABS = 0x28
+BPF_LD_B_ABS = 0x30
+BPF_LD_H_IND = 0x48
+BPF_LDX_B_MSH = 0xb1
+BPF_JMP_JEQ_K = 0x15
+BPF_JMP_JSET_K = 0x45
+BPF_RET_K = 0x06
+
+
+def get_udp_port_filter(port, is_dst_port_only=False):
+    """
+    Returns a classic BPF program which accepts the (first fragments of) IPv4 UDP datagrams of an ethernet device,
+    which are sent from or to a given port. It is the equivalent of tcpdump's filter `udp [dst] port <PORT>`,
+    restricted to IPv4.
+
+    :param port: the UDP port to capture
+    :type port: int
+
+    :param is_dst_port_only: true if only datagrams sent to the port should be accepted, false if also datagrams sent
+        from the port should be accepted
+    :type is_dst_port_only: bool
+
+    :return: the instructions of the program as list of tuples (code, jt, jf, k)
+    :rtype: list[tuple]
+    """
+
+    assert isinstance(port, int) and 0 < port < 65536
+    assert isinstance(is_dst_port_only, bool)
+
+    # the jump offsets are relative to the next instruction, so the programs are built from the end:
+    # [..., accept, reject]
+    accept = (BPF_RET_K, 0, 0, SNAP_LEN)
+    reject = (BPF_RET_K, 0, 0, 0)
+
+    port_checks = [
+        (BPF_LD_H_IND, 0, 0, 16),           # load the UDP destination port
+        (BPF_JMP_JEQ_K, 0, 1, port),        # equal -> accept, otherwise -> reject
+    ]
+
+    if not is_dst_port_only:
+        port_checks = [
+            (BPF_LD_H_IND, 0, 0, 14),       # load the UDP source port
+            (BPF_JMP_JEQ_K, 2, 0, port),    # equal -> accept
+        ] + port_checks
+
+    header_checks = [
+        (BPF_LD_H_ABS, 0, 0, 12),           # load the ether type
+        (BPF_JMP_JEQ_K, 0, None, 0x0800),   # IPv4?
+        (BPF_LD_B_ABS, 0, 0, 23),           # load the IP protocol
+        (BPF_JMP_JEQ_K, 0, None, 17),       # UDP?
+        (BPF_LD_H_ABS, 0, 0, 20),           # load the fragment offset
+        (BPF_JMP_JSET_K, None, 0, 0x1fff),  # no first fragment -> reject
+        (BPF_LDX_B_MSH, 0, 0, 14),          # X = length of the IP header
+    ]
+
+    # resolve the jumps to `reject` (marked with None)
+    program = list()
+    for (i, (code, jt, jf, k)) in enumerate(header_checks):
+        distance = len(header_checks) - i - 1 + len(port_checks) + 1
+        program.append((code, distance if jt is None else jt, distance if jf is None else jf, k))
+
+    return program + port_checks + [accept, reject]
+
+
+class PacketCapture(object):
+    """
+    Captures the UDP datagrams of a port on a device into a pcap file, until it is stopped.
+    """
+
+    def __init__(self, device, pcap_path, port, is_dst_port_only=False, network_namespace_name=None):
+        """
+        Initializes the capture.
+
+        :param device: the name of the device to capture on
+        :type device: basestring
+
+        :param pcap_path: the path of the pcap file to write
+        :type pcap_path: basestring
+
+        :param port: the UDP port to capture
+        :type port: int
+
+        :param is_dst_port_only: true if only datagrams sent to the port should be captured, false if also datagrams
+            sent from the port should be captured
+        :type is_dst_port_only: bool
+
+        :param network_namespace_name: the name of the network namespace wherein the device is located (None -> the
+            namespace of the application)
+        :type network_namespace_name: basestring|None
+        """
+
+        assert isinstance(device, basestring)
+        assert isinstance(pcap_path, basestring)
+        assert isinstance(port, int)
+        assert isinstance(is_dst_port_only, bool)
+        assert network_namespace_name is None or isinstance(network_namespace_name, basestring)
+
+        self.__device = device
+        self.__pcap_path = pcap_path
+        self.__port = port
+        self.__is_dst_port_only = is_dst_port_only
+        self.__network_namespace_name = network_namespace_name
+
+        self.__socket = None
+        self.__ring = None
+        self.__thread = None
+        self.__error = None
+        self.__is_ready = Event()
+        self.__is_stopped = Event()
+
+        self.packet_count = 0
+
+        # the number of packets dropped by the kernel (known after the capture was stopped); on loopback devices the
+        #  dropped outgoing duplicates are counted too
+        self.dropped_packet_count = 0
+
+    def __enter_network_namespace(self):
+        """
+        Switches the calling thread into the capture's network namespace.
+
+        :return: the file of the thread's previous namespace, to switch back (None if no namespace is given)
+        :rtype: file|None
+        """
+
+        if self.__network_namespace_name is None:
+            return None
+
+        from util.libc import get_libc
+
+        libc = get_libc()
+        if libc is None or not hasattr(libc, 'setns'):
+            raise OSError('The network namespace `%s` can not be entered!' % self.__network_namespace_name)
+
+        previous_namespace = open('/proc/thread-self/ns/net', 'rb')
+
+        with open('/var/run/netns/%s' % self.__network_namespace_name, 'rb') as namespace:
+            if libc.setns(namespace.fileno(), CLONE_NEWNET) != 0:
+                previous_namespace.close()
+                raise OSError('The network namespace `%s` can not be entered!' % self.__network_namespace_name)
+
+        return previous_namespace
+
+    @staticmethod
+    def __leave_network_namespace(previous_namespace):
+        """
+        Switches the calling thread back into its previous network namespace.
+
+        :param previous_namespace: the file of the previous namespace (see `__enter_network_namespace`)
+        :type previous_namespace: file|None
+        """
+
+        if previous_namespace is None:
+            return
+
+        from util.libc import get_libc
+
+        get_libc().setns(previous_namespace.fileno(), CLONE_NEWNET)
+        previous_namespace.close()
+
+    def __open_socket(self):
+        """
+        Opens the raw socket with the port filter and maps its ring buffer.
+        """
+
+        import ctypes
+        import mmap
+        import socket
+
+        # sockets stay in the namespace they were created in, so the namespace is only entered for the creation
+        previous_namespace = self.__enter_network_namespace()
+        try:
+            self.__socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+            self.__socket.bind((self.__device, ETH_P_ALL))
+        finally:
+            self.__leave_network_namespace(previous_namespace)
+
+        # attach the filter before the ring is set up, so that no foreign packets are queued
+        program = get_udp_port_filter(self.__port, self.__is_dst_port_only)
+        instructions = ctypes.create_string_buffer(''.join(SOCK_FILTER.pack(*i) for i in program))
+        sock_fprog = Struct('HL').pack(len(program), ctypes.addressof(instructions))
+        self.__socket.setsockopt(SOL_SOCKET, SO_ATTACH_FILTER, sock_fprog)
+
+        frame_count = RING_BLOCK_SIZE / RING_FRAME_SIZE * RING_BLOCK_COUNT
+        self.__socket.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V2)
+        self.__socket.setsockopt(SOL_PACKET, PACKET_RX_RING, TPACKET_REQ.pack(
+            RING_BLOCK_SIZE, RING_BLOCK_COUNT, RING_FRAME_SIZE, frame_count
+        ))
+
+        self.__ring = mmap.mmap(
+            self.__socket.fileno(),
+            RING_BLOCK_SIZE * RING_BLOCK_COUNT,
+            mmap.MAP_SHARED,
+            mmap.PROT_READ | mmap.PROT_WRITE
+        )
+
+    def __capture(self):
+        """
+        Reads the packets from the ring buffer and writes them into the pcap file until the capture is stopped and
+        drained. Any error is kept to be raised by `start` or `stop`.
+        """
+
+        import select
+        import sys
+        from util.pcapFile import PcapWriter, LINK_TYPE_ETHERNET
+
+        try:
+            self.__open_socket()
+
+            ring = self.__ring
+            frame_count = RING_BLOCK_SIZE / RING_FRAME_SIZE * RING_BLOCK_COUNT
+            frame_index = 0
+
+            poller = select.poll()
+            poller.register(self.__socket.fileno(), select.POLLIN | select.POLLERR)
+
+            with PcapWriter(self.__pcap_path, LINK_TYPE_ETHERNET, SNAP_LEN) as writer:
+                self.__is_ready.set()
+
+                while True:
+                    offset = frame_index * RING_FRAME_SIZE
+                    (status, length, snap_length, mac, net, sec, nsec) = TPACKET2_HEADER.unpack_from(ring, offset)
+
+                    # frames flagged with TP_STATUS_LOSING follow packets, which the kernel dropped since the ring was
+                    #  full; they are counted by the statistics, which are read when the capture is stopped
+                    if status & TP_STATUS_USER:
+                        (family, protocol, if_index, hardware_type, packet_type, address_length) = \
+                            SOCKADDR_LL.unpack_from(ring, offset + TPACKET2_HEADER_SIZE)
+
+                        # loopback devices see each packet twice (outgoing and incoming) -> keep the incoming one,
+                        # like libpcap does
+                        if not (packet_type == PACKET_OUTGOING and hardware_type == ARPHRD_LOOPBACK):
+                            writer.write(sec, nsec / 1000, length, ring[offset + mac:offset + mac + snap_length])
+                            self.packet_count += 1
+
+                        # hand the frame back to the kernel
+                        ring[offset:offset + 4] = '\x00\x00\x00\x00'
+                        frame_index = (frame_index + 1) % frame_count
+                        continue
+
+                    if self.__is_stopped.is_set():
+                        # drain: wait for packets still in flight, until the device stays quiet
+                        if not poller.poll(DRAIN_TIMEOUT):
+                            break
+                    else:
+                        poller.poll(POLL_TIMEOUT)
+
+            # the statistics are reset by each read, so they are read once for the complete capture
+            (_, self.dropped_packet_count) = TPACKET_STATS.unpack(
+                self.__socket.getsockopt(SOL_PACKET, PACKET_STATISTICS, TPACKET_STATS.size)
+            )
+
+        except Exception:
+            self.__error = sys.exc_info()
+            self.__is_ready.set()
+
+        finally:
+            if self.__ring is not None:
+                self.__ring.close()
+            if self.__socket is not None:
+                self.__socket.close()
+
+    def __raise_error(self):
+        """
+        Raises the error of the capture thread (with its traceback), if there is one.
+        """
+
+        if self.__error is not None:
+            (error_type, error, traceback) = self.__error
+            self.__error = None
+            raise error_type, error, traceback
+
+    def start(self, timeout=5):
+        """
+        Starts the capture and waits until it is ready to receive packets.
+
+        :param timeout: the maximum time (in s) to wait until the capture is ready
+        :type timeout: int|float
+
+        :return: self
+        :rtype: PacketCapture
+
+        :raises: OSError|IOError|socket.error, if the capture could not be started (e.g. due to missing privileges)
+        """
+
+        self.__thread = Thread(target=self.__capture)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+        if not self.__is_ready.wait(timeout):
+            self.__is_stopped.set()
+            raise OSError('The capture on the device `%s` did not get ready in time!' % self.__device)
+
+        if self.__error is not None:
+            self.__thread.join()
+            self.__raise_error()
+
+        return self
+
+    def stop(self):
+        """
+        Stops the capture, after all packets which are still buffered or in flight have been written to the file.
+        Afterwards, `dropped_packet_count` gives the number of packets which the kernel dropped.
+
+        :raises: the error which aborted the capture (e.g. IOError, if the file could not be written)
+        """
+
+        self.__is_stopped.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        self.__raise_error()
@@ -0,0 +1,387 @@
+"""
+Indexes the packets of a pcap file in a structured numpy array (see `PACKET_INDEX_DTYPE`), so that tools can look up
+the header fields of all packets at once and slice the packets' data from the file, instead of dissecting the capture
+again.
+
+The record headers are walked once; the link, IPv4, UDP, RTP and MPEG-TS headers are then parsed for all packets at
+once on a memory map of the file. The index is stored as `.npy` sidecar next to the capture (see
+`get_packet_index_file_path`) and is memory-mapped by all further loads, until the capture is modified.
+"""
+
+__author__ = 'Alexander Dethof'
+
+import numpy
+
+from util.pcapFile import PcapReader, GLOBAL_HEADER_SIZE, RECORD_HEADER_SIZE, UDP_HEADER_SIZE, \
+    LINK_TYPE_ETHERNET, LINK_TYPE_LINUX_SLL, LINK_TYPE_NULL, LINK_TYPE_RAW, LINK_TYPE_RAW_OPENBSD, \
+    ETHER_TYPE_IPV4, ETHER_TYPE_VLAN, IP_PROTOCOL_UDP
+
+# the maximum number of TS packets of a datagram, whose headers are indexed (7 x 188 bytes fit into an ethernet frame)
+TS_PACKETS_PER_DATAGRAM = 7
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+RTP_HEADER_SIZE = 12
+
+# suffix of the index file of a capture
+PACKET_INDEX_FILE_SUFFIX = '.index.npy'
+
+PACKET_INDEX_DTYPE = numpy.dtype([
+    # file offset of the captured data of the packet (behind its record header)
+    ('offset', '<i8'),
+    ('captured_length', '<u4'),
+    ('original_length', '<u4'),
+    # capture time in ns
+    ('timestamp', '<i8'),
+    ('src_port', '<u2'),
+    ('dst_port', '<u2'),
+    # file offset of the UDP payload (-1 for packets which are no UDP datagrams)
+    ('payload_offset', '<i8'),
+    ('payload_length', '<u4'),
+    # CRC-32 of the UDP payload (of the captured data for packets which are no UDP datagrams)
+    ('payload_checksum', '<u4'),
+    # length of the RTP header, incl. CSRC identifiers and header extension (0 if the payload is no RTP packet)
+    ('rtp_header_length', '<u2'),
+    ('rtp_sequence_number', '<u2'),
+    ('rtp_timestamp', '<u4'),
+    ('rtp_ssrc', '<u4'),
+    ('rtp_payload_type', 'u1'),
+    ('rtp_marker', '?'),
+    # number of TS packets behind the UDP (or RTP) header, and the PID and continuity counter of the first ones
+    ('ts_count', 'u1'),
+    ('ts_pids', '<u2', (TS_PACKETS_PER_DATAGRAM,)),
+    ('ts_continuity_counters', 'u1', (TS_PACKETS_PER_DATAGRAM,))
+])
+
+
+def get_packet_index_file_path(pcap_file_path):
+    """
+    Returns the path of the index file of a capture.
+
+    :param pcap_file_path: the path of the pcap file
+    :type pcap_file_path: basestring
+
+    :rtype: basestring
+    """
+
+    return pcap_file_path + PACKET_INDEX_FILE_SUFFIX
+
+
+def __get_records(data, byte_order, is_nano):
+    """
+    Walks the record headers of a pcap file.
+
+    :param data: the content of the pcap file
+    :type data: mmap.mmap
+
+    :param byte_order: the byte order of the headers (`<` or `>`)
+    :type byte_order: basestring
+
+    :param is_nano: true if the timestamps are given in nanoseconds, false if given in microseconds
+    :type is_nano: bool
+
+    :return: tuple (offsets, captured lengths, original lengths, timestamps in ns)
+    :rtype: tuple
+    """
+
+    from struct import Struct
+
+    unpack_record_header = Struct(byte_order + 'IIII').unpack_from
+    fraction_scale = 1 if is_nano else 1000
+    file_size = len(data)
+
+    offsets = list()
+    captured_lengths = list()
+    original_lengths = list()
+    timestamps = list()
+
+    offset = GLOBAL_HEADER_SIZE
+    while offset + RECORD_HEADER_SIZE <= file_size:
+        (ts_sec, ts_frac, incl_len, orig_len) = unpack_record_header(data, offset)
+        offset += RECORD_HEADER_SIZE
+
+        if offset + incl_len > file_size:
+            # truncated record of an interrupted capture
+            break
+
+        offsets.append(offset)
+        captured_lengths.append(incl_len)
+        original_lengths.append(orig_len)
+        timestamps.append(ts_sec * 1000000000 + ts_frac * fraction_scale)
+
+        offset += incl_len
+
+    return (
+        numpy.array(offsets, dtype=numpy.int64),
+        numpy.array(captured_lengths, dtype=numpy.int64),
+        numpy.array(original_lengths, dtype=numpy.int64),
+        numpy.array(timestamps, dtype=numpy.int64)
+    )
+
+
+def build_packet_index(pcap_file_path):
+    """
+    Indexes the packets of a pcap file.
+
+    :param pcap_file_path: the path of the pcap file
+    :type pcap_file_path: basestring
+
+    :return: the index entry of each packet (see `PACKET_INDEX_DTYPE`)
+    :rtype: numpy.ndarray
+    """
+
+    assert isinstance(pcap_file_path, basestring)
+
+    from mmap import mmap, ACCESS_READ
+
+    with PcapReader(pcap_file_path) as reader:
+        (link_type, byte_order, is_nano) = (reader.link_type, reader.byte_order, reader.is_nano)
+
+    with open(pcap_file_path, 'rb') as pcap_file:
+        content = mmap(pcap_file.fileno(), 0, access=ACCESS_READ)
+
+    try:
+        return __index_packets(content, link_type, byte_order, is_nano)
+    finally:
+        content.close()
+
+
+def __index_packets(content, link_type, byte_order, is_nano):
+    """
+    Indexes the packets of the content of a pcap file.
+
+    :param content: the content of the pcap file
+    :type content: mmap.mmap
+
+    :param link_type: the link layer type of the capture
+    :type link_type: int
+
+    :param byte_order: the byte order of the headers (`<` or `>`)
+    :type byte_order: basestring
+
+    :param is_nano: true if the timestamps are given in nanoseconds, false if given in microseconds
+    :type is_nano: bool
+
+    :return: the index entry of each packet (see `PACKET_INDEX_DTYPE`)
+    :rtype: numpy.ndarray
+    """
+
+    from zlib import crc32
+
+    (offsets, captured_lengths, original_lengths, timestamps) = __get_records(content, byte_order, is_nano)
+
+    packet_count = len(offsets)
+    index = numpy.zeros(packet_count, dtype=PACKET_INDEX_DTYPE)
+    index['offset'] = offsets
+    index['captured_length'] = captured_lengths
+    index['original_length'] = original_lengths
+    index['timestamp'] = timestamps
+    index['payload_offset'] = -1
+
+    if not packet_count:
+        return index
+
+    data = numpy.frombuffer(content, dtype=numpy.uint8)
+    ends = offsets + captured_lengths
+
+    def get_bytes(positions, is_valid):
+        # the bytes at the file positions, 0 where invalid or behind the captured data of a packet
+        is_valid = is_valid & (positions < ends)
+        return numpy.where(is_valid, data[numpy.where(is_valid, positions, 0)], 0).astype(numpy.int64)
+
+    def get_words(positions, is_valid):
+        return (get_bytes(positions, is_valid) << 8) | get_bytes(positions + 1, is_valid)
+
+    def get_double_words(positions, is_valid):
+        return (get_words(positions, is_valid) << 16) | get_words(positions + 2, is_valid)
+
+    is_packet = numpy.ones(packet_count, dtype=bool)
+
+    #
+    # link layer
+    #
+
+    if link_type == LINK_TYPE_ETHERNET:
+        ether_types = get_words(offsets + 12, is_packet)
+        is_vlan = ether_types == ETHER_TYPE_VLAN
+        ether_types = numpy.where(is_vlan, get_words(offsets + 16, is_vlan), ether_types)
+        ip_offsets = offsets + numpy.where(is_vlan, 18, 14)
+        is_ip = ether_types == ETHER_TYPE_IPV4
+    elif link_type == LINK_TYPE_LINUX_SLL:
+        ip_offsets = offsets + 16
+        is_ip = get_words(offsets + 14, is_packet) == ETHER_TYPE_IPV4
+    elif link_type == LINK_TYPE_NULL:
+        ip_offsets = offsets + 4
+        is_ip = is_packet.copy()
+    elif link_type in (LINK_TYPE_RAW, LINK_TYPE_RAW_OPENBSD):
+        ip_offsets = offsets
+        is_ip = is_packet.copy()
+    else:
+        ip_offsets = offsets
+        is_ip = ~is_packet
+
+    #
+    # IPv4 / UDP (only the first fragment of a datagram carries the UDP header)
+    #
+
+    is_ip &= ip_offsets + 20 <= ends
+    version_lengths = get_bytes(ip_offsets, is_ip)
+    is_udp = is_ip \
+        & (version_lengths >> 4 == 4) \
+        & (get_bytes(ip_offsets + 9, is_ip) == IP_PROTOCOL_UDP) \
+        & (get_words(ip_offsets + 6, is_ip) & 0x1fff == 0)
+
+    udp_offsets = ip_offsets + (version_lengths & 0x0f) * 4
+    is_udp &= udp_offsets + UDP_HEADER_SIZE <= ends
+
+    payload_offsets = udp_offsets + UDP_HEADER_SIZE
+    payload_lengths = numpy.where(is_udp, ends - payload_offsets, 0)
+
+    index['src_port'] = get_words(udp_offsets, is_udp)
+    index['dst_port'] = get_words(udp_offsets + 2, is_udp)
+    index['payload_offset'] = numpy.where(is_udp, payload_offsets, -1)
+    index['payload_length'] = payload_lengths
+
+    #
+    # RTP (version 2)
+    #
+
+    first_bytes = get_bytes(payload_offsets, is_udp & (payload_lengths >= RTP_HEADER_SIZE))
+    is_rtp = is_udp & (payload_lengths >= RTP_HEADER_SIZE) & (first_bytes >> 6 == 2)
+
+    rtp_header_lengths = RTP_HEADER_SIZE + (first_bytes & 0x0f) * 4
+    has_extension = is_rtp & (first_bytes & 0x10 != 0) & (rtp_header_lengths + 4 <= payload_lengths)
+    rtp_header_lengths += numpy.where(
+        has_extension, 4 + get_words(payload_offsets + rtp_header_lengths + 2, has_extension) * 4, 0
+    )
+    is_rtp &= rtp_header_lengths <= payload_lengths
+
+    second_bytes = get_bytes(payload_offsets + 1, is_rtp)
+    index['rtp_header_length'] = numpy.where(is_rtp, rtp_header_lengths, 0)
+    index['rtp_marker'] = second_bytes & 0x80 != 0
+    index['rtp_payload_type'] = second_bytes & 0x7f
+    index['rtp_sequence_number'] = get_words(payload_offsets + 2, is_rtp)
+    index['rtp_timestamp'] = get_double_words(payload_offsets + 4, is_rtp)
+    index['rtp_ssrc'] = get_double_words(payload_offsets + 8, is_rtp)
+
+    #
+    # MPEG-TS, behind the UDP or RTP header
+    #
+
+    ts_offsets = payload_offsets + numpy.where(is_rtp, rtp_header_lengths, 0)
+    is_ts = is_udp & (get_bytes(ts_offsets, is_udp) == TS_SYNC_BYTE)
+    ts_counts = numpy.where(is_ts, (ends - ts_offsets) // TS_PACKET_SIZE, 0)
+    index['ts_count'] = numpy.minimum(ts_counts, 0xff)
+
+    for ts_index in xrange(TS_PACKETS_PER_DATAGRAM):
+        header_offsets = ts_offsets + ts_index * TS_PACKET_SIZE
+        is_synced = (ts_counts > ts_index) & (get_bytes(header_offsets, ts_counts > ts_index) == TS_SYNC_BYTE)
+
+        index['ts_pids'][:, ts_index] = get_words(header_offsets + 1, is_synced) & 0x1fff
+        index['ts_continuity_counters'][:, ts_index] = get_bytes(header_offsets + 3, is_synced) & 0x0f
+
+    #
+    # payload checksums (to identify the packets of a capture in a manipulated copy of it)
+    #
+
+    checksum_offsets = numpy.where(is_udp, payload_offsets, offsets).tolist()
+    index['payload_checksum'] = [
+        crc32(content[start:end]) & 0xffffffff for (start, end) in zip(checksum_offsets, ends.tolist())
+    ]
+
+    return index
+
+
+def load_packet_index(pcap_file_path, is_stored=True):
+    """
+    Returns the index of a capture from its sidecar file, or indexes the capture if the sidecar does not exist or is
+    older than the capture.
+
+    :param pcap_file_path: the path of the pcap file
+    :type pcap_file_path: basestring
+
+    :param is_stored: whether a new index is stored as sidecar file (if the folder of the capture is writable)
+    :type is_stored: bool
+
+    :return: the index entry of each packet (see `PACKET_INDEX_DTYPE`), memory-mapped if loaded from the sidecar
+    :rtype: numpy.ndarray
+    """
+
+    assert isinstance(pcap_file_path, basestring)
+
+    from os.path import exists, getmtime
+
+    index_file_path = get_packet_index_file_path(pcap_file_path)
+
+    if exists(index_file_path) and getmtime(index_file_path) >= getmtime(pcap_file_path):
+        try:
+            index = numpy.load(index_file_path, mmap_mode='r')
+            if index.dtype == PACKET_INDEX_DTYPE:
+                return index
+        except (IOError, OSError, ValueError):
+            pass
+
+    index = build_packet_index(pcap_file_path)
+
+    if is_stored:
+        from os import rename
+
+        try:
+            with open(index_file_path + '.part', 'wb') as index_file:
+                numpy.save(index_file, index)
+            rename(index_file_path + '.part', index_file_path)
+        except (IOError, OSError):
+            # the index is still usable for this run
+            pass
+
+    return index
+
+
+class PacketRecords(object):
+    """
+    Sequence of the records of a memory-mapped capture, looked up by its packet index. Like `util.pcapFile.PcapReader`,
+    each record is given as tuple (ts_sec, ts_frac, orig_len, data), but the data of a record is only sliced from the
+    map when the record is accessed, so that the captured bytes are never held in memory all at once.
+    """
+
+    def __init__(self, content, index, is_nano):
+        """
+        Initializes the records.
+
+        :param content: the memory map (or the content) of the capture
+        :type content: mmap.mmap|str
+
+        :param index: the packet index of the capture (see `load_packet_index`)
+        :type index: numpy.ndarray
+
+        :param is_nano: true if the timestamps of the records are given in nanoseconds, false if given in microseconds
+        :type is_nano: bool
+        """
+
+        assert isinstance(index, numpy.ndarray) and index.dtype == PACKET_INDEX_DTYPE
+        assert isinstance(is_nano, bool)
+
+        self.__content = content
+        self.__fields = index[['offset', 'captured_length', 'original_length', 'timestamp']]
+        self.__units_per_second = 1000000000 if is_nano else 1000000
+
+        # the index gives the timestamps in nanoseconds
+        self.__unit_size = 1000000000 // self.__units_per_second
+
+    def __len__(self):
+        return len(self.__fields)
+
+    def __getitem__(self, record_index):
+        (offset, captured_length, original_length, timestamp) = self.__fields[record_index].tolist()
+        timestamp //= self.__unit_size
+
+        return (
+            timestamp // self.__units_per_second,
+            timestamp % self.__units_per_second,
+            original_length,
+            self.__content[offset:offset + captured_length]
+        )
+
+    def __iter__(self):
+        for record_index in xrange(len(self.__fields)):
+            yield self[record_index]
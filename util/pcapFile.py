@@ -0,0 +1,278 @@
+"""
+Minimal reader and writer for pcap files (libpcap format), which does not need to dissect the packets like scapy does.
+It is meant for tools which only have to look at or patch a few header fields of a large number of packets.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from struct import Struct
+
+# magic numbers of the global header (microsecond and nanosecond resolution)
+PCAP_MAGIC_USEC = 0xa1b2c3d4
+PCAP_MAGIC_NSEC = 0xa1b23c4d
+
+# link layer types (see http://www.tcpdump.org/linktypes.html)
+LINK_TYPE_NULL = 0
+LINK_TYPE_ETHERNET = 1
+LINK_TYPE_RAW = 101
+LINK_TYPE_RAW_OPENBSD = 12
+LINK_TYPE_LINUX_SLL = 113
+
+ETHER_TYPE_IPV4 = 0x0800
+ETHER_TYPE_VLAN = 0x8100
+IP_PROTOCOL_UDP = 17
+
+# header sizes
+GLOBAL_HEADER_SIZE = 24
+RECORD_HEADER_SIZE = 16
+UDP_HEADER_SIZE = 8
+
+
+def get_udp_header_offset(link_type, data):
+    """
+    Returns the offset of the UDP header in a captured IPv4 frame.
+
+    :param link_type: the link layer type of the capture
+    :type link_type: int
+
+    :param data: the captured frame
+    :type data: str
+
+    :return: the offset of the UDP header, or None if the frame does not carry (the first fragment of) an IPv4 UDP
+        datagram
+    :rtype: int|None
+    """
+
+    if link_type == LINK_TYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+
+        ip_offset = 14
+        ether_type = (ord(data[12]) << 8) | ord(data[13])
+
+        if ether_type == ETHER_TYPE_VLAN and len(data) >= 18:
+            ip_offset = 18
+            ether_type = (ord(data[16]) << 8) | ord(data[17])
+
+        if ether_type != ETHER_TYPE_IPV4:
+            return None
+
+    elif link_type == LINK_TYPE_LINUX_SLL:
+        if len(data) < 16 or ((ord(data[14]) << 8) | ord(data[15])) != ETHER_TYPE_IPV4:
+            return None
+        ip_offset = 16
+
+    elif link_type == LINK_TYPE_NULL:
+        ip_offset = 4
+
+    elif link_type in (LINK_TYPE_RAW, LINK_TYPE_RAW_OPENBSD):
+        ip_offset = 0
+
+    else:
+        return None
+
+    if len(data) < ip_offset + 20 or ord(data[ip_offset]) >> 4 != 4:
+        return None
+
+    if ord(data[ip_offset + 9]) != IP_PROTOCOL_UDP:
+        return None
+
+    # only the first fragment of a datagram carries the UDP header
+    if ((ord(data[ip_offset + 6]) & 0x1f) << 8) | ord(data[ip_offset + 7]):
+        return None
+
+    udp_offset = ip_offset + (ord(data[ip_offset]) & 0x0f) * 4
+    if len(data) < udp_offset + UDP_HEADER_SIZE:
+        return None
+
+    return udp_offset
+
+
+class PcapReader(object):
+    """
+    Iterates over the records of a pcap file. Each record is returned as tuple (ts_sec, ts_frac, orig_len, data), where
+    `ts_frac` is given in micro- or nanoseconds, depending on the file's resolution (see `is_nano`).
+    """
+
+    def __init__(self, file_path):
+        """
+        Opens a pcap file and reads its global header.
+
+        :param file_path: the path of the pcap file to read
+        :type file_path: basestring
+        """
+
+        assert isinstance(file_path, basestring)
+
+        self.__file = open(file_path, 'rb')
+        header = self.__file.read(GLOBAL_HEADER_SIZE)
+
+        if len(header) < GLOBAL_HEADER_SIZE:
+            self.__file.close()
+            raise IOError('The file `%s` is no valid pcap file!' % file_path)
+
+        for byte_order in ('<', '>'):
+            magic = Struct(byte_order + 'I').unpack(header[:4])[0]
+            if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+                break
+        else:
+            self.__file.close()
+            raise IOError('The file `%s` is no valid pcap file (magic number: %s)!' % (
+                file_path, header[:4].encode('hex')
+            ))
+
+        self.byte_order = byte_order
+        self.is_nano = magic == PCAP_MAGIC_NSEC
+        (self.snap_len, self.link_type) = Struct(byte_order + 'II').unpack(header[16:24])
+
+        self.__record_header = Struct(byte_order + 'IIII')
+
+    def __iter__(self):
+        record_header = self.__record_header
+        read = self.__file.read
+
+        while True:
+            header = read(RECORD_HEADER_SIZE)
+            if len(header) < RECORD_HEADER_SIZE:
+                # end of file (or a truncated record of an interrupted capture)
+                return
+
+            (ts_sec, ts_frac, incl_len, orig_len) = record_header.unpack(header)
+            data = read(incl_len)
+
+            if len(data) < incl_len:
+                return
+
+            yield (ts_sec, ts_frac, orig_len, data)
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PcapWriter(object):
+    """
+    Writes records into a new pcap file.
+    """
+
+    def __init__(self, file_path, link_type, snap_len=65535, is_nano=False, byte_order='<'):
+        """
+        Creates a pcap file and writes its global header.
+
+        :param file_path: the path of the pcap file to write
+        :type file_path: basestring
+
+        :param link_type: the link layer type of the records
+        :type link_type: int
+
+        :param snap_len: the maximum number of bytes captured per packet
+        :type snap_len: int
+
+        :param is_nano: true if the timestamps are given in nanoseconds, false if given in microseconds
+        :type is_nano: bool
+
+        :param byte_order: the byte order of the headers (`<` or `>`)
+        :type byte_order: basestring
+        """
+
+        assert isinstance(file_path, basestring)
+        assert isinstance(link_type, int)
+        assert isinstance(snap_len, int)
+        assert isinstance(is_nano, bool)
+        assert byte_order in ('<', '>')
+
+        self.__file = open(file_path, 'wb')
+        self.__file.write(Struct(byte_order + 'IHHiIII').pack(
+            PCAP_MAGIC_NSEC if is_nano else PCAP_MAGIC_USEC, 2, 4, 0, 0, snap_len, link_type
+        ))
+
+        self.__record_header = Struct(byte_order + 'IIII')
+
+    @classmethod
+    def like(cls, file_path, reader):
+        """
+        Creates a pcap file with the same global settings (link type, resolution, ...) as an opened pcap file.
+
+        :param file_path: the path of the pcap file to write
+        :type file_path: basestring
+
+        :param reader: the reader of the pcap file to take the settings from
+        :type reader: PcapReader
+
+        :rtype: PcapWriter
+        """
+
+        assert isinstance(reader, PcapReader)
+        return cls(file_path, reader.link_type, reader.snap_len, reader.is_nano, reader.byte_order)
+
+    def write(self, ts_sec, ts_frac, orig_len, data):
+        """
+        Appends a record to the file.
+
+        :param ts_sec: the seconds of the capture timestamp
+        :type ts_sec: int
+
+        :param ts_frac: the micro- or nanoseconds of the capture timestamp
+        :type ts_frac: int
+
+        :param orig_len: the original length of the packet on the wire
+        :type orig_len: int
+
+        :param data: the captured bytes of the packet
+        :type data: str
+        """
+
+        self.__file.write(self.__record_header.pack(ts_sec, ts_frac, len(data), orig_len) + data)
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def rewrite_udp_destination_port(file_path, port):
+    """
+    Rewrites the destination port of all UDP datagrams in a pcap file in place. Since the port is part of the UDP
+    checksum, the checksum is set to zero (i.e. "not computed", which is valid for IPv4).
+
+    :param file_path: the path of the pcap file to rewrite
+    :type file_path: basestring
+
+    :param port: the destination port to set
+    :type port: int
+    """
+
+    assert isinstance(file_path, basestring)
+    assert isinstance(port, int) and 0 < port < 65536
+
+    from os import rename
+
+    port_bytes = chr(port >> 8) + chr(port & 0xff)
+    tmp_file_path = file_path + '.tmp'
+
+    with PcapReader(file_path) as reader:
+        with PcapWriter.like(tmp_file_path, reader) as writer:
+            link_type = reader.link_type
+
+            for (ts_sec, ts_frac, orig_len, data) in reader:
+                udp_offset = get_udp_header_offset(link_type, data)
+
+                if udp_offset is not None:
+                    data = data[:udp_offset + 2] \
+                        + port_bytes \
+                        + data[udp_offset + 4:udp_offset + 6] \
+                        + '\x00\x00' \
+                        + data[udp_offset + UDP_HEADER_SIZE:]
+
+                writer.write(ts_sec, ts_frac, orig_len, data)
+
+    rename(tmp_file_path, file_path)
@@ -0,0 +1,104 @@
+__author__ = 'Alexander Dethof'
+
+from threading import Condition
+
+
+class PortPool(object):
+    """
+    Hands out network ports to concurrently running jobs, so that each job can use an own port. Ports which are
+    occupied by other applications of the host are skipped.
+    """
+
+    def __init__(self, host, first_port, count, step=2):
+        """
+        Initializes the pool with a range of ports.
+
+        :param host: the host the ports are used on
+        :type host: basestring
+
+        :param first_port: the first port of the pool
+        :type first_port: int
+
+        :param count: the number of ports in the pool
+        :type count: int
+
+        :param step: the distance between two ports of the pool (2 by default, since RTP senders use the following odd
+            port for RTCP)
+        :type step: int
+        """
+
+        assert isinstance(host, basestring)
+        assert isinstance(first_port, int)
+        assert isinstance(count, int) and count > 0
+        assert isinstance(step, int) and step > 0
+        assert 0 < first_port and first_port + (count - 1) * step + 1 < 65536
+
+        self.__host = host
+        self.__free_ports = [first_port + i * step for i in range(count)]
+        self.__step = step
+        self.__condition = Condition()
+
+    def __is_available_on_host(self, port):
+        """
+        Checks if a port (and its companion ports within the step) is not bound by another application.
+
+        :param port: the port to check
+        :type port: int
+
+        :return: true if the port is available, false otherwise
+        :rtype: bool
+        """
+
+        import socket
+
+        sockets = list()
+        try:
+            for p in range(port, port + self.__step):
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sockets.append(s)
+                s.bind((self.__host, p))
+        except socket.error:
+            return False
+        finally:
+            for s in sockets:
+                s.close()
+
+        return True
+
+    def acquire(self):
+        """
+        Returns a port which is not used by another job. Blocks until a port is released, if all ports are in use.
+
+        :return: a port which is not used by another job
+        :rtype: int
+
+        :raises: Warning, if all ports of the pool which are not in use are occupied on the host
+        """
+
+        with self.__condition:
+            while not self.__free_ports:
+                self.__condition.wait()
+
+            for port in self.__free_ports:
+                if self.__is_available_on_host(port):
+                    self.__free_ports.remove(port)
+                    return port
+
+            raise Warning('All free ports of the pool (%s) are occupied on the host `%s`!' % (
+                ', '.join(str(p) for p in self.__free_ports), self.__host
+            ))
+
+    def release(self, port):
+        """
+        Returns a port to the pool.
+
+        :param port: the port to return
+        :type port: int
+        """
+
+        assert isinstance(port, int)
+
+        with self.__condition:
+            assert port not in self.__free_ports, 'The port %d was not acquired!' % port
+            self.__free_ports.append(port)
+            self.__condition.notify()
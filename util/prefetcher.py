@@ -0,0 +1,193 @@
+"""
+Background read-ahead for the inputs of upcoming jobs. While a tool works on its current job, the inputs of the next
+jobs are pulled into the page cache, so that they are not read cold from disk when their turn comes.
+"""
+
+__author__ = 'Alexander Dethof'
+
+from threading import Lock, Thread
+from Queue import Queue
+
+# advice for posix_fadvise to read the given range ahead (see <fcntl.h>)
+POSIX_FADV_WILLNEED = 3
+
+# chunk size of the sequential warm-up reads, which are used if posix_fadvise is not available
+WARM_UP_CHUNK_SIZE = 1 << 20
+
+
+def __advise_will_need(file_path):
+    """
+    Asks the kernel to read a file ahead into the page cache, without waiting for it.
+
+    :param file_path: the path of the file to read ahead
+    :type file_path: basestring
+
+    :return: true if the kernel accepted the advice, false otherwise
+    :rtype: bool
+    """
+
+    from util.libc import get_libc
+
+    libc = get_libc()
+    if libc is None or not hasattr(libc, 'posix_fadvise'):
+        return False
+
+    import ctypes
+
+    with open(file_path, 'rb') as f:
+        # offset 0 and length 0 cover the whole file
+        return libc.posix_fadvise(f.fileno(), ctypes.c_int64(0), ctypes.c_int64(0), POSIX_FADV_WILLNEED) == 0
+
+
+def __warm_up(file_path):
+    """
+    Reads a file sequentially once, to pull it into the page cache.
+
+    :param file_path: the path of the file to read
+    :type file_path: basestring
+    """
+
+    with open(file_path, 'rb') as f:
+        while f.read(WARM_UP_CHUNK_SIZE):
+            pass
+
+
+def read_ahead(file_path):
+    """
+    Pulls a file into the page cache, either by advising the kernel or by a sequential warm-up read.
+
+    :param file_path: the path of the file to read ahead
+    :type file_path: basestring
+    """
+
+    assert isinstance(file_path, basestring)
+
+    if not __advise_will_need(file_path):
+        __warm_up(file_path)
+
+
+class Prefetcher(object):
+    """
+    Reads the inputs of the next jobs of a tool ahead, using a small pool of worker threads. The prefetcher knows the
+    inputs of all jobs in the order in which the tool processes them. Each time the tool starts a job, it calls
+    `advance` with the job's input, which schedules the inputs of the following jobs, as long as the scheduled but not
+    yet consumed inputs fit into the byte budget.
+    """
+
+    def __init__(self, input_paths, depth, byte_budget, worker_count=2):
+        """
+        Initializes the prefetcher with the inputs of all jobs.
+
+        :param input_paths: the input paths of all jobs, in the order in which they are processed
+        :type input_paths: list
+
+        :param depth: the number of upcoming jobs whose inputs are read ahead
+        :type depth: int
+
+        :param byte_budget: the maximum number of bytes which are read ahead, but not consumed yet
+        :type byte_budget: int|long
+
+        :param worker_count: the number of threads reading ahead
+        :type worker_count: int
+        """
+
+        assert isinstance(input_paths, list)
+        assert isinstance(depth, int) and depth > 0
+        assert isinstance(byte_budget, (int, long)) and byte_budget > 0
+        assert isinstance(worker_count, int) and worker_count > 0
+
+        self.__input_paths = input_paths
+        self.__depth = depth
+        self.__byte_budget = byte_budget
+
+        # dict(input_path => position of its first job)
+        self.__positions = dict()
+        for (position, input_path) in enumerate(input_paths):
+            self.__positions.setdefault(input_path, position)
+
+        # dict(input_path => size) of all inputs which were scheduled, but are not consumed yet
+        self.__scheduled = dict()
+        self.__lock = Lock()
+
+        self.__queue = Queue()
+        self.__workers = list()
+        self.__is_stopped = False
+
+        for i in range(worker_count):
+            worker = Thread(target=self.__work)
+            worker.daemon = True
+            worker.start()
+            self.__workers.append(worker)
+
+    def __work(self):
+        """
+        Reads the queued inputs ahead until the prefetcher is stopped.
+        """
+
+        while True:
+            input_path = self.__queue.get()
+
+            if input_path is None or self.__is_stopped:
+                return
+
+            try:
+                read_ahead(input_path)
+            except (IOError, OSError):
+                # read ahead is only an optimization -> the job will report the missing input itself
+                pass
+
+    def advance(self, input_path):
+        """
+        Notifies the prefetcher that the job with the given input is started and schedules the inputs of the next
+        jobs.
+
+        :param input_path: the input path of the started job
+        :type input_path: basestring
+        """
+
+        assert isinstance(input_path, basestring)
+
+        if input_path not in self.__positions:
+            return
+
+        from os.path import getsize
+
+        position = self.__positions[input_path]
+
+        with self.__lock:
+            # release the budget of the inputs which are consumed now
+            for consumed_path in self.__input_paths[:position + 1]:
+                self.__scheduled.pop(consumed_path, None)
+
+            used_bytes = sum(self.__scheduled.values())
+
+            for next_path in self.__input_paths[position + 1:position + 1 + self.__depth]:
+                if next_path in self.__scheduled:
+                    continue
+
+                try:
+                    size = getsize(next_path)
+                except OSError:
+                    continue
+
+                if used_bytes + size > self.__byte_budget:
+                    break
+
+                used_bytes += size
+                self.__scheduled[next_path] = size
+                self.__queue.put(next_path)
+
+    def cleanup(self):
+        """
+        Stops all worker threads, without reading ahead the inputs which are still queued.
+        """
+
+        self.__is_stopped = True
+
+        for worker in self.__workers:
+            self.__queue.put(None)
+
+        for worker in self.__workers:
+            worker.join()
+
+        self.__workers = list()
@@ -0,0 +1,270 @@
+__author__ = 'Alexander Dethof'
+
+from threading import Lock, Event, Thread
+# noinspection PyPep8Naming
+from os import sep as PATH_SEPARATOR
+
+
+class StagingCache(object):
+    """
+    Stages (i.e. copies) source files from slow storage (e.g. network shares) into a fast staging folder, like a tmpfs
+    mount under `/dev/shm` or a local SSD. The cache keeps the total size of all staged files within a configured byte
+    budget. If a new file does not fit in, the least recently used files are evicted, unless they are pinned by a job
+    which is currently working on them.
+
+    Files which can not be staged (too large, budget occupied by pinned files, copy errors) are simply not staged, so
+    that the callers can always fall back to the original path.
+    """
+
+    # entry fields
+    ENTRY_FIELD_STAGED_PATH = 'staged_path'
+    ENTRY_FIELD_SIZE = 'size'
+    ENTRY_FIELD_MTIME = 'mtime'
+    ENTRY_FIELD_PIN_COUNT = 'pin_count'
+    ENTRY_FIELD_READY = 'ready'
+
+    def __init__(self, staging_dir_path, byte_budget):
+        """
+        Initializes the cache for a given staging folder and byte budget.
+
+        :param staging_dir_path: the folder where to stage the files in (created if not existing)
+        :type staging_dir_path: basestring
+
+        :param byte_budget: the maximum number of bytes which can be staged at the same time
+        :type byte_budget: int|long
+        """
+
+        assert isinstance(staging_dir_path, basestring)
+        assert isinstance(byte_budget, (int, long)) and byte_budget > 0
+
+        from os.path import isdir
+        from os import makedirs
+
+        if not isdir(staging_dir_path):
+            makedirs(staging_dir_path)
+
+        from collections import OrderedDict
+
+        self.__staging_dir_path = staging_dir_path.rstrip(PATH_SEPARATOR) + PATH_SEPARATOR
+        self.__byte_budget = byte_budget
+        self.__used_bytes = 0
+
+        # dict(src_path => entry), ordered from the least to the most recently used entry
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+        self.__prefetch_threads = list()
+
+    def __get_staged_path(self, src_path):
+        """
+        Returns a unique path in the staging folder for a given source path.
+
+        :param src_path: the path of the source to stage
+        :type src_path: basestring
+
+        :return: the path where the source is staged
+        :rtype: str
+        """
+
+        from hashlib import md5
+        from os.path import abspath, basename
+
+        path_hash = md5(abspath(src_path)).hexdigest()[:12]
+        return self.__staging_dir_path + path_hash + '_' + basename(src_path)
+
+    def __evict(self, required_bytes):
+        """
+        Evicts the least recently used, unpinned entries until the required number of bytes fits into the budget. Has
+        to be called with the cache's lock held.
+
+        :param required_bytes: the number of bytes which should fit into the budget
+        :type required_bytes: int|long
+
+        :return: true if the required bytes fit into the budget, false otherwise
+        :rtype: bool
+        """
+
+        if required_bytes > self.__byte_budget:
+            return False
+
+        from os import remove
+        from os.path import exists
+
+        for src_path in list(self.__entries.keys()):
+            if self.__used_bytes + required_bytes <= self.__byte_budget:
+                break
+
+            entry = self.__entries[src_path]
+            if entry[self.ENTRY_FIELD_PIN_COUNT] > 0 or not entry[self.ENTRY_FIELD_READY].is_set():
+                continue
+
+            del self.__entries[src_path]
+            self.__used_bytes -= entry[self.ENTRY_FIELD_SIZE]
+
+            if exists(entry[self.ENTRY_FIELD_STAGED_PATH]):
+                remove(entry[self.ENTRY_FIELD_STAGED_PATH])
+
+        return self.__used_bytes + required_bytes <= self.__byte_budget
+
+    def __drop(self, src_path):
+        """
+        Removes an entry (and its staged file) from the cache. Has to be called with the cache's lock held.
+
+        :param src_path: the source path of the entry to remove
+        :type src_path: basestring
+        """
+
+        from os import remove
+        from os.path import exists
+
+        entry = self.__entries.pop(src_path)
+        self.__used_bytes -= entry[self.ENTRY_FIELD_SIZE]
+
+        if exists(entry[self.ENTRY_FIELD_STAGED_PATH]):
+            remove(entry[self.ENTRY_FIELD_STAGED_PATH])
+
+    def stage(self, src_path, pin=False):
+        """
+        Stages a source file, if it is not staged yet, and marks it as most recently used.
+
+        :param src_path: the path of the file to stage
+        :type src_path: basestring
+
+        :param pin: true if the staged file should be pinned, i.e. protected against eviction until `unpin` is called
+        :type pin: bool
+
+        :return: the path of the staged file, or the source path itself if the file could not be staged
+        :rtype: str
+        """
+
+        assert isinstance(src_path, basestring)
+        assert isinstance(pin, bool)
+
+        from os import stat
+        src_stat = stat(src_path)
+
+        with self.__lock:
+            entry = self.__entries.get(src_path)
+
+            # restage files which were modified after they were staged
+            if entry is not None \
+                    and entry[self.ENTRY_FIELD_READY].is_set() \
+                    and (entry[self.ENTRY_FIELD_SIZE] != src_stat.st_size
+                         or entry[self.ENTRY_FIELD_MTIME] != src_stat.st_mtime) \
+                    and entry[self.ENTRY_FIELD_PIN_COUNT] == 0:
+                self.__drop(src_path)
+                entry = None
+
+            is_owner = entry is None
+            if is_owner:
+                if not self.__evict(src_stat.st_size):
+                    return src_path
+
+                entry = {
+                    self.ENTRY_FIELD_STAGED_PATH: self.__get_staged_path(src_path),
+                    self.ENTRY_FIELD_SIZE: src_stat.st_size,
+                    self.ENTRY_FIELD_MTIME: src_stat.st_mtime,
+                    self.ENTRY_FIELD_PIN_COUNT: 0,
+                    self.ENTRY_FIELD_READY: Event()
+                }
+                self.__entries[src_path] = entry
+                self.__used_bytes += src_stat.st_size
+            else:
+                # mark entry as most recently used
+                del self.__entries[src_path]
+                self.__entries[src_path] = entry
+
+            if pin:
+                entry[self.ENTRY_FIELD_PIN_COUNT] += 1
+
+        if is_owner:
+            # copy outside of the lock, so that other files can be looked up in the meanwhile
+            is_staged = True
+            try:
+                from util.fileMaterializer import materialize_file
+                # a hard link would not move any data onto the staging storage
+                materialize_file(src_path, entry[self.ENTRY_FIELD_STAGED_PATH], allow_link=False)
+            except (IOError, OSError):
+                is_staged = False
+
+            with self.__lock:
+                entry[self.ENTRY_FIELD_READY].set()
+                if not is_staged:
+                    self.__drop(src_path)
+                    return src_path
+        else:
+            # another thread is staging the file right now -> wait until it is done
+            entry[self.ENTRY_FIELD_READY].wait()
+
+            with self.__lock:
+                if self.__entries.get(src_path) is not entry:
+                    return src_path
+
+        return entry[self.ENTRY_FIELD_STAGED_PATH]
+
+    def prefetch(self, src_paths):
+        """
+        Stages the given source files in background, e.g. the sources required by upcoming jobs.
+
+        :param src_paths: the paths of the files to stage
+        :type src_paths: list|tuple
+        """
+
+        assert isinstance(src_paths, (list, tuple))
+
+        def stage_all():
+            for src_path in src_paths:
+                self.stage(src_path)
+
+        thread = Thread(target=stage_all)
+        thread.daemon = True
+        thread.start()
+
+        self.__prefetch_threads = [t for t in self.__prefetch_threads if t.is_alive()]
+        self.__prefetch_threads.append(thread)
+
+    def unpin(self, src_path):
+        """
+        Releases a pin which was set on staging a file.
+
+        :param src_path: the source path of the staged file to unpin
+        :type src_path: basestring
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(src_path)
+            if entry is not None and entry[self.ENTRY_FIELD_PIN_COUNT] > 0:
+                entry[self.ENTRY_FIELD_PIN_COUNT] -= 1
+
+    def get_path(self, src_path):
+        """
+        Returns the path of the staged copy of a given source file, if it is staged, or the source path otherwise.
+
+        :param src_path: the path of the source file to look up
+        :type src_path: basestring
+
+        :return: the path of the staged copy of a given source file, if it is staged, or the source path otherwise
+        :rtype: str
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(src_path)
+            if entry is None or not entry[self.ENTRY_FIELD_READY].is_set():
+                return src_path
+
+            # mark entry as most recently used
+            del self.__entries[src_path]
+            self.__entries[src_path] = entry
+
+            return entry[self.ENTRY_FIELD_STAGED_PATH]
+
+    def cleanup(self):
+        """
+        Waits for running prefetches and removes all staged files.
+        """
+
+        for thread in self.__prefetch_threads:
+            thread.join()
+
+        with self.__lock:
+            for src_path in list(self.__entries.keys()):
+                self.__drop(src_path)